@@ -14,5 +14,6 @@ from wagtail.wagtailcore import urls as wagtail_urls
 urlpatterns = [
     url(r'^django-admin/', include(admin.site.urls)),
     url(r'^admin/', include(wagtailadmin_urls)),
+    url(r'^omniforms/', include('omniforms.urls')),
     url(r'', include(wagtail_urls))
 ]
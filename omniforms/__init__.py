@@ -7,6 +7,8 @@ from __future__ import unicode_literals
 
 VERSION = ['0', '4', '0']
 
+default_app_config = 'omniforms.apps.OmniFormsConfig'
+
 
 def get_version():
     """
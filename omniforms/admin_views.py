@@ -15,6 +15,7 @@ from django.shortcuts import get_object_or_404
 from django.views.generic import FormView, CreateView, DetailView, UpdateView
 from omniforms.admin_forms import AddRelatedForm, FieldForm
 from omniforms.models import OmniForm, OmniModelForm, OmniField, OmniRelatedField, OmniFormHandler
+from omniforms.registry import concrete_model_registry
 
 
 class AdminView(PermissionRequiredMixin, FormView):
@@ -251,17 +252,12 @@ class SelectHandlerViewMixin(object):
         """
         Method for getting form handler model class content types
 
-        :return: Queryset of ContentType model instances
+        :return: List of (content type pk, content type name) tuples
         """
-        content_types = filter(
-            lambda x: (
-                x.model_class() is not None and
-                issubclass(x.model_class(), OmniFormHandler) and
-                x.model_class() != OmniFormHandler
-            ),
-            ContentType.objects.all()
-        )
-        return [(content_type.pk, '{0}'.format(content_type)) for content_type in content_types]
+        return [
+            (content_type.pk, '{0}'.format(content_type))
+            for content_type, model_class in concrete_model_registry.get_content_types(OmniFormHandler)
+        ]
 
 
 class CreateHandlerView(CreateView):
@@ -491,11 +487,14 @@ class OmniModelFormFieldView(OmniModelFormRelatedView):
         :type request: django.http.HttpRequest
         """
         self.omni_form = self._load_omni_form(args[0])
+        introspection = self.omni_form.get_model_introspection()
         try:
-            self.model_field = self.omni_form.content_type.model_class()._meta.get_field(args[1])
+            self.model_field = introspection.model_class._meta.get_field(args[1])
         except FieldDoesNotExist:
             raise Http404
-        self.model = OmniField.get_concrete_class_for_model_field(self.model_field)
+        self.model = introspection.omni_field_classes.get(args[1])
+        if self.model is None:
+            self.model = OmniField.get_concrete_class_for_model_field(self.model_field)
         return super(OmniModelFormFieldView, self).dispatch(request, *args, **kwargs)
 
     def get_object(self, queryset=None):
@@ -546,8 +545,7 @@ class OmniModelFormFieldView(OmniModelFormRelatedView):
             widgets['related_type'] = forms.HiddenInput
 
         if len(self.model.FORM_WIDGETS) > 1:
-            choices = map(lambda x: (x, x.rsplit('.')[-1]), self.model.FORM_WIDGETS)
-            widgets['widget_class'] = forms.Select(choices=choices)
+            widgets['widget_class'] = forms.Select(choices=self.model.get_widget_choices())
 
         return widgets
 
@@ -735,8 +733,7 @@ class OmniFormFieldView(OmniFormRelatedView):
         })
 
         if len(self.model.FORM_WIDGETS) > 1:
-            choices = map(lambda x: (x, x.rsplit('.')[-1]), self.model.FORM_WIDGETS)
-            widgets['widget_class'] = forms.Select(choices=choices)
+            widgets['widget_class'] = forms.Select(choices=self.model.get_widget_choices())
 
         return widgets
 
@@ -771,10 +768,8 @@ class OmniFormSelectFieldView(OmniFormSelectRelatedView):
         :return: Dict of kwargs for the form
         """
         return [
-            [instance.pk, instance.name] for instance in ContentType.objects.order_by('model')
-            if instance.model_class() is not None
-            and issubclass(instance.model_class(), OmniField)
-            and instance.model_class() != OmniField
+            [content_type.pk, content_type.name]
+            for content_type, model_class in concrete_model_registry.get_content_types(OmniField)
         ]
 
 
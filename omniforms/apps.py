@@ -0,0 +1,29 @@
+# -*- coding:utf8 -*-
+"""
+Omni forms app config
+"""
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+
+
+class OmniFormsConfig(AppConfig):
+    """
+    Custom app config for the omni forms app
+    """
+    name = 'omniforms'
+
+    def ready(self):
+        """
+        Populates the concrete model registry, connects the omniforms signal
+        receivers and compiles (and validates) the OmniField field mapping and
+        the form field and widget classes used by each OmniField subclass
+        """
+        from omniforms import signals
+        from omniforms.models import OmniField, OmniFormBase, OmniFormHandler
+        from omniforms.registry import concrete_model_registry
+        concrete_model_registry.populate(OmniField, OmniFormHandler, OmniFormBase)
+        signals.connect_model_receivers()
+        OmniField.get_field_mapping()
+        for model_class in concrete_model_registry.get_concrete_models(OmniField):
+            model_class.validate_import_paths()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Attachment handling for the omniforms email handlers
+"""
+from __future__ import unicode_literals
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils.encoding import force_text
+from email.mime.base import MIMEBase
+import base64
+import mimetypes
+import threading
+import uuid
+import weakref
+
+
+_encode = getattr(base64, 'encodebytes', getattr(base64, 'encodestring', None))
+
+# Base64 encodes 57 bytes of input into a single 76 character line, so reading a
+# multiple of 57 bytes at a time produces correctly wrapped output for each chunk
+CHUNK_SIZE = 57 * 1024
+
+
+class Attachment(object):
+    """
+    An uploaded file prepared for attaching to outbound emails
+
+    The file content is read and base64 encoded a chunk at a time. The encoded content is held
+    in memory, as the email backends serialize each message in full before sending it; use the
+    OMNI_FORMS_ATTACHMENT_MAX_SIZE setting to link to large files rather than attaching them.
+    The MIME part is built once and can be attached to any number of email messages
+    """
+    def __init__(self, file_object):
+        """
+        Reads and encodes the file
+
+        :param file_object: Uploaded file instance
+        :type file_object: django.core.files.File
+        """
+        super(Attachment, self).__init__()
+        self.name = file_object.name
+        self.content_type = (
+            getattr(file_object, 'content_type', None) or
+            mimetypes.guess_type(self.name)[0] or
+            'application/octet-stream'
+        )
+        self.size = 0
+        self._mime_part = None
+        encoded = []
+        remainder = b''
+        for chunk in file_object.chunks(CHUNK_SIZE):
+            self.size += len(chunk)
+            data = remainder + chunk
+            cutoff = len(data) - (len(data) % 57)
+            encoded.append(_encode(data[:cutoff]))
+            remainder = data[cutoff:]
+        if remainder:
+            encoded.append(_encode(remainder))
+        self._payload = b''.join(encoded).decode('ascii')
+
+    def get_mime_part(self):
+        """
+        Gets the MIME part for the attachment, building it from the encoded content on first use
+
+        :return: email.mime.base.MIMEBase instance
+        """
+        if self._mime_part is None:
+            part = MIMEBase(*self.content_type.split('/', 1))
+            part.set_payload(self._payload)
+            part['Content-Transfer-Encoding'] = 'base64'
+            filename = force_text(self.name)
+            try:
+                filename.encode('ascii')
+            except UnicodeEncodeError:
+                filename = ('utf-8', '', filename)
+            part.add_header('Content-Disposition', 'attachment', filename=filename)
+            self._mime_part = part
+            self._payload = None
+        return self._mime_part
+
+
+class AttachmentLink(object):
+    """
+    An uploaded file that is too large to attach, saved to storage and linked to from outbound emails
+    """
+    def __init__(self, file_object):
+        """
+        Saves the file to storage
+
+        :param file_object: Uploaded file instance
+        :type file_object: django.core.files.File
+        """
+        super(AttachmentLink, self).__init__()
+        self.name = file_object.name
+        self.size = file_object.size
+        directory = getattr(settings, 'OMNI_FORMS_ATTACHMENT_STORAGE_DIR', 'omniforms/attachments')
+        file_object.seek(0)
+        self.path = default_storage.save('{0}/{1}/{2}'.format(directory, uuid.uuid4().hex, self.name), file_object)
+        file_object.seek(0)
+        self.url = default_storage.url(self.path)
+
+
+class AttachmentSet(object):
+    """
+    The attachments for a single form submission
+    """
+    def __init__(self, files):
+        """
+        Prepares attachments for each uploaded file. Files larger than the
+        OMNI_FORMS_ATTACHMENT_MAX_SIZE setting are saved to storage and linked to instead
+
+        :param files: List of uploaded file instances
+        """
+        super(AttachmentSet, self).__init__()
+        max_size = getattr(settings, 'OMNI_FORMS_ATTACHMENT_MAX_SIZE', None)
+        self.attachments = []
+        self.links = []
+        for file_object in files:
+            if max_size is not None and file_object.size > max_size:
+                self.links.append(AttachmentLink(file_object))
+            else:
+                self.attachments.append(Attachment(file_object))
+
+    def get_mime_parts(self):
+        """
+        Gets the MIME parts for all inline attachments
+
+        :return: List of email.mime.base.MIMEBase instances
+        """
+        return [attachment.get_mime_part() for attachment in self.attachments]
+
+    def get_links_text(self):
+        """
+        Gets text listing the storage links for files that were too large to attach
+
+        :return: Text string (empty if there are no links)
+        """
+        return '\n'.join('{0}: {1}'.format(link.name, link.url) for link in self.links)
+
+
+_attachment_sets = weakref.WeakKeyDictionary()
+_attachment_sets_lock = threading.Lock()
+
+
+def get_attachments(form):
+    """
+    Gets the attachments for the uploaded files in the forms cleaned data
+    Files are only read once per form instance, however many handlers use them
+
+    :param form: Valid form instance
+    :return: AttachmentSet instance
+    """
+    with _attachment_sets_lock:
+        attachment_set = _attachment_sets.get(form)
+        if attachment_set is None:
+            attachment_set = AttachmentSet(
+                [value for value in form.cleaned_data.values() if isinstance(value, File)]
+            )
+            _attachment_sets[form] = attachment_set
+        return attachment_set
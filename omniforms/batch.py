@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Batch validation of many submissions against a single omni form
+
+Rows are validated by a single bound form instance that is rebound to each row in turn, so the
+form fields (and the choice sets and validators compiled into the validation plan of the form
+class) are built once per batch rather than once per row. Large batches can be split into chunks
+and validated in a pool of worker processes; each worker builds the form class once and
+validates every chunk it is given with its own form instance.
+"""
+from __future__ import unicode_literals
+from collections import namedtuple
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.forms.models import BaseModelForm
+import multiprocessing
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+class BatchResult(namedtuple('BatchResult', ['index', 'cleaned_data', 'errors'])):
+    """
+    The outcome of validating one row. Either cleaned_data or errors is None.
+    Errors are dicts of lists of {'message': ..., 'code': ...} dicts keyed by field name
+    """
+    __slots__ = ()
+
+    @property
+    def is_valid(self):
+        """
+        Whether or not the row is valid
+
+        :return: bool
+        """
+        return self.errors is None
+
+
+class BatchValidator(object):
+    """
+    Validates rows of submitted data with a single instance of the form class
+    """
+    def __init__(self, form_class):
+        """
+        Creates the form instance that is rebound to each row
+
+        :param form_class: Generated form class
+        """
+        super(BatchValidator, self).__init__()
+        self.form = form_class(data={})
+        self._model_class = form_class._meta.model if issubclass(form_class, BaseModelForm) else None
+
+    def validate(self, index, data):
+        """
+        Validates the row
+
+        :param index: The position of the row in the batch
+        :param data: Dict of submitted data
+        :return: BatchResult instance
+        """
+        form = self.form
+        form.data = data
+        form._errors = None
+        form._bound_fields_cache.clear()
+        form.__dict__.pop('changed_data', None)
+        if self._model_class is not None:
+            form.instance = self._model_class()
+        form.full_clean()
+        if form._errors:
+            return BatchResult(index, None, {name: errors.get_json_data() for name, errors in form._errors.items()})
+        return BatchResult(index, form.cleaned_data, None)
+
+
+def _chunks(rows, chunk_size):
+    """
+    Splits the rows into chunks
+
+    :param rows: Iterable of dicts of submitted data
+    :param chunk_size: The maximum number of rows in each chunk
+    :return: Generator of (index of the first row, list of rows) tuples
+    """
+    start, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield start, chunk
+            start, chunk = start + len(chunk), []
+    if chunk:
+        yield start, chunk
+
+
+# The validator for the form each worker process validates rows for
+_worker_validator = None
+
+
+def _init_worker(content_type_id, form_pk):
+    """
+    Builds the form class in the worker process
+
+    :param content_type_id: The primary key of the content type of the omni form model
+    :param form_pk: The primary key of the omni form
+    """
+    global _worker_validator
+    omni_form = ContentType.objects.get_for_id(content_type_id).get_object_for_this_type(pk=form_pk)
+    _worker_validator = BatchValidator(omni_form.get_form_class())
+
+
+def _validate_chunk(chunk):
+    """
+    Validates a chunk of rows in the worker process
+
+    :param chunk: Tuple of (index of the first row, list of rows)
+    :return: List of BatchResult instances
+    """
+    start, rows = chunk
+    return [_worker_validator.validate(start + offset, data) for offset, data in enumerate(rows)]
+
+
+def validate_batch(omni_form, rows, processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validates each row of submitted data against the form, yielding results in the order of the rows
+
+    If processes is greater than 1 the rows are validated in chunks by a pool of worker processes.
+    Workers are forked and query the database for the form, so the form must be saved and the pool
+    cannot be used inside a transaction. Database connections are closed before the pool is started,
+    so that each worker opens its own.
+
+    :param omni_form: Saved OmniForm or OmniModelForm instance
+    :param rows: Iterable of dicts of submitted data
+    :param processes: The number of worker processes to validate the rows with
+    :param chunk_size: The number of rows sent to a worker process at a time
+    :raises: ValueError if a process pool is requested for an unsaved form or inside a transaction
+    :return: Generator of BatchResult instances
+    """
+    if not processes or processes <= 1:
+        validator = BatchValidator(omni_form.get_form_class())
+        for index, data in enumerate(rows):
+            yield validator.validate(index, data)
+        return
+
+    if omni_form.pk is None:
+        raise ValueError('Unsaved forms cannot be validated by a process pool')
+    if any(connection.in_atomic_block for connection in connections.all()):
+        raise ValueError('Forms cannot be validated by a process pool inside a transaction')
+    content_type_id = ContentType.objects.get_for_model(omni_form).pk
+    connections.close_all()
+
+    pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(content_type_id, omni_form.pk))
+    try:
+        for results in pool.imap(_validate_chunk, _chunks(rows, chunk_size)):
+            for result in results:
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+__all__ = [
+    'BatchResult',
+    'BatchValidator',
+    'DEFAULT_CHUNK_SIZE',
+    'validate_batch',
+]
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Performance benchmarks for form generation, validation and handling
+
+Benchmarks build forms using the factories in omniforms.tests.factories, so the
+'omniforms.tests' app must be installed. Run them with the omniforms_benchmark
+management command.
+"""
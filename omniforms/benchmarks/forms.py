@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Builders for the forms used by the benchmarks
+"""
+from __future__ import unicode_literals
+from itertools import cycle
+from omniforms.tests import factories
+from omniforms.tests.models import DummyModel2
+
+
+RELATED_INSTANCES = 25
+
+# (factory, factory kwargs, function returning valid submitted data given the related instance pks)
+# File and image fields are optional and left empty so that no files are written to storage
+FIELD_TYPES = (
+    (factories.OmniCharFieldFactory, {}, lambda pks: 'Some text'),
+    (factories.OmniBooleanFieldFactory, {}, lambda pks: 'on'),
+    (factories.OmniChoiceFieldFactory, {}, lambda pks: 'b'),
+    (factories.OmniDateFieldFactory, {}, lambda pks: '2018-01-01'),
+    (factories.OmniDateTimeFieldFactory, {}, lambda pks: '2018-01-01 12:30:00'),
+    (factories.OmniDecimalFieldFactory, {}, lambda pks: '12.34'),
+    (factories.OmniDurationFieldFactory, {}, lambda pks: '01:30:00'),
+    (factories.OmniEmailFieldFactory, {}, lambda pks: 'user@example.com'),
+    (factories.OmniFileFieldFactory, {'required': False}, None),
+    (factories.OmniFloatFieldFactory, {}, lambda pks: '1.5'),
+    (factories.OmniForeignKeyFieldFactory, {}, lambda pks: pks[0]),
+    (factories.OmniGenericIPAddressFieldFactory, {}, lambda pks: '127.0.0.1'),
+    (factories.OmniImageFieldFactory, {'required': False}, None),
+    (factories.OmniIntegerFieldFactory, {}, lambda pks: '42'),
+    (factories.OmniManyToManyFieldFactory, {}, lambda pks: pks[:3]),
+    (factories.OmniMultipleChoiceFieldFactory, {}, lambda pks: ['a', 'c']),
+    (factories.OmniSlugFieldFactory, {}, lambda pks: 'some-slug'),
+    (factories.OmniTimeFieldFactory, {}, lambda pks: '12:30'),
+    (factories.OmniUrlFieldFactory, {}, lambda pks: 'http://www.example.com'),
+    (factories.OmniUUIDFieldFactory, {}, lambda pks: '0f3a5c1e-2b4d-4e6f-8a9b-1c2d3e4f5a6b'),
+)
+
+
+def get_field_models():
+    """
+    Gets the OmniField model classes covered by the benchmarks
+
+    :return: Set of model classes
+    """
+    return set(field_factory._meta.model for field_factory, kwargs, get_value in FIELD_TYPES)
+
+
+def build_form(num_fields):
+    """
+    Builds a form with the given number of fields, cycling through every field type,
+    along with an email handler and a submission store handler
+
+    :param num_fields: The number of fields to add to the form
+    :return: Tuple of (OmniForm instance, dict of valid submitted data)
+    """
+    pks = [DummyModel2.objects.create(title='Related {0}'.format(index)).pk for index in range(RELATED_INSTANCES)]
+    form = factories.OmniFormFactory.create()
+    data = {}
+    field_types = cycle(FIELD_TYPES)
+    for order in range(num_fields):
+        field_factory, kwargs, get_value = next(field_types)
+        field = field_factory.create(form=form, order=order, **kwargs)
+        if get_value is not None:
+            data[field.name] = get_value(pks)
+    factories.OmniFormEmailHandlerFactory.create(form=form)
+    factories.OmniFormSaveSubmissionHandlerFactory.create(form=form)
+    return form, data
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmarks and compares results
+"""
+from __future__ import division, unicode_literals
+from collections import OrderedDict
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from omniforms.benchmarks.forms import build_form
+from omniforms.cache import choices_cache, form_class_cache
+from omniforms.submissions import submission_buffer
+import django
+import omniforms
+import os
+import platform
+import subprocess
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+def _median(values):
+    """
+    Gets the median of the values
+
+    :param values: List of numbers
+    :return: float
+    """
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def _get_peak_memory(func, setup):
+    """
+    Gets the peak memory allocated by python whilst calling the function.
+    Returns None if tracemalloc is unavailable or already tracing
+
+    :param func: Callable accepting the value returned by setup
+    :param setup: Callable returning the argument for func
+    :return: int|None
+    """
+    if tracemalloc is None or tracemalloc.is_tracing():
+        return None
+    argument = setup()
+    tracemalloc.start()
+    try:
+        func(argument)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(func, setup=lambda: None, repeat=5):
+    """
+    Measures the function. The function is timed 'repeat' times and then called once
+    more each to count queries and measure peak memory. Setup is not measured
+
+    :param func: Callable accepting the value returned by setup
+    :param setup: Callable returning the argument for func
+    :param repeat: The number of timed calls
+    :return: OrderedDict of measurements. Times are in seconds and memory in bytes
+    """
+    timings = []
+    for index in range(repeat):
+        argument = setup()
+        start = timeit.default_timer()
+        func(argument)
+        timings.append(timeit.default_timer() - start)
+
+    argument = setup()
+    with CaptureQueriesContext(connection) as context:
+        func(argument)
+
+    return OrderedDict([
+        ('min', min(timings)),
+        ('mean', sum(timings) / len(timings)),
+        ('median', _median(timings)),
+        ('max', max(timings)),
+        ('queries', len(context.captured_queries)),
+        ('peak_memory', _get_peak_memory(func, setup)),
+    ])
+
+
+def _get_cold_form_class(omni_form):
+    """
+    Gets the form class for a freshly loaded copy of the form with empty caches
+
+    :param omni_form: OmniForm instance
+    :return: Form class
+    """
+    form_class_cache.clear()
+    choices_cache.clear()
+    return omni_form.__class__.objects.get(pk=omni_form.pk).get_form_class()
+
+
+def _get_valid_form(form_class, data):
+    """
+    Instantiates and validates the form
+
+    :param form_class: Form class
+    :param data: Dict of submitted data
+    :raises: ValueError if the benchmark data is not valid
+    :return: Valid form instance
+    """
+    form = form_class(data=data)
+    if not form.is_valid():
+        raise ValueError('The benchmark form data is invalid: {0}'.format(form.errors.as_json()))
+    return form
+
+
+def _handle(form):
+    """
+    Handles the form, writing any buffered submissions
+
+    :param form: Valid form instance
+    """
+    form.handle()
+    submission_buffer.flush()
+
+
+def benchmark_form(num_fields, repeat=5):
+    """
+    Benchmarks generating, instantiating, validating and handling a form with the given number of fields
+
+    :param num_fields: The number of fields on the form
+    :param repeat: The number of timed calls for each operation
+    :return: OrderedDict of measurements keyed by operation name
+    """
+    omni_form, data = build_form(num_fields)
+    form_class = _get_cold_form_class(omni_form)
+    _get_valid_form(form_class, data)
+
+    def setup_handle():
+        mail.outbox = []
+        return _get_valid_form(form_class, data)
+
+    return OrderedDict([
+        ('get_form_class_cold', measure(lambda arg: _get_cold_form_class(omni_form), repeat=repeat)),
+        ('get_form_class', measure(lambda arg: omni_form.get_form_class(), repeat=repeat)),
+        ('instantiate', measure(lambda arg: form_class(data=data), repeat=repeat)),
+        ('is_valid', measure(lambda form: form.is_valid(), lambda: form_class(data=data), repeat=repeat)),
+        ('handle', measure(_handle, setup_handle, repeat=repeat)),
+    ])
+
+
+def get_commit():
+    """
+    Gets the git commit of the omniforms source tree, if available
+
+    :return: str|None
+    """
+    directory = os.path.dirname(os.path.abspath(omniforms.__file__))
+    try:
+        with open(os.devnull, 'w') as devnull:
+            output = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=directory, stderr=devnull)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5):
+    """
+    Runs the benchmarks for forms with each of the given numbers of fields
+
+    :param sizes: Iterable of field counts
+    :param repeat: The number of timed calls for each operation
+    :return: OrderedDict of results, suitable for serializing as JSON
+    """
+    return OrderedDict([
+        ('environment', OrderedDict([
+            ('python', platform.python_version()),
+            ('implementation', platform.python_implementation()),
+            ('django', django.get_version()),
+            ('omniforms', omniforms.get_version()),
+            ('database', connection.vendor),
+            ('commit', get_commit()),
+            ('timestamp', timezone.now().isoformat()),
+        ])),
+        ('repeat', repeat),
+        ('results', [
+            OrderedDict([('fields', size), ('operations', benchmark_form(size, repeat=repeat))])
+            for size in sizes
+        ]),
+    ])
+
+
+def compare_results(baseline, current):
+    """
+    Compares the mean timings and query counts of two sets of results
+
+    :param baseline: Results dict returned by run_benchmarks (or loaded from JSON)
+    :param current: Results dict returned by run_benchmarks (or loaded from JSON)
+    :return: List of dicts for each operation run with the same number of fields in both sets of results
+    """
+    baseline_results = {result['fields']: result['operations'] for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        operations = baseline_results.get(result['fields'], {})
+        for name, measurements in result['operations'].items():
+            if name not in operations:
+                continue
+            before = operations[name]
+            rows.append(OrderedDict([
+                ('fields', result['fields']),
+                ('operation', name),
+                ('baseline_mean', before['mean']),
+                ('mean', measurements['mean']),
+                ('ratio', measurements['mean'] / before['mean'] if before['mean'] else None),
+                ('baseline_queries', before['queries']),
+                ('queries', measurements['queries']),
+            ]))
+    return rows
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Caching utilities for the omniforms app
+"""
+from __future__ import unicode_literals
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import Template
+from django.utils.encoding import force_bytes
+from django.utils.module_loading import import_string
+import hashlib
+import json
+import threading
+import uuid
+
+
+class FormClassCache(object):
+    """
+    Process wide cache of generated form classes
+
+    Form classes are keyed by the content type and primary key of the form they were
+    generated from along with a definition version token. The version token is kept
+    in the django cache framework so that invalidating a form definition in one process
+    is visible to every other process sharing the same cache backend.
+    """
+    version_key_prefix = 'omniforms:form_class_version'
+
+    # Cache backends that are not shared between processes
+    local_cache_classes = (LocMemCache, DummyCache)
+
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(FormClassCache, self).__init__()
+        self._lock = threading.Lock()
+        self._form_classes = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        """
+        Whether or not generated form classes should be cached. Unless the OMNI_FORMS_CACHE_FORM_CLASSES
+        setting is defined, form classes are only cached if versions are stored in a cache shared
+        between processes, as other processes would not see the version change when a form is edited
+
+        :return: bool
+        """
+        enabled = getattr(settings, 'OMNI_FORMS_CACHE_FORM_CLASSES', None)
+        if enabled is None:
+            return not isinstance(self._get_cache(), self.local_cache_classes)
+        return enabled
+
+    @staticmethod
+    def _get_cache():
+        """
+        Gets the django cache used to store form definition versions
+
+        :return: django cache instance
+        """
+        return caches[getattr(settings, 'OMNI_FORMS_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+
+    def _get_version_key(self, content_type_id, object_id):
+        """
+        Generates the django cache key for a forms definition version
+
+        :param content_type_id: ID of the forms content type
+        :param object_id: Primary key of the form
+        :return: Cache key string
+        """
+        return '{0}:{1}:{2}'.format(self.version_key_prefix, content_type_id, object_id)
+
+    def get_version(self, content_type_id, object_id):
+        """
+        Gets the current definition version for the form. A new version
+        is generated if one does not exist (e.g. it has been evicted)
+
+        :param content_type_id: ID of the forms content type
+        :param object_id: Primary key of the form
+        :return: Version token string
+        """
+        cache = self._get_cache()
+        key = self._get_version_key(content_type_id, object_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+        return version
+
+    def get_form_class(self, form):
+        """
+        Gets the form class for the given omni form, building and storing it if required
+
+        :param form: OmniForm or OmniModelForm model instance
+        :return: Generated form class
+        """
+        if not self.enabled or form.pk is None:
+            return form.build_form_class()
+
+        content_type_id = ContentType.objects.get_for_model(form).pk
+        key = (content_type_id, form.pk, self.get_version(content_type_id, form.pk))
+
+        with self._lock:
+            form_class = self._form_classes.get(key)
+            if form_class is not None:
+                self.hits += 1
+                return form_class
+            self.misses += 1
+
+        form_class = form.build_form_class()
+
+        with self._lock:
+            for stale_key in [k for k in self._form_classes if k[:2] == key[:2]]:
+                del self._form_classes[stale_key]
+            self._form_classes[key] = form_class
+        return form_class
+
+    def invalidate(self, content_type_id, object_id):
+        """
+        Invalidates any cached form classes for the given form by issuing a new definition version
+
+        :param content_type_id: ID of the forms content type
+        :param object_id: Primary key of the form
+        """
+        self._get_cache().set(self._get_version_key(content_type_id, object_id), uuid.uuid4().hex, None)
+        with self._lock:
+            for stale_key in [k for k in self._form_classes if k[:2] == (content_type_id, object_id)]:
+                del self._form_classes[stale_key]
+
+    def clear(self):
+        """
+        Removes all form classes from the local cache and resets the hit/miss counters
+        """
+        with self._lock:
+            self._form_classes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns the current cache statistics
+
+        :return: Dict of cache statistics
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._form_classes)}
+
+
+form_class_cache = FormClassCache()
+
+
+class LRUCache(object):
+    """
+    Bounded, thread safe mapping of keys to values built on demand
+    The least recently used entries are discarded once the cache is full
+    """
+    def __init__(self, max_size):
+        """
+        Sets up the instance
+
+        :param max_size: The maximum number of entries to store
+        :type max_size: int
+        """
+        super(LRUCache, self).__init__()
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_or_build(self, key, build):
+        """
+        Gets the value for the key, building and storing it if it is not in the cache.
+        Values are built outside of the lock, so may occasionally be built more than once
+
+        :param key: Hashable cache key
+        :param build: Function taking no arguments that returns the value
+        :return: The cached or built value
+        """
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                pass
+            else:
+                self._entries[key] = value
+                return value
+
+        value = build()
+
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def discard(self, predicate):
+        """
+        Removes all entries whose keys match the predicate
+
+        :param predicate: Function taking a key and returning True if the entry should be removed
+        """
+        with self._lock:
+            for stale_key in [key for key in self._entries if predicate(key)]:
+                del self._entries[stale_key]
+
+    def clear(self):
+        """
+        Removes all entries from the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        """
+        Returns the number of entries in the cache
+
+        :return: int
+        """
+        return len(self._entries)
+
+
+class ImportStringCache(LRUCache):
+    """
+    Cache of objects resolved from python dotted import paths
+    """
+    def __init__(self, max_size=256):
+        """
+        Sets up the instance
+
+        :param max_size: The maximum number of resolved objects to store
+        :type max_size: int
+        """
+        super(ImportStringCache, self).__init__(max_size)
+
+    def resolve(self, dotted_path):
+        """
+        Gets the object for the dotted path, importing it if it has not already been resolved
+
+        :param dotted_path: Python dotted import path
+        :type dotted_path: str|unicode
+
+        :raises: ImportError
+        :return: The imported object
+        """
+        return self.get_or_build(dotted_path, lambda: import_string(dotted_path))
+
+
+import_string_cache = ImportStringCache()
+
+
+def cached_import_string(dotted_path):
+    """
+    Drop in replacement for django's import_string that stores resolved objects in a process wide cache
+
+    :param dotted_path: Python dotted import path
+    :type dotted_path: str|unicode
+
+    :raises: ImportError
+    :return: The imported object
+    """
+    return import_string_cache.resolve(dotted_path)
+
+
+class ObjectSourceCache(LRUCache):
+    """
+    Cache of values built from source text belonging to a saved object
+
+    Values are keyed by the primary key of the object they belong to along with a hash
+    of the source, so changes to the source never return a stale value.
+    Values built for unsaved objects are not stored
+    """
+    def get(self, object_id, source, build):
+        """
+        Gets the value built from the source, building and storing it if required
+
+        :param object_id: Primary key of the object the source belongs to
+        :param source: Source string
+        :param build: Function taking the source and returning the value
+        :return: The cached or built value
+        """
+        if object_id is None:
+            return build(source)
+        key = object_id, hashlib.sha1(force_bytes(source)).hexdigest()
+        return self.get_or_build(key, lambda: build(source))
+
+    def invalidate(self, object_id):
+        """
+        Removes all values for the given object
+
+        :param object_id: Primary key of the object the values belong to
+        """
+        self.discard(lambda key: key[0] == object_id)
+
+
+class TemplateCache(ObjectSourceCache):
+    """
+    Cache of compiled handler templates
+    """
+    def __init__(self, max_size=128):
+        """
+        Sets up the instance
+
+        :param max_size: The maximum number of compiled templates to store
+        :type max_size: int
+        """
+        super(TemplateCache, self).__init__(max_size)
+
+    def get_template(self, object_id, source):
+        """
+        Gets the compiled template, compiling and storing it if required
+
+        :param object_id: Primary key of the object the template belongs to
+        :param source: Template source string
+        :type source: str|unicode
+
+        :raises: django.template.TemplateSyntaxError
+        :return: django.template.Template instance
+        """
+        return self.get(object_id, source, Template)
+
+
+template_cache = TemplateCache()
+
+
+class ChoicesCache(ObjectSourceCache):
+    """
+    Cache of decoded field choices. Each entry is an immutable tuple shared by every form field built from it
+    """
+    def __init__(self, max_size=256):
+        """
+        Sets up the instance
+
+        :param max_size: The maximum number of choice tuples to store
+        :type max_size: int
+        """
+        super(ChoicesCache, self).__init__(max_size)
+
+    @staticmethod
+    def _decode(data):
+        """
+        Decodes the stored choice data
+
+        :param data: JSON encoded list of [value, label] pairs
+        :return: Tuple of (value, label) tuples
+        """
+        return tuple((value, label) for value, label in json.loads(data))
+
+    def get_choices(self, object_id, data):
+        """
+        Gets the decoded choices, decoding and storing them if required
+
+        :param object_id: Primary key of the field the choices belong to
+        :param data: JSON encoded list of [value, label] pairs
+        :return: Tuple of (value, label) tuples
+        """
+        return self.get(object_id, data, self._decode)
+
+
+choices_cache = ChoicesCache()
+
+
+class GenerationCounter(object):
+    """
+    Thread safe, process wide counters keyed by the content type and primary key of a form
+
+    A forms counter is incremented whenever one of its fields changes, allowing values
+    memoized on form instances to be recognised as out of date
+    """
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(GenerationCounter, self).__init__()
+        self._lock = threading.Lock()
+        self._generations = {}
+
+    def get(self, content_type_id, object_id):
+        """
+        Gets the current generation for the form
+
+        :param content_type_id: ID of the forms content type
+        :param object_id: Primary key of the form
+        :return: int
+        """
+        return self._generations.get((content_type_id, object_id), 0)
+
+    def increment(self, content_type_id, object_id):
+        """
+        Increments the generation for the form
+
+        :param content_type_id: ID of the forms content type
+        :param object_id: Primary key of the form
+        """
+        key = (content_type_id, object_id)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+
+field_generations = GenerationCounter()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk cloning of omni form definitions
+"""
+from __future__ import unicode_literals
+from collections import OrderedDict
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, models, router, transaction
+
+
+def _get_table_models(model_class):
+    """
+    Gets the concrete models whose tables hold the data for instances of the model class
+    ordered from the root model to the model class itself
+
+    :param model_class: The concrete model class
+    :return: List of model classes
+    """
+    return list(reversed(model_class._meta.get_parent_list())) + [model_class]
+
+
+def _batches(instances, batch_size):
+    """
+    Splits the list of instances into batches
+
+    :param instances: List of model instances
+    :param batch_size: The maximum number of instances in each batch
+    :return: Generator of lists of model instances
+    """
+    for index in range(0, len(instances), batch_size):
+        yield instances[index:index + batch_size]
+
+
+def _insert_root_rows(model_class, instances, using):
+    """
+    Inserts rows into the root table for the instances, setting the primary key of each instance.
+    Rows are inserted in bulk where the database can return the ids of bulk inserted rows
+
+    :param model_class: The root model class
+    :param instances: List of unsaved model instances
+    :param using: The database alias to use
+    """
+    connection = connections[using]
+    fields = [field for field in model_class._meta.local_concrete_fields if not isinstance(field, models.AutoField)]
+    manager = model_class._base_manager
+    if connection.features.can_return_ids_from_bulk_insert:
+        batch_size = max(connection.ops.bulk_batch_size(fields, instances), 1)
+        batches = _batches(instances, batch_size)
+    else:
+        batches = ([instance] for instance in instances)
+
+    for batch in batches:
+        ids = manager._insert(batch, fields=fields, return_id=True, using=using)
+        if not isinstance(ids, (list, tuple)):
+            ids = [ids]
+        for instance, pk in zip(batch, ids):
+            setattr(instance, model_class._meta.pk.attname, pk)
+
+
+def bulk_insert(model_class, instances, using):
+    """
+    Inserts the instances, all of which must be of the given model class, into the database.
+    Unlike QuerySet.bulk_create this supports multi-table inherited models, inserting the
+    rows for each table in the inheritance chain in bulk. No signals are sent.
+
+    :param model_class: The concrete model class of the instances
+    :param instances: List of unsaved model instances
+    :param using: The database alias to use
+    """
+    if not instances:
+        return
+
+    table_models = _get_table_models(model_class)
+    root_model, child_models = table_models[0], table_models[1:]
+    _insert_root_rows(root_model, instances, using)
+
+    for instance in instances:
+        pk = getattr(instance, root_model._meta.pk.attname)
+        for child_model in child_models:
+            setattr(instance, child_model._meta.pk.attname, pk)
+        instance._state.adding = False
+        instance._state.db = using
+
+    connection = connections[using]
+    for child_model in child_models:
+        fields = child_model._meta.local_concrete_fields
+        batch_size = max(connection.ops.bulk_batch_size(fields, instances), 1)
+        for batch in _batches(instances, batch_size):
+            child_model._base_manager._insert(batch, fields=fields, using=using)
+
+
+def _group_by_model(instances):
+    """
+    Groups the instances by their model class
+
+    :param instances: Iterable of model instances
+    :return: OrderedDict of lists of model instances keyed by model class
+    """
+    groups = OrderedDict()
+    for instance in instances:
+        groups.setdefault(instance.__class__, []).append(instance)
+    return groups
+
+
+def _copy(instance):
+    """
+    Clears the primary key (and any parent link) of the instance so that it is saved as a new row
+
+    :param instance: Model instance
+    :return: The model instance
+    """
+    for model_class in _get_table_models(instance.__class__):
+        setattr(instance, model_class._meta.pk.attname, None)
+    instance._state.adding = True
+    return instance
+
+
+def _remap_field_references(handler, field_pks):
+    """
+    Points any foreign keys from the handler to fields on the source form at the cloned fields
+
+    :param handler: Handler model instance
+    :param field_pks: Dict of cloned field primary keys keyed by the source field primary key
+    """
+    from omniforms.models import OmniField
+    for field in handler._meta.concrete_fields:
+        if isinstance(field, models.ForeignKey) and issubclass(field.related_model, OmniField):
+            value = getattr(handler, field.attname)
+            if value in field_pks:
+                setattr(handler, field.attname, field_pks[value])
+
+
+def _get_related_copies(base_model_class, form_pks, using):
+    """
+    Gets unsaved copies of the fields or handlers of the source forms, pointed at the cloned forms
+
+    :param base_model_class: OmniField or OmniFormHandler
+    :param form_pks: Dict of cloned form primary keys keyed by (content type id, source form primary key)
+    :param using: The database alias to use
+    :return: List of (source pk, unsaved copy) tuples
+    """
+    query = models.Q()
+    for content_type_id, object_id in form_pks:
+        query |= models.Q(content_type_id=content_type_id, object_id=object_id)
+    copies = []
+    for instance in base_model_class.objects.db_manager(using).filter(query).order_by('pk').specific():
+        source_pk = instance.pk
+        instance.object_id = form_pks[(instance.content_type_id, instance.object_id)]
+        copies.append((source_pk, _copy(instance)))
+    return copies
+
+
+def clone_forms(forms, titles=None):
+    """
+    Clones the forms along with all of their fields and handlers
+
+    Fields and handlers are fetched with one query per concrete model class and inserted in
+    bulk for each concrete model class. Handler references to fields on the source form (e.g.
+    the recipient field of an email confirmation handler) are pointed at the cloned fields.
+    Everything is written in a single transaction.
+
+    :param forms: List of saved OmniForm or OmniModelForm instances
+    :param titles: Optional list of titles for the cloned forms (defaults to the source titles)
+    :return: List of cloned forms, in the same order as the source forms
+    """
+    from omniforms.models import OmniField, OmniFormHandler
+
+    forms = list(forms)
+    if titles is None:
+        titles = [form.title for form in forms]
+    if len(titles) != len(forms):
+        raise ValueError('A title must be given for each form')
+    if len(set((form.__class__, form.pk) for form in forms)) != len(forms):
+        raise ValueError('Each form may only be cloned once per call')
+    if not forms:
+        return []
+
+    using = router.db_for_write(forms[0].__class__, instance=forms[0])
+    with transaction.atomic(using=using):
+        sources = {}
+        for model_class, instances in _group_by_model(forms).items():
+            sources[model_class] = model_class._base_manager.using(using).in_bulk(
+                [instance.pk for instance in instances]
+            )
+
+        clones = []
+        form_pks = {}
+        for form, title in zip(forms, titles):
+            clone = _copy(sources[form.__class__][form.pk])
+            clone.title = title
+            clone.snapshot = ''  # Regenerated from the cloned fields and handlers when first used
+            clones.append(clone)
+        for model_class, instances in _group_by_model(clones).items():
+            bulk_insert(model_class, instances, using)
+        for form, clone in zip(forms, clones):
+            content_type_id = ContentType.objects.db_manager(using).get_for_model(form).pk
+            form_pks[(content_type_id, form.pk)] = clone.pk
+
+        fields = _get_related_copies(OmniField, form_pks, using)
+        for model_class, instances in _group_by_model(field for source_pk, field in fields).items():
+            bulk_insert(model_class, instances, using)
+        field_pks = {source_pk: field.pk for source_pk, field in fields}
+
+        handlers = [handler for source_pk, handler in _get_related_copies(OmniFormHandler, form_pks, using)]
+        for handler in handlers:
+            _remap_field_references(handler, field_pks)
+        for model_class, instances in _group_by_model(handlers).items():
+            bulk_insert(model_class, instances, using)
+
+    return clones
+
+
+def clone_form(form, title=None):
+    """
+    Clones the form along with all of its fields and handlers
+
+    :param form: Saved OmniForm or OmniModelForm instance
+    :param title: Optional title for the cloned form (defaults to the source title)
+    :return: Cloned form instance
+    """
+    return clone_forms([form], titles=None if title is None else [title])[0]
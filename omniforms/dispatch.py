@@ -0,0 +1,785 @@
+# -*- coding: utf-8 -*-
+"""
+Handler dispatch backends for the omniforms app
+"""
+from __future__ import unicode_literals
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.utils import six, timezone
+from django.utils.datastructures import MultiValueDict
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from django.utils.six.moves import queue
+from omniforms.tracing import span
+import json
+import logging
+import threading
+import traceback
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionError(Exception):
+    """
+    Raised when a submission cannot be turned back into a valid form
+    """
+
+
+class Submission(object):
+    """
+    Serializable representation of a submitted omni form
+
+    The submitted data is stored along with any uploaded files (which are staged to
+    storage) so that the form can be rebuilt, re-validated and passed to handlers
+    outside of the request that received it
+    """
+    def __init__(self, content_type_id, object_id, payload, submission_id=None):
+        """
+        Sets up the instance
+
+        :param content_type_id: ID of the omni forms content type
+        :param object_id: Primary key of the omni form
+        :param payload: Dict of submitted data, staged files, form prefix and model instance pk
+        :param submission_id: Unique identifier for the submission
+        """
+        super(Submission, self).__init__()
+        self.content_type_id = content_type_id
+        self.object_id = object_id
+        self.payload = payload
+        self.submission_id = submission_id or uuid.uuid4().hex
+
+    @staticmethod
+    def _get_lists(data):
+        """
+        Converts a dict or MultiValueDict into a dict of lists
+
+        :param data: Dict or MultiValueDict instance
+        :return: Dict where each value is a list
+        """
+        if hasattr(data, 'lists'):
+            return {key: list(values) for key, values in data.lists()}
+        return {
+            key: list(value) if isinstance(value, (list, tuple)) else [value]
+            for key, value in data.items()
+        }
+
+    @staticmethod
+    def _stage_file(uploaded_file):
+        """
+        Saves an uploaded file to storage so that it is available once the request has finished
+
+        :param uploaded_file: Uploaded file instance
+        :return: Dict of data required to reopen the file
+        """
+        directory = getattr(settings, 'OMNI_FORMS_HANDLER_STAGING_DIR', 'omniforms/staged')
+        uploaded_file.seek(0)
+        path = default_storage.save(
+            '{0}/{1}/{2}'.format(directory, uuid.uuid4().hex, uploaded_file.name),
+            uploaded_file
+        )
+        uploaded_file.seek(0)
+        return {
+            'path': path,
+            'name': uploaded_file.name,
+            'content_type': getattr(uploaded_file, 'content_type', None),
+            'size': uploaded_file.size,
+            'charset': getattr(uploaded_file, 'charset', None),
+        }
+
+    @classmethod
+    def from_form(cls, form):
+        """
+        Creates a submission from a bound omni form instance
+
+        :param form: Bound form instance generated by an OmniForm or OmniModelForm
+        :return: Submission instance
+        """
+        instance = getattr(form, 'instance', None)
+        payload = {
+            'data': cls._get_lists(form.data),
+            'files': {
+                key: [cls._stage_file(uploaded_file) for uploaded_file in uploaded_files]
+                for key, uploaded_files in cls._get_lists(form.files).items()
+            },
+            'prefix': form.prefix,
+            'instance_pk': instance.pk if instance is not None else None,
+        }
+        return cls(
+            form._omni_form_content_type_id,
+            form._omni_form_pk,
+            json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+        )
+
+    def to_json(self):
+        """
+        Serializes the submission
+
+        :return: JSON string
+        """
+        return json.dumps({
+            'content_type_id': self.content_type_id,
+            'object_id': self.object_id,
+            'submission_id': self.submission_id,
+            'payload': self.payload,
+        })
+
+    @classmethod
+    def from_json(cls, value):
+        """
+        Deserializes a submission
+
+        :param value: JSON string created by to_json
+        :return: Submission instance
+        """
+        data = json.loads(value)
+        return cls(data['content_type_id'], data['object_id'], data['payload'], data['submission_id'])
+
+    def get_omni_form(self):
+        """
+        Gets the omni form the submission was made against
+
+        :return: OmniForm or OmniModelForm instance
+        """
+        return ContentType.objects.get_for_id(self.content_type_id).get_object_for_this_type(pk=self.object_id)
+
+    def _get_files(self):
+        """
+        Reopens staged files
+
+        :return: MultiValueDict of uploaded file instances
+        """
+        files = MultiValueDict()
+        for key, staged_files in self.payload['files'].items():
+            files.setlist(key, [
+                UploadedFile(
+                    file=default_storage.open(staged_file['path']),
+                    name=staged_file['name'],
+                    content_type=staged_file['content_type'],
+                    size=staged_file['size'],
+                    charset=staged_file['charset']
+                )
+                for staged_file in staged_files
+            ])
+        return files
+
+    def build_form(self, omni_form=None):
+        """
+        Rebuilds and validates the submitted form
+
+        :param omni_form: The omni form the submission was made against (looked up if not provided)
+        :raises: SubmissionError
+        :return: Valid form instance
+        """
+        omni_form = omni_form or self.get_omni_form()
+        form_class = omni_form.get_form_class()
+        form_kwargs = {
+            'data': MultiValueDict(self.payload['data']),
+            'files': self._get_files(),
+            'prefix': self.payload['prefix'],
+        }
+        if self.payload['instance_pk'] is not None:
+            form_kwargs['instance'] = form_class._meta.model._default_manager.get(pk=self.payload['instance_pk'])
+        form = form_class(omni_form=omni_form, **form_kwargs)
+        if not form.is_valid():
+            raise SubmissionError('Submission {0} is no longer valid: {1}'.format(
+                self.submission_id,
+                form.errors.as_json()
+            ))
+        return form
+
+    def delete_staged_files(self):
+        """
+        Removes all staged files from storage
+        """
+        for staged_files in self.payload['files'].values():
+            for staged_file in staged_files:
+                default_storage.delete(staged_file['path'])
+
+
+def get_max_attempts():
+    """
+    Gets the maximum number of times a handler will be attempted
+
+    :return: int
+    """
+    return getattr(settings, 'OMNI_FORMS_HANDLER_MAX_ATTEMPTS', 3)
+
+
+def get_retry_delay(attempts):
+    """
+    Gets the number of seconds to wait before retrying a handler. The delay doubles with each attempt
+
+    :param attempts: The number of attempts made so far
+    :return: Delay in seconds
+    """
+    return getattr(settings, 'OMNI_FORMS_HANDLER_RETRY_DELAY', 10) * (2 ** max(attempts - 1, 0))
+
+
+def get_job_timeout():
+    """
+    Gets the number of seconds after which running handler jobs are assumed to have been abandoned
+
+    :return: Timeout in seconds
+    """
+    return getattr(settings, 'OMNI_FORMS_HANDLER_JOB_TIMEOUT', 600)
+
+
+def is_email_handler(handler):
+    """
+    Whether or not the message for the handler can be sent by the backend. Messages from email
+    handlers are built first and sent together over a single mail connection. Email handlers that
+    override the handle method are run like any other handler, so that the override is called
+
+    :param handler: OmniFormHandler instance
+    :return: bool
+    """
+    from omniforms.models import OmniFormEmailHandlerBase
+    return (
+        isinstance(handler, OmniFormEmailHandlerBase) and
+        six.get_unbound_function(type(handler).handle) is six.get_unbound_function(OmniFormEmailHandlerBase.handle)
+    )
+
+
+def run_handler(handler, form):
+    """
+    Runs the handler for the valid form
+
+    :param handler: OmniFormHandler instance
+    :param form: Valid form instance
+    """
+    with span('handler.handle', form=form, handler=handler):
+        handler.handle(form)
+
+
+def build_handler_message(handler, form):
+    """
+    Builds the email message for the email handler and the valid form
+
+    :param handler: OmniFormEmailHandlerBase instance
+    :param form: Valid form instance
+    :return: EmailMessage instance
+    """
+    with span('handler.handle', form=form, handler=handler):
+        return handler.get_message(form)
+
+
+class MailConnectionMixin(object):
+    """
+    Keeps a mail connection open for each thread so that it can be reused for many submissions
+    """
+    @cached_property
+    def _mail_connections(self):
+        """
+        Thread local storage for mail connections
+
+        :return: threading.local instance
+        """
+        return threading.local()
+
+    def _get_mail_connection(self):
+        """
+        Gets the current threads mail connection, opening it if required
+
+        :return: Email backend instance
+        """
+        mail_connection = getattr(self._mail_connections, 'connection', None)
+        if mail_connection is None:
+            mail_connection = mail.get_connection()
+            mail_connection.open()
+            self._mail_connections.connection = mail_connection
+        return mail_connection
+
+    def send_messages(self, messages):
+        """
+        Sends the messages over the current threads mail connection. Messages are sent one at a time,
+        so that the messages that were delivered are known if sending fails. The connection is closed
+        if sending a message fails so that a new connection is used for the next message
+
+        :param messages: List of EmailMessage instances
+        :return: List containing None for each message that was sent, or the traceback for each message that wasn't
+        """
+        errors = []
+        with span('email.send', message_count=len(messages)):
+            for message in messages:
+                try:
+                    self._get_mail_connection().send_messages([message])
+                except Exception:
+                    errors.append(traceback.format_exc())
+                    self.close_mail_connection()
+                else:
+                    errors.append(None)
+        return errors
+
+    def close_mail_connection(self):
+        """
+        Closes the current threads mail connection
+        """
+        mail_connection = getattr(self._mail_connections, 'connection', None)
+        self._mail_connections.connection = None
+        if mail_connection is not None:
+            try:
+                mail_connection.close()
+            except Exception:
+                logger.exception('Could not close mail connection')
+
+
+class BaseHandlerBackend(object):
+    """
+    Base class for handler dispatch backends
+    """
+    def dispatch(self, form, handlers):
+        """
+        Dispatches the handlers for the valid form
+
+        :param form: Valid form instance
+        :param handlers: List of OmniFormHandler instances
+        """
+        if getattr(form, '_omni_form_pk', None) is None:
+            # Forms that weren't generated from a saved omni form can't be rebuilt elsewhere
+            SynchronousBackend().dispatch(form, handlers)
+        else:
+            self.enqueue(Submission.from_form(form), handlers)
+
+    def enqueue(self, submission, handlers):
+        """
+        Queues the handlers for execution
+
+        :param submission: Submission instance
+        :param handlers: List of OmniFormHandler instances
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError('"{0}" must define it\'s own enqueue method'.format(self.__class__.__name__))
+
+
+class SynchronousBackend(BaseHandlerBackend):
+    """
+    Runs each handler in turn in the current thread
+    """
+    def dispatch(self, form, handlers):
+        """
+        Calls each handlers handle method in the configured order. Messages from consecutive
+        email handlers are built in turn and then sent together, reusing a single mail connection
+
+        :param form: Valid form instance
+        :param handlers: List of OmniFormHandler instances
+        """
+        connection = mail.get_connection()
+        messages = []
+        try:
+            for handler in handlers:
+                if is_email_handler(handler):
+                    messages.append(build_handler_message(handler, form))
+                    continue
+                if messages:
+                    self._send_messages(form, connection, messages)
+                    messages = []
+                run_handler(handler, form)
+            if messages:
+                self._send_messages(form, connection, messages)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _send_messages(form, connection, messages):
+        """
+        Sends the messages over the mail connection, opening it if it isn't already open
+
+        :param form: Valid form instance
+        :param connection: Mail backend instance
+        :param messages: List of EmailMessage instances
+        """
+        with span('email.send', form=form, message_count=len(messages)):
+            connection.open()
+            connection.send_messages(messages)
+
+
+class ThreadPoolBackend(MailConnectionMixin, BaseHandlerBackend):
+    """
+    Runs handlers in a pool of background threads once the current transaction has been committed
+    Failed handlers are scheduled to be retried after a back off delay, so worker threads are never
+    blocked waiting for a retry. The outcome of each handler is logged.
+    Each worker thread reuses a single mail connection for every submission it processes
+    """
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_RETRYING = 'retrying'
+    STATUS_FAILED = 'failed'
+
+    def __init__(self, max_workers=None):
+        """
+        Sets up the instance
+
+        :param max_workers: The number of worker threads to start
+        """
+        super(ThreadPoolBackend, self).__init__()
+        self.max_workers = max_workers or getattr(settings, 'OMNI_FORMS_HANDLER_THREADS', 4)
+        self._queue = queue.Queue()
+        self._threads = []
+        self._timers = set()
+        self._lock = threading.Lock()
+
+    def _start_workers(self):
+        """
+        Starts the worker threads if they haven't already been started
+        """
+        with self._lock:
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name='omniforms-handler-{0}'.format(len(self._threads)))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        """
+        Worker thread loop
+        """
+        while True:
+            submission, handlers, attempt = self._queue.get()
+            try:
+                self.run(submission, handlers, attempt)
+            except Exception:
+                logger.exception('Could not process omniform submission %s', submission.submission_id)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def enqueue(self, submission, handlers):
+        """
+        Queues the handlers to run once the current transaction has been committed
+
+        :param submission: Submission instance
+        :param handlers: List of OmniFormHandler instances
+        """
+        transaction.on_commit(lambda: self.submit(submission, handlers))
+
+    def submit(self, submission, handlers, attempt=1):
+        """
+        Adds the submission to the worker queue
+
+        :param submission: Submission instance
+        :param handlers: List of OmniFormHandler instances
+        :param attempt: The attempt number
+        """
+        self._start_workers()
+        self._queue.put((submission, handlers, attempt))
+
+    def schedule_retry(self, submission, handlers, attempt):
+        """
+        Submits the handlers again once the retry delay for the previous attempt has passed
+
+        :param submission: Submission instance
+        :param handlers: List of OmniFormHandler instances to retry
+        :param attempt: The number of the previous attempt
+        """
+        def retry():
+            self.submit(submission, handlers, attempt + 1)
+            with self._lock:
+                self._timers.discard(timer)
+
+        timer = threading.Timer(get_retry_delay(attempt), retry)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def join(self):
+        """
+        Blocks until all queued submissions, and any retries scheduled for them, have been processed
+        """
+        while True:
+            self._queue.join()
+            with self._lock:
+                timers = list(self._timers)
+                if not timers and not self._queue.unfinished_tasks:
+                    return
+            for timer in timers:
+                timer.join()
+
+    def _attempt(self, submission, handler, attempt, func):
+        """
+        Calls func, logging the outcome
+
+        :param submission: Submission instance
+        :param handler: The handler being run
+        :param attempt: The attempt number
+        :param func: Callable to attempt
+        :return: True if func succeeded
+        """
+        try:
+            func()
+        except Exception:
+            logger.exception(
+                'Handler %s failed for submission %s (attempt %s of %s)',
+                handler.pk, submission.submission_id, attempt, get_max_attempts()
+            )
+            return False
+        return True
+
+    def run(self, submission, handlers, attempt=1):
+        """
+        Rebuilds the form and runs each handler once, in the configured order. Messages from
+        consecutive email handlers are sent together before the next handler runs. Failed handlers
+        are scheduled to be retried until the maximum number of attempts has been reached
+
+        :param submission: Submission instance
+        :param handlers: List of OmniFormHandler instances
+        :param attempt: The attempt number
+        :return: Dict of handler status keyed by handler pk
+        """
+        succeeded = []
+        failed = []
+        email_handlers = []
+        messages = []
+        retrying = False
+
+        def send_pending_messages():
+            """
+            Sends the messages built for the pending email handlers
+            """
+            for email_handler, error in zip(email_handlers, self.send_messages(list(messages)) if messages else []):
+                if error is None:
+                    succeeded.append(email_handler)
+                else:
+                    logger.error(
+                        'Handler %s failed for submission %s (attempt %s of %s)\n%s',
+                        email_handler.pk, submission.submission_id, attempt, get_max_attempts(), error
+                    )
+                    failed.append(email_handler)
+            del email_handlers[:]
+            del messages[:]
+
+        try:
+            form = submission.build_form()
+            for handler in handlers:
+                if is_email_handler(handler):
+                    if self._attempt(
+                        submission, handler, attempt,
+                        lambda: messages.append(build_handler_message(handler, form))
+                    ):
+                        email_handlers.append(handler)
+                    else:
+                        failed.append(handler)
+                    continue
+                send_pending_messages()
+                if self._attempt(submission, handler, attempt, lambda: run_handler(handler, form)):
+                    succeeded.append(handler)
+                else:
+                    failed.append(handler)
+            send_pending_messages()
+
+            for handler in succeeded:
+                logger.info('Handler %s succeeded for submission %s', handler.pk, submission.submission_id)
+            retrying = bool(failed) and attempt < get_max_attempts()
+            if retrying:
+                self.schedule_retry(submission, failed, attempt)
+        finally:
+            if not retrying:
+                submission.delete_staged_files()
+
+        statuses = {handler.pk: self.STATUS_SUCCEEDED for handler in succeeded}
+        statuses.update({
+            handler.pk: self.STATUS_RETRYING if retrying else self.STATUS_FAILED
+            for handler in failed
+        })
+        return statuses
+
+
+class DatabaseQueueBackend(MailConnectionMixin, BaseHandlerBackend):
+    """
+    Stores a job for each handler in the database. Jobs are processed by
+    running the 'omniforms_process_handler_jobs' management command
+    A single mail connection is reused for every batch of jobs processed
+    """
+    def enqueue(self, submission, handlers):
+        """
+        Creates a pending job for each handler
+
+        :param submission: Submission instance
+        :param handlers: List of OmniFormHandler instances
+        """
+        from omniforms.models import OmniFormHandlerJob
+        payload = submission.to_json()
+        OmniFormHandlerJob.objects.bulk_create([
+            OmniFormHandlerJob(
+                submission_id=submission.submission_id,
+                handler_id=handler.pk,
+                content_type_id=submission.content_type_id,
+                object_id=submission.object_id,
+                payload=payload
+            )
+            for handler in handlers
+        ])
+
+    @staticmethod
+    def _claim(queryset, limit=None, **kwargs):
+        """
+        Stamps the jobs matched by the queryset with a new claim token and returns those this
+        worker claimed. The update re-checks the queryset conditions, so jobs claimed by another
+        worker between reading and updating them (on databases that cannot skip locked rows) are
+        not claimed twice
+
+        :param queryset: QuerySet of OmniFormHandlerJob instances that may be claimed
+        :param limit: The maximum number of jobs to claim
+        :param kwargs: Additional values to update the claimed jobs with
+        :return: List of OmniFormHandlerJob instances
+        """
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            available = queryset
+            if connection.features.has_select_for_update_skip_locked:
+                available = available.select_for_update(skip_locked=True)
+            job_ids = available.values_list('pk', flat=True)
+            job_ids = list(job_ids[:limit] if limit is not None else job_ids)
+            queryset.filter(pk__in=job_ids).update(claim_token=token, modified=timezone.now(), **kwargs)
+        return list(
+            queryset.model.objects.filter(claim_token=token).select_related('handler').order_by('created', 'pk')
+        )
+
+    def _claim_jobs(self, limit):
+        """
+        Marks up to 'limit' available jobs as running and returns them
+
+        :param limit: The maximum number of jobs to claim
+        :return: List of OmniFormHandlerJob instances
+        """
+        from omniforms.models import OmniFormHandlerJob
+        queryset = OmniFormHandlerJob.objects.filter(
+            status=OmniFormHandlerJob.STATUS_PENDING,
+            available_at__lte=timezone.now()
+        )
+        return self._claim(queryset, limit, status=OmniFormHandlerJob.STATUS_RUNNING)
+
+    def reclaim_jobs(self):
+        """
+        Records a failed attempt for running jobs that have not finished within the job timeout
+        (e.g. because the process running them was killed), so that they are retried or marked
+        as failed, and removes the staged files of submissions that have no unfinished jobs left
+
+        :return: The number of jobs reclaimed
+        """
+        from omniforms.models import OmniFormHandlerJob
+        cutoff = timezone.now() - timedelta(seconds=get_job_timeout())
+        queryset = OmniFormHandlerJob.objects.filter(status=OmniFormHandlerJob.STATUS_RUNNING, modified__lt=cutoff)
+        jobs = self._claim(queryset)
+        for job in jobs:
+            logger.warning('Handler job %s did not finish and has been reclaimed', job.pk)
+            job.fail('The job did not finish within {0} seconds'.format(get_job_timeout()))
+        submissions = {job.submission_id: Submission.from_json(job.payload) for job in jobs}
+        for submission in submissions.values():
+            self._cleanup(submission)
+        return len(jobs)
+
+    def process(self, limit=100):
+        """
+        Processes available jobs in order, after reclaiming any jobs that have timed out
+        Messages for consecutive email handler jobs are sent together before the next job runs
+
+        :param limit: The maximum number of jobs to process
+        :return: The number of jobs processed
+        """
+        self.reclaim_jobs()
+        jobs = self._claim_jobs(limit)
+        forms = {}
+        submissions = {}
+        email_jobs = []
+        for job in jobs:
+            submission = submissions.setdefault(job.submission_id, Submission.from_json(job.payload))
+            try:
+                if submission.submission_id not in forms:
+                    forms[submission.submission_id] = submission.build_form()
+                handler = job.handler.specific
+                if is_email_handler(handler):
+                    email_jobs.append((job, build_handler_message(handler, forms[submission.submission_id])))
+                    continue
+                self._send_email_jobs(email_jobs)
+                email_jobs = []
+                run_handler(handler, forms[submission.submission_id])
+            except Exception:
+                job.fail(traceback.format_exc())
+                logger.exception('Handler job %s failed', job.pk)
+            else:
+                job.succeed()
+        self._send_email_jobs(email_jobs)
+
+        for submission in submissions.values():
+            self._cleanup(submission)
+        return len(jobs)
+
+    def _send_email_jobs(self, email_jobs):
+        """
+        Sends the messages built for the email handler jobs, recording the outcome of each job
+
+        :param email_jobs: List of (OmniFormHandlerJob, EmailMessage) tuples
+        """
+        if not email_jobs:
+            return
+        errors = self.send_messages([message for job, message in email_jobs])
+        for (job, message), error in zip(email_jobs, errors):
+            if error is None:
+                job.succeed()
+            else:
+                logger.error('Handler job %s failed\n%s', job.pk, error)
+                job.fail(error)
+
+    @staticmethod
+    def _cleanup(submission):
+        """
+        Removes staged files once all jobs for the submission have finished
+
+        :param submission: Submission instance
+        """
+        from omniforms.models import OmniFormHandlerJob
+        unfinished = OmniFormHandlerJob.objects.filter(
+            submission_id=submission.submission_id,
+            status__in=[OmniFormHandlerJob.STATUS_PENDING, OmniFormHandlerJob.STATUS_RUNNING]
+        )
+        if not unfinished.exists():
+            submission.delete_staged_files()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_handler_backend():
+    """
+    Gets the handler backend defined by the OMNI_FORMS_HANDLER_BACKEND setting
+
+    :return: Handler backend instance
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend = getattr(settings, 'OMNI_FORMS_HANDLER_BACKEND', 'omniforms.dispatch.SynchronousBackend')
+            _backend = import_string(backend)() if isinstance(backend, six.string_types) else backend()
+        return _backend
+
+
+def reset_handler_backend():
+    """
+    Discards the current handler backend so that it is recreated from settings on next use
+    """
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+__all__ = [
+    'SubmissionError',
+    'Submission',
+    'BaseHandlerBackend',
+    'SynchronousBackend',
+    'ThreadPoolBackend',
+    'DatabaseQueueBackend',
+    'build_handler_message',
+    'get_handler_backend',
+    'reset_handler_backend',
+    'run_handler',
+]
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Form fields for the omniforms app
+"""
+from __future__ import unicode_literals
+from contextlib import contextmanager
+from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.boundfield import BoundField
+from django.forms.models import ModelChoiceIterator
+from django.utils.encoding import force_text
+from django.utils.functional import cached_property
+
+
+class LimitedModelChoiceIterator(ModelChoiceIterator):
+    """
+    Model choice iterator that yields at most 'choice_limit' choices from the fields queryset,
+    followed by choices for any selected values that are beyond the limit
+    """
+    def __init__(self, field, selected=None):
+        """
+        Sets up the instance
+
+        :param field: The model choice field
+        :param selected: List of selected values (as text) that must always be included in the choices
+        """
+        super(LimitedModelChoiceIterator, self).__init__(field)
+        self.selected = selected or []
+
+    def _get_queryset(self):
+        """
+        Gets the queryset to generate choices from
+
+        :return: QuerySet instance
+        """
+        queryset = self.queryset.all()
+        choice_limit = getattr(self.field, 'choice_limit', None)
+        if choice_limit is not None:
+            queryset = queryset[:choice_limit]
+        return queryset
+
+    def __iter__(self):
+        """
+        Yields the empty label (if defined) followed by a choice for each instance
+
+        :return: Generator of (value, label) tuples
+        """
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        queryset = self._get_queryset()
+        if not queryset._prefetch_related_lookups:
+            queryset = queryset.iterator()
+        values = set()
+        for obj in queryset:
+            choice = self.choice(obj)
+            values.add(force_text(choice[0]))
+            yield choice
+        for obj in self._get_selected_instances(values):
+            yield self.choice(obj)
+
+    def _get_selected_instances(self, values):
+        """
+        Gets the instances for selected values that are not among the limited choices
+
+        :param values: Set of the values (as text) of the limited choices
+        :return: List of model instances
+        """
+        if getattr(self.field, 'choice_limit', None) is None:
+            return []
+        missing = [value for value in self.selected if value not in values]
+        if not missing:
+            return []
+        key = self.field.to_field_name or 'pk'
+        try:
+            return list(self.queryset.filter(**{'{0}__in'.format(key): missing}))
+        except (ValidationError, TypeError, ValueError):
+            return []
+
+    def __len__(self):
+        """
+        Returns the number of choices
+
+        :return: int
+        """
+        length = self._get_queryset().count() + (1 if self.field.empty_label is not None else 0)
+        if self.selected and getattr(self.field, 'choice_limit', None) is not None:
+            values = set(force_text(self.field.prepare_value(obj)) for obj in self._get_queryset())
+            length += len(self._get_selected_instances(values))
+        return length
+
+
+class LimitedChoicesBoundField(BoundField):
+    """
+    Bound field that always renders the bound or initial values of a limited model choice field
+    """
+    @contextmanager
+    def _selected_choices(self, widget):
+        """
+        Temporarily gives the widget choices that include the selected values
+
+        :param widget: The widget being rendered
+        """
+        choices = getattr(widget, 'choices', None)
+        if not isinstance(choices, LimitedModelChoiceIterator):
+            yield
+            return
+        value = self.field.prepare_value(self.value())
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        widget.choices = self.field.iterator(
+            self.field,
+            selected=[force_text(item) for item in value if item not in (None, '')]
+        )
+        try:
+            yield
+        finally:
+            widget.choices = choices
+
+    def as_widget(self, widget=None, attrs=None, only_initial=False):
+        """
+        Renders the field, including choices for the selected values
+
+        :param widget: Optional widget to render instead of the fields widget
+        :param attrs: Dict of widget attributes
+        :param only_initial: Whether to render the initial value
+        :return: Rendered HTML
+        """
+        with self._selected_choices(widget or self.field.widget):
+            return super(LimitedChoicesBoundField, self).as_widget(widget, attrs, only_initial)
+
+    @cached_property
+    def subwidgets(self):
+        """
+        Gets the subwidgets for the field, including choices for the selected values
+
+        :return: List of BoundWidget instances
+        """
+        with self._selected_choices(self.field.widget):
+            return super(LimitedChoicesBoundField, self).subwidgets
+
+
+class LimitedChoicesMixin(object):
+    """
+    Mixin for model choice fields that limits the number of choices rendered by the widget
+    Values are still validated against the full queryset
+    """
+    iterator = LimitedModelChoiceIterator
+
+    def __init__(self, *args, **kwargs):
+        """
+        Sets up the instance
+
+        :param choice_limit: The maximum number of choices to render (None for no limit)
+        """
+        self.choice_limit = kwargs.pop('choice_limit', None)
+        super(LimitedChoicesMixin, self).__init__(*args, **kwargs)
+
+    def get_bound_field(self, form, field_name):
+        """
+        Gets the bound field, which renders the selected values even if they are beyond the choice limit
+
+        :param form: The form instance
+        :param field_name: The name of the field
+        :return: LimitedChoicesBoundField instance
+        """
+        return LimitedChoicesBoundField(form, self, field_name)
+
+
+class ModelChoiceField(LimitedChoicesMixin, forms.ModelChoiceField):
+    """
+    ModelChoiceField with an optional limit on the number of rendered choices
+    """
+
+
+class ModelMultipleChoiceField(LimitedChoicesMixin, forms.ModelMultipleChoiceField):
+    """
+    ModelMultipleChoiceField with an optional limit on the number of rendered choices
+    """
@@ -5,7 +5,9 @@ Forms for the omniforms app
 from __future__ import unicode_literals
 from django import forms
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from omniforms.dispatch import get_handler_backend
+from omniforms.validation import FALLBACK
 
 
 class OmniFormBaseForm(forms.Form):
@@ -13,10 +15,81 @@ class OmniFormBaseForm(forms.Form):
     Base form for generated omni forms
     """
     _handlers = None
+    _omni_form_content_type_id = None
+    _omni_form_pk = None
+    _validation_plan = None
+
+    def __init__(self, *args, **kwargs):
+        """
+        Binds the omni form the form is being instantiated for
+
+        :param args: Default positional args
+        :param kwargs: Default keyword args, optionally including the 'omni_form' instance
+        """
+        omni_form = kwargs.pop('omni_form', None)
+        super(OmniFormBaseForm, self).__init__(*args, **kwargs)
+        if omni_form is not None:
+            self._bound_omni_form = omni_form
+
+    @property
+    def _omni_form(self):
+        """
+        Gets the omni form the form was generated from. Generated form classes are cached, so
+        only the forms content type and primary key are stored on the class. The omni form is
+        bound when the form is instantiated, or looked up the first time it is requested
+
+        :return: OmniForm or OmniModelForm instance or None
+        """
+        omni_form = getattr(self, '_bound_omni_form', None)
+        if omni_form is None and self._omni_form_pk is not None:
+            omni_form = ContentType.objects.get_for_id(self._omni_form_content_type_id).get_object_for_this_type(
+                pk=self._omni_form_pk
+            )
+            self._bound_omni_form = omni_form
+        return omni_form
+
+    def _clean_field(self, name, field, cleaner=None):
+        """
+        Cleans the field, adding the cleaned value or errors to the form.
+        Values the compiled cleaner cannot accept are cleaned by the field
+
+        :param name: Field name
+        :param field: Form field instance
+        :param cleaner: Compiled cleaner for the field, or None
+        """
+        if field.disabled:
+            value = self.get_initial_for_field(field, name)
+        else:
+            value = field.widget.value_from_datadict(self.data, self.files, self.add_prefix(name))
+        try:
+            cleaned = FALLBACK if cleaner is None else cleaner(value)
+            if cleaned is not FALLBACK:
+                value = cleaned
+            elif isinstance(field, forms.FileField):
+                value = field.clean(value, self.get_initial_for_field(field, name))
+            else:
+                value = field.clean(value)
+            self.cleaned_data[name] = value
+            if hasattr(self, 'clean_%s' % name):
+                value = getattr(self, 'clean_%s' % name)()
+                self.cleaned_data[name] = value
+        except ValidationError as e:
+            self.add_error(name, e)
+
+    def _clean_fields(self):
+        """
+        Cleans the fields using the validation plan compiled for the form class, if there is one
+        """
+        plan = self._validation_plan
+        if plan is None:
+            return super(OmniFormBaseForm, self)._clean_fields()
+        for name, field in self.fields.items():
+            self._clean_field(name, field, plan.get_cleaner(name, field))
 
     def handle(self):
         """
         Really simple form handle method
+        Handlers are dispatched through the backend defined by the OMNI_FORMS_HANDLER_BACKEND setting
 
         :return:
         """
@@ -27,14 +100,25 @@ class OmniFormBaseForm(forms.Form):
             )
 
         if self._handlers:
-            for handler in self._handlers:
-                handler.handle(self)
+            get_handler_backend().dispatch(self, self._handlers)
 
 
 class OmniModelFormBaseForm(forms.ModelForm, OmniFormBaseForm):
     """
     Base form for generated omni forms
     """
+    def __init__(self, *args, **kwargs):
+        """
+        Binds the omni form the form is being instantiated for
+
+        :param args: Default positional args
+        :param kwargs: Default keyword args, optionally including the 'omni_form' instance
+        """
+        omni_form = kwargs.pop('omni_form', None)
+        super(OmniModelFormBaseForm, self).__init__(*args, **kwargs)
+        if omni_form is not None:
+            self._bound_omni_form = omni_form
+
     def save(self, commit=True):
         self.handle()
 
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Management command for benchmarking form generation, validation and handling
+"""
+from __future__ import unicode_literals
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment
+)
+from django.utils.encoding import force_text
+import io
+import json
+
+
+class Command(BaseCommand):
+    """
+    Runs the omniforms benchmarks against a test database and writes the results as JSON
+    """
+    help = (
+        'Benchmarks omniforms form generation, instantiation, validation and handling '
+        'for forms with different numbers of fields'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Adds command arguments
+
+        :param parser: Argument parser instance
+        """
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[10, 100, 1000],
+            help='The numbers of fields to benchmark forms with'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='The number of timed runs of each operation'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Path of the file to write the JSON results to. Results are written to stdout if omitted'
+        )
+        parser.add_argument(
+            '--compare',
+            default=None,
+            help='Path of a JSON results file to compare the results against'
+        )
+
+    def _load_baseline(self, path):
+        """
+        Loads the results to compare against
+
+        :param path: Path of the JSON results file
+        :raises: CommandError if the file cannot be read
+        :return: Results dict
+        """
+        try:
+            with io.open(path, encoding='utf-8') as baseline_file:
+                return json.load(baseline_file)
+        except (IOError, ValueError) as e:
+            raise CommandError('Could not read the results to compare against: {0}'.format(e))
+
+    def _write_comparison(self, rows):
+        """
+        Writes a table comparing the results to stderr
+
+        :param rows: List of dicts returned by compare_results
+        """
+        self.stderr.write('{0:>7} {1:<20} {2:>12} {3:>12} {4:>7} {5:>9}'.format(
+            'fields', 'operation', 'baseline (s)', 'current (s)', 'ratio', 'queries'
+        ))
+        for row in rows:
+            self.stderr.write('{0:>7} {1:<20} {2:>12.6f} {3:>12.6f} {4:>7} {5:>9}'.format(
+                row['fields'],
+                row['operation'],
+                row['baseline_mean'],
+                row['mean'],
+                '-' if row['ratio'] is None else '{0:.2f}'.format(row['ratio']),
+                '{0}->{1}'.format(row['baseline_queries'], row['queries'])
+            ))
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmarks
+
+        :param args: Command args
+        :param options: Command options
+        """
+        if not apps.is_installed('omniforms.tests'):
+            raise CommandError('The benchmarks require \'omniforms.tests\' to be in INSTALLED_APPS')
+        if options['repeat'] < 1 or any(size < 1 for size in options['sizes']):
+            raise CommandError('The sizes and number of repeats must be positive integers')
+        baseline = self._load_baseline(options['compare']) if options['compare'] else None
+
+        from omniforms.benchmarks.runner import compare_results, run_benchmarks
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                OMNI_FORMS_HANDLER_BACKEND='omniforms.dispatch.SynchronousBackend'
+            ):
+                results = run_benchmarks(sizes=options['sizes'], repeat=options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        output = force_text(json.dumps(results, indent=2))
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf-8') as output_file:
+                output_file.write(output)
+            self.stderr.write('Results written to {0}'.format(options['output']))
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            self._write_comparison(compare_results(baseline, results))
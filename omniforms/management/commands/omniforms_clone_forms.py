@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Management command for cloning form definitions
+"""
+from __future__ import unicode_literals
+from django.core.management.base import BaseCommand, CommandError
+from omniforms.cloning import clone_forms
+from omniforms.models import OmniForm, OmniModelForm
+
+
+class Command(BaseCommand):
+    """
+    Clones forms along with all of their fields and handlers
+    """
+    help = 'Clones omniforms forms along with all of their fields and handlers'
+
+    form_models = {
+        'omniform': OmniForm,
+        'omnimodelform': OmniModelForm,
+    }
+
+    def add_arguments(self, parser):
+        """
+        Adds command arguments
+
+        :param parser: Argument parser instance
+        """
+        parser.add_argument(
+            'form_ids',
+            nargs='+',
+            type=int,
+            help='The primary keys of the forms to clone'
+        )
+        parser.add_argument(
+            '--model',
+            choices=sorted(self.form_models),
+            default='omniform',
+            help='The type of form to clone'
+        )
+        parser.add_argument(
+            '--title-format',
+            default='{title} (copy)',
+            help='Format string for the cloned form titles. May contain {title} and {pk} placeholders'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Clones the forms
+
+        :param args: Command args
+        :param options: Command options
+        """
+        form_ids = []
+        for pk in options['form_ids']:
+            if pk not in form_ids:
+                form_ids.append(pk)
+        forms = self.form_models[options['model']].objects.in_bulk(form_ids)
+        missing = [str(pk) for pk in form_ids if pk not in forms]
+        if missing:
+            raise CommandError('Could not find form(s) with the id(s): {0}'.format(', '.join(missing)))
+
+        sources = [forms[pk] for pk in form_ids]
+        titles = [options['title_format'].format(title=form.title, pk=form.pk) for form in sources]
+        for form, clone in zip(sources, clone_forms(sources, titles=titles)):
+            self.stdout.write('Cloned form {0} to {1} ({2})'.format(form.pk, clone.pk, clone.title))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Management command for exporting form definitions
+"""
+from __future__ import unicode_literals
+from django.core.management.base import BaseCommand, CommandError
+from itertools import chain
+from omniforms.models import OmniForm, OmniModelForm
+from omniforms.transfer import DEFAULT_BATCH_SIZE, InvalidFormDefinition, dump_forms
+import io
+
+
+class Command(BaseCommand):
+    """
+    Exports forms along with all of their fields and handlers as JSON lines
+    """
+    help = (
+        'Exports omniforms forms along with all of their fields and handlers in a '
+        'portable format that can be loaded with the omniforms_import command'
+    )
+
+    form_models = {
+        'omniform': OmniForm,
+        'omnimodelform': OmniModelForm,
+    }
+
+    def add_arguments(self, parser):
+        """
+        Adds command arguments
+
+        :param parser: Argument parser instance
+        """
+        parser.add_argument(
+            'form_ids',
+            nargs='*',
+            type=int,
+            help='The primary keys of the forms to export. All forms are exported if omitted'
+        )
+        parser.add_argument(
+            '--model',
+            choices=sorted(self.form_models),
+            default='omniform',
+            help='The type of form the primary keys refer to'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Path of the file to write the export to. The export is written to stdout if omitted'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='The number of forms to fetch fields and handlers for at a time'
+        )
+
+    def _get_forms(self, options):
+        """
+        Gets the forms to export
+
+        :param options: Command options
+        :raises: CommandError if any of the forms do not exist
+        :return: Iterable of forms
+        """
+        if not options['form_ids']:
+            return chain(*[
+                self.form_models[name].objects.order_by('pk').iterator() for name in sorted(self.form_models)
+            ])
+
+        form_ids = []
+        for pk in options['form_ids']:
+            if pk not in form_ids:
+                form_ids.append(pk)
+        forms = self.form_models[options['model']].objects.in_bulk(form_ids)
+        missing = [str(pk) for pk in form_ids if pk not in forms]
+        if missing:
+            raise CommandError('Could not find form(s) with the id(s): {0}'.format(', '.join(missing)))
+        return [forms[pk] for pk in form_ids]
+
+    def handle(self, *args, **options):
+        """
+        Exports the forms
+
+        :param args: Command args
+        :param options: Command options
+        """
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be a positive integer')
+        forms = self._get_forms(options)
+        try:
+            if options['output']:
+                with io.open(options['output'], 'w', encoding='utf-8') as output_file:
+                    count = dump_forms(forms, output_file, batch_size=options['batch_size'])
+            else:
+                count = dump_forms(forms, self.stdout, batch_size=options['batch_size'])
+        except InvalidFormDefinition as e:
+            raise CommandError('Could not export the forms: {0}'.format(e))
+        self.stderr.write('Exported {0} form(s)'.format(count))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Management command for importing form definitions
+"""
+from __future__ import unicode_literals
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from omniforms.transfer import DEFAULT_BATCH_SIZE, InvalidFormDefinition, import_forms, load_forms
+import io
+import sys
+
+
+class Command(BaseCommand):
+    """
+    Imports forms along with all of their fields and handlers from an export
+    """
+    help = (
+        'Imports omniforms forms along with all of their fields and handlers from a file '
+        'written by the omniforms_export command. All forms are imported in a single transaction'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Adds command arguments
+
+        :param parser: Argument parser instance
+        """
+        parser.add_argument(
+            'path',
+            help='Path of the export to import. Use - to read from stdin'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='The number of forms to insert at a time'
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+            help='The database to import the forms into'
+        )
+
+    def _import(self, stream, options):
+        """
+        Imports the forms from the stream
+
+        :param stream: Text stream to read from
+        :param options: Command options
+        :return: List of created forms
+        """
+        return import_forms(load_forms(stream), using=options['database'], batch_size=options['batch_size'])
+
+    def handle(self, *args, **options):
+        """
+        Imports the forms
+
+        :param args: Command args
+        :param options: Command options
+        """
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be a positive integer')
+        try:
+            if options['path'] == '-':
+                forms = self._import(sys.stdin, options)
+            else:
+                with io.open(options['path'], encoding='utf-8') as import_file:
+                    forms = self._import(import_file, options)
+        except IOError as e:
+            raise CommandError('Could not read the export: {0}'.format(e))
+        except (InvalidFormDefinition, DatabaseError) as e:
+            raise CommandError('Could not import the forms, no changes were made: {0}'.format(e))
+        self.stdout.write('Imported {0} form(s)'.format(len(forms)))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Management command for processing queued form handler jobs
+"""
+from __future__ import unicode_literals
+from django.core.management.base import BaseCommand
+from omniforms.dispatch import DatabaseQueueBackend
+import time
+
+
+class Command(BaseCommand):
+    """
+    Processes form handler jobs created by the DatabaseQueueBackend
+    """
+    help = 'Processes queued omniforms handler jobs'
+
+    def add_arguments(self, parser):
+        """
+        Adds command arguments
+
+        :param parser: Argument parser instance
+        """
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='The maximum number of jobs to process in each batch'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            default=False,
+            help='Keep polling for new jobs rather than exiting once the queue is empty'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='The number of seconds to wait between polls when running with --loop'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Processes the queued jobs
+
+        :param args: Command args
+        :param options: Command options
+        """
+        backend = DatabaseQueueBackend()
+        total = 0
+        try:
+            while True:
+                processed = backend.process(limit=options['batch_size'])
+                total += processed
+                if processed:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            backend.close_mail_connection()
+        self.stdout.write('Processed {0} job(s)'.format(total))
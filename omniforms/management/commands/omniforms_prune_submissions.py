@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Management command for exporting and pruning stored form submissions
+"""
+from __future__ import unicode_literals
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.encoding import force_text
+from omniforms.models import OmniFormSubmission
+import io
+import json
+
+
+class Command(BaseCommand):
+    """
+    Exports and/or deletes stored submissions older than a given number of days
+    """
+    help = 'Exports and deletes stored omniforms submissions older than a given number of days'
+
+    def add_arguments(self, parser):
+        """
+        Adds command arguments
+
+        :param parser: Argument parser instance
+        """
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Required. Only submissions older than this number of days will be exported or deleted'
+        )
+        parser.add_argument(
+            '--content-type',
+            type=int,
+            default=None,
+            help='Only include submissions for forms of this content type id'
+        )
+        parser.add_argument(
+            '--form',
+            type=int,
+            default=None,
+            help='Only include submissions for the form with this primary key (requires --content-type)'
+        )
+        parser.add_argument(
+            '--export',
+            default=None,
+            help='Path of a file to write the submissions to (one JSON object per line) before deleting them'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            default=False,
+            help='Export the submissions without deleting them'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='The number of submissions to read from the database at a time'
+        )
+
+    def get_queryset(self, options):
+        """
+        Gets the submissions matching the command options
+
+        :param options: Command options
+        :return: OmniFormSubmission queryset
+        """
+        queryset = OmniFormSubmission.objects.filter(created__lt=timezone.now() - timedelta(days=options['days']))
+        if options['form'] is not None and options['content_type'] is None:
+            raise CommandError('--form requires --content-type')
+        if options['content_type'] is not None:
+            queryset = queryset.filter(content_type_id=options['content_type'])
+        if options['form'] is not None:
+            queryset = queryset.filter(object_id=options['form'])
+        return queryset.order_by('pk')
+
+    @staticmethod
+    def export(queryset, path, batch_size):
+        """
+        Writes the submissions to a file, one JSON object per line
+
+        :param queryset: OmniFormSubmission queryset
+        :param path: Path of the file to write to
+        :param batch_size: The number of submissions to read from the database at a time
+        :return: The number of submissions exported
+        """
+        count = 0
+        last_pk = 0
+        values = queryset.values_list('pk', 'content_type_id', 'object_id', 'created', 'data')
+        with io.open(path, 'w', encoding='utf-8') as export_file:
+            while True:
+                batch = list(values.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                for pk, content_type_id, object_id, created, data in batch:
+                    export_file.write(force_text(json.dumps({
+                        'id': pk,
+                        'content_type': content_type_id,
+                        'form': object_id,
+                        'created': created.isoformat(),
+                        'data': json.loads(data),
+                    })))
+                    export_file.write('\n')
+                count += len(batch)
+                last_pk = batch[-1][0]
+        return count
+
+    def handle(self, *args, **options):
+        """
+        Exports and/or deletes the submissions
+
+        :param args: Command args
+        :param options: Command options
+        """
+        if options['days'] is None:
+            raise CommandError('--days is required')
+        if options['keep'] and not options['export']:
+            raise CommandError('--keep can only be used with --export')
+
+        with transaction.atomic():
+            queryset = self.get_queryset(options)
+            if options['export']:
+                count = self.export(queryset, options['export'], options['batch_size'])
+                self.stdout.write('Exported {0} submission(s)'.format(count))
+            if not options['keep']:
+                count, deleted = queryset.delete()
+                self.stdout.write('Deleted {0} submission(s)'.format(count))
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 13:50
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('omniforms', '0026_omniformhandlerjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OmniFormSaveSubmissionHandler',
+            fields=[
+                ('omniformhandler_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='omniforms.OmniFormHandler')),
+            ],
+            options={
+                'verbose_name': 'Store Submission',
+            },
+            bases=('omniforms.omniformhandler',),
+        ),
+        migrations.CreateModel(
+            name='OmniFormSubmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('data', models.TextField()),
+                ('created', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'ordering': ('-created', '-pk'),
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='omniformsubmission',
+            index_together=set([('content_type', 'object_id', 'created')]),
+        ),
+    ]
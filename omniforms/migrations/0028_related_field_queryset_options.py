@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omniforms', '0027_omniformsubmission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='omniforeignkeyfield',
+            name='queryset_filter',
+            field=models.TextField(blank=True, help_text='Optional JSON object of lookups used to filter the available choices, e.g. {"is_active": true, "category__slug": "news"}'),
+        ),
+        migrations.AddField(
+            model_name='omniforeignkeyfield',
+            name='queryset_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='The maximum number of choices to render. Only applies to widgets that render every choice, not to autocomplete widgets.', null=True),
+        ),
+        migrations.AddField(
+            model_name='omniforeignkeyfield',
+            name='queryset_ordering',
+            field=models.CharField(blank=True, help_text='Optional comma separated list of fields used to order the available choices, e.g. -created,title', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='omniforeignkeyfield',
+            name='search_fields',
+            field=models.CharField(blank=True, help_text='Comma separated list of fields searched by autocomplete widgets, e.g. title,author__name', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='omnimanytomanyfield',
+            name='queryset_filter',
+            field=models.TextField(blank=True, help_text='Optional JSON object of lookups used to filter the available choices, e.g. {"is_active": true, "category__slug": "news"}'),
+        ),
+        migrations.AddField(
+            model_name='omnimanytomanyfield',
+            name='queryset_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='The maximum number of choices to render. Only applies to widgets that render every choice, not to autocomplete widgets.', null=True),
+        ),
+        migrations.AddField(
+            model_name='omnimanytomanyfield',
+            name='queryset_ordering',
+            field=models.CharField(blank=True, help_text='Optional comma separated list of fields used to order the available choices, e.g. -created,title', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='omnimanytomanyfield',
+            name='search_fields',
+            field=models.CharField(blank=True, help_text='Comma separated list of fields searched by autocomplete widgets, e.g. title,author__name', max_length=255),
+        ),
+    ]
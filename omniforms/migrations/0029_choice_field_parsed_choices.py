@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:28
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import json
+
+
+def parse_choices(text):
+    # Existing lines are used as both the value and the label, whether or not they contain a '|'
+    choices = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            choices.append((line, line))
+    return choices
+
+
+def forwards(apps, schema_editor):
+    for model_name in ('OmniChoiceField', 'OmniMultipleChoiceField'):
+        model_class = apps.get_model('omniforms', model_name)
+        for instance in model_class.objects.all():
+            model_class.objects.filter(pk=instance.pk).update(
+                parsed_choices=json.dumps(parse_choices(instance.choices))
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omniforms', '0028_related_field_queryset_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='omnichoicefield',
+            name='parsed_choices',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='omnimultiplechoicefield',
+            name='parsed_choices',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='omnichoicefield',
+            name='choices',
+            field=models.TextField(help_text='Please add one choice per line. To store a value that differs from the displayed label, enter the choice as value|label.'),
+        ),
+        migrations.AlterField(
+            model_name='omnimultiplechoicefield',
+            name='choices',
+            field=models.TextField(help_text='Please add one choice per line. To store a value that differs from the displayed label, enter the choice as value|label.'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
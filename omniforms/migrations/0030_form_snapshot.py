@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:43
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omniforms', '0029_choice_field_parsed_choices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='omniform',
+            name='snapshot',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='omnimodelform',
+            name='snapshot',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 15:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omniforms', '0030_form_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='omnichoicefield',
+            name='separate_values',
+            field=models.BooleanField(default=False, help_text='To store a value that differs from the displayed label, check this box and enter each choice as value|label.'),
+        ),
+        migrations.AddField(
+            model_name='omnimultiplechoicefield',
+            name='separate_values',
+            field=models.BooleanField(default=False, help_text='To store a value that differs from the displayed label, check this box and enter each choice as value|label.'),
+        ),
+        migrations.AlterField(
+            model_name='omnichoicefield',
+            name='choices',
+            field=models.TextField(help_text='Please add one choice per line.'),
+        ),
+        migrations.AlterField(
+            model_name='omnimultiplechoicefield',
+            name='choices',
+            field=models.TextField(help_text='Please add one choice per line.'),
+        ),
+    ]
@@ -3,30 +3,98 @@
 Models for the omniforms app
 """
 from __future__ import unicode_literals
+from collections import defaultdict
+from datetime import timedelta
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ValidationError, ImproperlyConfigured
+from django.core.exceptions import FieldError, ValidationError, ImproperlyConfigured
 from django.core.files import File
 from django.core.mail import EmailMessage
-from django.core.urlresolvers import reverse
+from django.core import signing
+from django.core.urlresolvers import NoReverseMatch, reverse
 from django.core.validators import RegexValidator
 from django.db import models
-from django.db.models.fields.related import ForeignObjectRel
+from django.db.models.query import BaseIterable
 from django.forms import modelform_factory
-from django.template import Template, Context
+from django.template import Context, Template, TemplateSyntaxError
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.functional import cached_property
+from django.utils.http import urlencode
+from django.utils import timezone
 from django.utils.module_loading import import_string
 from django.utils.translation import ugettext_lazy as _
+from omniforms.attachments import get_attachments
+from omniforms.batch import DEFAULT_CHUNK_SIZE, validate_batch
+from omniforms.cache import (
+    cached_import_string,
+    choices_cache,
+    field_generations,
+    form_class_cache,
+    template_cache
+)
+from omniforms.dispatch import get_max_attempts, get_retry_delay
 from omniforms.forms import OmniFormBaseForm, OmniModelFormBaseForm, EmailConfirmationHandlerBaseFormClass
+from omniforms.registry import concrete_model_registry, model_introspection_cache
+from omniforms.snapshots import get_definition
+from omniforms.submissions import serialize_cleaned_data, submission_buffer
+from omniforms.tracing import span
+from omniforms.validation import ValidationPlan
+from omniforms.widgets import AUTOCOMPLETE_TOKEN_SALT, AutocompleteWidgetMixin, get_fallback_widget_class
+import json
 import re
+import threading
+
+
+class SpecificIterable(BaseIterable):
+    """
+    Iterable that yields the most specific subclassed version of each instance in a queryset
+    Instances are fetched with a single query per concrete model class and yielded in the
+    order defined by the original queryset
+    """
+    def __iter__(self):
+        """
+        Groups the queryset rows by their real type and fetches each concrete model class in bulk
+
+        :return: Generator of model subclass instances
+        """
+        queryset = self.queryset
+        pks_and_types = list(queryset.values_list('pk', 'real_type'))
+        pks_by_type = defaultdict(list)
+        for pk, real_type_id in pks_and_types:
+            pks_by_type[real_type_id].append(pk)
+
+        instances_by_type = {}
+        for real_type_id, pks in pks_by_type.items():
+            real_type = ContentType.objects.get_for_id(real_type_id)
+            model_class = real_type.model_class() or queryset.model
+            instances_by_type[real_type_id] = instances = {}
+            for instance in model_class._base_manager.using(queryset.db).filter(pk__in=pks):
+                # Use the cached content type so that accessing 'specific' doesn't hit the database
+                instance.real_type = real_type
+                instances[instance.pk] = instance
+
+        for pk, real_type_id in pks_and_types:
+            instance = instances_by_type[real_type_id].get(pk)
+            if instance is not None:
+                yield instance
 
 
 class OmniFormRelatedQuerySet(models.QuerySet):
     """
     Custom queryset for OmniFormHandler model
     """
+    def specific(self):
+        """
+        Returns a clone of the queryset that yields the most specific
+        subclassed version of each instance using the minimum number of queries
+
+        :return: QuerySet of model subclass instances
+        """
+        clone = self._clone()
+        clone._iterable_class = SpecificIterable
+        return clone
+
     def _get_concrete_models(self, base_model_class):
         """
         Method for retrieving and returning a list of all handler model classes
@@ -34,20 +102,7 @@ class OmniFormRelatedQuerySet(models.QuerySet):
 
         :return: List of OmniFormHandler model classes
         """
-        model_classes = []
-        for ctype in ContentType.objects.all():
-            model_class = ctype.model_class()
-            if not model_class:
-                continue
-
-            if model_class._meta.abstract:
-                continue
-
-            if model_class == base_model_class or not issubclass(model_class, base_model_class):
-                continue
-
-            model_classes.append(model_class)
-        return model_classes
+        return list(concrete_model_registry.get_concrete_models(base_model_class))
 
 
 class OmniFieldQuerySet(OmniFormRelatedQuerySet):
@@ -136,6 +191,10 @@ class OmniField(models.Model):
 
     objects = OmniFieldQuerySet.as_manager()
 
+    _field_mapping = None
+    _concrete_classes = {}
+    _field_mapping_lock = threading.Lock()
+
     class Meta(object):
         """
         Django properties
@@ -186,14 +245,13 @@ class OmniField(models.Model):
         return field_mapping
 
     @classmethod
-    def get_concrete_class_for_model_field(cls, model_field):
+    def get_default_field_mapping(cls):
         """
-        Method for getting a concrete model class to represent the type of form field required
+        Class method for getting the default field mappings
 
-        :param model_field: Model Field instance
-        :return: OmniField subclass
+        :return: Field mapping dict where the key is a model field class and the value is an OmniField subclass
         """
-        field_mapping = {
+        return {
             models.CharField: OmniCharField,
             models.TextField: OmniCharField,
             models.BooleanField: OmniBooleanField,
@@ -219,8 +277,95 @@ class OmniField(models.Model):
             models.DurationField: OmniDurationField,
             models.GenericIPAddressField: OmniGenericIPAddressField
         }
-        field_mapping.update(cls.get_custom_field_mapping())
-        return field_mapping.get(model_field.__class__)
+
+    @classmethod
+    def get_field_mapping(cls):
+        """
+        Class method for getting the compiled field mapping (default and custom field mappings)
+        The mapping is only built once and is reset when OMNI_FORMS_CUSTOM_FIELD_MAPPING changes
+
+        :return: Field mapping dict where the key is a model field class and the value is an OmniField subclass
+        """
+        field_mapping = OmniField._field_mapping
+        if field_mapping is None:
+            with OmniField._field_mapping_lock:
+                field_mapping = OmniField._field_mapping
+                if field_mapping is None:
+                    field_mapping = cls.get_default_field_mapping()
+                    field_mapping.update(cls.get_custom_field_mapping())
+                    OmniField._field_mapping = field_mapping
+        return field_mapping
+
+    @classmethod
+    def clear_field_mapping(cls):
+        """
+        Class method for clearing the compiled field mapping and the classes resolved from it
+        """
+        with OmniField._field_mapping_lock:
+            OmniField._field_mapping = None
+            OmniField._concrete_classes = {}
+
+    @classmethod
+    def get_concrete_class_for_model_field(cls, model_field):
+        """
+        Method for getting a concrete model class to represent the type of form field required
+        Model field subclasses are resolved using the closest mapped class in their MRO.
+        Parent links and auto created one to one fields can't be represented on a form
+
+        :param model_field: Model Field instance
+        :return: OmniField subclass
+        """
+        if isinstance(model_field, models.OneToOneField) and (
+            model_field.remote_field.parent_link or model_field.auto_created
+        ):
+            return None
+
+        model_field_class = model_field.__class__
+        try:
+            return OmniField._concrete_classes[model_field_class]
+        except KeyError:
+            pass
+
+        field_mapping = cls.get_field_mapping()
+        concrete_class = None
+        for klass in model_field_class.__mro__:
+            if klass in field_mapping:
+                concrete_class = field_mapping[klass]
+                break
+        # Store the result separately from the mapping, unless the mapping was cleared in the meantime
+        with OmniField._field_mapping_lock:
+            if OmniField._field_mapping is field_mapping:
+                OmniField._concrete_classes[model_field_class] = concrete_class
+        return concrete_class
+
+    @classmethod
+    def get_widget_choices(cls):
+        """
+        Class method for getting admin form choices for the widgets permitted by the field
+
+        :return: List of (widget_class, widget name) choices
+        """
+        return [(widget, cached_import_string(widget).__name__) for widget in cls.FORM_WIDGETS]
+
+    @classmethod
+    def validate_import_paths(cls):
+        """
+        Class method that resolves the FIELD_CLASS and FORM_WIDGETS import paths for the field
+
+        :raises: ImproperlyConfigured
+        """
+        import_paths = list(getattr(cls, 'FORM_WIDGETS', ()))
+        if getattr(cls, 'FIELD_CLASS', None):
+            import_paths.append(cls.FIELD_CLASS)
+
+        for import_path in import_paths:
+            try:
+                cached_import_string(import_path)
+            except ImportError:
+                raise ImproperlyConfigured(
+                    'Could not import \'{0}\' defined on \'{1}\'. Please ensure that the FIELD_CLASS '
+                    'and FORM_WIDGETS attributes contain valid import paths'.format(import_path, cls.__name__)
+                )
 
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         """
@@ -273,8 +418,8 @@ class OmniField(models.Model):
 
         :return: django.forms.fields.Field subclass
         """
-        field_class = import_string(self.specific.FIELD_CLASS)
-        widget_class = import_string(self.specific.widget_class)
+        field_class = cached_import_string(self.specific.FIELD_CLASS)
+        widget_class = cached_import_string(self.specific.widget_class)
         return field_class(
             widget=widget_class(),
             label=self.specific.label,
@@ -856,11 +1001,146 @@ class OmniRelatedField(OmniField):
     Represents a field with relationships
     """
     related_type = models.ForeignKey(ContentType, related_name='+')
+    queryset_filter = models.TextField(
+        blank=True,
+        help_text=_(
+            'Optional JSON object of lookups used to filter the available choices, '
+            'e.g. {"is_active": true, "category__slug": "news"}'
+        )
+    )
+    queryset_ordering = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text=_('Optional comma separated list of fields used to order the available choices, e.g. -created,title')
+    )
+    queryset_limit = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text=_(
+            'The maximum number of choices to render. Only applies to widgets that '
+            'render every choice, not to autocomplete widgets.'
+        )
+    )
+    search_fields = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text=_('Comma separated list of fields searched by autocomplete widgets, e.g. title,author__name')
+    )
     initial_data = None
 
     class Meta(object):
         abstract = True
 
+    @staticmethod
+    def _split_field_list(value):
+        """
+        Splits a comma separated list of field names
+
+        :param value: Comma separated string
+        :return: List of field names
+        """
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_related_model(self):
+        """
+        Gets the related model class using the content type cache
+
+        :return: Model class
+        """
+        return ContentType.objects.get_for_id(self.related_type_id).model_class()
+
+    def get_queryset_filter(self):
+        """
+        Gets the lookups used to filter the available choices
+
+        :raises: ValueError if the filter is not a JSON object
+        :return: Dict of lookups
+        """
+        if not self.queryset_filter.strip():
+            return {}
+        lookups = json.loads(self.queryset_filter)
+        if not isinstance(lookups, dict):
+            raise ValueError('The filter must be a JSON object')
+        return lookups
+
+    def get_queryset(self):
+        """
+        Gets the queryset of available choices, filtered and ordered as specified
+        Unordered querysets are ordered by primary key so that paginated results are stable
+
+        :return: QuerySet instance
+        """
+        queryset = self.get_related_model()._default_manager.filter(**self.get_queryset_filter())
+        ordering = self._split_field_list(self.queryset_ordering)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        elif not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return queryset
+
+    def get_search_query(self, term):
+        """
+        Gets a query matching instances where any of the search fields contain the search term
+
+        :param term: The search term
+        :return: Q instance
+        """
+        query = models.Q()
+        for name in self._split_field_list(self.search_fields):
+            query |= models.Q(**{'{0}__icontains'.format(name): term})
+        return query
+
+    def clean(self):
+        """
+        Cleans the model data
+        Ensures that the queryset filter, ordering and search fields are valid for the related model
+
+        :raises: ValidationError
+        """
+        super(OmniRelatedField, self).clean()
+        if self.related_type_id is None:
+            return
+
+        try:
+            lookups = self.get_queryset_filter()
+        except ValueError as e:
+            raise ValidationError({'queryset_filter': 'The filter is not a valid JSON object: {0}'.format(e)})
+
+        manager = self.get_related_model()._default_manager
+        checks = (
+            ('queryset_filter', lambda: manager.filter(**lookups)),
+            ('queryset_ordering', lambda: manager.order_by(*self._split_field_list(self.queryset_ordering))),
+            ('search_fields', lambda: manager.filter(self.get_search_query(''))),
+        )
+        for name, get_queryset in checks:
+            try:
+                queryset = get_queryset()
+                queryset.query.get_compiler(queryset.db).as_sql()
+            except (FieldError, TypeError, ValueError) as e:
+                raise ValidationError({name: 'Invalid value: {0}'.format(e)})
+
+    def uses_autocomplete_widget(self):
+        """
+        Determines whether the field is rendered with an autocomplete widget
+
+        :return: bool
+        """
+        return issubclass(cached_import_string(self.specific.widget_class), AutocompleteWidgetMixin)
+
+    def get_autocomplete_url(self):
+        """
+        Gets the URL of the autocomplete endpoint for the field. The URL carries a signed
+        token which scopes the lookup to this field on the form it belongs to
+
+        :return: URL string or None if the omniforms URLs are not included
+        """
+        try:
+            url = reverse('omniforms:autocomplete', args=[self.pk])
+        except NoReverseMatch:
+            return None
+        token = signing.dumps([self.pk, self.content_type_id, self.object_id], salt=AUTOCOMPLETE_TOKEN_SALT)
+        return '{0}?{1}'.format(url, urlencode({'token': token}))
+
     def as_form_field(self):
         """
         Method for generating a form field instance from the
@@ -868,15 +1148,23 @@ class OmniRelatedField(OmniField):
 
         :return: django.forms.fields.Field subclass
         """
-        field_class = import_string(self.specific.FIELD_CLASS)
-        widget_class = import_string(self.specific.widget_class)
+        field_class = cached_import_string(self.specific.FIELD_CLASS)
+        widget_class = cached_import_string(self.specific.widget_class)
+        widget_kwargs = {}
+        if issubclass(widget_class, AutocompleteWidgetMixin):
+            url = self.get_autocomplete_url() if self.pk is not None else None
+            if url is None:
+                widget_class = get_fallback_widget_class(widget_class)
+            else:
+                widget_kwargs['url'] = url
         return field_class(
-            queryset=self.related_type.model_class().objects.all(),
-            widget=widget_class(),
+            queryset=self.specific.get_queryset(),
+            widget=widget_class(**widget_kwargs),
             label=self.specific.label,
             help_text=self.specific.help_text,
             required=self.specific.required,
-            initial=self.specific.initial_data
+            initial=self.specific.initial_data,
+            choice_limit=self.specific.queryset_limit
         )
 
 
@@ -884,8 +1172,12 @@ class OmniManyToManyField(OmniRelatedField):
     """
     ManyToManyField representation
     """
-    FIELD_CLASS = 'django.forms.ModelMultipleChoiceField'
-    FORM_WIDGETS = ('django.forms.SelectMultiple', 'django.forms.CheckboxSelectMultiple')
+    FIELD_CLASS = 'omniforms.fields.ModelMultipleChoiceField'
+    FORM_WIDGETS = (
+        'django.forms.SelectMultiple',
+        'django.forms.CheckboxSelectMultiple',
+        'omniforms.widgets.AutocompleteSelectMultiple',
+    )
 
     class Meta(object):
         """
@@ -898,8 +1190,8 @@ class OmniForeignKeyField(OmniRelatedField):
     """
     ForeignKey field representation
     """
-    FIELD_CLASS = 'django.forms.ModelChoiceField'
-    FORM_WIDGETS = ('django.forms.Select', 'django.forms.RadioSelect')
+    FIELD_CLASS = 'omniforms.fields.ModelChoiceField'
+    FORM_WIDGETS = ('django.forms.Select', 'django.forms.RadioSelect', 'omniforms.widgets.AutocompleteSelect')
 
     class Meta(object):
         """
@@ -908,14 +1200,47 @@ class OmniForeignKeyField(OmniRelatedField):
         verbose_name = 'Foreign Key Field'
 
 
+CHOICE_SEPARATOR = '|'
+
+
+def parse_choices(text, separate_values=False):
+    """
+    Parses choices entered one per line. Each line is used as both the value and the label
+    of a choice, unless separate_values is True, in which case lines may take the form
+    'value|label' to store a value that differs from the displayed label.
+    Surrounding whitespace and blank lines are ignored
+
+    :param text: Choices string
+    :param separate_values: Whether to split lines into a value and a label
+    :return: Tuple of (value, label) tuples
+    """
+    choices = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        value, separator, label = line.partition(CHOICE_SEPARATOR) if separate_values else (line, '', '')
+        if separator:
+            choices.append((value.strip(), label.strip()))
+        else:
+            choices.append((line, line))
+    return tuple(choices)
+
+
 class ChoiceFieldMixin(models.Model):
     """
     Provides common functionality for choice fields
     """
     initial_data = None
-    choices = models.TextField(
-        help_text='Please add one choice per line.'
+    choices = models.TextField(help_text=_('Please add one choice per line.'))
+    separate_values = models.BooleanField(
+        default=False,
+        help_text=_(
+            'To store a value that differs from the displayed label, '
+            'check this box and enter each choice as value|label.'
+        )
     )
+    parsed_choices = models.TextField(editable=False, blank=True)
 
     class Meta(object):
         """
@@ -923,19 +1248,25 @@ class ChoiceFieldMixin(models.Model):
         """
         abstract = True
 
+    def save(self, *args, **kwargs):
+        """
+        Parses and stores the choices before saving
+
+        :param args: Default positional args
+        :param kwargs: Default keyword args
+        """
+        self.parsed_choices = json.dumps(parse_choices(self.choices, self.separate_values))
+        super(ChoiceFieldMixin, self).save(*args, **kwargs)
+
     def _get_field_choices(self):
         """
-        Generates a list of form field choices from the choices field data
+        Gets the form field choices from the parsed choices stored when the field was saved
 
-        :return: List of form field choices
+        :return: Tuple of (value, label) tuples
         """
-        choices = []
-        for choice in self.choices.splitlines():
-            choice = choice.strip()
-            if not choice:
-                continue
-            choices.append([choice, choice])
-        return choices
+        if not self.parsed_choices:
+            return parse_choices(self.choices, self.separate_values)
+        return choices_cache.get_choices(self.pk, self.parsed_choices)
 
     def as_form_field(self, **kwargs):
         """
@@ -1098,7 +1429,7 @@ class TemplateHelpTextLazy(object):
         """
         help_text = 'Please enter the content of the email here.'
         if self.instance.form:
-            used_fields = self.instance.form.used_field_names
+            used_fields = self.instance.form.ordered_field_names
             if len(used_fields) > 0:
                 help_text += ' Available tokens are {0}'.format(
                     ', '.join(['{{ %s }}' % field for field in used_fields])
@@ -1150,7 +1481,20 @@ class OmniFormEmailHandlerBase(OmniFormHandler):
 
         :return: Rendered content
         """
-        return Template(self.template).render(Context(context_data))
+        return template_cache.get_template(self.pk, self.template).render(Context(context_data))
+
+    def clean(self):
+        """
+        Cleans the handler
+        Ensures that the template can be compiled
+
+        :raises: ValidationError
+        """
+        super(OmniFormEmailHandlerBase, self).clean()
+        try:
+            Template(self.template)
+        except TemplateSyntaxError as e:
+            raise ValidationError({'template': 'The template could not be compiled: {0}'.format(e)})
 
     @staticmethod
     def get_files(form):
@@ -1167,25 +1511,45 @@ class OmniFormEmailHandlerBase(OmniFormHandler):
             )
         )
 
-    def handle(self, form):
+    def get_message(self, form):
         """
-        Handle method
-        Sends an email to the specified recipients
+        Builds the email message for the valid form
+        Uploaded files are read once per submission and shared between handlers
 
         :param form: Valid form instance
         :type form: django.forms.Form
+
+        :return: EmailMessage instance
         """
+        with span('email.render', form=form, handler=self):
+            attachments = get_attachments(form)
+            body = self._render_template(form.cleaned_data)
+            if attachments.links:
+                body = '{0}\n\n{1}'.format(body, attachments.get_links_text())
+
         message = EmailMessage(
             self.subject,
-            self._render_template(form.cleaned_data),
+            body,
             settings.DEFAULT_FROM_EMAIL,
             self._get_recipients(form)
         )
 
-        for file_object in self.get_files(form):
-            message.attach(file_object.name, file_object.read(), file_object.content_type)
+        for mime_part in attachments.get_mime_parts():
+            message.attach(mime_part)
 
-        message.send()
+        return message
+
+    def handle(self, form):
+        """
+        Handle method
+        Sends an email to the specified recipients
+
+        :param form: Valid form instance
+        :type form: django.forms.Form
+        """
+        message = self.get_message(form)
+        with span('email.send', form=form, handler=self, message_count=1):
+            message.send()
 
 
 class OmniFormEmailHandler(OmniFormEmailHandlerBase):
@@ -1258,11 +1622,10 @@ class OmniFormSaveInstanceHandler(OmniFormHandler):
         :raises: ValidationError
         """
         defined_fields = self.form.used_field_names
-        required_fields = self.form.get_required_field_names()
-        missing_fields = []
-        for field in required_fields:
-            if field not in defined_fields:
-                missing_fields.append(field)
+        missing_fields = [
+            field for field in self.form.get_required_field_names()
+            if field not in defined_fields
+        ]
 
         if len(missing_fields) > 0:
             raise ValidationError(
@@ -1310,6 +1673,138 @@ class OmniFormSaveInstanceHandler(OmniFormHandler):
             form._save_m2m()
 
 
+class OmniFormSaveSubmissionHandler(OmniFormHandler):
+    """
+    Handler for storing the submitted form data
+    """
+    class Meta(object):
+        """
+        Django properties
+        """
+        verbose_name = 'Store Submission'
+
+    def handle(self, form):
+        """
+        Handle method
+        Buffers the submitted data for writing to the database
+
+        :param form: Valid form instance
+        :type form: django.forms.Form
+        """
+        submission_buffer.add(OmniFormSubmission(
+            content_type_id=self.content_type_id,
+            object_id=self.object_id,
+            data=serialize_cleaned_data(form.cleaned_data)
+        ))
+
+
+@python_2_unicode_compatible
+class OmniFormSubmission(models.Model):
+    """
+    Submitted form data stored by the OmniFormSaveSubmissionHandler
+    """
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    object_id = models.PositiveIntegerField()
+    form = GenericForeignKey()
+    data = models.TextField()
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta(object):
+        """
+        Django properties
+        """
+        ordering = ('-created', '-pk')
+        index_together = (('content_type', 'object_id', 'created'),)
+
+    def __str__(self):
+        """
+        String representation of the model instance
+
+        :return: The form reference and submission date
+        """
+        return '{0}.{1}: {2}'.format(self.content_type_id, self.object_id, self.created.isoformat())
+
+    def get_data(self):
+        """
+        Gets the submitted data
+
+        :return: Dict of submitted data
+        """
+        return json.loads(self.data)
+
+
+@python_2_unicode_compatible
+class OmniFormHandlerJob(models.Model):
+    """
+    A queued execution of a form handler for a single form submission
+    Created by the DatabaseQueueBackend and processed by the omniforms_process_handler_jobs command
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed')
+    )
+
+    submission_id = models.CharField(max_length=32, db_index=True)
+    handler = models.ForeignKey(OmniFormHandler, on_delete=models.CASCADE, related_name='jobs')
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    object_id = models.PositiveIntegerField()
+    form = GenericForeignKey()
+    payload = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)  # Set by the worker claiming the job
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta(object):
+        """
+        Django properties
+        """
+        ordering = ('created', 'pk')
+
+    def __str__(self):
+        """
+        String representation of the model instance
+
+        :return: The submission id, handler id and status
+        """
+        return '{0} ({1}): {2}'.format(self.submission_id, self.handler_id, self.status)
+
+    def succeed(self):
+        """
+        Marks the job as succeeded
+        """
+        self.attempts += 1
+        self.status = self.STATUS_SUCCEEDED
+        self.last_error = ''
+        self.save(update_fields=['attempts', 'status', 'last_error', 'modified'])
+
+    def fail(self, error):
+        """
+        Records a failed attempt. The job is made available for a retry after a
+        back off delay until the maximum number of attempts has been reached
+
+        :param error: Error message or traceback
+        :type error: str|unicode
+        """
+        self.attempts += 1
+        self.last_error = error
+        if self.attempts < get_max_attempts():
+            self.status = self.STATUS_PENDING
+            self.available_at = timezone.now() + timedelta(seconds=get_retry_delay(self.attempts))
+        else:
+            self.status = self.STATUS_FAILED
+        self.save(update_fields=['attempts', 'status', 'last_error', 'available_at', 'modified'])
+
+
 class FormGeneratorMixin(object):
     """
     Mixin containing methods for form generation
@@ -1331,7 +1826,10 @@ class FormGeneratorMixin(object):
 
         :return: list of form field instances
         """
-        return {field.name: field.specific.as_form_field() for field in self.fields.all()}
+        with span('form.resolve_fields', form=self):
+            fields = self.get_definition().fields
+        with span('form.as_form_field', form=self, field_count=len(fields)):
+            return {field.name: field.as_form_field() for field in fields}
 
     def _get_field(self, name):
         """
@@ -1342,12 +1840,12 @@ class FormGeneratorMixin(object):
 
         :return: field instance
         """
-        try:
-            field = self.fields.get(name=name)
-        except self.fields.model.DoesNotExist:
-            return None
-        else:
-            return field.specific.as_form_field()
+        with span('form.resolve_fields', form=self, field_name=name):
+            field = next((field for field in self.get_definition().fields if field.name == name), None)
+            if field is None:
+                return None
+        with span('form.as_form_field', form=self, field_count=1):
+            return field.as_form_field()
 
     def get_initial_data(self):
         """
@@ -1355,7 +1853,7 @@ class FormGeneratorMixin(object):
 
         :return: Dict of initial data where the dict key is the field name
         """
-        return {field.name: field.specific.initial_data for field in self.fields.all()}
+        return {field.name: field.initial_data for field in self.get_definition().fields}
 
     def _get_field_widgets(self):
         """
@@ -1363,7 +1861,7 @@ class FormGeneratorMixin(object):
 
         :return: Dict of field widgets where the dict key is the field name
         """
-        return {field.name: import_string(field.widget_class) for field in self.fields.all()}
+        return {field.name: cached_import_string(field.widget_class) for field in self.fields.all()}
 
     def _get_field_labels(self):
         """
@@ -1388,6 +1886,7 @@ class OmniFormBase(FormGeneratorMixin, models.Model):
     Base class for the OmniForm model
     """
     title = models.CharField(max_length=255)
+    snapshot = models.TextField(editable=False, blank=True)  # JSON definition of the fields and handlers
 
     class Meta(object):
         """
@@ -1403,14 +1902,137 @@ class OmniFormBase(FormGeneratorMixin, models.Model):
         """
         return self.title
 
+    def _get_field_names(self):
+        """
+        Gets the names of the fields associated with the form. Names are memoized on the
+        instance until a field belonging to the form is saved or deleted
+
+        :return: Tuple of (field names in field order, frozenset of field names)
+        """
+        if self.pk is None:
+            return (), frozenset()
+
+        generation = field_generations.get(ContentType.objects.get_for_model(self).pk, self.pk)
+        cached = self.__dict__.get('_field_names_cache')
+        if cached is None or cached[0] != generation:
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('fields')
+            if prefetched is not None:
+                names = tuple(field.name for field in prefetched)
+            else:
+                names = tuple(self.fields.values_list('name', flat=True))
+            cached = self._field_names_cache = (generation, names, frozenset(names))
+        return cached[1:]
+
+    @property
+    def ordered_field_names(self):
+        """
+        Property for getting the names of all fields associated with the form in field order
+
+        :return: Tuple of field names
+        """
+        return self._get_field_names()[0]
+
     @property
     def used_field_names(self):
         """
         Property for getting the names of all fields associated with the form
 
-        :return: List of available field names
+        :return: frozenset of field names
+        """
+        return self._get_field_names()[1]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Records the definition version of forms loaded with their snapshot, so that the loaded
+        snapshot is only used while the form, its fields and its handlers are unchanged
+
+        :param db: Database alias the instance was loaded from
+        :param field_names: Names of the loaded fields
+        :param values: Loaded values
+        :return: Model instance
+        """
+        instance = super(OmniFormBase, cls).from_db(db, field_names, values)
+        if instance.pk is not None and 'snapshot' in instance.__dict__:
+            instance._snapshot_version = form_class_cache.get_version(
+                ContentType.objects.get_for_model(cls).pk,
+                instance.pk
+            )
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """
+        Discards the memoized field names before reloading the instance from the database
+
+        :param using: Database alias to use
+        :param fields: Names of the fields to reload
+        """
+        self.__dict__.pop('_field_names_cache', None)
+        self.__dict__.pop('_definition_cache', None)
+        self.__dict__.pop('_snapshot_version', None)
+        super(OmniFormBase, self).refresh_from_db(using=using, fields=fields)
+
+    def get_definition(self):
+        """
+        Gets the fields and handlers of the form from its snapshot. The snapshot loaded with the
+        instance is used if the form definition has not changed since it was loaded, otherwise the
+        snapshot is read from the database. The definition is memoized on the instance until the
+        form, its fields or its handlers change
+
+        :return: omniforms.snapshots.FormDefinition instance
+        """
+        if self.pk is None:
+            return get_definition(self)
+
+        version = form_class_cache.get_version(ContentType.objects.get_for_model(self).pk, self.pk)
+        cached = self.__dict__.get('_definition_cache')
+        if cached is None or cached[0] != version:
+            loaded = None
+            if version is not None and version == self.__dict__.get('_snapshot_version'):
+                loaded = self.__dict__.get('snapshot')
+            cached = self._definition_cache = (version, get_definition(self, loaded))
+        return cached[1]
+
+    def _compile_validation_plan(self, form_class):
+        """
+        Compiles the validation plan for the form class, unless the OMNI_FORMS_VALIDATION_PLAN setting is False
+
+        :param form_class: Generated form class
+        :return: The form class
+        """
+        if getattr(settings, 'OMNI_FORMS_VALIDATION_PLAN', True):
+            form_class._validation_plan = ValidationPlan(form_class.base_fields)
+        return form_class
+
+    def validate_batch(self, rows, processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Validates many rows of submitted data against the form, reusing a single form instance
+        (and optionally a pool of worker processes) for the whole batch
+
+        :param rows: Iterable of dicts of submitted data
+        :param processes: The number of worker processes to validate the rows with
+        :param chunk_size: The number of rows sent to a worker process at a time
+        :return: Generator of omniforms.batch.BatchResult instances, in the order of the rows
+        """
+        return validate_batch(self, rows, processes=processes, chunk_size=chunk_size)
+
+    def build_form_class(self):
+        """
+        Method for generating a form class from the data contained within the model
+
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError('"{0}" must define it\'s own build_form_class method'.format(self.__class__.__name__))
+
+    def get_form_class(self):
+        """
+        Method for getting the form class for the model instance
+        Generated form classes are cached until the form, its fields or its handlers change
+
+        :return: Form class
         """
-        return self.fields.values_list('name', flat=True)
+        with span('form.get_form_class', form=self):
+            return form_class_cache.get_form_class(self)
 
 
 class OmniModelFormBase(OmniFormBase):
@@ -1434,7 +2056,11 @@ class OmniModelFormBase(OmniFormBase):
         return type(
             self._get_form_class_name(),
             (OmniModelFormBaseForm,),
-            {'_handlers': [handler.specific for handler in self.handlers.all()]}
+            {
+                '_handlers': list(self.get_definition().handlers),
+                '_omni_form_content_type_id': ContentType.objects.get_for_model(self).pk,
+                '_omni_form_pk': self.pk,
+            }
         )
 
     def formfield_callback(self, model_field, **kwargs):
@@ -1447,6 +2073,14 @@ class OmniModelFormBase(OmniFormBase):
         """
         return self._get_field(model_field.name)
 
+    def get_model_introspection(self):
+        """
+        Gets the precomputed field information for the model associated with the forms content type
+
+        :return: omniforms.registry.ModelIntrospection instance
+        """
+        return model_introspection_cache.get(self.content_type)
+
     def get_model_fields(self):
         """
         Method to get all model fields for the content type
@@ -1454,13 +2088,7 @@ class OmniModelFormBase(OmniFormBase):
 
         :return: List of model field instances
         """
-
-        def is_valid_field(field):
-            if isinstance(field, (models.AutoField, ForeignObjectRel, GenericRelation, GenericForeignKey)):
-                return False
-            else:
-                return True
-        return list(filter(is_valid_field, self.content_type.model_class()._meta.get_fields()))
+        return list(self.get_model_introspection().fields)
 
     def get_model_field_names(self):
         """
@@ -1469,7 +2097,7 @@ class OmniModelFormBase(OmniFormBase):
 
         :return: List of field name strings
         """
-        return [field.name for field in self.get_model_fields()]
+        return list(self.get_model_introspection().field_names)
 
     def get_model_field_choices(self):
         """
@@ -1477,10 +2105,11 @@ class OmniModelFormBase(OmniFormBase):
 
         :return: List of (field.name, field.verbose_name) choices for use in the admin form
         """
+        used_field_names = self.used_field_names
         return [
             (field.name, getattr(field, 'verbose_name', field.name))
             for field in self.get_model_fields()
-            if field.name not in self.used_field_names
+            if field.name not in used_field_names
         ]
 
     def get_required_fields(self, exclude_with_default=True):
@@ -1492,16 +2121,7 @@ class OmniModelFormBase(OmniFormBase):
 
         :return: List of required field names
         """
-        def filter_field(field):
-            if field.blank:
-                return False
-            elif isinstance(field, models.ManyToManyField):
-                return False
-            elif exclude_with_default and field.has_default():
-                return False
-            else:
-                return True
-        return list(filter(filter_field, self.get_model_fields()))
+        return list(self.get_model_introspection().get_required_fields(exclude_with_default=exclude_with_default))
 
     def get_required_field_names(self, exclude_with_default=True):
         """
@@ -1509,9 +2129,8 @@ class OmniModelFormBase(OmniFormBase):
 
         :return: List of required field names
         """
-        return list(map(
-            lambda field: field.name,
-            self.get_required_fields(exclude_with_default=exclude_with_default)
+        return list(self.get_model_introspection().get_required_field_names(
+            exclude_with_default=exclude_with_default
         ))
 
 
@@ -1531,20 +2150,26 @@ class OmniForm(OmniFormBase):
         return type(
             self._get_form_class_name(),
             (OmniFormBaseForm,),
-            {'_handlers': [handler.specific for handler in self.handlers.all()]}
+            {
+                '_handlers': list(self.get_definition().handlers),
+                '_omni_form_content_type_id': ContentType.objects.get_for_model(self).pk,
+                '_omni_form_pk': self.pk,
+            }
         )
 
-    def get_form_class(self):
+    def build_form_class(self):
         """
         Method for generating a form class from the data contained within the model
 
         :return: ModelForm class
         """
-        return type(
-            self._get_form_class_name(),
-            (self._get_base_form_class(),),
-            self._get_fields()
-        )
+        fields = self._get_fields()
+        with span('form.create_class', form=self):
+            return self._compile_validation_plan(type(
+                self._get_form_class_name(),
+                (self._get_base_form_class(),),
+                fields
+            ))
 
 
 class OmniModelForm(OmniModelFormBase):
@@ -1554,15 +2179,16 @@ class OmniModelForm(OmniModelFormBase):
     fields = GenericRelation(OmniField)
     handlers = GenericRelation(OmniFormHandler)
 
-    def get_form_class(self):
+    def build_form_class(self):
         """
         Method for generating a form class from the data contained within the model
 
         :return: ModelForm class
         """
-        return modelform_factory(
-            self.content_type.model_class(),
-            form=self._get_base_form_class(),
-            fields=self.used_field_names,
-            formfield_callback=self.formfield_callback
-        )
+        with span('form.create_class', form=self):
+            return self._compile_validation_plan(modelform_factory(
+                self.content_type.model_class(),
+                form=self._get_base_form_class(),
+                fields=self.ordered_field_names,
+                formfield_callback=self.formfield_callback
+            ))
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Model registries for the omniforms app
+"""
+from __future__ import unicode_literals
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models.fields.related import ForeignObjectRel
+import threading
+
+
+PERMISSION_ACTIONS = ('add', 'change', 'delete')
+
+
+class ConcreteModelRegistry(object):
+    """
+    Registry of the concrete model subclasses of a given base model class
+
+    Subclasses are read from the django app registry once (at app ready time or on
+    first use) and stored so that subsequent lookups are simple dictionary reads
+    """
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(ConcreteModelRegistry, self).__init__()
+        self._models = {}
+        self._content_types = {}
+        self._permission_actions = {}
+
+    @staticmethod
+    def _find_concrete_models(base_model_class):
+        """
+        Finds all installed models that subclass the base model class
+        and are not either abstract classes or the base model class itself
+
+        :param base_model_class: The base model class
+        :return: tuple of model classes
+        """
+        return tuple(
+            model_class for model_class in apps.get_models()
+            if issubclass(model_class, base_model_class)
+            and model_class != base_model_class
+            and not model_class._meta.abstract
+        )
+
+    def populate(self, *base_model_classes):
+        """
+        Finds and stores the concrete models for each of the given base model classes
+
+        :param base_model_classes: The base model classes to populate the registry for
+        """
+        for base_model_class in base_model_classes:
+            self._models[base_model_class] = self._find_concrete_models(base_model_class)
+
+    def get_concrete_models(self, base_model_class):
+        """
+        Gets the concrete models for the base model class, populating the registry if required
+
+        :param base_model_class: The base model class
+        :return: tuple of model classes
+        """
+        try:
+            return self._models[base_model_class]
+        except KeyError:
+            self.populate(base_model_class)
+            return self._models[base_model_class]
+
+    def get_content_types(self, base_model_class):
+        """
+        Gets the content type for each of the concrete models for the base model class,
+        looking them up the first time they are requested
+
+        :param base_model_class: The base model class
+        :return: tuple of (ContentType, model class) tuples ordered by content type model name
+        """
+        try:
+            return self._content_types[base_model_class]
+        except KeyError:
+            model_classes = self.get_concrete_models(base_model_class)
+            content_types = ContentType.objects.get_for_models(*model_classes, for_concrete_models=False)
+            self._content_types[base_model_class] = tuple(sorted(
+                ((content_types[model_class], model_class) for model_class in model_classes),
+                key=lambda item: (item[0].model, item[0].pk)
+            ))
+            return self._content_types[base_model_class]
+
+    def get_permission_action(self, codename):
+        """
+        Gets the action (add, change, delete) that a permission codename grants, storing the
+        result so that each codename is only parsed once
+
+        :param codename: Permission codename (e.g. 'add_omnicharfield')
+        :return: Action string or None if the codename is not for one of the default actions
+        """
+        try:
+            return self._permission_actions[codename]
+        except KeyError:
+            action = codename.split('_')[0]
+            self._permission_actions[codename] = action if action in PERMISSION_ACTIONS else None
+            return self._permission_actions[codename]
+
+    def clear(self):
+        """
+        Empties the registry. Models will be looked up again the next time they are requested
+        """
+        self._models.clear()
+        self._content_types.clear()
+        self._permission_actions.clear()
+
+
+concrete_model_registry = ConcreteModelRegistry()
+
+
+class ModelIntrospection(object):
+    """
+    Precomputed field information for a model managed by an omni model form
+    """
+    def __init__(self, model_class):
+        """
+        Reads the fields of the model class
+
+        :param model_class: The model class to introspect
+        """
+        from omniforms.models import OmniField
+        super(ModelIntrospection, self).__init__()
+        self.model_class = model_class
+        self.fields = tuple(field for field in model_class._meta.get_fields() if self._is_valid_field(field))
+        self.field_names = tuple(field.name for field in self.fields)
+        self.fields_by_name = {field.name: field for field in self.fields}
+        self.omni_field_classes = {
+            field.name: OmniField.get_concrete_class_for_model_field(field) for field in self.fields
+        }
+        self._required_fields = {
+            exclude_with_default: tuple(
+                field for field in self.fields
+                if self._is_required_field(field, exclude_with_default)
+            )
+            for exclude_with_default in (True, False)
+        }
+        self._required_field_names = {
+            key: tuple(field.name for field in fields) for key, fields in self._required_fields.items()
+        }
+
+    @staticmethod
+    def _is_valid_field(field):
+        """
+        Determines whether or not a model field can be represented on an omni model form
+
+        :param field: Model field instance
+        :return: bool
+        """
+        return not isinstance(field, (models.AutoField, ForeignObjectRel, GenericRelation, GenericForeignKey))
+
+    @staticmethod
+    def _is_required_field(field, exclude_with_default):
+        """
+        Determines whether or not a model field must be present on an omni model form
+
+        :param field: Model field instance
+        :param exclude_with_default: Whether or not fields with default values are considered optional
+        :return: bool
+        """
+        if field.blank:
+            return False
+        elif isinstance(field, models.ManyToManyField):
+            return False
+        elif exclude_with_default and field.has_default():
+            return False
+        return True
+
+    def get_required_fields(self, exclude_with_default=True):
+        """
+        Gets the fields that must be present on an omni model form
+
+        :param exclude_with_default: Whether or not to exclude fields with default values
+        :return: tuple of model field instances
+        """
+        return self._required_fields[bool(exclude_with_default)]
+
+    def get_required_field_names(self, exclude_with_default=True):
+        """
+        Gets the names of the fields that must be present on an omni model form
+
+        :param exclude_with_default: Whether or not to exclude fields with default values
+        :return: tuple of field names
+        """
+        return self._required_field_names[bool(exclude_with_default)]
+
+
+class ModelIntrospectionCache(object):
+    """
+    Thread safe cache of ModelIntrospection instances keyed by content type id
+    Models are introspected the first time they are requested
+    """
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(ModelIntrospectionCache, self).__init__()
+        self._lock = threading.Lock()
+        self._introspections = {}
+
+    def get(self, content_type):
+        """
+        Gets the introspection for the model class of the content type
+
+        :param content_type: ContentType instance
+        :return: ModelIntrospection instance
+        """
+        try:
+            return self._introspections[content_type.pk]
+        except KeyError:
+            introspection = ModelIntrospection(content_type.model_class())
+            with self._lock:
+                return self._introspections.setdefault(content_type.pk, introspection)
+
+    def clear(self):
+        """
+        Empties the cache. Models will be introspected again the next time they are requested
+        """
+        with self._lock:
+            self._introspections.clear()
+
+
+model_introspection_cache = ModelIntrospectionCache()
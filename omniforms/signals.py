@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Signal receivers for the omniforms app
+"""
+from __future__ import unicode_literals
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import request_finished
+from django.db.models.signals import class_prepared, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from omniforms.cache import choices_cache, field_generations, form_class_cache, template_cache
+from omniforms.dispatch import reset_handler_backend
+from omniforms.models import ChoiceFieldMixin, OmniField, OmniFormHandler, OmniFormBase, OmniFormEmailHandlerBase
+from omniforms.registry import concrete_model_registry, model_introspection_cache
+from omniforms.snapshots import mark_form_deleted, schedule_snapshot_refresh, sync_snapshot
+from omniforms.submissions import submission_buffer
+from omniforms.tracing import reset_tracer
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_form_snapshot(sender, instance, **kwargs):
+    """
+    Regenerates the snapshot of a forms definition when a field or handler
+    associated with the form is saved or deleted
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being saved or deleted
+    :param kwargs: Default keyword args
+    """
+    schedule_snapshot_refresh(instance.content_type_id, instance.object_id)
+
+
+def sync_form_snapshot(sender, instance, raw=False, **kwargs):
+    """
+    Replaces the snapshot written when a form is saved if it does not match the forms
+    current fields and handlers
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being saved
+    :param raw: Whether or not the instance is being loaded from a fixture
+    :param kwargs: Default keyword args
+    """
+    if not raw:
+        sync_snapshot(instance)
+
+
+def mark_form_snapshot_deleted(sender, instance, **kwargs):
+    """
+    Stops the snapshot of a form being regenerated as the fields and handlers of the form are deleted with it
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being deleted
+    :param kwargs: Default keyword args
+    """
+    mark_form_deleted(instance)
+
+
+def invalidate_form_class_cache(sender, instance, **kwargs):
+    """
+    Invalidates cached form classes when a form, or any field or handler
+    associated with a form, is saved or deleted
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being saved or deleted
+    :param kwargs: Default keyword args
+    """
+    if isinstance(instance, OmniFormBase):
+        form_class_cache.invalidate(ContentType.objects.get_for_model(instance).pk, instance.pk)
+    else:
+        form_class_cache.invalidate(instance.content_type_id, instance.object_id)
+
+
+def increment_field_generation(sender, instance, **kwargs):
+    """
+    Marks field names memoized on form instances as out of date when a field is saved or deleted
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being saved or deleted
+    :param kwargs: Default keyword args
+    """
+    field_generations.increment(instance.content_type_id, instance.object_id)
+
+
+def invalidate_template_cache(sender, instance, **kwargs):
+    """
+    Discards compiled templates when an email handler is saved or deleted
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being saved or deleted
+    :param kwargs: Default keyword args
+    """
+    template_cache.invalidate(instance.pk)
+
+
+def invalidate_choices_cache(sender, instance, **kwargs):
+    """
+    Discards decoded choices when a choice field is saved or deleted
+
+    :param sender: The model class sending the signal
+    :param instance: The model instance being saved or deleted
+    :param kwargs: Default keyword args
+    """
+    choices_cache.invalidate(instance.pk)
+
+
+def connect_model_receivers():
+    """
+    Connects the model signal receivers to the concrete field, handler and form models in the
+    concrete model registry, so that saving and deleting other models does not call them
+    """
+    field_models = concrete_model_registry.get_concrete_models(OmniField)
+    handler_models = concrete_model_registry.get_concrete_models(OmniFormHandler)
+    for model_class in field_models + handler_models:
+        for signal in (post_save, post_delete):
+            signal.connect(refresh_form_snapshot, sender=model_class)
+            signal.connect(invalidate_form_class_cache, sender=model_class)
+            if issubclass(model_class, OmniField):
+                signal.connect(increment_field_generation, sender=model_class)
+            if issubclass(model_class, ChoiceFieldMixin):
+                signal.connect(invalidate_choices_cache, sender=model_class)
+            if issubclass(model_class, OmniFormEmailHandlerBase):
+                signal.connect(invalidate_template_cache, sender=model_class)
+    for model_class in concrete_model_registry.get_concrete_models(OmniFormBase):
+        post_save.connect(sync_form_snapshot, sender=model_class)
+        pre_delete.connect(mark_form_snapshot_deleted, sender=model_class)
+        post_save.connect(invalidate_form_class_cache, sender=model_class)
+        post_delete.connect(invalidate_form_class_cache, sender=model_class)
+
+
+@receiver(setting_changed)
+def clear_concrete_model_registry(setting, **kwargs):
+    """
+    Clears the concrete model registry and model introspection cache when the installed apps change
+
+    :param setting: The name of the setting that changed
+    :param kwargs: Default keyword args
+    """
+    if setting == 'INSTALLED_APPS':
+        concrete_model_registry.clear()
+        model_introspection_cache.clear()
+        connect_model_receivers()
+
+
+@receiver(class_prepared)
+def clear_model_introspection_cache(sender, **kwargs):
+    """
+    Clears the model introspection cache when a model class is added to the app registry
+
+    :param sender: The model class that has been prepared
+    :param kwargs: Default keyword args
+    """
+    model_introspection_cache.clear()
+
+
+@receiver(setting_changed)
+def clear_field_mapping(setting, **kwargs):
+    """
+    Clears the compiled OmniField field mapping when the custom field mapping setting changes
+
+    :param setting: The name of the setting that changed
+    :param kwargs: Default keyword args
+    """
+    if setting == 'OMNI_FORMS_CUSTOM_FIELD_MAPPING':
+        OmniField.clear_field_mapping()
+        model_introspection_cache.clear()
+
+
+@receiver(setting_changed)
+def reset_handler_backend_on_change(setting, **kwargs):
+    """
+    Discards the handler backend when the handler backend setting changes
+
+    :param setting: The name of the setting that changed
+    :param kwargs: Default keyword args
+    """
+    if setting == 'OMNI_FORMS_HANDLER_BACKEND':
+        reset_handler_backend()
+
+
+@receiver(setting_changed)
+def reset_tracer_on_change(setting, **kwargs):
+    """
+    Discards the tracer when the tracer setting changes
+
+    :param setting: The name of the setting that changed
+    :param kwargs: Default keyword args
+    """
+    if setting == 'OMNI_FORMS_TRACER':
+        reset_tracer()
+
+
+@receiver(request_finished)
+def flush_submission_buffer(**kwargs):
+    """
+    Writes any buffered submissions to the database once the request has finished,
+    unless the request was handled inside a transaction that is still open
+
+    :param kwargs: Default keyword args
+    """
+    if len(submission_buffer) and not submission_buffer.in_transaction():
+        try:
+            submission_buffer.flush()
+        except Exception:
+            logger.exception('Could not write %s buffered submission(s)', len(submission_buffer))
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Serialized snapshots of omni form definitions
+
+A snapshot holds the concrete type and attributes of every field and handler belonging to a
+form, in order, as compact JSON stored on the form row. Forms can therefore be built from
+the form row alone, rather than with one query per concrete field and handler table.
+"""
+from __future__ import unicode_literals
+from collections import namedtuple
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.utils import six
+from functools import partial
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+FormDefinition = namedtuple('FormDefinition', ['fields', 'handlers'])
+
+EMPTY_DEFINITION = FormDefinition(fields=(), handlers=())
+
+# Native JSON types that are stored as they are. Other values are stored as strings
+_NATIVE_TYPES = (bool, float, type(None)) + six.integer_types + six.string_types
+
+# Attributes that are set from the form the instances belong to
+_FORM_ATTNAMES = ('content_type_id', 'object_id')
+
+
+class InvalidSnapshot(Exception):
+    """
+    Raised when a snapshot cannot be loaded (e.g. it was written by a different snapshot version)
+    """
+
+
+def _is_parent_link(model_class, field):
+    """
+    Whether or not the field links the model to one of its parents, other than through the
+    models primary key. The values of parent links are the same as the primary key
+
+    :param model_class: Concrete field or handler model class
+    :param field: Model field
+    :return: bool
+    """
+    return bool(field.remote_field and field.remote_field.parent_link) and field is not model_class._meta.pk
+
+
+def _get_stored_fields(model_class):
+    """
+    Gets the model fields whose values are stored in the snapshot
+
+    :param model_class: Concrete field or handler model class
+    :return: List of model fields
+    """
+    return [
+        field for field in model_class._meta.concrete_fields
+        if field.attname not in _FORM_ATTNAMES and not _is_parent_link(model_class, field)
+    ]
+
+
+def serialize_value(field, instance):
+    """
+    Gets the value of the model field on the instance as a JSON serializable value
+
+    :param field: Model field
+    :param instance: Model instance
+    :return: The value, if it is a native JSON type, otherwise its string representation
+    """
+    value = getattr(instance, field.attname)
+    return value if isinstance(value, _NATIVE_TYPES) else field.value_to_string(instance)
+
+
+def deserialize_value(field, value):
+    """
+    Converts a value returned by serialize_value to the python value for the model field
+
+    :param field: Model field
+    :param value: JSON value
+    :raises: ValidationError if the value is not valid for the field
+    :return: Python value
+    """
+    return None if value is None else field.to_python(value)
+
+
+def _serialize_instance(instance):
+    """
+    Serializes the field or handler instance
+
+    :param instance: Specific field or handler model instance
+    :return: List of [model label, dict of values keyed by attribute name]
+    """
+    values = {field.attname: serialize_value(field, instance) for field in _get_stored_fields(instance.__class__)}
+    return [instance._meta.label_lower, values]
+
+
+def _deserialize_instance(data, form):
+    """
+    Creates a field or handler instance from its serialized data
+
+    :param data: List of [model label, dict of values keyed by attribute name]
+    :param form: The OmniForm or OmniModelForm instance the field or handler belongs to
+    :raises: InvalidSnapshot if the data does not match the model
+    :return: Model instance
+    """
+    try:
+        label, values = data
+        model_class = apps.get_model(label)
+        attnames, field_values = [], []
+        for field in model_class._meta.concrete_fields:
+            if field.attname in _FORM_ATTNAMES:
+                continue
+            if _is_parent_link(model_class, field):
+                value = values[model_class._meta.pk.attname]
+            else:
+                value = values[field.attname]
+            attnames.append(field.attname)
+            field_values.append(deserialize_value(field, value))
+    except (LookupError, KeyError, TypeError, ValueError, ValidationError) as e:
+        raise InvalidSnapshot('Could not load {0!r}: {1}'.format(data, e))
+
+    instance = model_class.from_db(form._state.db, attnames, field_values)
+    instance.form = form
+    # Use the cached content type so that accessing 'specific' doesn't hit the database
+    instance.real_type = ContentType.objects.get_for_id(instance.real_type_id)
+    return instance
+
+
+def build_snapshot(form):
+    """
+    Generates the snapshot of the forms definition from its fields and handlers
+
+    :param form: Saved OmniForm or OmniModelForm instance
+    :return: JSON string
+    """
+    return json.dumps(
+        {
+            'version': SNAPSHOT_VERSION,
+            'fields': [_serialize_instance(field) for field in form.fields.specific()],
+            'handlers': [_serialize_instance(handler) for handler in form.handlers.specific()],
+        },
+        cls=DjangoJSONEncoder,
+        separators=(',', ':')
+    )
+
+
+def load_snapshot(snapshot, form):
+    """
+    Loads the forms definition from the snapshot
+
+    :param snapshot: JSON string generated by build_snapshot
+    :param form: The OmniForm or OmniModelForm instance the snapshot was generated for
+    :raises: InvalidSnapshot if the snapshot is empty, malformed or was generated by a different version
+    :return: FormDefinition instance
+    """
+    try:
+        data = json.loads(snapshot)
+        version = data['version']
+        fields, handlers = data['fields'], data['handlers']
+    except (TypeError, ValueError, KeyError) as e:
+        raise InvalidSnapshot('Could not load snapshot: {0}'.format(e))
+    if version != SNAPSHOT_VERSION:
+        raise InvalidSnapshot('Snapshot version {0} is not {1}'.format(version, SNAPSHOT_VERSION))
+    return FormDefinition(
+        fields=tuple(_deserialize_instance(field, form) for field in fields),
+        handlers=tuple(_deserialize_instance(handler, form) for handler in handlers)
+    )
+
+
+def refresh_snapshot(form):
+    """
+    Regenerates and stores the snapshot of the forms definition
+
+    :param form: Saved OmniForm or OmniModelForm instance
+    :return: JSON string
+    """
+    snapshot = build_snapshot(form)
+    form.__class__._base_manager.using(form._state.db).filter(pk=form.pk).update(snapshot=snapshot)
+    form.snapshot = snapshot
+    return snapshot
+
+
+def sync_snapshot(form):
+    """
+    Regenerates the snapshot of a form that has just been saved, storing it only if the saved
+    snapshot is out of date (e.g. the instance was loaded before its fields changed, or was
+    copied from another form)
+
+    :param form: Saved OmniForm or OmniModelForm instance
+    :return: JSON string
+    """
+    snapshot = build_snapshot(form)
+    if snapshot != form.snapshot:
+        form.__class__._base_manager.using(form._state.db).filter(pk=form.pk).update(snapshot=snapshot)
+        form.snapshot = snapshot
+    return snapshot
+
+
+def refresh_snapshot_for(content_type_id, object_id):
+    """
+    Regenerates the snapshot of the form with the given content type and primary key, if it exists
+
+    :param content_type_id: ID of the forms content type
+    :param object_id: Primary key of the form
+    """
+    from omniforms.models import OmniFormBase
+
+    model_class = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model_class is None or not issubclass(model_class, OmniFormBase):
+        return
+    form = model_class._base_manager.filter(pk=object_id).only('pk').first()
+    if form is not None:
+        refresh_snapshot(form)
+
+
+def _get_commit_callback(connection, attribute, key):
+    """
+    Gets the callback registered to run when the current transaction commits with the given key
+
+    :param connection: Database connection
+    :param attribute: The name of the callback attribute holding the key
+    :param key: Tuple of (content type id, form primary key)
+    :return: Callback or None
+    """
+    for sids, func in connection.run_on_commit:
+        if getattr(func, attribute, None) == key:
+            return func
+    return None
+
+
+def _refresh_after_commit(content_type_id, object_id):
+    """
+    Regenerates the snapshot of the form once the transaction its definition was changed in has
+    committed, and invalidates form classes built from the snapshot by other processes meanwhile
+
+    :param content_type_id: ID of the forms content type
+    :param object_id: Primary key of the form
+    """
+    from omniforms.cache import form_class_cache
+
+    refresh_snapshot_for(content_type_id, object_id)
+    form_class_cache.invalidate(content_type_id, object_id)
+
+
+def schedule_snapshot_refresh(content_type_id, object_id):
+    """
+    Regenerates the snapshot of the form after one of its fields or handlers has been saved or deleted
+
+    Outside of a transaction the snapshot is regenerated immediately. Inside a transaction the stored
+    snapshot is cleared, so that it is regenerated from the fields and handlers if the definition is
+    read before the transaction ends, and regenerated once when the transaction commits however many
+    fields and handlers are changed. Nothing is done while the form itself is being deleted
+
+    :param content_type_id: ID of the forms content type
+    :param object_id: Primary key of the form
+    """
+    from omniforms.models import OmniFormBase
+
+    model_class = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model_class is None or not issubclass(model_class, OmniFormBase):
+        return
+    using = router.db_for_write(model_class)
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        refresh_snapshot_for(content_type_id, object_id)
+        return
+
+    key = (content_type_id, object_id)
+    if _get_commit_callback(connection, 'deleted_form', key) is not None:
+        return
+    model_class._base_manager.using(using).filter(pk=object_id).update(snapshot='')
+    if _get_commit_callback(connection, 'refreshed_form', key) is None:
+        callback = partial(_refresh_after_commit, content_type_id, object_id)
+        callback.refreshed_form = key
+        transaction.on_commit(callback, using=using)
+
+
+def _deleted(content_type_id, object_id):
+    """
+    Marks the end of the transaction a form was deleted in
+
+    :param content_type_id: ID of the forms content type
+    :param object_id: Primary key of the form
+    """
+
+
+def mark_form_deleted(form):
+    """
+    Records that the form is being deleted, so that its snapshot is not regenerated as its fields
+    and handlers are deleted with it. The mark is kept with the transaction the form is deleted in,
+    so it is discarded when the transaction commits or is rolled back
+
+    :param form: OmniForm or OmniModelForm instance being deleted
+    """
+    using = form._state.db or router.db_for_write(form.__class__)
+    content_type_id = ContentType.objects.get_for_model(form).pk
+    marker = partial(_deleted, content_type_id, form.pk)
+    marker.deleted_form = (content_type_id, form.pk)
+    transaction.on_commit(marker, using=using)
+
+
+def get_definition(form, snapshot=None):
+    """
+    Gets the forms definition from its snapshot. The snapshot is read from the form row unless
+    an up to date snapshot is given (e.g. the one loaded with the form), or the given snapshot
+    cannot be loaded. Snapshots read from the form row are regenerated if they are missing (e.g.
+    the form was created in bulk) or cannot be loaded
+
+    :param form: OmniForm or OmniModelForm instance
+    :param snapshot: Optional JSON string loaded with the form
+    :return: FormDefinition instance
+    """
+    if form.pk is None:
+        return EMPTY_DEFINITION
+
+    if snapshot:
+        try:
+            return load_snapshot(snapshot, form)
+        except InvalidSnapshot:
+            pass
+
+    manager = form.__class__._base_manager.using(form._state.db)
+    stored = manager.filter(pk=form.pk).values_list('snapshot', flat=True).first()
+    if stored is None:
+        return EMPTY_DEFINITION
+    try:
+        return load_snapshot(stored, form)
+    except InvalidSnapshot as e:
+        if stored:
+            logger.info('Regenerating the snapshot for %s %s. %s', form._meta.model_name, form.pk, e)
+
+    snapshot = build_snapshot(form)
+    # Only replace the snapshot that was read so that a snapshot regenerated
+    # by a concurrent change to the form definition is not overwritten
+    manager.filter(pk=form.pk, snapshot=stored).update(snapshot=snapshot)
+    return load_snapshot(snapshot, form)
+
+
+__all__ = [
+    'SNAPSHOT_VERSION',
+    'FormDefinition',
+    'InvalidSnapshot',
+    'serialize_value',
+    'deserialize_value',
+    'build_snapshot',
+    'load_snapshot',
+    'refresh_snapshot',
+    'refresh_snapshot_for',
+    'sync_snapshot',
+    'schedule_snapshot_refresh',
+    'mark_form_deleted',
+    'get_definition',
+]
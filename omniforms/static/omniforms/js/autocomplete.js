@@ -0,0 +1,114 @@
+/**
+ * Autocomplete behaviour for omniforms related field widgets.
+ *
+ * Each select element with the 'omniforms-autocomplete' class gets a search input and a
+ * results list. Results are loaded a page at a time from the URL in the selects
+ * 'data-autocomplete-url' attribute, which returns {"results": [{"id", "text"}], "more": bool}.
+ */
+(function () {
+    'use strict';
+
+    function request(url, params, callback) {
+        var query = Object.keys(params).map(function (key) {
+            return encodeURIComponent(key) + '=' + encodeURIComponent(params[key]);
+        }).join('&');
+        var xhr = new XMLHttpRequest();
+        xhr.open('GET', url + (url.indexOf('?') === -1 ? '?' : '&') + query);
+        xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+        xhr.onload = function () {
+            if (xhr.status === 200) {
+                callback(JSON.parse(xhr.responseText));
+            }
+        };
+        xhr.send();
+    }
+
+    function selectOption(select, result) {
+        var options = select.options;
+        for (var i = 0; i < options.length; i++) {
+            if (options[i].value === result.id) {
+                options[i].selected = true;
+                return;
+            }
+        }
+        if (!select.multiple) {
+            for (var j = options.length - 1; j >= 0; j--) {
+                if (options[j].value !== '') {
+                    select.removeChild(options[j]);
+                }
+            }
+        }
+        var option = new Option(result.text, result.id, true, true);
+        select.appendChild(option);
+        select.dispatchEvent(new Event('change'));
+    }
+
+    function init(select) {
+        var url = select.getAttribute('data-autocomplete-url');
+        if (!url || select.getAttribute('data-autocomplete-ready')) {
+            return;
+        }
+        select.setAttribute('data-autocomplete-ready', 'true');
+
+        var input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'omniforms-autocomplete-search';
+        input.setAttribute('autocomplete', 'off');
+        var list = document.createElement('ul');
+        list.className = 'omniforms-autocomplete-results';
+        var more = document.createElement('button');
+        more.type = 'button';
+        more.className = 'omniforms-autocomplete-more';
+        more.textContent = 'More results';
+        more.style.display = 'none';
+
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(list, select.nextSibling);
+        list.parentNode.insertBefore(more, list.nextSibling);
+
+        var page = 1;
+        var timeout = null;
+
+        function load(append) {
+            request(url, {q: input.value, page: page}, function (data) {
+                if (!append) {
+                    list.innerHTML = '';
+                }
+                data.results.forEach(function (result) {
+                    var item = document.createElement('li');
+                    item.textContent = result.text;
+                    item.addEventListener('click', function () {
+                        selectOption(select, result);
+                    });
+                    list.appendChild(item);
+                });
+                more.style.display = data.more ? '' : 'none';
+            });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timeout);
+            timeout = setTimeout(function () {
+                page = 1;
+                load(false);
+            }, 250);
+        });
+        more.addEventListener('click', function () {
+            page += 1;
+            load(true);
+        });
+    }
+
+    function initAll() {
+        var selects = document.querySelectorAll('select.omniforms-autocomplete');
+        for (var i = 0; i < selects.length; i++) {
+            init(selects[i]);
+        }
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', initAll);
+    } else {
+        initAll();
+    }
+})();
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Submission storage utilities for the omniforms app
+"""
+from __future__ import unicode_literals
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from django.db.transaction import TransactionManagementError
+from functools import partial
+import atexit
+import json
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionJSONEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder for form cleaned data
+    Model instances are stored as their primary key and files as their name
+    """
+    def default(self, o):
+        """
+        Encodes values not supported by the DjangoJSONEncoder
+
+        :param o: The value to encode
+        :return: JSON serializable value
+        """
+        if isinstance(o, models.Model):
+            return o.pk
+        if isinstance(o, models.QuerySet):
+            return list(o.values_list('pk', flat=True))
+        if isinstance(o, File):
+            return o.name
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        return super(SubmissionJSONEncoder, self).default(o)
+
+
+def serialize_cleaned_data(cleaned_data):
+    """
+    Serializes the forms cleaned data
+
+    :param cleaned_data: Form cleaned data dict
+    :return: JSON string
+    """
+    return json.dumps(cleaned_data, cls=SubmissionJSONEncoder, sort_keys=True, separators=(',', ':'))
+
+
+class SubmissionBuffer(object):
+    """
+    Thread safe buffer of unsaved OmniFormSubmission instances
+
+    By default (OMNI_FORMS_SUBMISSION_BATCH_SIZE of 1) each submission is saved as soon as it is
+    added, inside the current transaction. Larger batch sizes opt in to buffering: submissions are
+    written to the database using bulk_create once the buffer holds OMNI_FORMS_SUBMISSION_BATCH_SIZE
+    submissions, when a submission is added more than OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL seconds
+    after the oldest buffered submission, at the end of each request and when the process exits.
+
+    The buffer is shared by every thread in the process, so it is never written inside a transaction.
+    Submissions added inside a transaction are only buffered once the transaction commits, and are
+    discarded if it is rolled back.
+    """
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(SubmissionBuffer, self).__init__()
+        self._lock = threading.Lock()
+        self._submissions = []
+        self._oldest = None
+
+    @property
+    def batch_size(self):
+        """
+        The number of submissions to buffer before writing them to the database
+
+        :return: int
+        """
+        return getattr(settings, 'OMNI_FORMS_SUBMISSION_BATCH_SIZE', 1)
+
+    @property
+    def flush_interval(self):
+        """
+        The maximum number of seconds a submission should be buffered for
+
+        :return: int|float
+        """
+        return getattr(settings, 'OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL', 5)
+
+    def add(self, submission):
+        """
+        Adds an unsaved submission to the buffer, writing the buffer to the database if required
+
+        :param submission: Unsaved OmniFormSubmission instance
+        """
+        if self.batch_size <= 1:
+            submission.save()
+            return
+
+        using = router.db_for_write(submission.__class__, instance=submission)
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(partial(self._buffer, submission), using=using)
+        else:
+            self._buffer(submission)
+
+    def _buffer(self, submission):
+        """
+        Adds the submission to the buffer, writing the buffer to the database if required.
+        Must not be called inside a transaction
+
+        :param submission: Unsaved OmniFormSubmission instance
+        """
+        with self._lock:
+            self._submissions.append(submission)
+            if self._oldest is None:
+                self._oldest = time.time()
+            flush = (
+                len(self._submissions) >= self.batch_size or
+                time.time() - self._oldest >= self.flush_interval
+            )
+        if flush and not self.in_transaction():
+            try:
+                self.flush()
+            except Exception:
+                # The submissions remain buffered and will be written on the next flush
+                logger.exception('Could not write %s buffered submission(s)', len(self))
+
+    def in_transaction(self):
+        """
+        Whether or not the database the submissions are written to is inside a transaction
+
+        :return: bool
+        """
+        from omniforms.models import OmniFormSubmission
+        return transaction.get_connection(router.db_for_write(OmniFormSubmission)).in_atomic_block
+
+    def flush(self):
+        """
+        Writes all buffered submissions to the database
+
+        :raises: TransactionManagementError if called inside a transaction
+        :return: The number of submissions written
+        """
+        if self._submissions and self.in_transaction():
+            raise TransactionManagementError('Buffered submissions cannot be written inside a transaction')
+        with self._lock:
+            submissions, self._submissions, self._oldest = self._submissions, [], None
+        if submissions:
+            from omniforms.models import OmniFormSubmission
+            try:
+                OmniFormSubmission.objects.bulk_create(submissions, batch_size=self.batch_size)
+            except Exception:
+                with self._lock:
+                    self._submissions[:0] = submissions
+                    self._oldest = self._oldest or time.time()
+                raise
+        return len(submissions)
+
+    def __len__(self):
+        """
+        Returns the number of buffered submissions
+
+        :return: int
+        """
+        return len(self._submissions)
+
+
+submission_buffer = SubmissionBuffer()
+atexit.register(submission_buffer.flush)
@@ -11,11 +11,29 @@ from omniforms.models import (
     OmniModelForm,
     OmniFormEmailHandler,
     OmniFormEmailConfirmationHandler,
+    OmniFormSaveSubmissionHandler,
     OmniCharField,
     OmniBooleanField,
-    OmniEmailField
+    OmniChoiceField,
+    OmniDateField,
+    OmniDateTimeField,
+    OmniDecimalField,
+    OmniDurationField,
+    OmniEmailField,
+    OmniFileField,
+    OmniFloatField,
+    OmniForeignKeyField,
+    OmniGenericIPAddressField,
+    OmniImageField,
+    OmniIntegerField,
+    OmniManyToManyField,
+    OmniMultipleChoiceField,
+    OmniSlugField,
+    OmniTimeField,
+    OmniUrlField,
+    OmniUUIDField
 )
-from omniforms.tests.models import DummyModel
+from omniforms.tests.models import DummyModel, DummyModel2
 import factory
 
 
@@ -141,6 +159,264 @@ class OmniEmailFieldFactory(factory.DjangoModelFactory):
         model = OmniEmailField
 
 
+class OmniDurationFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniDurationField instances
+    """
+    name = factory.Sequence('duration_field_{0}'.format)
+    label = factory.Sequence('Duration field {0}'.format)
+    widget_class = 'django.forms.widgets.TextInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniDurationField
+
+
+class OmniGenericIPAddressFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniGenericIPAddressField instances
+    """
+    name = factory.Sequence('ip_address_field_{0}'.format)
+    label = factory.Sequence('IP address field {0}'.format)
+    widget_class = 'django.forms.widgets.TextInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniGenericIPAddressField
+
+
+class OmniUUIDFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniUUIDField instances
+    """
+    name = factory.Sequence('uuid_field_{0}'.format)
+    label = factory.Sequence('UUID field {0}'.format)
+    widget_class = 'django.forms.widgets.TextInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniUUIDField
+
+
+class OmniSlugFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniSlugField instances
+    """
+    name = factory.Sequence('slug_field_{0}'.format)
+    label = factory.Sequence('Slug field {0}'.format)
+    widget_class = 'django.forms.widgets.TextInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniSlugField
+
+
+class OmniDateFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniDateField instances
+    """
+    name = factory.Sequence('date_field_{0}'.format)
+    label = factory.Sequence('Date field {0}'.format)
+    widget_class = 'django.forms.widgets.DateInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniDateField
+
+
+class OmniDateTimeFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniDateTimeField instances
+    """
+    name = factory.Sequence('datetime_field_{0}'.format)
+    label = factory.Sequence('DateTime field {0}'.format)
+    widget_class = 'django.forms.widgets.DateTimeInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniDateTimeField
+
+
+class OmniDecimalFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniDecimalField instances
+    """
+    name = factory.Sequence('decimal_field_{0}'.format)
+    label = factory.Sequence('Decimal field {0}'.format)
+    widget_class = 'django.forms.widgets.NumberInput'
+    max_digits = 10
+    decimal_places = 2
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniDecimalField
+
+
+class OmniFileFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniFileField instances
+    """
+    name = factory.Sequence('file_field_{0}'.format)
+    label = factory.Sequence('File field {0}'.format)
+    widget_class = 'django.forms.widgets.FileInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniFileField
+
+
+class OmniImageFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniImageField instances
+    """
+    name = factory.Sequence('image_field_{0}'.format)
+    label = factory.Sequence('Image field {0}'.format)
+    widget_class = 'django.forms.widgets.FileInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniImageField
+
+
+class OmniFloatFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniFloatField instances
+    """
+    name = factory.Sequence('float_field_{0}'.format)
+    label = factory.Sequence('Float field {0}'.format)
+    widget_class = 'django.forms.widgets.NumberInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniFloatField
+
+
+class OmniIntegerFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniIntegerField instances
+    """
+    name = factory.Sequence('integer_field_{0}'.format)
+    label = factory.Sequence('Integer field {0}'.format)
+    widget_class = 'django.forms.widgets.NumberInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniIntegerField
+
+
+class OmniTimeFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniTimeField instances
+    """
+    name = factory.Sequence('time_field_{0}'.format)
+    label = factory.Sequence('Time field {0}'.format)
+    widget_class = 'django.forms.widgets.TimeInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniTimeField
+
+
+class OmniUrlFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniUrlField instances
+    """
+    name = factory.Sequence('url_field_{0}'.format)
+    label = factory.Sequence('URL field {0}'.format)
+    widget_class = 'django.forms.widgets.URLInput'
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniUrlField
+
+
+class OmniChoiceFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniChoiceField instances
+    """
+    name = factory.Sequence('choice_field_{0}'.format)
+    label = factory.Sequence('Choice field {0}'.format)
+    widget_class = 'django.forms.widgets.Select'
+    choices = 'a|Choice A\nb|Choice B\nc|Choice C'
+    separate_values = True
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniChoiceField
+
+
+class OmniMultipleChoiceFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniMultipleChoiceField instances
+    """
+    name = factory.Sequence('multiple_choice_field_{0}'.format)
+    label = factory.Sequence('Multiple choice field {0}'.format)
+    widget_class = 'django.forms.widgets.SelectMultiple'
+    choices = 'a|Choice A\nb|Choice B\nc|Choice C'
+    separate_values = True
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniMultipleChoiceField
+
+
+class OmniForeignKeyFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniForeignKeyField instances
+    """
+    name = factory.Sequence('foreign_key_field_{0}'.format)
+    label = factory.Sequence('Foreign key field {0}'.format)
+    widget_class = 'django.forms.Select'
+    related_type = factory.LazyAttribute(lambda n: ContentType.objects.get_for_model(DummyModel2))
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniForeignKeyField
+
+
+class OmniManyToManyFieldFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniManyToManyField instances
+    """
+    name = factory.Sequence('many_to_many_field_{0}'.format)
+    label = factory.Sequence('Many to many field {0}'.format)
+    widget_class = 'django.forms.SelectMultiple'
+    related_type = factory.LazyAttribute(lambda n: ContentType.objects.get_for_model(DummyModel2))
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniManyToManyField
+
+
+class OmniFormSaveSubmissionHandlerFactory(factory.DjangoModelFactory):
+    """
+    Model factory for generating OmniFormSaveSubmissionHandler instances
+    """
+    name = factory.Sequence('Save submission handler {0}'.format)
+    order = factory.Sequence(lambda n: n)
+    form = factory.SubFactory(OmniFormFactory)
+
+    class Meta(object):
+        model = OmniFormSaveSubmissionHandler
+
+
 class DummyModelFactory(factory.DjangoModelFactory):
     """
     Factory for creating dummy model instances
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms attachments module
+"""
+from __future__ import unicode_literals
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from mock import Mock
+from omniforms.attachments import Attachment, AttachmentSet, get_attachments
+import os
+
+
+class AttachmentTestCase(TestCase):
+    """
+    Tests the Attachment class
+    """
+    def test_encodes_content(self):
+        """
+        Content spanning several chunks should be encoded correctly
+        """
+        content = os.urandom(200 * 1024 + 13)
+        attachment = Attachment(SimpleUploadedFile('data.bin', content, 'application/octet-stream'))
+        part = attachment.get_mime_part()
+        self.assertEqual(attachment.size, len(content))
+        self.assertEqual(part.get_payload(decode=True), content)
+        self.assertTrue(all(len(line) <= 76 for line in part.get_payload().splitlines()))
+
+    def test_mime_part_built_once(self):
+        """
+        The same MIME part should be returned on each call
+        """
+        attachment = Attachment(SimpleUploadedFile('test.txt', b'content', 'text/plain'))
+        self.assertIs(attachment.get_mime_part(), attachment.get_mime_part())
+
+    def test_guesses_content_type(self):
+        """
+        The content type should be guessed from the file name if the file does not define one
+        """
+        file_object = SimpleUploadedFile('test.pdf', b'content')
+        file_object.content_type = None
+        self.assertEqual(Attachment(file_object).content_type, 'application/pdf')
+
+    def test_non_ascii_file_name(self):
+        """
+        Non ascii file names should be preserved
+        """
+        part = Attachment(SimpleUploadedFile('résumé.txt', b'content', 'text/plain')).get_mime_part()
+        self.assertEqual(part.get_filename(), 'résumé.txt')
+
+
+class AttachmentSetTestCase(TestCase):
+    """
+    Tests the AttachmentSet class
+    """
+    def test_no_links_by_default(self):
+        """
+        All files should be attached if no maximum size has been configured
+        """
+        attachment_set = AttachmentSet([SimpleUploadedFile('test.txt', b'x' * 4096, 'text/plain')])
+        self.assertEqual(len(attachment_set.attachments), 1)
+        self.assertEqual(attachment_set.links, [])
+        self.assertEqual(attachment_set.get_links_text(), '')
+
+    def test_get_attachments_memoized(self):
+        """
+        The same attachment set should be returned for the same form instance
+        """
+        form = Mock(cleaned_data={'file': SimpleUploadedFile('test.txt', b'content', 'text/plain'), 'name': 'Bob'})
+        attachment_set = get_attachments(form)
+        self.assertIs(attachment_set, get_attachments(form))
+        self.assertEqual(len(attachment_set.attachments), 1)
+        other_form = Mock(cleaned_data={})
+        self.assertIsNot(attachment_set, get_attachments(other_form))
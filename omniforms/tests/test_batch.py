@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms batch module
+"""
+from __future__ import unicode_literals
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+from mock import patch
+from omniforms.benchmarks.forms import build_form
+from omniforms.tests.factories import OmniCharFieldFactory, OmniModelFormFactory, OmniSlugFieldFactory
+import json
+
+
+def normalize(cleaned_data):
+    """
+    Converts querysets in the cleaned data to lists so that they can be compared
+
+    :param cleaned_data: Dict of cleaned data
+    :return: Dict of cleaned data
+    """
+    return {name: list(value) if isinstance(value, QuerySet) else value for name, value in cleaned_data.items()}
+
+
+class ValidateBatchTestCase(TestCase):
+    """
+    Tests validating batches of rows in process
+    """
+    def setUp(self):
+        super(ValidateBatchTestCase, self).setUp()
+        self.omni_form, self.data = build_form(20)
+        self.invalid = dict((name, 'x' if isinstance(value, str) else value) for name, value in self.data.items())
+        self.rows = [self.data, self.invalid, {}, self.data]
+
+    def assert_same_as_forms(self, form_class, rows, results):
+        """
+        Asserts that the results are the same as validating each row with its own form instance
+
+        :param form_class: Generated form class
+        :param rows: List of dicts of submitted data
+        :param results: List of BatchResult instances
+        """
+        self.assertEqual([result.index for result in results], list(range(len(rows))))
+        for data, result in zip(rows, results):
+            form = form_class(data=data)
+            self.assertEqual(result.is_valid, form.is_valid())
+            if form.is_valid():
+                self.assertIsNone(result.errors)
+                self.assertEqual(normalize(result.cleaned_data), normalize(form.cleaned_data))
+            else:
+                self.assertIsNone(result.cleaned_data)
+                self.assertEqual(result.errors, json.loads(form.errors.as_json()))
+
+    def test_results(self):
+        """
+        Each row should be validated exactly as if it was validated by its own form instance
+        """
+        results = list(self.omni_form.validate_batch(self.rows))
+        self.assertEqual([result.is_valid for result in results], [True, False, True, True])
+        self.assert_same_as_forms(self.omni_form.get_form_class(), self.rows, results)
+
+    def test_single_form_instance(self):
+        """
+        A single form instance should be created for the whole batch
+        """
+        form_class = self.omni_form.get_form_class()
+        with patch.object(self.omni_form, 'get_form_class', return_value=form_class), \
+                patch.object(form_class, 'order_fields') as patched_method:
+            results = list(self.omni_form.validate_batch(self.rows * 5))
+        self.assertEqual(len(results), 20)
+        self.assertEqual(patched_method.call_count, 1)
+
+    def test_streamed(self):
+        """
+        Results should be yielded as each row is validated
+        """
+        def rows():
+            yield self.data
+            raise AssertionError('The second row should not be read')
+
+        self.assertTrue(next(self.omni_form.validate_batch(rows())).is_valid)
+
+    def test_model_form(self):
+        """
+        Rows of model forms should be validated exactly as if each was validated by its own form instance
+        """
+        omni_form = OmniModelFormFactory.create()
+        OmniCharFieldFactory.create(form=omni_form, name='title', required=True)
+        OmniSlugFieldFactory.create(form=omni_form, name='slug', required=True)
+        rows = [{'title': 'Title', 'slug': 'slug'}, {'title': 'Title'}, {'slug': 'not a slug'}]
+        results = list(omni_form.validate_batch(rows))
+        self.assertEqual([result.is_valid for result in results], [True, False, False])
+        self.assert_same_as_forms(omni_form.get_form_class(), rows, results)
+
+    def test_process_pool_in_transaction(self):
+        """
+        A ValueError should be raised if a process pool is requested inside a transaction
+        """
+        with self.assertRaises(ValueError):
+            list(self.omni_form.validate_batch(self.rows, processes=2))
+
+
+class ValidateBatchProcessPoolTestCase(TransactionTestCase):
+    """
+    Tests validating batches of rows in a pool of worker processes
+    """
+    def test_results(self):
+        """
+        Rows validated by worker processes should be yielded in order with the same results
+        """
+        omni_form, data = build_form(20)
+        invalid = dict((name, 'x' if isinstance(value, str) else value) for name, value in data.items())
+        rows = [data, invalid, {}, data, invalid]
+        results = list(omni_form.validate_batch(rows, processes=2, chunk_size=2))
+        self.assertEqual([result.index for result in results], list(range(5)))
+        self.assertEqual([result.is_valid for result in results], [True, False, True, True, False])
+        expected = list(omni_form.validate_batch(rows))
+        self.assertEqual([result.errors for result in results], [result.errors for result in expected])
+        self.assertEqual(
+            [normalize(result.cleaned_data) for result in results if result.is_valid],
+            [normalize(result.cleaned_data) for result in expected if result.is_valid]
+        )
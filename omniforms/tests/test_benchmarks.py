@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms benchmarks package
+"""
+from __future__ import unicode_literals
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+from mock import patch
+from omniforms.benchmarks.forms import build_form, get_field_models
+from omniforms.benchmarks.runner import compare_results, measure, run_benchmarks
+from omniforms.models import OmniField, OmniFormSubmission
+from omniforms.registry import concrete_model_registry
+import json
+import os
+import tempfile
+
+
+class BuildFormTestCase(TestCase):
+    """
+    Tests the build_form function
+    """
+    def test_covers_every_field_type(self):
+        """
+        The benchmarks should cover every concrete OmniField subclass in the omniforms app
+        """
+        field_models = set(
+            model_class for model_class in concrete_model_registry.get_concrete_models(OmniField)
+            if model_class._meta.app_label == 'omniforms'
+        )
+        self.assertEqual(get_field_models(), field_models)
+
+    def test_builds_form(self):
+        """
+        The form should have the requested number of fields and the data should be valid
+        """
+        omni_form, data = build_form(25)
+        self.assertEqual(omni_form.fields.count(), 25)
+        self.assertEqual(omni_form.handlers.count(), 2)
+        form = omni_form.get_form_class()(data=data)
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+class MeasureTestCase(TestCase):
+    """
+    Tests the measure function
+    """
+    def test_measurements(self):
+        """
+        The function should time the function and record queries and peak memory
+        """
+        calls = []
+        result = measure(lambda argument: calls.append(argument), lambda: 'arg', repeat=3)
+        self.assertEqual(calls, ['arg'] * 5)
+        self.assertEqual(list(result), ['min', 'mean', 'median', 'max', 'queries', 'peak_memory'])
+        self.assertLessEqual(result['min'], result['median'])
+        self.assertLessEqual(result['median'], result['max'])
+        self.assertEqual(result['queries'], 0)
+
+    def test_counts_queries(self):
+        """
+        The number of queries run by the function should be recorded
+        """
+        result = measure(lambda argument: list(OmniField.objects.all()), repeat=1)
+        self.assertEqual(result['queries'], 1)
+
+
+@override_settings(OMNI_FORMS_HANDLER_BACKEND='omniforms.dispatch.SynchronousBackend')
+class RunBenchmarksTestCase(TestCase):
+    """
+    Tests the run_benchmarks function
+    """
+    def test_results(self):
+        """
+        Results should be recorded for each size and operation
+        """
+        results = run_benchmarks(sizes=[3, 5], repeat=1)
+        self.assertEqual([result['fields'] for result in results['results']], [3, 5])
+        self.assertEqual(
+            list(results['results'][0]['operations']),
+            ['get_form_class_cold', 'get_form_class', 'instantiate', 'is_valid', 'handle']
+        )
+        self.assertEqual(results['repeat'], 1)
+        self.assertIn('django', results['environment'])
+        self.assertTrue(OmniFormSubmission.objects.exists())
+        json.dumps(results)
+
+    def test_compare_results(self):
+        """
+        Operations run with the same number of fields should be compared
+        """
+        baseline = {'results': [{'fields': 3, 'operations': {'handle': {'mean': 2.0, 'queries': 4}}}]}
+        current = {'results': [
+            {'fields': 3, 'operations': {'handle': {'mean': 1.0, 'queries': 3}, 'is_valid': {'mean': 1, 'queries': 0}}},
+            {'fields': 5, 'operations': {'handle': {'mean': 1.0, 'queries': 3}}},
+        ]}
+        rows = compare_results(baseline, current)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['operation'], 'handle')
+        self.assertEqual(rows[0]['ratio'], 0.5)
+        self.assertEqual((rows[0]['baseline_queries'], rows[0]['queries']), (4, 3))
+
+
+@patch('omniforms.management.commands.omniforms_benchmark.teardown_test_environment')
+@patch('omniforms.management.commands.omniforms_benchmark.setup_test_environment')
+@patch('omniforms.management.commands.omniforms_benchmark.teardown_databases')
+@patch('omniforms.management.commands.omniforms_benchmark.setup_databases')
+class BenchmarkCommandTestCase(TestCase):
+    """
+    Tests the omniforms_benchmark management command
+    """
+    def test_writes_json(self, setup_databases, *mocks):
+        """
+        The command should run the benchmarks in a test database and write the results as JSON
+        """
+        stdout = StringIO()
+        call_command('omniforms_benchmark', sizes=[2], repeat=1, stdout=stdout)
+        self.assertEqual(json.loads(stdout.getvalue())['results'][0]['fields'], 2)
+        setup_databases.assert_called_once_with(verbosity=0, interactive=False)
+
+    def test_output_and_compare(self, *mocks):
+        """
+        The command should write the results to the output file and compare them against the baseline
+        """
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'results.json')
+        call_command('omniforms_benchmark', sizes=[2], repeat=1, output=path, stderr=StringIO())
+        stderr = StringIO()
+        call_command('omniforms_benchmark', sizes=[2], repeat=1, compare=path, stdout=StringIO(), stderr=stderr)
+        self.assertIn('get_form_class_cold', stderr.getvalue())
+        os.remove(path)
+        os.rmdir(directory)
+
+    def test_invalid_options(self, *mocks):
+        """
+        A CommandError should be raised for invalid sizes, repeats or baseline files
+        """
+        self.assertRaises(CommandError, call_command, 'omniforms_benchmark', sizes=[0])
+        self.assertRaises(CommandError, call_command, 'omniforms_benchmark', repeat=0)
+        self.assertRaises(CommandError, call_command, 'omniforms_benchmark', compare='/missing.json')
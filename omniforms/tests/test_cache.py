@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms cache module
+"""
+from __future__ import unicode_literals
+from django import forms
+from django.contrib.contenttypes.models import ContentType
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, override_settings
+from mock import patch
+from omniforms.cache import (
+    ChoicesCache,
+    FormClassCache,
+    ImportStringCache,
+    LRUCache,
+    TemplateCache,
+    cached_import_string,
+    form_class_cache,
+    import_string_cache
+)
+from omniforms.models import OmniForm
+from omniforms.tests.factories import (
+    OmniFormFactory,
+    OmniModelFormFactory,
+    OmniBooleanFieldFactory,
+    OmniFormEmailHandlerFactory
+)
+import gc
+import shutil
+import tempfile
+import weakref
+
+
+@override_settings(OMNI_FORMS_CACHE_FORM_CLASSES=True)
+class FormClassCacheTestCase(TestCase):
+    """
+    Tests the FormClassCache class
+    """
+    def setUp(self):
+        super(FormClassCacheTestCase, self).setUp()
+        self.cache = FormClassCache()
+        self.omni_form = OmniFormFactory.create(title='Cache test')
+        self.field = OmniBooleanFieldFactory.create(form=self.omni_form, name='agree')
+        self.content_type_id = ContentType.objects.get_for_model(self.omni_form).pk
+
+    def test_caches_form_class(self):
+        """
+        The form class should only be built once
+        """
+        with patch.object(OmniForm, 'build_form_class', wraps=self.omni_form.build_form_class) as patched_method:
+            form_class_1 = self.cache.get_form_class(self.omni_form)
+            form_class_2 = self.cache.get_form_class(self.omni_form)
+        self.assertIs(form_class_1, form_class_2)
+        self.assertEqual(patched_method.call_count, 1)
+
+    def test_hit_and_miss_counters(self):
+        """
+        The cache should count hits and misses
+        """
+        self.cache.get_form_class(self.omni_form)
+        self.cache.get_form_class(self.omni_form)
+        self.cache.get_form_class(self.omni_form)
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 1, 'size': 1})
+
+    def test_invalidate(self):
+        """
+        Invalidating the form should cause the form class to be rebuilt
+        """
+        form_class_1 = self.cache.get_form_class(self.omni_form)
+        self.cache.invalidate(self.content_type_id, self.omni_form.pk)
+        form_class_2 = self.cache.get_form_class(self.omni_form)
+        self.assertIsNot(form_class_1, form_class_2)
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 2, 'size': 1})
+
+    def test_version_shared_between_instances(self):
+        """
+        Invalidating a form in one cache instance should change the version seen by others
+        """
+        other_cache = FormClassCache()
+        version = other_cache.get_version(self.content_type_id, self.omni_form.pk)
+        self.assertEqual(version, self.cache.get_version(self.content_type_id, self.omni_form.pk))
+        self.cache.invalidate(self.content_type_id, self.omni_form.pk)
+        self.assertNotEqual(version, other_cache.get_version(self.content_type_id, self.omni_form.pk))
+
+    def test_clear(self):
+        """
+        The clear method should empty the cache and reset the counters
+        """
+        self.cache.get_form_class(self.omni_form)
+        self.cache.get_form_class(self.omni_form)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 0, 'size': 0})
+
+    @override_settings(OMNI_FORMS_CACHE_FORM_CLASSES=False)
+    def test_disabled(self):
+        """
+        Form classes should not be cached if caching is disabled
+        """
+        form_class_1 = self.cache.get_form_class(self.omni_form)
+        form_class_2 = self.cache.get_form_class(self.omni_form)
+        self.assertIsNot(form_class_1, form_class_2)
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 0, 'size': 0})
+
+    @override_settings(OMNI_FORMS_CACHE_FORM_CLASSES=None)
+    def test_disabled_for_local_cache(self):
+        """
+        Form classes should not be cached by default if versions are stored in a cache local to the process
+        """
+        for backend in ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache'):
+            with override_settings(CACHES={'default': {'BACKEND': backend}}):
+                self.assertFalse(self.cache.enabled)
+                self.assertIsNot(self.cache.get_form_class(self.omni_form), self.cache.get_form_class(self.omni_form))
+
+    @override_settings(OMNI_FORMS_CACHE_FORM_CLASSES=None)
+    def test_enabled_for_shared_cache(self):
+        """
+        Form classes should be cached by default if versions are stored in a cache shared between processes
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            with override_settings(CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            }, OMNI_FORMS_CACHE_ALIAS='shared'):
+                self.assertTrue(self.cache.enabled)
+                self.assertIs(self.cache.get_form_class(self.omni_form), self.cache.get_form_class(self.omni_form))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_unsaved_forms_not_cached(self):
+        """
+        Form classes for unsaved forms should not be cached
+        """
+        self.cache.get_form_class(OmniForm(title='Unsaved'))
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 0, 'size': 0})
+
+    def test_omni_form_not_stored_on_class(self):
+        """
+        Cached form classes should only reference the omni form by content type and primary key
+        """
+        omni_form = OmniForm.objects.get(pk=self.omni_form.pk)
+        form_class = self.cache.get_form_class(omni_form)
+        self.assertNotIn(omni_form, vars(form_class).values())
+        self.assertEqual(form_class._omni_form_content_type_id, self.content_type_id)
+        self.assertEqual(form_class._omni_form_pk, self.omni_form.pk)
+
+        reference = weakref.ref(omni_form)
+        del omni_form
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_omni_form_bound_on_instantiation(self):
+        """
+        Forms should be bound to the omni form they are instantiated for, not the one the class was built for
+        """
+        form_class = self.cache.get_form_class(self.omni_form)
+        omni_form = OmniForm.objects.get(pk=self.omni_form.pk)
+        omni_form.title = 'Changed'
+        self.assertIs(self.cache.get_form_class(omni_form), form_class)
+        self.assertIs(form_class(omni_form=omni_form)._omni_form, omni_form)
+
+    def test_omni_form_looked_up(self):
+        """
+        Forms instantiated without an omni form should look it up once
+        """
+        form = self.cache.get_form_class(self.omni_form)()
+        with self.assertNumQueries(1):
+            self.assertEqual(form._omni_form, self.omni_form)
+            self.assertIs(form._omni_form, form._omni_form)
+
+
+@override_settings(OMNI_FORMS_CACHE_FORM_CLASSES=True)
+class FormClassCacheInvalidationTestCase(TestCase):
+    """
+    Tests that the form class cache is invalidated when form definitions change
+    """
+    def setUp(self):
+        super(FormClassCacheInvalidationTestCase, self).setUp()
+        self.omni_form = OmniFormFactory.create(title='Cache test')
+        self.field = OmniBooleanFieldFactory.create(form=self.omni_form, name='agree')
+        self.handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+
+    def test_get_form_class_uses_cache(self):
+        """
+        The get_form_class method should return the cached form class
+        """
+        self.assertIs(self.omni_form.get_form_class(), self.omni_form.get_form_class())
+
+    def test_field_save_invalidates(self):
+        """
+        Saving a field should invalidate the form class
+        """
+        form_class = self.omni_form.get_form_class()
+        self.field.label = 'Changed'
+        self.field.save()
+        new_form_class = self.omni_form.get_form_class()
+        self.assertIsNot(form_class, new_form_class)
+        self.assertEqual(new_form_class.base_fields['agree'].label, 'Changed')
+
+    def test_field_delete_invalidates(self):
+        """
+        Deleting a field should invalidate the form class
+        """
+        form_class = self.omni_form.get_form_class()
+        self.field.delete()
+        new_form_class = self.omni_form.get_form_class()
+        self.assertIsNot(form_class, new_form_class)
+        self.assertNotIn('agree', new_form_class.base_fields)
+
+    def test_handler_save_invalidates(self):
+        """
+        Saving a handler should invalidate the form class
+        """
+        form_class = self.omni_form.get_form_class()
+        OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        new_form_class = self.omni_form.get_form_class()
+        self.assertIsNot(form_class, new_form_class)
+        self.assertEqual(len(new_form_class._handlers), 2)
+
+    def test_handler_delete_invalidates(self):
+        """
+        Deleting a handler should invalidate the form class
+        """
+        form_class = self.omni_form.get_form_class()
+        self.handler.delete()
+        new_form_class = self.omni_form.get_form_class()
+        self.assertIsNot(form_class, new_form_class)
+        self.assertEqual(len(new_form_class._handlers), 0)
+
+    def test_form_save_invalidates(self):
+        """
+        Saving the form should invalidate the form class
+        """
+        form_class = self.omni_form.get_form_class()
+        self.omni_form.title = 'Changed'
+        self.omni_form.save()
+        new_form_class = self.omni_form.get_form_class()
+        self.assertIsNot(form_class, new_form_class)
+        self.assertEqual(new_form_class.__name__, 'OmniFormChanged')
+
+    def test_other_forms_not_invalidated(self):
+        """
+        Changing one form should not invalidate the form classes of other forms
+        """
+        other_form = OmniModelFormFactory.create()
+        form_class = other_form.get_form_class()
+        self.field.save()
+        self.assertIs(form_class, other_form.get_form_class())
+
+    def test_global_cache_counts_hits(self):
+        """
+        The process wide cache should record hits for repeated lookups
+        """
+        self.omni_form.get_form_class()
+        hits = form_class_cache.hits
+        self.omni_form.get_form_class()
+        self.assertEqual(form_class_cache.hits, hits + 1)
+
+
+class LRUCacheTestCase(TestCase):
+    """
+    Tests the LRUCache class
+    """
+    def setUp(self):
+        super(LRUCacheTestCase, self).setUp()
+        self.cache = LRUCache(max_size=2)
+
+    def test_get_or_build(self):
+        """
+        Values should only be built if they are not already in the cache
+        """
+        self.assertEqual(self.cache.get_or_build('a', lambda: 1), 1)
+        self.assertEqual(self.cache.get_or_build('a', lambda: 2), 1)
+
+    def test_least_recently_used_discarded(self):
+        """
+        The least recently used entries should be discarded once the cache is full
+        """
+        self.cache.get_or_build('a', lambda: 1)
+        self.cache.get_or_build('b', lambda: 2)
+        self.cache.get_or_build('a', lambda: 1)
+        self.cache.get_or_build('c', lambda: 3)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get_or_build('a', lambda: 4), 1)
+        self.assertEqual(self.cache.get_or_build('b', lambda: 5), 5)
+
+    def test_discard(self):
+        """
+        The discard method should remove entries whose keys match the predicate
+        """
+        self.cache.get_or_build(('a', 1), lambda: 1)
+        self.cache.get_or_build(('b', 1), lambda: 2)
+        self.cache.discard(lambda key: key[0] == 'a')
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get_or_build(('b', 1), lambda: 3), 2)
+
+
+class ImportStringCacheTestCase(TestCase):
+    """
+    Tests the ImportStringCache class
+    """
+    def setUp(self):
+        super(ImportStringCacheTestCase, self).setUp()
+        self.cache = ImportStringCache(max_size=2)
+
+    def test_resolve(self):
+        """
+        The resolve method should return the imported object
+        """
+        self.assertIs(self.cache.resolve('django.forms.CharField'), forms.CharField)
+
+    def test_resolve_cached(self):
+        """
+        Import paths should only be imported once
+        """
+        with patch('omniforms.cache.import_string', return_value=forms.CharField) as patched_method:
+            self.cache.resolve('django.forms.CharField')
+            self.cache.resolve('django.forms.CharField')
+        self.assertEqual(patched_method.call_count, 1)
+
+    def test_resolve_raises_import_error(self):
+        """
+        Invalid import paths should raise an ImportError and should not be cached
+        """
+        self.assertRaises(ImportError, self.cache.resolve, 'django.forms.FictionalField')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_bounded(self):
+        """
+        The least recently used objects should be discarded once the cache is full
+        """
+        self.cache.resolve('django.forms.CharField')
+        self.cache.resolve('django.forms.IntegerField')
+        self.cache.resolve('django.forms.CharField')
+        self.cache.resolve('django.forms.FloatField')
+        self.assertEqual(len(self.cache), 2)
+        with patch('omniforms.cache.import_string', return_value=forms.IntegerField) as patched_method:
+            self.cache.resolve('django.forms.CharField')
+            self.cache.resolve('django.forms.IntegerField')
+        self.assertEqual(patched_method.call_count, 1)
+
+    def test_clear(self):
+        """
+        The clear method should remove all resolved objects
+        """
+        self.cache.resolve('django.forms.CharField')
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_cached_import_string(self):
+        """
+        The cached_import_string function should use the process wide cache
+        """
+        self.assertIs(cached_import_string('django.forms.widgets.TextInput'), forms.TextInput)
+        with patch.object(import_string_cache, 'resolve') as patched_method:
+            cached_import_string('django.forms.widgets.TextInput')
+        patched_method.assert_called_once_with('django.forms.widgets.TextInput')
+
+
+class TemplateCacheTestCase(TestCase):
+    """
+    Tests the TemplateCache class
+    """
+    def setUp(self):
+        super(TemplateCacheTestCase, self).setUp()
+        self.cache = TemplateCache(max_size=2)
+
+    def test_get_template(self):
+        """
+        The get_template method should return a compiled template
+        """
+        template = self.cache.get_template(1, 'Hello {{ user }}')
+        self.assertIsInstance(template, Template)
+        self.assertEqual(template.render(Context({'user': 'Bob'})), 'Hello Bob')
+
+    def test_get_template_cached(self):
+        """
+        Templates should only be compiled once
+        """
+        self.assertIs(self.cache.get_template(1, 'Hello'), self.cache.get_template(1, 'Hello'))
+
+    def test_keyed_by_source(self):
+        """
+        Templates should be keyed by their source as well as the object id
+        """
+        self.assertIsNot(self.cache.get_template(1, 'Hello'), self.cache.get_template(1, 'Goodbye'))
+        self.assertIsNot(self.cache.get_template(1, 'Hello'), self.cache.get_template(2, 'Hello'))
+
+    def test_unsaved_objects_not_cached(self):
+        """
+        Templates for objects without a primary key should not be cached
+        """
+        self.cache.get_template(None, 'Hello')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_bounded(self):
+        """
+        The least recently used templates should be discarded once the cache is full
+        """
+        template_1 = self.cache.get_template(1, 'Hello')
+        self.cache.get_template(2, 'Hello')
+        self.cache.get_template(1, 'Hello')
+        self.cache.get_template(3, 'Hello')
+        self.assertEqual(len(self.cache), 2)
+        self.assertIs(self.cache.get_template(1, 'Hello'), template_1)
+
+    def test_syntax_error(self):
+        """
+        Templates that cannot be compiled should raise a TemplateSyntaxError and should not be cached
+        """
+        self.assertRaises(TemplateSyntaxError, self.cache.get_template, 1, '{% if %}')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        """
+        The invalidate method should remove all templates for the object
+        """
+        self.cache.get_template(1, 'Hello')
+        self.cache.get_template(2, 'Hello')
+        self.cache.invalidate(1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_clear(self):
+        """
+        The clear method should remove all templates
+        """
+        self.cache.get_template(1, 'Hello')
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+class ChoicesCacheTestCase(TestCase):
+    """
+    Tests the ChoicesCache class
+    """
+    def setUp(self):
+        super(ChoicesCacheTestCase, self).setUp()
+        self.cache = ChoicesCache(max_size=2)
+
+    def test_get_choices(self):
+        """
+        The get_choices method should return a tuple of (value, label) tuples
+        """
+        self.assertEqual(self.cache.get_choices(1, '[["a", "A"], ["b", "B"]]'), (('a', 'A'), ('b', 'B')))
+
+    def test_get_choices_cached(self):
+        """
+        Choices should only be decoded once and the same tuple shared between callers
+        """
+        self.assertIs(self.cache.get_choices(1, '[["a", "A"]]'), self.cache.get_choices(1, '[["a", "A"]]'))
+
+    def test_keyed_by_data(self):
+        """
+        Choices should be keyed by their data as well as the object id
+        """
+        self.assertEqual(self.cache.get_choices(1, '[["a", "A"]]'), (('a', 'A'),))
+        self.assertEqual(self.cache.get_choices(1, '[["b", "B"]]'), (('b', 'B'),))
+        self.assertIsNot(self.cache.get_choices(1, '[["a", "A"]]'), self.cache.get_choices(2, '[["a", "A"]]'))
+
+    def test_unsaved_objects_not_cached(self):
+        """
+        Choices for objects without a primary key should not be cached
+        """
+        self.cache.get_choices(None, '[]')
+        self.assertEqual(len(self.cache), 0)
+
+    def test_bounded(self):
+        """
+        The least recently used choices should be discarded once the cache is full
+        """
+        choices_1 = self.cache.get_choices(1, '[]')
+        self.cache.get_choices(2, '[]')
+        self.cache.get_choices(1, '[]')
+        self.cache.get_choices(3, '[]')
+        self.assertEqual(len(self.cache), 2)
+        self.assertIs(self.cache.get_choices(1, '[]'), choices_1)
+
+    def test_invalidate(self):
+        """
+        The invalidate method should remove all choices for the object
+        """
+        self.cache.get_choices(1, '[]')
+        self.cache.get_choices(2, '[]')
+        self.cache.invalidate(1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_clear(self):
+        """
+        The clear method should remove all choices
+        """
+        self.cache.get_choices(1, '[]')
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
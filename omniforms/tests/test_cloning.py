@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms cloning module
+"""
+from __future__ import unicode_literals
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.six import StringIO
+from mock import patch
+from omniforms.cloning import bulk_insert, clone_form, clone_forms
+from omniforms.models import (
+    OmniBooleanField,
+    OmniCharField,
+    OmniField,
+    OmniForm,
+    OmniFormEmailConfirmationHandler,
+    OmniFormEmailHandler,
+    OmniFormHandler,
+    OmniManyToManyField,
+    OmniModelForm
+)
+from omniforms.tests.factories import (
+    OmniBooleanFieldFactory,
+    OmniCharFieldFactory,
+    OmniEmailFieldFactory,
+    OmniFormEmailConfirmationHandlerFactory,
+    OmniFormEmailHandlerFactory,
+    OmniFormFactory,
+    OmniModelFormFactory
+)
+from omniforms.tests.models import DummyModel
+
+
+class BulkInsertTestCase(TestCase):
+    """
+    Tests the bulk_insert function
+    """
+    def setUp(self):
+        super(BulkInsertTestCase, self).setUp()
+        self.form = OmniFormFactory.create()
+        self.content_type = ContentType.objects.get_for_model(self.form)
+
+    def _make_fields(self, model_class, count, **kwargs):
+        """
+        Creates unsaved field instances
+
+        :param model_class: The field model class
+        :param count: The number of fields to create
+        :param kwargs: Extra field attributes
+        :return: List of unsaved field instances
+        """
+        return [
+            model_class(
+                name='{0}_{1}'.format(model_class._meta.model_name, index),
+                label='Field {0}'.format(index),
+                widget_class='django.forms.widgets.TextInput',
+                content_type=self.content_type,
+                object_id=self.form.pk,
+                real_type=ContentType.objects.get_for_model(model_class),
+                **kwargs
+            )
+            for index in range(count)
+        ]
+
+    def test_inserts_multi_table_instances(self):
+        """
+        Rows should be inserted for each table in the inheritance chain
+        """
+        fields = self._make_fields(OmniCharField, 3, max_length=10)
+        bulk_insert(OmniCharField, fields, 'default')
+        self.assertEqual(OmniCharField.objects.count(), 3)
+        for field in fields:
+            self.assertIsNotNone(field.pk)
+            self.assertEqual(field.pk, field.omnifield_ptr_id)
+            self.assertFalse(field._state.adding)
+            self.assertEqual(OmniField.objects.get(pk=field.pk).specific, field)
+
+    def test_inserts_grandchild_instances(self):
+        """
+        Rows should be inserted for models with more than one concrete parent
+        """
+        fields = self._make_fields(
+            OmniManyToManyField,
+            2,
+            related_type=ContentType.objects.get_for_model(DummyModel)
+        )
+        bulk_insert(OmniManyToManyField, fields, 'default')
+        for field in fields:
+            self.assertEqual(OmniField.objects.get(pk=field.pk).specific.related_type.model_class(), DummyModel)
+
+    def test_no_instances(self):
+        """
+        Nothing should be inserted when there are no instances
+        """
+        with self.assertNumQueries(0):
+            bulk_insert(OmniCharField, [], 'default')
+
+
+class CloneFormsTestCase(TestCase):
+    """
+    Tests the clone_forms function
+    """
+    def setUp(self):
+        super(CloneFormsTestCase, self).setUp()
+        self.form = OmniFormFactory.create(title='Source')
+        self.char_field = OmniCharFieldFactory.create(form=self.form, order=1)
+        self.boolean_field = OmniBooleanFieldFactory.create(form=self.form, order=2)
+        self.email_field = OmniEmailFieldFactory.create(form=self.form, order=3)
+        self.email_handler = OmniFormEmailHandlerFactory.create(form=self.form, recipients='a@example.com')
+        self.confirmation_handler = OmniFormEmailConfirmationHandlerFactory.create(
+            form=self.form,
+            recipient_field=self.email_field
+        )
+
+    def test_clones_form(self):
+        """
+        The form should be cloned with the given title
+        """
+        clone = clone_form(self.form, title='Cloned')
+        self.assertIsInstance(clone, OmniForm)
+        self.assertNotEqual(clone.pk, self.form.pk)
+        self.assertEqual(OmniForm.objects.get(pk=clone.pk).title, 'Cloned')
+
+    def test_default_title(self):
+        """
+        The source title should be used if no title is given
+        """
+        self.assertEqual(clone_form(self.form).title, 'Source')
+
+    def test_clones_fields(self):
+        """
+        Every field should be cloned as its most specific type and attached to the cloned form
+        """
+        clone = clone_form(self.form, title='Cloned')
+        fields = list(clone.fields.specific())
+        self.assertEqual(
+            [field.__class__ for field in fields],
+            [OmniCharField, OmniBooleanField, self.email_field.__class__]
+        )
+        for source, field in zip(self.form.fields.specific(), fields):
+            self.assertNotEqual(source.pk, field.pk)
+            self.assertEqual(source.name, field.name)
+            self.assertEqual(source.label, field.label)
+            self.assertEqual(source.order, field.order)
+            self.assertEqual(field.form, clone)
+        self.assertEqual(self.form.fields.count(), 3)
+
+    def test_clones_handlers(self):
+        """
+        Every handler should be cloned as its most specific type and attached to the cloned form
+        """
+        clone = clone_form(self.form, title='Cloned')
+        handlers = list(clone.handlers.specific())
+        self.assertEqual(
+            sorted(handler.__class__.__name__ for handler in handlers),
+            ['OmniFormEmailConfirmationHandler', 'OmniFormEmailHandler']
+        )
+        email_handler = clone.handlers.specific().get(real_type=ContentType.objects.get_for_model(OmniFormEmailHandler))
+        self.assertEqual(email_handler.recipients, 'a@example.com')
+        self.assertEqual(email_handler.subject, self.email_handler.subject)
+        self.assertEqual(self.form.handlers.count(), 2)
+
+    def test_remaps_recipient_field(self):
+        """
+        The confirmation handlers recipient field should point at the cloned email field
+        """
+        clone = clone_form(self.form, title='Cloned')
+        handler = OmniFormEmailConfirmationHandler.objects.get(object_id=clone.pk)
+        self.assertEqual(handler.recipient_field.form, clone)
+        self.assertEqual(handler.recipient_field.name, self.email_field.name)
+        self.assertEqual(
+            OmniFormEmailConfirmationHandler.objects.get(pk=self.confirmation_handler.pk).recipient_field_id,
+            self.email_field.pk
+        )
+
+    def test_clones_model_forms(self):
+        """
+        Model forms should be cloned along with their content type
+        """
+        form = OmniModelFormFactory.create()
+        OmniFormEmailHandlerFactory.create(form=form)
+        clone = clone_form(form, title='Cloned model form')
+        self.assertIsInstance(clone, OmniModelForm)
+        self.assertEqual(clone.content_type, form.content_type)
+        self.assertEqual(clone.handlers.count(), 1)
+
+    def test_clones_many_forms(self):
+        """
+        Many forms should be cloned at once, in order
+        """
+        form_2 = OmniFormFactory.create(title='Source 2')
+        OmniCharFieldFactory.create(form=form_2)
+        clones = clone_forms([self.form, form_2], titles=['Clone 1', 'Clone 2'])
+        self.assertEqual([clone.title for clone in clones], ['Clone 1', 'Clone 2'])
+        self.assertEqual(clones[0].fields.count(), 3)
+        self.assertEqual(clones[1].fields.count(), 1)
+
+    def _count_clone_queries(self):
+        """
+        Clones the form and returns the number of queries executed
+
+        :return: int
+        """
+        with CaptureQueriesContext(connection) as context:
+            clone_form(self.form, title='Cloned')
+        return len(context.captured_queries)
+
+    def test_num_queries(self):
+        """
+        Child rows should be inserted in bulk. Root rows are only inserted one at a time
+        where the database cannot return the ids of bulk inserted rows
+        """
+        initial = self._count_clone_queries()
+        OmniCharFieldFactory.create_batch(20, form=self.form)
+        expected = initial if connection.features.can_return_ids_from_bulk_insert else initial + 20
+        self.assertEqual(self._count_clone_queries(), expected)
+
+    def test_atomic(self):
+        """
+        Nothing should be written if cloning fails
+        """
+        with patch('omniforms.cloning._remap_field_references', side_effect=ValueError):
+            self.assertRaises(ValueError, clone_form, self.form, 'Cloned')
+        self.assertEqual(OmniForm.objects.count(), 1)
+        self.assertEqual(OmniField.objects.count(), 3)
+        self.assertEqual(OmniFormHandler.objects.count(), 2)
+
+    def test_titles_must_match_forms(self):
+        """
+        A ValueError should be raised if the number of titles does not match the number of forms
+        """
+        self.assertRaises(ValueError, clone_forms, [self.form], titles=['One', 'Two'])
+
+    def test_duplicate_forms(self):
+        """
+        A ValueError should be raised if a form is given more than once
+        """
+        self.assertRaises(ValueError, clone_forms, [self.form, self.form])
+
+
+class CloneFormsCommandTestCase(TestCase):
+    """
+    Tests the omniforms_clone_forms management command
+    """
+    def test_clones_forms(self):
+        """
+        The command should clone each of the given forms
+        """
+        form_1 = OmniFormFactory.create(title='One')
+        form_2 = OmniFormFactory.create(title='Two')
+        OmniCharFieldFactory.create(form=form_1)
+        stdout = StringIO()
+        call_command('omniforms_clone_forms', form_1.pk, form_2.pk, form_1.pk, stdout=stdout)
+        self.assertEqual(
+            list(OmniForm.objects.exclude(pk__in=[form_1.pk, form_2.pk]).values_list('title', flat=True)),
+            ['One (copy)', 'Two (copy)']
+        )
+        self.assertEqual(OmniForm.objects.get(title='One (copy)').fields.count(), 1)
+        self.assertIn('Cloned form {0}'.format(form_1.pk), stdout.getvalue())
+
+    def test_title_format(self):
+        """
+        The title format option should be used to generate the cloned form titles
+        """
+        form = OmniFormFactory.create(title='One')
+        call_command('omniforms_clone_forms', form.pk, title_format='{title} #{pk}', stdout=StringIO())
+        self.assertTrue(OmniForm.objects.filter(title='One #{0}'.format(form.pk)).exists())
+
+    def test_model_forms(self):
+        """
+        The model option should allow model forms to be cloned
+        """
+        form = OmniModelFormFactory.create(title='Model form')
+        call_command('omniforms_clone_forms', form.pk, model='omnimodelform', stdout=StringIO())
+        self.assertEqual(OmniModelForm.objects.filter(title='Model form (copy)').count(), 1)
+
+    def test_missing_forms(self):
+        """
+        A CommandError should be raised if a form does not exist
+        """
+        with self.assertRaises(CommandError):
+            call_command('omniforms_clone_forms', 0, stdout=StringIO())
@@ -0,0 +1,680 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms dispatch module
+"""
+from __future__ import unicode_literals
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+from mock import Mock, patch
+from omniforms.dispatch import (
+    DatabaseQueueBackend,
+    Submission,
+    SubmissionError,
+    SynchronousBackend,
+    ThreadPoolBackend,
+    get_handler_backend,
+    is_email_handler
+)
+from omniforms.forms import OmniFormBaseForm
+from omniforms.models import OmniFileField, OmniFormEmailHandler, OmniFormHandlerJob, OmniFormSaveSubmissionHandler
+from omniforms.tests.factories import (
+    OmniFormFactory,
+    OmniCharFieldFactory,
+    OmniFormEmailHandlerFactory,
+    OmniFormSaveSubmissionHandlerFactory
+)
+import shutil
+import tempfile
+
+
+class DispatchTestCaseMixin(object):
+    """
+    Creates an omni form with a char field, a file field and an email handler
+    Uploaded files are staged to a temporary media root
+    """
+    def setUp(self):
+        super(DispatchTestCaseMixin, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, OMNI_FORMS_HANDLER_RETRY_DELAY=0)
+        self.settings_override.enable()
+        self.omni_form = OmniFormFactory.create()
+        OmniCharFieldFactory.create(form=self.omni_form, name='title', order=0, required=True)
+        OmniFileField.objects.create(
+            form=self.omni_form,
+            name='attachment',
+            label='Attachment',
+            widget_class='django.forms.widgets.FileInput',
+            order=1,
+            required=False
+        )
+        self.handler = OmniFormEmailHandlerFactory.create(form=self.omni_form, template='Title: {{ title }}')
+        self.form = self.get_form()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super(DispatchTestCaseMixin, self).tearDown()
+
+    def get_form(self):
+        """
+        Creates a valid bound form instance
+
+        :return: Valid form instance
+        """
+        form = self.omni_form.get_form_class()(
+            data={'title': 'Some title'},
+            files={'attachment': SimpleUploadedFile('test.txt', b'file content', 'text/plain')}
+        )
+        self.assertTrue(form.is_valid())
+        return form
+
+    @staticmethod
+    def get_staged_path(submission):
+        """
+        Gets the storage path of the staged attachment
+
+        :param submission: Submission instance
+        :return: Storage path
+        """
+        return submission.payload['files']['attachment'][0]['path']
+
+
+class SubmissionTestCase(DispatchTestCaseMixin, TestCase):
+    """
+    Tests the Submission class
+    """
+    def test_from_form(self):
+        """
+        The submission should reference the omni form and contain the submitted data
+        """
+        submission = Submission.from_form(self.form)
+        self.assertEqual(submission.content_type_id, ContentType.objects.get_for_model(self.omni_form).pk)
+        self.assertEqual(submission.object_id, self.omni_form.pk)
+        self.assertEqual(submission.payload['data'], {'title': ['Some title']})
+        self.assertEqual(len(submission.submission_id), 32)
+
+    def test_from_form_stages_files(self):
+        """
+        Uploaded files should be saved to storage
+        """
+        submission = Submission.from_form(self.form)
+        staged_file = submission.payload['files']['attachment'][0]
+        self.assertEqual(staged_file['name'], 'test.txt')
+        self.assertEqual(staged_file['content_type'], 'text/plain')
+        self.assertEqual(staged_file['size'], 12)
+        self.assertTrue(default_storage.exists(staged_file['path']))
+
+    def test_json_round_trip(self):
+        """
+        Submissions should survive serialization
+        """
+        submission = Submission.from_form(self.form)
+        restored = Submission.from_json(submission.to_json())
+        self.assertEqual(restored.content_type_id, submission.content_type_id)
+        self.assertEqual(restored.object_id, submission.object_id)
+        self.assertEqual(restored.submission_id, submission.submission_id)
+        self.assertEqual(restored.payload, submission.payload)
+
+    def test_build_form(self):
+        """
+        The rebuilt form should be valid and contain the submitted data and files
+        """
+        form = Submission.from_json(Submission.from_form(self.form).to_json()).build_form()
+        self.assertEqual(form.cleaned_data['title'], 'Some title')
+        self.assertEqual(form.cleaned_data['attachment'].name, 'test.txt')
+        self.assertEqual(form.cleaned_data['attachment'].read(), b'file content')
+
+    def test_build_form_raises_submission_error(self):
+        """
+        A SubmissionError should be raised if the submitted data is no longer valid
+        """
+        submission = Submission.from_form(self.form)
+        submission.payload['data'] = {}
+        self.assertRaises(SubmissionError, submission.build_form)
+
+    def test_delete_staged_files(self):
+        """
+        The delete_staged_files method should remove staged files from storage
+        """
+        submission = Submission.from_form(self.form)
+        submission.delete_staged_files()
+        self.assertFalse(default_storage.exists(self.get_staged_path(submission)))
+
+
+class SynchronousBackendTestCase(TestCase):
+    """
+    Tests the SynchronousBackend class
+    """
+    def test_dispatch(self):
+        """
+        Each handler should be called with the form
+        """
+        form = Mock()
+        handlers = [Mock(), Mock()]
+        SynchronousBackend().dispatch(form, handlers)
+        handlers[0].handle.assert_called_once_with(form)
+        handlers[1].handle.assert_called_once_with(form)
+
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_dispatch_sends_messages_together(self, get_connection):
+        """
+        Messages from email handlers should be sent over a single mail connection
+        """
+        omni_form = OmniFormFactory.create()
+        email_handlers = OmniFormEmailHandlerFactory.create_batch(3, form=omni_form)
+        other_handler = Mock()
+        form = Mock(cleaned_data={})
+        SynchronousBackend().dispatch(form, email_handlers + [other_handler])
+        other_handler.handle.assert_called_once_with(form)
+        get_connection.assert_called_once_with()
+        messages = get_connection.return_value.send_messages.call_args[0][0]
+        self.assertEqual(
+            [message.to for message in messages],
+            [handler._get_recipients(form) for handler in email_handlers]
+        )
+
+        get_connection.return_value.close.assert_called_once_with()
+
+    def test_dispatch_keeps_handler_order(self):
+        """
+        Handlers should run in the configured order, with only consecutive email handlers sent together
+        """
+        omni_form = OmniFormFactory.create()
+        email_handlers = OmniFormEmailHandlerFactory.create_batch(3, form=omni_form)
+        other_handler = Mock()
+        other_handler.handle.side_effect = lambda form: self.assertEqual(len(mail.outbox), 1)
+        SynchronousBackend().dispatch(Mock(cleaned_data={}), email_handlers[:1] + [other_handler] + email_handlers[1:])
+        other_handler.handle.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+
+def custom_handle(handler, form):
+    """
+    Overrides the handle method of email handlers, recording that it was called before sending the email
+
+    :param handler: OmniFormEmailHandler instance
+    :param form: Valid form instance
+    """
+    form.custom_handler_called = True
+    handler.get_message(form).send()
+
+
+class IsEmailHandlerTestCase(TestCase):
+    """
+    Tests the is_email_handler function
+    """
+    def test_is_email_handler(self):
+        """
+        Only email handlers that do not override the handle method should have their messages batched
+        """
+        handler = OmniFormEmailHandlerFactory.create()
+        self.assertTrue(is_email_handler(handler))
+        self.assertFalse(is_email_handler(Mock()))
+        with patch.object(OmniFormEmailHandler, 'handle', custom_handle):
+            self.assertFalse(is_email_handler(handler))
+
+    def test_synchronous_backend_calls_overridden_handle(self):
+        """
+        The synchronous backend should call the handle method of email handlers that override it
+        """
+        handler = OmniFormEmailHandlerFactory.create()
+        form = Mock(cleaned_data={})
+        with patch.object(OmniFormEmailHandler, 'handle', custom_handle):
+            SynchronousBackend().dispatch(form, [handler])
+        self.assertTrue(form.custom_handler_called)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class ThreadPoolBackendTestCase(DispatchTestCaseMixin, TestCase):
+    """
+    Tests the ThreadPoolBackend class
+    """
+    def setUp(self):
+        super(ThreadPoolBackendTestCase, self).setUp()
+        self.backend = ThreadPoolBackend(max_workers=2)
+
+    @patch('omniforms.dispatch.transaction.on_commit')
+    def test_dispatch_waits_for_commit(self, patched_method):
+        """
+        Handlers should not be queued until the transaction has been committed
+        """
+        with patch.object(self.backend, 'submit') as patched_submit:
+            self.backend.dispatch(self.form, [self.handler])
+            patched_submit.assert_not_called()
+            patched_method.call_args[0][0]()
+        submission, handlers = patched_submit.call_args[0]
+        self.assertIsInstance(submission, Submission)
+        self.assertEqual(handlers, [self.handler])
+
+    def test_dispatch_without_omni_form(self):
+        """
+        Forms that were not generated from an omni form should be handled in the current thread
+        """
+        form = OmniFormBaseForm({})
+        handler = Mock()
+        self.backend.dispatch(form, [handler])
+        handler.handle.assert_called_once_with(form)
+
+    def test_submit(self):
+        """
+        Submitted handlers should be run in a worker thread
+        """
+        handler = Mock(pk=1)
+        submission = Submission.from_form(self.form)
+        with patch.object(Submission, 'build_form', return_value=self.form):
+            self.backend.submit(submission, [handler])
+            self.backend.join()
+        handler.handle.assert_called_once_with(self.form)
+        self.assertFalse(default_storage.exists(self.get_staged_path(submission)))
+
+    def test_run(self):
+        """
+        The run method should call each handler and return the status of each
+        """
+        statuses = self.backend.run(Submission.from_form(self.form), [self.handler])
+        self.assertEqual(statuses, {self.handler.pk: 'succeeded'})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body, 'Title: Some title')
+        attachment = mail.outbox[0].attachments[0]
+        self.assertEqual(attachment.get_filename(), 'test.txt')
+        self.assertEqual(attachment.get_payload(decode=True), b'file content')
+
+    def test_run_sends_messages_together(self):
+        """
+        Messages from email handlers should be sent in a single call
+        """
+        other_handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        with patch.object(self.backend, 'send_messages', return_value=[None, None]) as patched_method:
+            statuses = self.backend.run(Submission.from_form(self.form), [self.handler, other_handler])
+        self.assertEqual(statuses, {self.handler.pk: 'succeeded', other_handler.pk: 'succeeded'})
+        patched_method.assert_called_once()
+        self.assertEqual(len(patched_method.call_args[0][0]), 2)
+
+    def test_run_keeps_handler_order(self):
+        """
+        Handlers should run in the configured order, with only consecutive email handlers sent together
+        """
+        email_handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        other_handler = Mock()
+        other_handler.handle.side_effect = lambda form: self.assertEqual(len(mail.outbox), 1)
+        statuses = self.backend.run(Submission.from_form(self.form), [self.handler, other_handler, email_handler])
+        self.assertEqual(set(statuses.values()), {'succeeded'})
+        other_handler.handle.assert_called_once()
+        self.assertEqual(len(mail.outbox), 2)
+
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_mail_connection_reused(self, get_connection):
+        """
+        The mail connection should be opened once and reused for each submission
+        """
+        self.backend.run(Submission.from_form(self.form), [self.handler])
+        self.backend.run(Submission.from_form(self.get_form()), [self.handler])
+        get_connection.assert_called_once_with()
+        get_connection.return_value.open.assert_called_once_with()
+        self.assertEqual(get_connection.return_value.send_messages.call_count, 2)
+        get_connection.return_value.close.assert_not_called()
+
+    @patch('omniforms.dispatch.logger')
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_mail_connection_reopened_after_failure(self, get_connection, patched_logger):
+        """
+        The mail connection should be closed and reopened if sending fails
+        """
+        get_connection.return_value.send_messages.side_effect = [Exception('Failed'), 1]
+        submission = Submission.from_form(self.form)
+        with patch.object(self.backend, 'schedule_retry'):
+            self.assertEqual(self.backend.run(submission, [self.handler]), {self.handler.pk: 'retrying'})
+        self.assertEqual(self.backend.run(submission, [self.handler], attempt=2), {self.handler.pk: 'succeeded'})
+        get_connection.return_value.close.assert_called_once_with()
+        self.assertEqual(get_connection.call_count, 2)
+
+    @patch('omniforms.dispatch.logger')
+    @override_settings(OMNI_FORMS_HANDLER_MAX_ATTEMPTS=2)
+    def test_run_send_failure(self, patched_logger):
+        """
+        Email handlers should be marked as failed if their messages cannot be sent
+        """
+        with patch.object(self.backend, 'send_messages', return_value=['Traceback']):
+            statuses = self.backend.run(Submission.from_form(self.form), [self.handler], attempt=2)
+        self.assertEqual(statuses, {self.handler.pk: 'failed'})
+
+    @patch('omniforms.dispatch.logger')
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_run_retries_undelivered_messages(self, get_connection, patched_logger):
+        """
+        Only the email handlers whose messages could not be sent should be retried
+        """
+        other_handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        get_connection.return_value.send_messages.side_effect = [1, Exception('Failed')]
+        submission = Submission.from_form(self.form)
+        with patch.object(self.backend, 'schedule_retry') as patched_method:
+            statuses = self.backend.run(submission, [self.handler, other_handler])
+        self.assertEqual(statuses, {self.handler.pk: 'succeeded', other_handler.pk: 'retrying'})
+        patched_method.assert_called_once_with(submission, [other_handler], 1)
+
+    def test_run_calls_overridden_handle(self):
+        """
+        Email handlers that override the handle method should be run rather than having their messages batched
+        """
+        form = self.get_form()
+        with patch.object(Submission, 'build_form', return_value=form), \
+                patch.object(OmniFormEmailHandler, 'handle', custom_handle):
+            statuses = self.backend.run(Submission.from_form(self.form), [self.handler])
+        self.assertEqual(statuses, {self.handler.pk: 'succeeded'})
+        self.assertTrue(form.custom_handler_called)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @patch('omniforms.dispatch.logger')
+    def test_run_schedules_retry(self, patched_logger):
+        """
+        Failed handlers should be scheduled to be retried, and staged files kept until they have run
+        """
+        handler_1 = Mock(pk=1)
+        handler_1.handle.side_effect = Exception('Failed')
+        handler_2 = Mock(pk=2)
+        submission = Submission.from_form(self.form)
+        with patch.object(self.backend, 'schedule_retry') as patched_method:
+            statuses = self.backend.run(submission, [handler_1, handler_2])
+        self.assertEqual(statuses, {1: 'retrying', 2: 'succeeded'})
+        patched_method.assert_called_once_with(submission, [handler_1], 1)
+        self.assertTrue(default_storage.exists(self.get_staged_path(submission)))
+
+    @override_settings(OMNI_FORMS_HANDLER_RETRY_DELAY=60)
+    @patch('omniforms.dispatch.threading.Timer')
+    def test_schedule_retry(self, patched_class):
+        """
+        Retries should be submitted by a timer once the retry delay has passed, rather than by the worker thread
+        """
+        handler = Mock(pk=1)
+        submission = Submission.from_form(self.form)
+        with patch.object(self.backend, 'submit') as patched_method:
+            self.backend.schedule_retry(submission, [handler], 1)
+            delay, retry = patched_class.call_args[0]
+            self.assertEqual(delay, 60)
+            patched_class.return_value.start.assert_called_once_with()
+            patched_method.assert_not_called()
+            retry()
+        patched_method.assert_called_once_with(submission, [handler], 2)
+
+    @patch('omniforms.dispatch.logger')
+    def test_retries_run_by_workers(self, patched_logger):
+        """
+        Failed handlers should be retried by the worker threads
+        """
+        handler = Mock(pk=1)
+        handler.handle.side_effect = [Exception('Failed'), None]
+        submission = Submission.from_form(self.form)
+        with patch.object(Submission, 'build_form', return_value=self.form):
+            self.backend.submit(submission, [handler])
+            self.backend.join()
+        self.assertEqual(handler.handle.call_count, 2)
+        self.assertFalse(default_storage.exists(self.get_staged_path(submission)))
+
+    @override_settings(OMNI_FORMS_HANDLER_MAX_ATTEMPTS=2)
+    @patch('omniforms.dispatch.logger')
+    def test_run_gives_up(self, patched_logger):
+        """
+        Handlers should be marked as failed once the maximum number of attempts has been reached
+        """
+        handler_1 = Mock(pk=1)
+        handler_1.handle.side_effect = Exception('Failed')
+        handler_2 = Mock(pk=2)
+        submission = Submission.from_form(self.form)
+        with patch.object(self.backend, 'schedule_retry') as patched_method:
+            statuses = self.backend.run(submission, [handler_1, handler_2], attempt=2)
+        self.assertEqual(statuses, {1: 'failed', 2: 'succeeded'})
+        patched_method.assert_not_called()
+        handler_1.handle.assert_called_once()
+        handler_2.handle.assert_called_once()
+        self.assertFalse(default_storage.exists(self.get_staged_path(submission)))
+
+
+class DatabaseQueueBackendTestCase(DispatchTestCaseMixin, TestCase):
+    """
+    Tests the DatabaseQueueBackend class
+    """
+    def setUp(self):
+        super(DatabaseQueueBackendTestCase, self).setUp()
+        self.backend = DatabaseQueueBackend()
+
+    def test_dispatch_creates_jobs(self):
+        """
+        A pending job should be created for each handler
+        """
+        other_handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        self.backend.dispatch(self.form, [self.handler, other_handler])
+        jobs = OmniFormHandlerJob.objects.all()
+        self.assertEqual([job.handler_id for job in jobs], [self.handler.pk, other_handler.pk])
+        self.assertEqual(len(set(job.submission_id for job in jobs)), 1)
+        for job in jobs:
+            self.assertEqual(job.status, OmniFormHandlerJob.STATUS_PENDING)
+            self.assertEqual(job.form, self.omni_form)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_process(self):
+        """
+        Pending jobs should be run and marked as succeeded
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        self.assertEqual(self.backend.process(), 1)
+        job = OmniFormHandlerJob.objects.get()
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body, 'Title: Some title')
+        self.assertFalse(default_storage.exists(self.get_staged_path(Submission.from_json(job.payload))))
+
+    @override_settings(OMNI_FORMS_HANDLER_RETRY_DELAY=60)
+    @patch('omniforms.dispatch.logger')
+    def test_process_failure_retries(self, patched_logger):
+        """
+        Failed jobs should be made available again after a delay
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        with patch('omniforms.dispatch.mail.get_connection') as get_connection:
+            get_connection.return_value.send_messages.side_effect = Exception('Failed')
+            self.backend.process()
+        job = OmniFormHandlerJob.objects.get()
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Failed', job.last_error)
+        self.assertGreater(job.available_at, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(self.backend.process(), 0)
+        self.assertTrue(default_storage.exists(self.get_staged_path(Submission.from_json(job.payload))))
+
+    @override_settings(OMNI_FORMS_HANDLER_MAX_ATTEMPTS=2)
+    @patch('omniforms.dispatch.logger')
+    def test_process_failure_gives_up(self, patched_logger):
+        """
+        Jobs should be marked as failed once the maximum number of attempts has been reached
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        with patch('omniforms.dispatch.mail.get_connection') as get_connection:
+            get_connection.return_value.send_messages.side_effect = Exception('Failed')
+            self.backend.process()
+            self.backend.process()
+        job = OmniFormHandlerJob.objects.get()
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertFalse(default_storage.exists(self.get_staged_path(Submission.from_json(job.payload))))
+
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_process_sends_messages_together(self, get_connection):
+        """
+        Messages for every email handler job in the batch should be sent over one connection
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        self.backend.dispatch(self.get_form(), [self.handler])
+        self.backend.process()
+        get_connection.assert_called_once_with()
+        self.assertEqual(get_connection.return_value.send_messages.call_count, 2)
+        self.assertEqual(
+            OmniFormHandlerJob.objects.filter(status=OmniFormHandlerJob.STATUS_SUCCEEDED).count(),
+            2
+        )
+
+    def test_process_keeps_handler_order(self):
+        """
+        Jobs should run in the configured order, with only consecutive email handler jobs sent together
+        """
+        save_handler = OmniFormSaveSubmissionHandlerFactory.create(form=self.omni_form)
+        email_handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        self.backend.dispatch(self.form, [self.handler, save_handler, email_handler])
+        with patch.object(OmniFormSaveSubmissionHandler, 'handle') as patched_method:
+            patched_method.side_effect = lambda form: self.assertEqual(len(mail.outbox), 1)
+            self.assertEqual(self.backend.process(), 3)
+        patched_method.assert_called_once()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            OmniFormHandlerJob.objects.filter(status=OmniFormHandlerJob.STATUS_SUCCEEDED).count(),
+            3
+        )
+
+    @patch('omniforms.dispatch.logger')
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_process_retries_undelivered_messages(self, get_connection, patched_logger):
+        """
+        Only the jobs whose messages could not be sent should be retried
+        """
+        other_handler = OmniFormEmailHandlerFactory.create(form=self.omni_form)
+        self.backend.dispatch(self.form, [self.handler, other_handler])
+        get_connection.return_value.send_messages.side_effect = [1, Exception('Failed')]
+        self.backend.process()
+        job = OmniFormHandlerJob.objects.get(handler=self.handler)
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_SUCCEEDED)
+        job = OmniFormHandlerJob.objects.get(handler=other_handler)
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_PENDING)
+        self.assertIn('Failed', job.last_error)
+
+    def test_reclaim_abandoned_jobs(self):
+        """
+        Running jobs that have not finished within the job timeout should be retried
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        OmniFormHandlerJob.objects.update(
+            status=OmniFormHandlerJob.STATUS_RUNNING,
+            modified=timezone.now() - timedelta(seconds=601)
+        )
+        with patch('omniforms.dispatch.logger'):
+            self.assertEqual(self.backend.process(), 1)
+        job = OmniFormHandlerJob.objects.get()
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(OMNI_FORMS_HANDLER_MAX_ATTEMPTS=1)
+    def test_reclaim_abandoned_jobs_gives_up(self):
+        """
+        Abandoned jobs should be marked as failed, and their staged files removed, once
+        the maximum number of attempts has been reached
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        OmniFormHandlerJob.objects.update(
+            status=OmniFormHandlerJob.STATUS_RUNNING,
+            modified=timezone.now() - timedelta(seconds=601)
+        )
+        with patch('omniforms.dispatch.logger'):
+            self.assertEqual(self.backend.reclaim_jobs(), 1)
+        job = OmniFormHandlerJob.objects.get()
+        self.assertEqual(job.status, OmniFormHandlerJob.STATUS_FAILED)
+        self.assertIn('did not finish', job.last_error)
+        self.assertFalse(default_storage.exists(self.get_staged_path(Submission.from_json(job.payload))))
+
+    def test_running_jobs_not_reclaimed(self):
+        """
+        Jobs should not be reclaimed before the job timeout has passed
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        self.backend._claim_jobs(1)
+        with override_settings(OMNI_FORMS_HANDLER_JOB_TIMEOUT=60):
+            self.assertEqual(self.backend.reclaim_jobs(), 0)
+        self.assertEqual(OmniFormHandlerJob.objects.get().status, OmniFormHandlerJob.STATUS_RUNNING)
+
+    def test_claimed_jobs_not_claimed_again(self):
+        """
+        Jobs claimed by another worker after they were read should not be claimed again
+        """
+        self.backend.dispatch(self.form, [self.handler, self.handler])
+        jobs = list(OmniFormHandlerJob.objects.all())
+        values_list = QuerySet.values_list
+
+        def read_before_other_worker(queryset, *args, **kwargs):
+            OmniFormHandlerJob.objects.filter(pk=jobs[1].pk).update(
+                status=OmniFormHandlerJob.STATUS_RUNNING,
+                claim_token='other'
+            )
+            return values_list(OmniFormHandlerJob.objects.all(), *args, **kwargs)
+
+        with patch.object(QuerySet, 'values_list', autospec=True, side_effect=read_before_other_worker):
+            claimed = self.backend._claim_jobs(10)
+        self.assertEqual([job.pk for job in claimed], [jobs[0].pk])
+        self.assertEqual(OmniFormHandlerJob.objects.get(pk=jobs[1].pk).claim_token, 'other')
+
+    def test_process_limit(self):
+        """
+        No more than 'limit' jobs should be processed
+        """
+        self.backend.dispatch(self.form, [self.handler, self.handler])
+        self.assertEqual(self.backend.process(limit=1), 1)
+        self.assertEqual(OmniFormHandlerJob.objects.filter(status=OmniFormHandlerJob.STATUS_PENDING).count(), 1)
+
+    def test_management_command(self):
+        """
+        The management command should process all pending jobs
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        self.backend.dispatch(self.get_form(), [self.handler])
+        stdout = StringIO()
+        call_command('omniforms_process_handler_jobs', batch_size=1, stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), 'Processed 2 job(s)')
+        self.assertEqual(len(mail.outbox), 2)
+
+    @patch('omniforms.dispatch.mail.get_connection')
+    def test_management_command_closes_mail_connection(self, get_connection):
+        """
+        The management command should close the mail connection once it has finished
+        """
+        self.backend.dispatch(self.form, [self.handler])
+        call_command('omniforms_process_handler_jobs', stdout=StringIO())
+        get_connection.return_value.close.assert_called_once_with()
+
+
+class GetHandlerBackendTestCase(TestCase):
+    """
+    Tests the get_handler_backend function
+    """
+    def test_uses_setting(self):
+        """
+        The backend should be created from the OMNI_FORMS_HANDLER_BACKEND setting
+        """
+        with override_settings(OMNI_FORMS_HANDLER_BACKEND='omniforms.dispatch.DatabaseQueueBackend'):
+            self.assertIsInstance(get_handler_backend(), DatabaseQueueBackend)
+        self.assertIsInstance(get_handler_backend(), SynchronousBackend)
+
+    def test_memoized(self):
+        """
+        The same backend instance should be returned on each call
+        """
+        self.assertIs(get_handler_backend(), get_handler_backend())
+
+    @override_settings(OMNI_FORMS_HANDLER_BACKEND='omniforms.dispatch.DatabaseQueueBackend')
+    def test_form_handle_uses_backend(self):
+        """
+        The forms handle method should dispatch handlers through the configured backend
+        """
+        omni_form = OmniFormFactory.create()
+        OmniCharFieldFactory.create(form=omni_form, name='title')
+        handler = OmniFormEmailHandlerFactory.create(form=omni_form)
+        form = omni_form.get_form_class()(data={'title': 'Some title'})
+        self.assertTrue(form.is_valid())
+        form.handle()
+        self.assertEqual(OmniFormHandlerJob.objects.get().handler_id, handler.pk)
+        self.assertEqual(len(mail.outbox), 0)
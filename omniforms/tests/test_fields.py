@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms fields module
+"""
+from __future__ import unicode_literals
+from django import forms
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+from omniforms.fields import ModelChoiceField, ModelMultipleChoiceField
+
+
+class ModelChoiceFieldTestCase(TestCase):
+    """
+    Tests the ModelChoiceField form field
+    """
+    def test_no_limit(self):
+        """
+        All choices should be rendered if no limit is given
+        """
+        field = ModelChoiceField(queryset=Permission.objects.all())
+        self.assertEqual(len(list(field.choices)), Permission.objects.count() + 1)
+        self.assertEqual(len(field.choices), Permission.objects.count() + 1)
+
+    def test_choice_limit(self):
+        """
+        At most 'choice_limit' choices should be rendered
+        """
+        field = ModelChoiceField(queryset=Permission.objects.order_by('pk'), choice_limit=3)
+        permissions = list(Permission.objects.order_by('pk')[:3])
+        self.assertEqual(
+            [choice[0] for choice in field.choices],
+            [''] + [permission.pk for permission in permissions]
+        )
+        self.assertEqual(len(field.choices), 4)
+
+    def test_validates_against_full_queryset(self):
+        """
+        Values beyond the choice limit should still be valid
+        """
+        permission = Permission.objects.order_by('pk').last()
+        field = ModelChoiceField(queryset=Permission.objects.order_by('pk'), choice_limit=1)
+        self.assertEqual(field.clean(permission.pk), permission)
+
+    def test_renders_bound_value(self):
+        """
+        The bound value should be rendered even if it is beyond the choice limit
+        """
+        permission = Permission.objects.order_by('pk').last()
+        form_class = type(str('TestForm'), (forms.Form,), {
+            'permission': ModelChoiceField(queryset=Permission.objects.order_by('pk'), choice_limit=1)
+        })
+        html = str(form_class(data={'permission': permission.pk})['permission'])
+        self.assertIn('<option value="{0}" selected>'.format(permission.pk), html)
+        self.assertEqual(html.count('<option'), 3)
+
+    def test_renders_initial_value(self):
+        """
+        The initial value should be rendered even if it is beyond the choice limit
+        """
+        permission = Permission.objects.order_by('pk').last()
+        form_class = type(str('TestForm'), (forms.Form,), {
+            'permission': ModelChoiceField(
+                queryset=Permission.objects.order_by('pk'),
+                choice_limit=1,
+                widget=forms.RadioSelect
+            )
+        })
+        bound_field = form_class(initial={'permission': permission})['permission']
+        self.assertEqual(
+            [subwidget.data['value'] for subwidget in bound_field],
+            ['', Permission.objects.order_by('pk').first().pk, permission.pk]
+        )
+        self.assertTrue(bound_field[2].data['selected'])
+
+    def test_selected_choices_length(self):
+        """
+        Selected values beyond the choice limit should be counted
+        """
+        permission = Permission.objects.order_by('pk').last()
+        field = ModelChoiceField(queryset=Permission.objects.order_by('pk'), choice_limit=1)
+        self.assertEqual(len(field.iterator(field, selected=[str(permission.pk)])), 3)
+        self.assertEqual(len(field.iterator(field, selected=['invalid'])), 2)
+
+
+class ModelMultipleChoiceFieldTestCase(TestCase):
+    """
+    Tests the ModelMultipleChoiceField form field
+    """
+    def test_choice_limit(self):
+        """
+        At most 'choice_limit' choices should be rendered
+        """
+        field = ModelMultipleChoiceField(queryset=Permission.objects.all(), choice_limit=2)
+        self.assertEqual(len(list(field.choices)), 2)
+
+    def test_renders_bound_values(self):
+        """
+        Bound values should be rendered even if they are beyond the choice limit
+        """
+        permissions = list(Permission.objects.order_by('-pk')[:2])
+        form_class = type(str('TestForm'), (forms.Form,), {
+            'permissions': ModelMultipleChoiceField(queryset=Permission.objects.order_by('pk'), choice_limit=1)
+        })
+        html = str(form_class(data={'permissions': [p.pk for p in permissions]})['permissions'])
+        for permission in permissions:
+            self.assertIn('<option value="{0}" selected>'.format(permission.pk), html)
+        self.assertEqual(html.count('<option'), 3)
+
+    def test_validates_with_single_query(self):
+        """
+        Values should be validated with a single query regardless of the choice limit
+        """
+        permissions = list(Permission.objects.order_by('-pk')[:3])
+        field = ModelMultipleChoiceField(queryset=Permission.objects.all(), choice_limit=1)
+        with self.assertNumQueries(1):
+            self.assertEqual(set(field.clean([p.pk for p in permissions])), set(permissions))
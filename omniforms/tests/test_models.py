@@ -10,13 +10,18 @@ from django.contrib.contenttypes.models import ContentType
 from django.core import mail
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.exceptions import ImproperlyConfigured, ValidationError
-from django.core.urlresolvers import reverse
+from django.core.urlresolvers import NoReverseMatch, reverse
 from django.db import models, IntegrityError
+from django.db import connection
 from django.db.models.deletion import ProtectedError
 from django.test import TestCase, override_settings
+from django.template import Template
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.module_loading import import_string
 from mock import Mock, patch, PropertyMock
+from omniforms.attachments import Attachment
+from omniforms.cache import choices_cache
 from omniforms.forms import OmniFormBaseForm, OmniModelFormBaseForm, EmailConfirmationHandlerBaseFormClass
 from omniforms.models import (
     OmniFormBase,
@@ -47,8 +52,12 @@ from omniforms.models import (
     OmniFormEmailHandler,
     OmniFormEmailConfirmationHandler,
     OmniFormSaveInstanceHandler,
-    TemplateHelpTextLazy
+    OmniFormSaveSubmissionHandler,
+    OmniFormSubmission,
+    TemplateHelpTextLazy,
+    parse_choices
 )
+from omniforms.submissions import submission_buffer
 from omniforms.tests.factories import (
     DummyModelFactory,
     OmniFormFactory,
@@ -59,10 +68,12 @@ from omniforms.tests.factories import (
 )
 from omniforms.tests.models import TaggableManagerField, DummyModel2
 from omniforms.tests.utils import OmniModelFormTestCaseStub
+from omniforms.widgets import AutocompleteSelect
 from taggit_autosuggest.managers import TaggableManager
 from unittest import skipUnless
 
 import django
+import json
 import os
 
 
@@ -187,6 +198,75 @@ class OmniFormTestCase(OmniModelFormTestCaseStub):
         self.assertIn('title', used_field_names)
         self.assertIn('agree', used_field_names)
 
+    def test_used_field_names_frozenset(self):
+        """
+        The used_field_names property should return a frozenset
+        """
+        self.assertEqual(self.omniform.used_field_names, frozenset(['title', 'agree']))
+
+    def test_ordered_field_names(self):
+        """
+        The ordered_field_names property should return field names in field order
+        """
+        self.assertEqual(
+            self.omniform.ordered_field_names,
+            tuple(self.omniform.fields.values_list('name', flat=True))
+        )
+
+    def test_used_field_names_memoized(self):
+        """
+        Field names should only be queried once per instance
+        """
+        self.omniform.used_field_names
+        with self.assertNumQueries(0):
+            self.omniform.used_field_names
+            self.omniform.ordered_field_names
+
+    def test_used_field_names_refreshed_on_field_change(self):
+        """
+        Memoized field names should be refreshed when a field belonging to the form is saved or deleted
+        """
+        self.assertNotIn('extra', self.omniform.used_field_names)
+        field = OmniCharField.objects.create(
+            name='extra',
+            label='Extra',
+            widget_class='django.forms.widgets.TextInput',
+            form=self.omniform
+        )
+        self.assertIn('extra', self.omniform.used_field_names)
+        field.delete()
+        self.assertNotIn('extra', self.omniform.used_field_names)
+
+    def test_used_field_names_refreshed_from_db(self):
+        """
+        Memoized field names should be discarded when the instance is refreshed from the database
+        """
+        self.omniform.used_field_names
+        self.omniform.refresh_from_db()
+        self.assertNotIn('_field_names_cache', self.omniform.__dict__)
+
+    def test_build_form_class_num_queries(self):
+        """
+        The number of queries required to build the form class should not depend on the number of fields
+        """
+        with CaptureQueriesContext(connection) as context:
+            self.omniform.build_form_class()
+        num_queries = len(context.captured_queries)
+
+        for index in range(10):
+            OmniCharField.objects.create(
+                name='char_field_{0}'.format(index),
+                label='Char field',
+                widget_class='django.forms.widgets.TextInput',
+                form=self.omniform
+            )
+            OmniFormEmailHandlerFactory.create(form=self.omniform)
+
+        with self.assertNumQueries(num_queries):
+            form_class = self.omniform.build_form_class()
+        self.assertEqual(len(form_class.base_fields), 12)
+        self.assertEqual(len(form_class._handlers), 12)
+
     def test_get_fields(self):
         """
         The method should return the correct fields as a dict
@@ -263,7 +343,7 @@ class OmniModelFormTestCase(TestCase):
         form_class = self.omniform.get_form_class()
         self.assertTrue(issubclass(form_class, OmniModelFormBaseForm))
 
-    @patch('omniforms.models.OmniModelForm.used_field_names',
+    @patch('omniforms.models.OmniModelForm.ordered_field_names',
            PropertyMock(return_value=['foo', 'bar', 'baz']))
     @patch('omniforms.models.OmniModelForm._get_base_form_class')
     @patch('omniforms.models.modelform_factory')
@@ -323,6 +403,26 @@ class OmniModelFormTestCase(TestCase):
         self.assertIn(('some_url', 'some url'), choices)
         self.assertNotIn(('id', 'ID'), choices)
 
+    def test_model_introspection_reused(self):
+        """
+        Model fields should only be introspected once for the content type
+        """
+        self.omniform.get_model_fields()
+        model_class = self.omniform.content_type.model_class()
+        with patch.object(model_class._meta, 'get_fields') as get_fields:
+            self.omniform.get_model_fields()
+            self.omniform.get_model_field_names()
+            self.omniform.get_required_fields()
+            self.omniform.get_required_field_names(exclude_with_default=False)
+        self.assertFalse(get_fields.called)
+
+    def test_get_model_field_choices_num_queries(self):
+        """
+        The get_model_field_choices method should query the used field names at most once
+        """
+        with self.assertNumQueries(1):
+            self.omniform.get_model_field_choices()
+
     @patch('omniforms.models.OmniModelForm.used_field_names',
            PropertyMock(return_value=['title', 'agree']))
     def test_get_model_field_choices_omits_used_fields(self):
@@ -342,10 +442,12 @@ class OmniModelFormTestCase(TestCase):
         self.assertNotIn(('title', 'title'), choices)
         self.assertNotIn(('agree', 'agree'), choices)
 
-    @patch('omniforms.models.OmniFormEmailHandler.handle')
-    def test_form_handle_method_calls_handlers(self, patched_method):
+    @patch('omniforms.dispatch.mail.get_connection')
+    @patch('omniforms.models.OmniFormEmailHandler.get_message')
+    def test_form_handle_method_calls_handlers(self, patched_method, get_connection):
         """
-        The forms 'handle' method should call each handler in turn
+        The forms 'handle' method should build a message from each email handler
+        in turn and send them all over a single mail connection
         """
         form_class = self.omniform.get_form_class()
         form = form_class({})
@@ -353,11 +455,15 @@ class OmniModelFormTestCase(TestCase):
         form.handle()
         self.assertEqual(patched_method.call_count, 2)
         patched_method.assert_any_call(form)
+        get_connection.assert_called_once_with()
+        get_connection.return_value.send_messages.assert_called_once_with([patched_method.return_value] * 2)
 
-    @patch('omniforms.models.OmniFormEmailHandler.handle')
-    def test_form_save_calls_handlers(self, patched_method):
+    @patch('omniforms.dispatch.mail.get_connection')
+    @patch('omniforms.models.OmniFormEmailHandler.get_message')
+    def test_form_save_calls_handlers(self, patched_method, get_connection):
         """
-        The forms 'handle' method should call each handler in turn
+        The forms 'save' method should build a message from each email handler
+        in turn and send them all over a single mail connection
         """
         form_class = self.omniform.get_form_class()
         form = form_class({})
@@ -365,6 +471,8 @@ class OmniModelFormTestCase(TestCase):
         form.save()
         self.assertEqual(patched_method.call_count, 2)
         patched_method.assert_any_call(form)
+        get_connection.assert_called_once_with()
+        get_connection.return_value.send_messages.assert_called_once_with([patched_method.return_value] * 2)
 
     def test_get_required_fields(self):
         """
@@ -478,6 +586,53 @@ class OmniModelFormTestCase(TestCase):
         self.assertIn('title', used_field_names)
         self.assertIn('agree', used_field_names)
 
+    def test_used_field_names_frozenset(self):
+        """
+        The used_field_names property should return a frozenset
+        """
+        self.assertEqual(self.omniform.used_field_names, frozenset(['title', 'agree']))
+
+    def test_ordered_field_names(self):
+        """
+        The ordered_field_names property should return field names in field order
+        """
+        self.assertEqual(
+            self.omniform.ordered_field_names,
+            tuple(self.omniform.fields.values_list('name', flat=True))
+        )
+
+    def test_used_field_names_memoized(self):
+        """
+        Field names should only be queried once per instance
+        """
+        self.omniform.used_field_names
+        with self.assertNumQueries(0):
+            self.omniform.used_field_names
+            self.omniform.ordered_field_names
+
+    def test_used_field_names_refreshed_on_field_change(self):
+        """
+        Memoized field names should be refreshed when a field belonging to the form is saved or deleted
+        """
+        self.assertNotIn('extra', self.omniform.used_field_names)
+        field = OmniCharField.objects.create(
+            name='extra',
+            label='Extra',
+            widget_class='django.forms.widgets.TextInput',
+            form=self.omniform
+        )
+        self.assertIn('extra', self.omniform.used_field_names)
+        field.delete()
+        self.assertNotIn('extra', self.omniform.used_field_names)
+
+    def test_used_field_names_refreshed_from_db(self):
+        """
+        Memoized field names should be discarded when the instance is refreshed from the database
+        """
+        self.omniform.used_field_names
+        self.omniform.refresh_from_db()
+        self.assertNotIn('_field_names_cache', self.omniform.__dict__)
+
     def test_get_model_fields(self):
         """
         The get_model_fields method of the form should return appropriate model fields
@@ -705,6 +860,89 @@ class OmniFieldTestCase(TestCase):
             OmniManyToManyField
         )
 
+    def test_get_concrete_class_for_model_field_subclass(self):
+        """
+        Model field subclasses should be resolved using the closest mapped class in their MRO
+        """
+        class CustomCharField(models.CharField):
+            pass
+
+        class CustomEmailField(models.EmailField):
+            pass
+
+        self.assertEqual(OmniField.get_concrete_class_for_model_field(CustomCharField()), OmniCharField)
+        self.assertEqual(OmniField.get_concrete_class_for_model_field(CustomEmailField()), OmniEmailField)
+        self.assertEqual(OmniField.get_concrete_class_for_model_field(models.OneToOneField(DummyModel2)),
+                         OmniForeignKeyField)
+        self.assertIsNone(OmniField.get_concrete_class_for_model_field(models.AutoField()))
+
+    def test_get_concrete_class_for_model_field_parent_links(self):
+        """
+        Parent links and auto created one to one fields should not be represented
+        """
+        self.assertIsNone(
+            OmniField.get_concrete_class_for_model_field(TaggableManagerField._meta.get_field('omnifield_ptr'))
+        )
+        self.assertIsNone(
+            OmniField.get_concrete_class_for_model_field(models.OneToOneField(DummyModel2, parent_link=True))
+        )
+
+    def test_get_concrete_class_for_model_field_mapping_unchanged(self):
+        """
+        Classes resolved through the MRO should not be stored in the shared field mapping
+        """
+        class CustomCharField(models.CharField):
+            pass
+
+        field_mapping = dict(OmniField.get_field_mapping())
+        self.assertEqual(OmniField.get_concrete_class_for_model_field(CustomCharField()), OmniCharField)
+        self.assertIsNone(OmniField.get_concrete_class_for_model_field(models.AutoField()))
+        self.assertEqual(OmniField.get_field_mapping(), field_mapping)
+        self.assertEqual(OmniField._concrete_classes[CustomCharField], OmniCharField)
+
+    def test_clear_field_mapping_clears_concrete_classes(self):
+        """
+        Resolved classes should be discarded along with the field mapping
+        """
+        class CustomCharField(models.CharField):
+            pass
+
+        OmniField.get_concrete_class_for_model_field(CustomCharField())
+        OmniField.clear_field_mapping()
+        self.assertNotIn(CustomCharField, OmniField._concrete_classes)
+
+    def test_get_field_mapping_compiled_once(self):
+        """
+        The custom field mapping should only be imported once
+        """
+        OmniField.clear_field_mapping()
+        with patch.object(OmniField, 'get_custom_field_mapping', return_value={}) as patched_method:
+            OmniField.get_concrete_class_for_model_field(models.CharField())
+            OmniField.get_concrete_class_for_model_field(models.IntegerField())
+        self.assertEqual(patched_method.call_count, 1)
+        OmniField.clear_field_mapping()
+
+    @override_settings(OMNI_FORMS_CUSTOM_FIELD_MAPPING={
+        'taggit_autosuggest.managers.TaggableManager': 'omniforms.tests.models.TaggableManagerField',
+        'django.db.models.CharField': 'omniforms.models.OmniEmailField'
+    })
+    def test_get_concrete_class_for_model_field_custom_mapping(self):
+        """
+        The compiled field mapping should be refreshed when the custom field mapping setting changes
+        """
+        self.assertEqual(OmniField.get_concrete_class_for_model_field(TaggableManager()), TaggableManagerField)
+        self.assertEqual(OmniField.get_concrete_class_for_model_field(models.CharField()), OmniEmailField)
+
+    def test_get_concrete_class_for_model_field_custom_mapping_reset(self):
+        """
+        Custom field mappings should not persist once the setting has been reset
+        """
+        with self.settings(OMNI_FORMS_CUSTOM_FIELD_MAPPING={
+            'taggit_autosuggest.managers.TaggableManager': 'omniforms.tests.models.TaggableManagerField'
+        }):
+            self.assertEqual(OmniField.get_concrete_class_for_model_field(TaggableManager()), TaggableManagerField)
+        self.assertIsNone(OmniField.get_concrete_class_for_model_field(TaggableManager()))
+
     @override_settings(OMNI_FORMS_CUSTOM_FIELD_MAPPING={
         'taggit_autosuggest.managers.TaggableManager': 'omniforms.tests.models.TaggableManagerField'
     })
@@ -746,6 +984,37 @@ class OmniFieldTestCase(TestCase):
         """
         self.assertRaises(ImproperlyConfigured, OmniField.get_custom_field_mapping)
 
+    def test_get_widget_choices(self):
+        """
+        The get_widget_choices method should return choices for each of the permitted widgets
+        """
+        self.assertEqual(OmniCharField.get_widget_choices(), [
+            ('django.forms.widgets.TextInput', 'TextInput'),
+            ('django.forms.widgets.Textarea', 'Textarea'),
+            ('django.forms.widgets.PasswordInput', 'PasswordInput')
+        ])
+
+    def test_validate_import_paths(self):
+        """
+        The validate_import_paths method should not raise an exception for valid import paths
+        """
+        for model_class in OmniField.objects.get_concrete_models():
+            model_class.validate_import_paths()
+
+    @patch('omniforms.models.OmniCharField.FORM_WIDGETS', ('django.forms.widgets.FictionalInput',))
+    def test_validate_import_paths_invalid_widget(self):
+        """
+        The validate_import_paths method should raise an ImproperlyConfigured exception for invalid widgets
+        """
+        self.assertRaises(ImproperlyConfigured, OmniCharField.validate_import_paths)
+
+    @patch('omniforms.models.OmniCharField.FIELD_CLASS', 'django.forms.FictionalField')
+    def test_validate_import_paths_invalid_field_class(self):
+        """
+        The validate_import_paths method should raise an ImproperlyConfigured exception for invalid field classes
+        """
+        self.assertRaises(ImproperlyConfigured, OmniCharField.validate_import_paths)
+
     def test_field_name_unique_for_form(self):
         """
         The field name must be unique for the given form
@@ -843,6 +1112,49 @@ class OmniFieldInstanceTestCase(OmniModelFormTestCaseStub):
             assert base_instance.specific
             self.assertEqual(patched_method.call_count, 1)
 
+    def test_specific_queryset(self):
+        """
+        The specific queryset method should return specific instances in the original order
+        """
+        char_field = OmniCharField.objects.create(
+            name='char_field',
+            label='Char field',
+            widget_class='django.forms.widgets.TextInput',
+            order=-1,
+            form=self.omni_form
+        )
+        boolean_field = OmniBooleanField.objects.create(
+            name='boolean_field',
+            label='Boolean field',
+            widget_class='django.forms.widgets.CheckboxInput',
+            order=1,
+            form=self.omni_form
+        )
+        instances = list(self.omni_form.fields.specific())
+        self.assertEqual(instances, [char_field, self.field, boolean_field])
+        self.assertIsInstance(instances[0], OmniCharField)
+        self.assertIsInstance(instances[1], OmniFloatField)
+        self.assertIsInstance(instances[2], OmniBooleanField)
+        for instance in instances:
+            self.assertIs(instance.specific, instance)
+
+    def test_specific_queryset_num_queries(self):
+        """
+        The specific queryset method should use one query per concrete model class
+        """
+        for index in range(5):
+            OmniCharField.objects.create(
+                name='char_field_{0}'.format(index),
+                label='Char field',
+                widget_class='django.forms.widgets.TextInput',
+                form=self.omni_form
+            )
+        ContentType.objects.get_for_model(OmniCharField)
+        ContentType.objects.get_for_model(OmniFloatField)
+        with self.assertNumQueries(3):
+            instances = [instance.specific for instance in OmniField.objects.specific()]
+        self.assertEqual(len(instances), 6)
+
     def test_as_form_field(self):
         """
         The as_form_field method should return an instance of the correct field
@@ -1799,7 +2111,7 @@ class OmniManyToManyFieldTestCase(OmniModelFormTestCaseStub):
         """
         The model should define the correct field class
         """
-        self.assertEqual(OmniManyToManyField.FIELD_CLASS, 'django.forms.ModelMultipleChoiceField')
+        self.assertEqual(OmniManyToManyField.FIELD_CLASS, 'omniforms.fields.ModelMultipleChoiceField')
 
     def test_form_widgets(self):
         """
@@ -1807,6 +2119,7 @@ class OmniManyToManyFieldTestCase(OmniModelFormTestCaseStub):
         """
         self.assertIn('django.forms.SelectMultiple', OmniManyToManyField.FORM_WIDGETS)
         self.assertIn('django.forms.CheckboxSelectMultiple', OmniManyToManyField.FORM_WIDGETS)
+        self.assertIn('omniforms.widgets.AutocompleteSelectMultiple', OmniManyToManyField.FORM_WIDGETS)
 
     def test_related_type_field(self):
         """
@@ -1866,7 +2179,7 @@ class OmniForeignKeyFieldTestCase(OmniModelFormTestCaseStub):
         """
         The model should define the correct field class
         """
-        self.assertEqual(OmniForeignKeyField.FIELD_CLASS, 'django.forms.ModelChoiceField')
+        self.assertEqual(OmniForeignKeyField.FIELD_CLASS, 'omniforms.fields.ModelChoiceField')
 
     def test_form_widgets(self):
         """
@@ -1874,6 +2187,7 @@ class OmniForeignKeyFieldTestCase(OmniModelFormTestCaseStub):
         """
         self.assertIn('django.forms.Select', OmniForeignKeyField.FORM_WIDGETS)
         self.assertIn('django.forms.RadioSelect', OmniForeignKeyField.FORM_WIDGETS)
+        self.assertIn('omniforms.widgets.AutocompleteSelect', OmniForeignKeyField.FORM_WIDGETS)
 
     def test_related_type_field(self):
         """
@@ -1899,6 +2213,238 @@ class OmniForeignKeyFieldTestCase(OmniModelFormTestCaseStub):
         self.assertIsInstance(instance.widget, widget_class)
         self.assertEquals(list(instance.queryset), list(Permission.objects.all()))
 
+    def test_queryset_filter(self):
+        """
+        The queryset should be filtered using the lookups in the queryset filter
+        """
+        self.field.queryset_filter = '{"codename__startswith": "add_"}'
+        self.assertEqual(
+            list(self.field.as_form_field().queryset),
+            list(Permission.objects.filter(codename__startswith='add_'))
+        )
+
+    def test_queryset_ordering(self):
+        """
+        The queryset should be ordered using the queryset ordering
+        """
+        self.field.queryset_ordering = '-codename, pk'
+        self.assertEqual(
+            list(self.field.as_form_field().queryset),
+            list(Permission.objects.order_by('-codename', 'pk'))
+        )
+
+    def test_queryset_limit(self):
+        """
+        The queryset limit should limit the rendered choices but not the valid choices
+        """
+        self.field.queryset_limit = 2
+        instance = self.field.as_form_field()
+        permissions = list(Permission.objects.all())
+        self.assertEqual(len(list(instance.choices)), 3)
+        self.assertEqual(len(instance.choices), 3)
+        self.assertEqual(instance.clean(permissions[-1].pk), permissions[-1])
+
+    def test_validation_num_queries(self):
+        """
+        Validating a value should not depend on the number of available choices
+        """
+        permission = Permission.objects.last()
+        instance = self.field.as_form_field()
+        with self.assertNumQueries(1):
+            self.assertEqual(instance.clean(permission.pk), permission)
+
+    def test_get_search_query(self):
+        """
+        The search query should match instances where any of the search fields contain the term
+        """
+        self.field.search_fields = 'codename, name'
+        queryset = self.field.get_queryset().filter(self.field.get_search_query('omnifield'))
+        self.assertEqual(
+            list(queryset),
+            list(Permission.objects.filter(
+                models.Q(codename__icontains='omnifield') | models.Q(name__icontains='omnifield')
+            ))
+        )
+
+    def test_clean_valid(self):
+        """
+        The clean method should accept valid options
+        """
+        self.field.queryset_filter = '{"content_type__app_label": "omniforms"}'
+        self.field.queryset_ordering = 'codename'
+        self.field.search_fields = 'name,content_type__model'
+        self.field.clean()
+
+    def test_clean_invalid_json(self):
+        """
+        The clean method should reject filters that are not JSON objects
+        """
+        for value in ('{', '[1, 2]'):
+            self.field.queryset_filter = value
+            with self.assertRaises(ValidationError) as cm:
+                self.field.clean()
+            self.assertIn('queryset_filter', cm.exception.message_dict)
+
+    def test_clean_invalid_lookups(self):
+        """
+        The clean method should reject filters, orderings and search fields that are invalid for the related model
+        """
+        for name, value in (
+            ('queryset_filter', '{"missing": 1}'),
+            ('queryset_filter', '{"pk": "abc"}'),
+            ('queryset_ordering', 'missing'),
+            ('search_fields', 'missing'),
+        ):
+            field = OmniForeignKeyField(related_type=self.field.related_type, **{name: value})
+            with self.assertRaises(ValidationError) as cm:
+                field.clean()
+            self.assertIn(name, cm.exception.message_dict)
+
+    def test_autocomplete_widget(self):
+        """
+        Autocomplete widgets should be given the URL of the autocomplete endpoint
+        """
+        self.field.widget_class = 'omniforms.widgets.AutocompleteSelect'
+        self.assertTrue(self.field.uses_autocomplete_widget())
+        widget = self.field.as_form_field().widget
+        self.assertIsInstance(widget, AutocompleteSelect)
+        self.assertEqual(widget.attrs['data-autocomplete-url'], self.field.get_autocomplete_url())
+        self.assertTrue(
+            widget.attrs['data-autocomplete-url'].startswith(
+                '{0}?token='.format(reverse('omniforms:autocomplete', args=[self.field.pk]))
+            )
+        )
+
+    def test_autocomplete_widget_without_urls(self):
+        """
+        The plain select widget should be used if the autocomplete endpoint cannot be reversed
+        """
+        self.field.widget_class = 'omniforms.widgets.AutocompleteSelect'
+        with patch('omniforms.models.reverse', side_effect=NoReverseMatch):
+            self.assertIsNone(self.field.get_autocomplete_url())
+            widget = self.field.as_form_field().widget
+        self.assertIs(type(widget), forms.Select)
+        self.assertNotIn('data-autocomplete-url', widget.attrs)
+
+    def test_uses_autocomplete_widget(self):
+        """
+        The uses_autocomplete_widget method should return False for other widgets
+        """
+        self.assertFalse(self.field.uses_autocomplete_widget())
+
+
+class ParseChoicesTestCase(TestCase):
+    """
+    Tests the parse_choices function
+    """
+    def test_one_choice_per_line(self):
+        """
+        Each non blank line should be used as both the value and label of a choice
+        """
+        self.assertEqual(parse_choices('foo\n\n   bar \r\n baz'), (('foo', 'foo'), ('bar', 'bar'), ('baz', 'baz')))
+
+    def test_value_label(self):
+        """
+        Lines should be split into a value and label on the first separator if values are separated
+        """
+        self.assertEqual(parse_choices(' a | A \nb|B|C', True), (('a', 'A'), ('b', 'B|C')))
+
+    def test_separator_ignored_by_default(self):
+        """
+        Lines containing the separator should be used as both the value and label by default
+        """
+        self.assertEqual(parse_choices(' a | A \nb'), (('a | A', 'a | A'), ('b', 'b')))
+
+    def test_empty(self):
+        """
+        An empty tuple should be returned if there are no choices
+        """
+        self.assertEqual(parse_choices(' \n'), ())
+
+
+class ChoiceFieldMixinTestCase(TestCase):
+    """
+    Tests the ChoiceFieldMixin class
+    """
+    def setUp(self):
+        super(ChoiceFieldMixinTestCase, self).setUp()
+        self.form = OmniForm.objects.create(title='Dummy form')
+        self.field = OmniChoiceField.objects.create(
+            name='choices',
+            label='choices',
+            widget_class='django.forms.widgets.Select',
+            choices='a|A\nb',
+            separate_values=True,
+            form=self.form
+        )
+
+    def tearDown(self):
+        super(ChoiceFieldMixinTestCase, self).tearDown()
+        choices_cache.clear()
+
+    def test_parsed_choices_field(self):
+        """
+        The model should have a non editable parsed_choices field
+        """
+        field = OmniChoiceField._meta.get_field('parsed_choices')
+        self.assertIsInstance(field, models.TextField)
+        self.assertFalse(field.editable)
+
+    def test_parses_choices_on_save(self):
+        """
+        The parsed choices should be stored when the field is saved
+        """
+        self.assertEqual(
+            json.loads(OmniChoiceField.objects.get(pk=self.field.pk).parsed_choices),
+            [['a', 'A'], ['b', 'b']]
+        )
+        self.field.choices = 'c'
+        self.field.save()
+        self.assertEqual(json.loads(OmniChoiceField.objects.get(pk=self.field.pk).parsed_choices), [['c', 'c']])
+
+    def test_choices_shared(self):
+        """
+        Form fields built from the same stored choices should share the same choice tuples
+        """
+        with patch('omniforms.models.parse_choices') as parse:
+            field_1 = OmniChoiceField.objects.get(pk=self.field.pk).as_form_field()
+            field_2 = OmniChoiceField.objects.get(pk=self.field.pk).as_form_field()
+        parse.assert_not_called()
+        self.assertEqual(field_1.choices, [('a', 'A'), ('b', 'b')])
+        for choice_1, choice_2 in zip(field_1.choices, field_2.choices):
+            self.assertIs(choice_1, choice_2)
+
+    def test_choices_updated(self):
+        """
+        Updated choices should be used once the field has been saved
+        """
+        OmniChoiceField.objects.get(pk=self.field.pk).as_form_field()
+        self.field.choices = 'c'
+        self.field.save()
+        self.assertEqual(OmniChoiceField.objects.get(pk=self.field.pk).as_form_field().choices, [('c', 'c')])
+
+    def test_separate_values_field(self):
+        """
+        Values should only be separated from labels if the field opts in
+        """
+        field = OmniChoiceField._meta.get_field('separate_values')
+        self.assertIsInstance(field, models.BooleanField)
+        self.assertFalse(field.default)
+        self.field.separate_values = False
+        self.field.save()
+        self.assertEqual(
+            OmniChoiceField.objects.get(pk=self.field.pk).as_form_field().choices,
+            [('a|A', 'a|A'), ('b', 'b')]
+        )
+
+    def test_unparsed_choices(self):
+        """
+        Choices should be parsed when building the form field if they have not been stored
+        """
+        OmniChoiceField.objects.filter(pk=self.field.pk).update(parsed_choices='')
+        field = OmniChoiceField.objects.get(pk=self.field.pk).as_form_field()
+        self.assertEqual(field.choices, [('a', 'A'), ('b', 'b')])
+
 
 class OmniChoiceFieldTestCase(TestCase):
     """
@@ -1953,9 +2499,28 @@ class OmniChoiceFieldTestCase(TestCase):
         field = instance.as_form_field()
 
         self.assertEqual(3, len(field.choices))
-        self.assertIn(['foo', 'foo'], field.choices)
-        self.assertIn(['bar', 'bar'], field.choices)
-        self.assertIn(['baz', 'baz'], field.choices)
+        self.assertIn(('foo', 'foo'), field.choices)
+        self.assertIn(('bar', 'bar'), field.choices)
+        self.assertIn(('baz', 'baz'), field.choices)
+
+    def test_as_form_field_value_label_choices(self):
+        """
+        Choices entered as value|label should be split into a value and a label
+        """
+        form = OmniForm.objects.create(title='Dummy form')
+        instance = OmniChoiceField.objects.create(
+            name='choices',
+            label='choices',
+            widget_class='django.forms.widgets.Select',
+            choices='gb | United Kingdom\nfr|France|Metropolitan\n|None',
+            separate_values=True,
+            form=form
+        )
+        field = instance.as_form_field()
+        self.assertEqual(
+            list(field.choices),
+            [('gb', 'United Kingdom'), ('fr', 'France|Metropolitan'), ('', 'None')]
+        )
 
 
 class OmniMultipleChoiceFieldTestCase(TestCase):
@@ -2011,9 +2576,28 @@ class OmniMultipleChoiceFieldTestCase(TestCase):
         field = instance.as_form_field()
 
         self.assertEqual(3, len(field.choices))
-        self.assertIn(['foo', 'foo'], field.choices)
-        self.assertIn(['bar', 'bar'], field.choices)
-        self.assertIn(['baz', 'baz'], field.choices)
+        self.assertIn(('foo', 'foo'), field.choices)
+        self.assertIn(('bar', 'bar'), field.choices)
+        self.assertIn(('baz', 'baz'), field.choices)
+
+    def test_as_form_field_value_label_choices(self):
+        """
+        Choices entered as value|label should be split into a value and a label
+        """
+        form = OmniForm.objects.create(title='Dummy form')
+        instance = OmniMultipleChoiceField.objects.create(
+            name='choices',
+            label='choices',
+            widget_class='django.forms.widgets.SelectMultiple',
+            choices='gb | United Kingdom\nfr|France|Metropolitan\n|None',
+            separate_values=True,
+            form=form
+        )
+        field = instance.as_form_field()
+        self.assertEqual(
+            list(field.choices),
+            [('gb', 'United Kingdom'), ('fr', 'France|Metropolitan'), ('', 'None')]
+        )
 
 
 class OmniFormHandlerTestCase(TestCase):
@@ -2267,6 +2851,50 @@ class OmniFormEmailHandlerTestCase(TestCase):
         instance = OmniFormEmailHandler(template='Hello {{ user }}')
         self.assertEqual('Hello Bob', instance._render_template({'user': 'Bob'}))
 
+    def test_render_template_cached(self):
+        """
+        The compiled template should be reused for each render
+        """
+        instance = OmniFormEmailHandlerFactory.create(template='Hello {{ user }}')
+        with patch('omniforms.cache.Template', wraps=Template) as patched_class:
+            self.assertEqual('Hello Bob', instance._render_template({'user': 'Bob'}))
+            self.assertEqual('Hello Jane', instance._render_template({'user': 'Jane'}))
+        self.assertEqual(patched_class.call_count, 1)
+
+    def test_render_template_recompiled_on_change(self):
+        """
+        Changing the template should cause the template to be recompiled
+        """
+        instance = OmniFormEmailHandlerFactory.create(template='Hello {{ user }}')
+        instance._render_template({'user': 'Bob'})
+        instance.template = 'Goodbye {{ user }}'
+        self.assertEqual('Goodbye Bob', instance._render_template({'user': 'Bob'}))
+
+    def test_save_invalidates_template_cache(self):
+        """
+        Saving the handler should discard its compiled templates
+        """
+        instance = OmniFormEmailHandlerFactory.create(template='Hello {{ user }}')
+        instance._render_template({'user': 'Bob'})
+        with patch('omniforms.signals.template_cache.invalidate') as patched_method:
+            instance.save()
+        patched_method.assert_called_once_with(instance.pk)
+
+    def test_clean_invalid_template(self):
+        """
+        The clean method should raise a ValidationError if the template cannot be compiled
+        """
+        instance = OmniFormEmailHandler(template='Hello {% if user %}')
+        with self.assertRaises(ValidationError) as context:
+            instance.clean()
+        self.assertIn('template', context.exception.message_dict)
+
+    def test_clean_valid_template(self):
+        """
+        The clean method should not raise an exception for valid templates
+        """
+        OmniFormEmailHandler(template='Hello {{ user }}').clean()
+
     @override_settings(DEFAULT_FROM_EMAIL='administrator@example.com')
     @patch('omniforms.models.EmailMessage.__init__')
     @patch('omniforms.models.EmailMessage.send')
@@ -2291,14 +2919,21 @@ class OmniFormEmailHandlerTestCase(TestCase):
         )
         send.assert_called_with()
 
-    @patch('omniforms.models.EmailMessage.attach')
-    @patch('django.core.files.uploadedfile.InMemoryUploadedFile.read', Mock(return_value='Content'))
-    def test_attaches_files(self, patched_method):
+    def _get_uploaded_files(self):
         """
-        Uploaded files should be attached to the email
+        Creates uploaded pdf and gif files
+
+        :return: Tuple of uploaded file instances
         """
         pdf = InMemoryUploadedFile(self.pdf_file, None, 'test.pdf', 'application/pdf', 1024, None)
         gif = InMemoryUploadedFile(self.image_file, None, 'test.gif', 'image/gif', 1024, None)
+        return pdf, gif
+
+    def test_attaches_files(self):
+        """
+        Uploaded files should be attached to the email
+        """
+        pdf, gif = self._get_uploaded_files()
         form = Mock(attributes=['cleaned_data'])
         form.cleaned_data = {'user': 'Bob', 'pdf': pdf, 'gif': gif}
         instance = OmniFormEmailHandler(
@@ -2307,8 +2942,57 @@ class OmniFormEmailHandlerTestCase(TestCase):
             subject='This is a test'
         )
         instance.handle(form)
-        patched_method.assert_any_call('test.pdf', 'Content', 'application/pdf')
-        patched_method.assert_any_call('test.gif', 'Content', 'image/gif')
+        attachments = {part.get_filename(): part for part in mail.outbox[0].attachments}
+        self.assertEqual(set(attachments), {'test.pdf', 'test.gif'})
+        self.assertEqual(attachments['test.pdf'].get_content_type(), 'application/pdf')
+        self.assertEqual(attachments['test.gif'].get_content_type(), 'image/gif')
+        self.pdf_file.seek(0)
+        self.image_file.seek(0)
+        self.assertEqual(attachments['test.pdf'].get_payload(decode=True), self.pdf_file.read())
+        self.assertEqual(attachments['test.gif'].get_payload(decode=True), self.image_file.read())
+        self.assertIn('Content-Disposition: attachment; filename="test.pdf"', mail.outbox[0].message().as_string())
+
+    def test_attachments_read_once_per_submission(self):
+        """
+        Uploaded files should only be read once, however many handlers send them
+        """
+        pdf, gif = self._get_uploaded_files()
+        form = Mock(attributes=['cleaned_data'])
+        form.cleaned_data = {'user': 'Bob', 'pdf': pdf, 'gif': gif}
+        handlers = [
+            OmniFormEmailHandler(template='Hello {{ user }}', recipients='a@example.com', subject='Test'),
+            OmniFormEmailHandler(template='Hello {{ user }}', recipients='b@example.com', subject='Test'),
+        ]
+        with patch('omniforms.attachments.Attachment.__init__', side_effect=Attachment.__init__, autospec=True) as init:
+            for handler in handlers:
+                handler.handle(form)
+        self.assertEqual(init.call_count, 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            mail.outbox[0].attachments[0].get_payload(decode=True),
+            mail.outbox[1].attachments[0].get_payload(decode=True)
+        )
+
+    @override_settings(OMNI_FORMS_ATTACHMENT_MAX_SIZE=500)
+    @patch('omniforms.attachments.default_storage')
+    def test_large_files_linked(self, storage):
+        """
+        Files larger than the maximum attachment size should be saved to storage and linked to
+        """
+        storage.save.return_value = 'omniforms/attachments/abc/test.pdf'
+        storage.url.return_value = 'https://example.com/media/omniforms/attachments/abc/test.pdf'
+        pdf = InMemoryUploadedFile(self.pdf_file, None, 'test.pdf', 'application/pdf', 1024, None)
+        gif = InMemoryUploadedFile(self.image_file, None, 'test.gif', 'image/gif', 100, None)
+        form = Mock(attributes=['cleaned_data'])
+        form.cleaned_data = {'user': 'Bob', 'pdf': pdf, 'gif': gif}
+        instance = OmniFormEmailHandler(template='Hello {{ user }}', recipients='a@example.com', subject='Test')
+        instance.handle(form)
+        self.assertEqual([part.get_filename() for part in mail.outbox[0].attachments], ['test.gif'])
+        self.assertEqual(
+            mail.outbox[0].body,
+            'Hello Bob\n\ntest.pdf: https://example.com/media/omniforms/attachments/abc/test.pdf'
+        )
+        self.assertTrue(storage.save.call_args[0][0].startswith('omniforms/attachments/'))
 
 
 class EmailConfirmationHandlerTestCase(TestCase):
@@ -2504,3 +3188,64 @@ class OmniFormSaveInstanceHandlerTestCase(OmniModelFormTestCaseStub):
         get_required_field_names.return_value = ['foo', 'bar', 'baz']
         handler = OmniFormSaveInstanceHandler(name='Save instance', order=0, form=self.omni_form)
         handler.assert_has_all_required_fields()
+
+
+class OmniFormSaveSubmissionHandlerTestCase(TestCase):
+    """
+    Tests the OmniFormSaveSubmissionHandler
+    """
+    def setUp(self):
+        super(OmniFormSaveSubmissionHandlerTestCase, self).setUp()
+        self.omni_form = OmniFormFactory.create()
+        OmniEmailFieldFactory.create(form=self.omni_form, name='email')
+        self.handler = OmniFormSaveSubmissionHandler.objects.create(
+            name='Store submission',
+            order=0,
+            form=self.omni_form
+        )
+
+    def test_extends_base_class(self):
+        """
+        The model should extend OmniFormHandler
+        """
+        self.assertTrue(issubclass(OmniFormSaveSubmissionHandler, OmniFormHandler))
+
+    def test_handle(self):
+        """
+        The handle method should store the cleaned data against the form
+        """
+        form = self.omni_form.get_form_class()(data={'email': 'bob@example.com'})
+        self.assertTrue(form.is_valid())
+        form.handle()
+        submission = OmniFormSubmission.objects.get()
+        self.assertEqual(submission.form, self.omni_form)
+        self.assertEqual(submission.get_data(), {'email': 'bob@example.com'})
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=2, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+    def test_handle_buffers_submissions(self):
+        """
+        Submissions handled inside a transaction should not be written or buffered until it commits
+        """
+        form = self.omni_form.get_form_class()(data={'email': 'bob@example.com'})
+        self.assertTrue(form.is_valid())
+        self.handler.handle(form)
+        self.handler.handle(form)
+        self.assertEqual(OmniFormSubmission.objects.count(), 0)
+        self.assertEqual(len(submission_buffer), 0)
+
+
+class OmniFormSubmissionTestCase(TestCase):
+    """
+    Tests the OmniFormSubmission model
+    """
+    def test_index_together(self):
+        """
+        Submissions should be indexed by form and submission date
+        """
+        self.assertIn(('content_type', 'object_id', 'created'), OmniFormSubmission._meta.index_together)
+
+    def test_get_data(self):
+        """
+        The get_data method should return the decoded submission data
+        """
+        self.assertEqual(OmniFormSubmission(data='{"a":1}').get_data(), {'a': 1})
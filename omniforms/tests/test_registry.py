@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms registry module
+"""
+from __future__ import unicode_literals
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django.db.models.signals import class_prepared
+from django.test.signals import setting_changed
+from mock import patch
+from omniforms.models import OmniField, OmniFormHandler, OmniCharField, OmniFormEmailHandler
+from omniforms.registry import (
+    ConcreteModelRegistry,
+    ModelIntrospection,
+    ModelIntrospectionCache,
+    concrete_model_registry,
+    model_introspection_cache
+)
+from omniforms.tests.models import DummyModel, TaggableManagerField
+
+
+class ConcreteModelRegistryTestCase(TestCase):
+    """
+    Tests the ConcreteModelRegistry class
+    """
+    def setUp(self):
+        super(ConcreteModelRegistryTestCase, self).setUp()
+        self.registry = ConcreteModelRegistry()
+
+    def test_get_concrete_models(self):
+        """
+        The registry should return concrete subclasses of the base model class
+        """
+        model_classes = self.registry.get_concrete_models(OmniField)
+        self.assertIn(OmniCharField, model_classes)
+        self.assertIn(TaggableManagerField, model_classes)
+        self.assertNotIn(OmniField, model_classes)
+        self.assertNotIn(OmniFormEmailHandler, model_classes)
+        for model_class in model_classes:
+            self.assertFalse(model_class._meta.abstract)
+
+    def test_populate(self):
+        """
+        The populate method should store models for each of the base model classes
+        """
+        self.registry.populate(OmniField, OmniFormHandler)
+        with patch('omniforms.registry.apps.get_models') as get_models:
+            self.assertIn(OmniCharField, self.registry.get_concrete_models(OmniField))
+            self.assertIn(OmniFormEmailHandler, self.registry.get_concrete_models(OmniFormHandler))
+        self.assertFalse(get_models.called)
+
+    def test_memoized(self):
+        """
+        The app registry should only be read once
+        """
+        with patch('omniforms.registry.apps.get_models', return_value=[OmniCharField]) as get_models:
+            self.registry.get_concrete_models(OmniField)
+            self.registry.get_concrete_models(OmniField)
+        self.assertEqual(get_models.call_count, 1)
+
+    def test_clear(self):
+        """
+        Clearing the registry should cause models to be looked up again
+        """
+        self.registry.get_concrete_models(OmniField)
+        self.registry.clear()
+        with patch('omniforms.registry.apps.get_models', return_value=[OmniCharField]) as get_models:
+            self.assertEqual(self.registry.get_concrete_models(OmniField), (OmniCharField,))
+        self.assertEqual(get_models.call_count, 1)
+
+    def test_get_content_types(self):
+        """
+        The registry should return the content type of each concrete model ordered by model name
+        """
+        content_types = self.registry.get_content_types(OmniField)
+        self.assertEqual(
+            [model_class for content_type, model_class in content_types],
+            list(sorted(self.registry.get_concrete_models(OmniField), key=lambda m: m._meta.model_name))
+        )
+        for content_type, model_class in content_types:
+            self.assertEqual(content_type, ContentType.objects.get_for_model(model_class))
+
+    def test_get_content_types_memoized(self):
+        """
+        Content types should only be looked up once
+        """
+        self.registry.get_content_types(OmniFormHandler)
+        with patch('omniforms.registry.ContentType.objects.get_for_models') as get_for_models:
+            self.registry.get_content_types(OmniFormHandler)
+        self.assertFalse(get_for_models.called)
+
+    def test_clear_content_types(self):
+        """
+        Clearing the registry should cause content types to be looked up again
+        """
+        self.registry.get_content_types(OmniFormHandler)
+        self.registry.clear()
+        with patch('omniforms.registry.ContentType.objects.get_for_models', return_value={}) as get_for_models:
+            with patch('omniforms.registry.apps.get_models', return_value=[]):
+                self.assertEqual(self.registry.get_content_types(OmniFormHandler), ())
+        self.assertEqual(get_for_models.call_count, 1)
+
+    def test_get_permission_action(self):
+        """
+        The registry should return the action granted by a permission codename
+        """
+        self.assertEqual(self.registry.get_permission_action('add_omnicharfield'), 'add')
+        self.assertEqual(self.registry.get_permission_action('change_omnicharfield'), 'change')
+        self.assertEqual(self.registry.get_permission_action('delete_omnicharfield'), 'delete')
+        self.assertIsNone(self.registry.get_permission_action('publish_omnicharfield'))
+
+    def test_get_permission_action_memoized(self):
+        """
+        Each codename should only be parsed once
+        """
+        self.registry.get_permission_action('add_omnicharfield')
+        self.assertIn('add_omnicharfield', self.registry._permission_actions)
+        self.registry.clear()
+        self.assertNotIn('add_omnicharfield', self.registry._permission_actions)
+
+    def test_cleared_when_installed_apps_change(self):
+        """
+        The global registry should be cleared when the INSTALLED_APPS setting changes
+        """
+        concrete_model_registry.get_concrete_models(OmniField)
+        with patch.object(concrete_model_registry, 'clear') as patched_method:
+            setting_changed.send(sender=override_settings, setting='INSTALLED_APPS', value=[], enter=True)
+        patched_method.assert_called_once_with()
+
+    def test_manager_methods_do_not_query(self):
+        """
+        The get_concrete_models manager methods should not hit the database
+        """
+        with self.assertNumQueries(0):
+            OmniField.objects.get_concrete_models()
+            OmniFormHandler.objects.get_concrete_models()
+
+
+class ModelIntrospectionTestCase(TestCase):
+    """
+    Tests the ModelIntrospection class
+    """
+    def setUp(self):
+        super(ModelIntrospectionTestCase, self).setUp()
+        self.introspection = ModelIntrospection(DummyModel)
+
+    def test_fields(self):
+        """
+        Auto fields and reverse/generic relations should be excluded
+        """
+        self.assertNotIn('id', self.introspection.field_names)
+        self.assertIn('title', self.introspection.field_names)
+        self.assertEqual(self.introspection.field_names, tuple(field.name for field in self.introspection.fields))
+        self.assertEqual(self.introspection.fields_by_name['title'], DummyModel._meta.get_field('title'))
+
+    def test_omni_field_classes(self):
+        """
+        The concrete OmniField class should be stored for each field
+        """
+        self.assertEqual(self.introspection.omni_field_classes['title'], OmniCharField)
+        for field in self.introspection.fields:
+            self.assertEqual(
+                self.introspection.omni_field_classes[field.name],
+                OmniField.get_concrete_class_for_model_field(field)
+            )
+
+    def test_required_fields(self):
+        """
+        Required fields should be computed with and without fields that have defaults
+        """
+        for field in self.introspection.get_required_fields():
+            self.assertFalse(field.blank)
+            self.assertFalse(field.has_default())
+        with_defaults = self.introspection.get_required_field_names(exclude_with_default=False)
+        self.assertTrue(set(self.introspection.get_required_field_names()).issubset(with_defaults))
+        self.assertIn('slug', self.introspection.get_required_field_names())
+
+
+class ModelIntrospectionCacheTestCase(TestCase):
+    """
+    Tests the ModelIntrospectionCache class
+    """
+    def setUp(self):
+        super(ModelIntrospectionCacheTestCase, self).setUp()
+        self.cache = ModelIntrospectionCache()
+        self.content_type = ContentType.objects.get_for_model(DummyModel)
+
+    def test_get(self):
+        """
+        The cache should return an introspection for the content types model
+        """
+        introspection = self.cache.get(self.content_type)
+        self.assertIsInstance(introspection, ModelIntrospection)
+        self.assertEqual(introspection.model_class, DummyModel)
+
+    def test_memoized(self):
+        """
+        Models should only be introspected once
+        """
+        introspection = self.cache.get(self.content_type)
+        with patch('omniforms.registry.ModelIntrospection') as patched_class:
+            self.assertIs(self.cache.get(self.content_type), introspection)
+        self.assertFalse(patched_class.called)
+
+    def test_clear(self):
+        """
+        Clearing the cache should cause models to be introspected again
+        """
+        introspection = self.cache.get(self.content_type)
+        self.cache.clear()
+        self.assertIsNot(self.cache.get(self.content_type), introspection)
+
+    def test_cleared_on_app_registry_changes(self):
+        """
+        The global cache should be cleared when models are added or the installed apps change
+        """
+        with patch.object(model_introspection_cache, 'clear') as patched_method:
+            class_prepared.send(sender=DummyModel)
+            setting_changed.send(sender=override_settings, setting='INSTALLED_APPS', value=[], enter=True)
+        self.assertEqual(patched_method.call_count, 2)
+
+    def test_cleared_on_field_mapping_change(self):
+        """
+        The global cache should be cleared when the custom field mapping changes
+        """
+        with patch.object(model_introspection_cache, 'clear') as patched_method:
+            setting_changed.send(
+                sender=override_settings,
+                setting='OMNI_FORMS_CUSTOM_FIELD_MAPPING',
+                value={},
+                enter=True
+            )
+        patched_method.assert_called_once_with()
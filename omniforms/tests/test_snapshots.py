@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms snapshots module
+"""
+from __future__ import unicode_literals
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from mock import patch
+from omniforms.benchmarks.forms import build_form
+from omniforms.cache import choices_cache, form_class_cache
+from omniforms.cloning import clone_form
+from omniforms.models import OmniCharField, OmniField, OmniForm, OmniFormEmailHandler, OmniModelForm
+from omniforms.signals import refresh_form_snapshot, sync_form_snapshot
+from omniforms.snapshots import (
+    InvalidSnapshot,
+    SNAPSHOT_VERSION,
+    build_snapshot,
+    get_definition,
+    load_snapshot,
+    refresh_snapshot
+)
+from omniforms.tests.factories import (
+    OmniCharFieldFactory,
+    OmniFormEmailHandlerFactory,
+    OmniFormFactory,
+    OmniModelFormFactory
+)
+import json
+
+
+class SnapshotTestCase(TestCase):
+    """
+    Tests building and loading snapshots
+    """
+    def setUp(self):
+        super(SnapshotTestCase, self).setUp()
+        self.form, self.data = build_form(20)
+        self.form = OmniForm.objects.get(pk=self.form.pk)
+
+    @staticmethod
+    def _get_values(instance):
+        """
+        Gets the values of every concrete model field of the instance
+
+        :param instance: Model instance
+        :return: Dict of values keyed by attribute name
+        """
+        return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+    def test_round_trip(self):
+        """
+        Loaded fields and handlers should be of the same type and have the same values as the saved instances
+        """
+        definition = load_snapshot(build_snapshot(self.form), self.form)
+        for loaded, saved in [
+            (definition.fields, list(self.form.fields.specific())),
+            (definition.handlers, list(self.form.handlers.specific()))
+        ]:
+            self.assertEqual([instance.__class__ for instance in loaded], [instance.__class__ for instance in saved])
+            self.assertEqual(
+                [self._get_values(instance) for instance in loaded],
+                [self._get_values(instance) for instance in saved]
+            )
+
+    def test_loaded_instances_not_adding(self):
+        """
+        Loaded instances should be marked as existing rows belonging to the form
+        """
+        definition = load_snapshot(build_snapshot(self.form), self.form)
+        for instance in definition.fields + definition.handlers:
+            self.assertFalse(instance._state.adding)
+            self.assertIs(instance.form, self.form)
+
+    def test_version(self):
+        """
+        The snapshot should record its version
+        """
+        self.assertEqual(json.loads(build_snapshot(self.form))['version'], SNAPSHOT_VERSION)
+
+    def test_invalid_snapshots(self):
+        """
+        Empty, malformed and outdated snapshots should not be loaded
+        """
+        outdated = json.loads(build_snapshot(self.form))
+        outdated['version'] = SNAPSHOT_VERSION + 1
+        unknown_model = json.loads(build_snapshot(self.form))
+        unknown_model['fields'][0][0] = 'omniforms.omnifictionalfield'
+        missing_value = json.loads(build_snapshot(self.form))
+        del missing_value['fields'][0][1]['label']
+        for snapshot in ['', '[]', json.dumps(outdated), json.dumps(unknown_model), json.dumps(missing_value)]:
+            with self.assertRaises(InvalidSnapshot):
+                load_snapshot(snapshot, self.form)
+
+
+class SnapshotMaintenanceTestCase(TransactionTestCase):
+    """
+    Tests that snapshots are regenerated when the form definition changes
+    """
+    def setUp(self):
+        super(SnapshotMaintenanceTestCase, self).setUp()
+        self.form = OmniFormFactory.create()
+        self.field = OmniCharFieldFactory.create(form=self.form, name='title')
+
+    def get_stored_names(self):
+        """
+        Gets the names of the fields in the stored snapshot
+
+        :return: List of field names
+        """
+        snapshot = OmniForm.objects.values_list('snapshot', flat=True).get(pk=self.form.pk)
+        return [values['name'] for label, values in json.loads(snapshot)['fields']]
+
+    def test_field_save(self):
+        """
+        The snapshot should be regenerated when a field is saved
+        """
+        self.assertEqual(self.get_stored_names(), ['title'])
+        self.field.name = 'subject'
+        self.field.save()
+        self.assertEqual(self.get_stored_names(), ['subject'])
+
+    def test_field_delete(self):
+        """
+        The snapshot should be regenerated when a field is deleted
+        """
+        self.field.delete()
+        self.assertEqual(self.get_stored_names(), [])
+
+    def test_handler_save_and_delete(self):
+        """
+        The snapshot should be regenerated when a handler is saved or deleted
+        """
+        handler = OmniFormEmailHandlerFactory.create(form=self.form)
+        self.assertEqual([instance.pk for instance in get_definition(self.form).handlers], [handler.pk])
+        handler.delete()
+        self.assertEqual(get_definition(self.form).handlers, ())
+
+    def test_form_save_keeps_snapshot(self):
+        """
+        Saving a form instance loaded before its fields changed should not overwrite the snapshot
+        """
+        form = OmniForm.objects.get(pk=self.form.pk)
+        OmniCharFieldFactory.create(form=self.form, name='extra')
+        form.title = 'Changed'
+        form.save()
+        self.assertEqual(self.get_stored_names(), ['title', 'extra'])
+        self.assertEqual(OmniForm.objects.get(pk=self.form.pk).title, 'Changed')
+
+    def test_form_copy(self):
+        """
+        Forms copied by clearing the primary key should be saved with a snapshot of their own definition
+        """
+        form = OmniForm.objects.get(pk=self.form.pk)
+        form.pk = None
+        form.id = None
+        form.save()
+        self.assertNotEqual(form.pk, self.form.pk)
+        self.assertEqual([field.name for field in get_definition(form).fields], [])
+        self.assertEqual(self.get_stored_names(), ['title'])
+
+    def test_form_force_insert(self):
+        """
+        Forms saved with force_insert should be inserted
+        """
+        form = OmniForm(title='Inserted')
+        form.save(force_insert=True)
+        self.assertTrue(OmniForm.objects.filter(pk=form.pk, title='Inserted').exists())
+        self.assertEqual(get_definition(form).fields, ())
+
+    def test_refreshed_once_on_commit(self):
+        """
+        Inside a transaction the snapshot should be cleared when fields change, and regenerated once on commit
+        """
+        with patch('omniforms.snapshots.build_snapshot', wraps=build_snapshot) as patched_method:
+            with transaction.atomic():
+                for index in range(3):
+                    OmniCharFieldFactory.create(form=self.form, name='field_{0}'.format(index))
+                self.assertEqual(OmniForm.objects.get(pk=self.form.pk).snapshot, '')
+                self.assertFalse(patched_method.called)
+            self.assertEqual(patched_method.call_count, 1)
+        self.assertEqual(self.get_stored_names(), ['title', 'field_0', 'field_1', 'field_2'])
+
+    def test_definition_inside_transaction(self):
+        """
+        Definitions read inside the transaction the fields changed in should include the changes
+        """
+        with transaction.atomic():
+            OmniCharFieldFactory.create(form=self.form, name='extra')
+            names = [field.name for field in get_definition(OmniForm.objects.get(pk=self.form.pk)).fields]
+        self.assertEqual(names, ['title', 'extra'])
+
+    def test_rolled_back_changes(self):
+        """
+        The snapshot should be unchanged if the transaction the fields changed in is rolled back
+        """
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                OmniCharFieldFactory.create(form=self.form, name='extra')
+                raise ValueError
+        self.assertEqual(self.get_stored_names(), ['title'])
+
+    def test_form_delete(self):
+        """
+        The snapshot should not be regenerated as the fields of a deleted form are deleted
+        """
+        OmniCharFieldFactory.create_batch(30, form=self.form)
+        other = OmniFormFactory.create()
+        OmniCharFieldFactory.create_batch(3, form=other)
+        with patch('omniforms.snapshots.build_snapshot') as patched_method:
+            with CaptureQueriesContext(connection) as many_fields:
+                self.form.delete()
+            with CaptureQueriesContext(connection) as few_fields:
+                other.delete()
+        self.assertFalse(patched_method.called)
+        self.assertEqual(len(many_fields), len(few_fields))
+
+    def test_other_models_ignored(self):
+        """
+        The receivers should only be connected to the concrete form, field and handler models
+        """
+        self.assertIn(refresh_form_snapshot, post_save._live_receivers(OmniCharField))
+        self.assertIn(refresh_form_snapshot, post_delete._live_receivers(OmniFormEmailHandler))
+        self.assertIn(sync_form_snapshot, post_save._live_receivers(OmniForm))
+        self.assertNotIn(refresh_form_snapshot, post_save._live_receivers(OmniField))
+        self.assertNotIn(refresh_form_snapshot, post_save._live_receivers(ContentType))
+        self.assertNotIn(sync_form_snapshot, post_save._live_receivers(ContentType))
+
+    def test_missing_snapshot_regenerated(self):
+        """
+        Missing snapshots should be regenerated and stored when the definition is loaded
+        """
+        OmniForm.objects.filter(pk=self.form.pk).update(snapshot='')
+        self.assertEqual([field.name for field in get_definition(self.form).fields], ['title'])
+        self.assertEqual(self.get_stored_names(), ['title'])
+
+    def test_outdated_snapshot_regenerated(self):
+        """
+        Snapshots generated by a different version should be regenerated
+        """
+        OmniForm.objects.filter(pk=self.form.pk).update(snapshot=json.dumps({'version': 0}))
+        self.assertEqual([field.name for field in get_definition(self.form).fields], ['title'])
+        self.assertEqual(self.get_stored_names(), ['title'])
+
+    def test_clone_regenerates_snapshot(self):
+        """
+        Cloned forms should be built from their own fields
+        """
+        clone = clone_form(self.form, title='Clone')
+        fields = get_definition(clone).fields
+        self.assertEqual([field.name for field in fields], ['title'])
+        self.assertNotEqual(fields[0].pk, self.field.pk)
+        self.assertEqual(fields[0].object_id, clone.pk)
+
+
+class SnapshotFormClassTestCase(TestCase):
+    """
+    Tests building form classes from snapshots
+    """
+    def setUp(self):
+        super(SnapshotFormClassTestCase, self).setUp()
+        form, self.data = build_form(20)
+        refresh_snapshot(form)
+        self.form = OmniForm.objects.get(pk=form.pk)
+        form_class_cache.clear()
+        choices_cache.clear()
+
+    def test_cold_build_no_queries(self):
+        """
+        Building the form class should use the snapshot loaded with the form
+        """
+        with self.assertNumQueries(0):
+            form_class = self.form.get_form_class()
+        self.assertEqual(len(form_class.base_fields), 20)
+        self.assertEqual(len(form_class._handlers), 2)
+
+    def test_deferred_snapshot_single_query(self):
+        """
+        The snapshot should be read in a single query if it was not loaded with the form
+        """
+        form = OmniForm.objects.defer('snapshot').get(pk=self.form.pk)
+        with self.assertNumQueries(1):
+            form_class = form.get_form_class()
+        self.assertEqual(len(form_class.base_fields), 20)
+
+    def test_changed_definition_read(self):
+        """
+        The loaded snapshot should not be used once the form definition has changed
+        """
+        OmniCharFieldFactory.create(form=self.form, name='extra', order=100)
+        self.assertEqual(self.form.get_definition().fields[-1].name, 'extra')
+
+    def test_form_valid(self):
+        """
+        Forms built from the snapshot should validate submitted data
+        """
+        form = self.form.get_form_class()(data=self.data)
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_definition_memoized(self):
+        """
+        The definition should be memoized on the instance until the form definition changes
+        """
+        self.form.get_definition()
+        with self.assertNumQueries(0):
+            self.form.get_definition()
+        OmniCharFieldFactory.create(form=self.form, name='extra', order=100)
+        self.assertEqual(self.form.get_definition().fields[-1].name, 'extra')
+
+    def test_model_form(self):
+        """
+        Model form fields should be built from the snapshot
+        """
+        form = OmniModelFormFactory.create()
+        OmniCharFieldFactory.create(form=form, name='title')
+        refresh_snapshot(form)
+        form = OmniModelForm.objects.get(pk=form.pk)
+        form_class_cache.clear()
+        with patch('omniforms.snapshots.build_snapshot') as patched_method:
+            form_class = form.get_form_class()
+        self.assertFalse(patched_method.called)
+        self.assertEqual(list(form_class.base_fields), ['title'])
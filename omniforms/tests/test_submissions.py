@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms submissions module
+"""
+from __future__ import unicode_literals
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.transaction import TransactionManagementError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+from mock import patch
+from omniforms.models import OmniFormSubmission
+from omniforms.submissions import SubmissionBuffer, serialize_cleaned_data, submission_buffer
+from omniforms.tests.factories import DummyModelFactory, OmniFormFactory
+from omniforms.tests.models import DummyModel
+import io
+import json
+import os
+import shutil
+import tempfile
+
+
+class SerializeCleanedDataTestCase(TestCase):
+    """
+    Tests the serialize_cleaned_data function
+    """
+    def test_serializes_values(self):
+        """
+        Values should be converted to JSON serializable types
+        """
+        instance = DummyModelFactory.create()
+        data = json.loads(serialize_cleaned_data({
+            'name': 'Bob',
+            'date': date(2016, 1, 2),
+            'amount': Decimal('1.50'),
+            'instance': instance,
+            'queryset': DummyModel.objects.filter(pk=instance.pk),
+            'file': SimpleUploadedFile('test.txt', b'content'),
+            'choices': {'a'},
+            'empty': None,
+        }))
+        self.assertEqual(data, {
+            'name': 'Bob',
+            'date': '2016-01-02',
+            'amount': '1.50',
+            'instance': instance.pk,
+            'queryset': [instance.pk],
+            'file': 'test.txt',
+            'choices': ['a'],
+            'empty': None,
+        })
+
+
+class SubmissionBufferTestCase(TestCase):
+    """
+    Tests the SubmissionBuffer class
+    """
+    def setUp(self):
+        super(SubmissionBufferTestCase, self).setUp()
+        self.buffer = SubmissionBuffer()
+        self.form = OmniFormFactory.create()
+        self.content_type = ContentType.objects.get_for_model(self.form)
+
+    def get_submission(self):
+        """
+        Creates an unsaved submission
+
+        :return: OmniFormSubmission instance
+        """
+        return OmniFormSubmission(content_type=self.content_type, object_id=self.form.pk, data='{}')
+
+    def test_writes_immediately_by_default(self):
+        """
+        Submissions should be saved as soon as they are added unless buffering is enabled
+        """
+        with patch.object(OmniFormSubmission.objects, 'bulk_create') as patched_method:
+            self.buffer.add(self.get_submission())
+        patched_method.assert_not_called()
+        self.assertEqual(OmniFormSubmission.objects.count(), 1)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_write_rolled_back_with_transaction(self):
+        """
+        Submissions written immediately should be rolled back with the current transaction
+        """
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.buffer.add(self.get_submission())
+                raise ValueError
+        self.assertEqual(OmniFormSubmission.objects.count(), 0)
+
+
+class BufferedSubmissionsTestCase(TransactionTestCase):
+    """
+    Tests buffering submissions with the SubmissionBuffer class
+    """
+    def setUp(self):
+        super(BufferedSubmissionsTestCase, self).setUp()
+        self.buffer = SubmissionBuffer()
+        self.form = OmniFormFactory.create()
+        self.content_type = ContentType.objects.get_for_model(self.form)
+
+    def get_submission(self):
+        """
+        Creates an unsaved submission
+
+        :return: OmniFormSubmission instance
+        """
+        return OmniFormSubmission(content_type=self.content_type, object_id=self.form.pk, data='{}')
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=3, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+    def test_writes_in_batches(self):
+        """
+        Submissions should be written once the batch size has been reached
+        """
+        self.buffer.add(self.get_submission())
+        self.buffer.add(self.get_submission())
+        self.assertEqual(OmniFormSubmission.objects.count(), 0)
+        self.assertEqual(len(self.buffer), 2)
+        with patch.object(OmniFormSubmission.objects, 'bulk_create', wraps=OmniFormSubmission.objects.bulk_create) \
+                as patched_method:
+            self.buffer.add(self.get_submission())
+        patched_method.assert_called_once()
+        self.assertEqual(OmniFormSubmission.objects.count(), 3)
+        self.assertEqual(len(self.buffer), 0)
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=100, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=0)
+    def test_writes_after_interval(self):
+        """
+        Submissions should be written once the flush interval has passed
+        """
+        self.buffer.add(self.get_submission())
+        self.assertEqual(OmniFormSubmission.objects.count(), 1)
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=100, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+    def test_flush(self):
+        """
+        The flush method should write all buffered submissions
+        """
+        self.buffer.add(self.get_submission())
+        self.buffer.add(self.get_submission())
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(OmniFormSubmission.objects.count(), 2)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=2, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=0)
+    @patch('omniforms.submissions.logger')
+    def test_failed_write_keeps_submissions(self, patched_logger):
+        """
+        Submissions should remain buffered if they cannot be written
+        """
+        with patch.object(OmniFormSubmission.objects, 'bulk_create', side_effect=Exception('Failed')):
+            self.buffer.add(self.get_submission())
+        self.assertEqual(len(self.buffer), 1)
+        patched_logger.exception.assert_called_once()
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(OmniFormSubmission.objects.count(), 1)
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=2, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+    def test_buffered_on_commit(self):
+        """
+        Submissions added inside a transaction should only be buffered once it commits,
+        and the buffer should not be written inside the transaction
+        """
+        self.buffer.add(self.get_submission())
+        with transaction.atomic():
+            self.buffer.add(self.get_submission())
+            self.assertEqual(len(self.buffer), 1)
+            self.assertEqual(OmniFormSubmission.objects.count(), 0)
+        self.assertEqual(OmniFormSubmission.objects.count(), 2)
+        self.assertEqual(len(self.buffer), 0)
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=2, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+    def test_rolled_back_submissions_discarded(self):
+        """
+        Submissions added inside a transaction that is rolled back should be discarded,
+        without affecting submissions that were already buffered
+        """
+        self.buffer.add(self.get_submission())
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.buffer.add(self.get_submission())
+                raise ValueError
+        self.assertEqual(len(self.buffer), 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(OmniFormSubmission.objects.count(), 1)
+
+    @override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=2, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+    def test_flush_inside_transaction(self):
+        """
+        The buffer should not be written inside a transaction
+        """
+        self.buffer.add(self.get_submission())
+        with transaction.atomic():
+            with self.assertRaises(TransactionManagementError):
+                self.buffer.flush()
+        self.assertEqual(len(self.buffer), 1)
+
+
+@override_settings(OMNI_FORMS_SUBMISSION_BATCH_SIZE=100, OMNI_FORMS_SUBMISSION_FLUSH_INTERVAL=60)
+class FlushSubmissionBufferTestCase(TransactionTestCase):
+    """
+    Tests writing buffered submissions at the end of each request
+    """
+    def tearDown(self):
+        super(FlushSubmissionBufferTestCase, self).tearDown()
+        submission_buffer.flush()
+
+    def test_flushed_on_request_finished(self):
+        """
+        Buffered submissions should be written once the request has finished
+        """
+        form = OmniFormFactory.create()
+        content_type = ContentType.objects.get_for_model(form)
+        submission_buffer.add(OmniFormSubmission(content_type=content_type, object_id=form.pk, data='{}'))
+        self.assertEqual(OmniFormSubmission.objects.count(), 0)
+        request_finished.send(sender=self.__class__)
+        self.assertEqual(OmniFormSubmission.objects.count(), 1)
+        self.assertEqual(len(submission_buffer), 0)
+
+    @patch('omniforms.signals.logger')
+    def test_failed_flush_logged(self, patched_logger):
+        """
+        Errors writing buffered submissions at the end of the request should be logged rather than raised
+        """
+        form = OmniFormFactory.create()
+        content_type = ContentType.objects.get_for_model(form)
+        submission_buffer.add(OmniFormSubmission(content_type=content_type, object_id=form.pk, data='{}'))
+        with patch.object(OmniFormSubmission.objects, 'bulk_create', side_effect=Exception('Failed')):
+            request_finished.send(sender=self.__class__)
+        patched_logger.exception.assert_called_once()
+        self.assertEqual(len(submission_buffer), 1)
+
+
+class PruneSubmissionsCommandTestCase(TestCase):
+    """
+    Tests the omniforms_prune_submissions management command
+    """
+    def setUp(self):
+        super(PruneSubmissionsCommandTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.form = OmniFormFactory.create()
+        self.other_form = OmniFormFactory.create()
+        self.content_type = ContentType.objects.get_for_model(self.form)
+        self.old = [
+            self.create_submission(self.form, days=40, data='{"name":"Bob"}'),
+            self.create_submission(self.other_form, days=40, data='{"name":"Jane"}'),
+        ]
+        self.new = self.create_submission(self.form, days=1, data='{"name":"Joe"}')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super(PruneSubmissionsCommandTestCase, self).tearDown()
+
+    def create_submission(self, form, days, data):
+        """
+        Creates a submission
+
+        :param form: The form the submission belongs to
+        :param days: The age of the submission in days
+        :param data: Submitted JSON data
+        :return: OmniFormSubmission instance
+        """
+        return OmniFormSubmission.objects.create(
+            content_type=self.content_type,
+            object_id=form.pk,
+            data=data,
+            created=timezone.now() - timedelta(days=days)
+        )
+
+    def test_prune(self):
+        """
+        Submissions older than the given number of days should be deleted
+        """
+        stdout = StringIO()
+        call_command('omniforms_prune_submissions', days=30, stdout=stdout)
+        self.assertEqual(list(OmniFormSubmission.objects.all()), [self.new])
+        self.assertEqual(stdout.getvalue().strip(), 'Deleted 2 submission(s)')
+
+    def test_prune_form(self):
+        """
+        Only submissions for the given form should be deleted
+        """
+        call_command(
+            'omniforms_prune_submissions',
+            days=30,
+            content_type=self.content_type.pk,
+            form=self.form.pk,
+            stdout=StringIO()
+        )
+        self.assertEqual(set(OmniFormSubmission.objects.all()), {self.new, self.old[1]})
+
+    def test_export(self):
+        """
+        Submissions should be written to the export file before being deleted
+        """
+        path = os.path.join(self.directory, 'export.jsonl')
+        call_command('omniforms_prune_submissions', days=30, export=path, batch_size=1, stdout=StringIO())
+        with io.open(path, encoding='utf-8') as export_file:
+            rows = [json.loads(line) for line in export_file]
+        self.assertEqual([row['data'] for row in rows], [{'name': 'Bob'}, {'name': 'Jane'}])
+        self.assertEqual(rows[0]['form'], self.form.pk)
+        self.assertEqual(rows[0]['content_type'], self.content_type.pk)
+        self.assertEqual(list(OmniFormSubmission.objects.all()), [self.new])
+
+    def test_export_keep(self):
+        """
+        Submissions should not be deleted if the keep option is set
+        """
+        path = os.path.join(self.directory, 'export.jsonl')
+        call_command('omniforms_prune_submissions', days=30, export=path, keep=True, stdout=StringIO())
+        self.assertEqual(OmniFormSubmission.objects.count(), 3)
+
+    def test_keep_requires_export(self):
+        """
+        The keep option should only be allowed along with the export option
+        """
+        self.assertRaises(CommandError, call_command, 'omniforms_prune_submissions', days=30, keep=True)
+
+    def test_form_requires_content_type(self):
+        """
+        The form option should only be allowed along with the content type option
+        """
+        self.assertRaises(CommandError, call_command, 'omniforms_prune_submissions', days=30, form=self.form.pk)
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms tracing module
+"""
+from __future__ import unicode_literals
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from mock import patch
+from omniforms.cache import form_class_cache
+from omniforms.models import OmniField
+from omniforms.snapshots import refresh_snapshot
+from omniforms.submissions import submission_buffer
+from omniforms.tests.factories import (
+    OmniCharFieldFactory,
+    OmniEmailFieldFactory,
+    OmniFormEmailHandlerFactory,
+    OmniFormFactory,
+    OmniFormSaveSubmissionHandlerFactory,
+    OmniModelFormFactory
+)
+from omniforms.tracing import LoggingTracer, MemoryTracer, Span, get_tracer, query_counter, span
+
+
+@override_settings(OMNI_FORMS_TRACER='omniforms.tracing.MemoryTracer')
+class TracingTestCase(TestCase):
+    """
+    Base test case recording spans with the memory tracer
+    """
+    def setUp(self):
+        super(TracingTestCase, self).setUp()
+        form_class_cache.clear()
+        self.tracer = get_tracer()
+        self.tracer.clear()
+
+    def get_span_names(self):
+        """
+        Gets the names of the recorded spans
+
+        :return: List of span names
+        """
+        return [recorded.name for recorded in self.tracer.get_spans()]
+
+
+class SpanTestCase(TracingTestCase):
+    """
+    Tests the span context manager
+    """
+    def test_records_span(self):
+        """
+        The span should be recorded with its elapsed time, query count and details
+        """
+        form = OmniFormFactory.create()
+        with span('test', form=form, foo='bar') as current:
+            list(OmniField.objects.all())
+        self.assertEqual(self.tracer.get_spans(), [current])
+        self.assertEqual(current.form_pk, form.pk)
+        self.assertEqual(current.form_type, 'omniform')
+        self.assertEqual(current.query_count, 1)
+        self.assertGreaterEqual(current.elapsed, 0)
+        self.assertEqual(current.tags, {'foo': 'bar'})
+
+    def test_nested_spans(self):
+        """
+        Nested spans should each count their own queries
+        """
+        with span('outer') as outer:
+            list(OmniField.objects.all())
+            with span('inner') as inner:
+                list(OmniField.objects.all())
+        self.assertEqual(self.get_span_names(), ['inner', 'outer'])
+        self.assertEqual(inner.query_count, 1)
+        self.assertEqual(outer.query_count, 2)
+
+    def test_restores_query_logging(self):
+        """
+        Query logging should be restored and logged queries discarded once the outermost span closes
+        """
+        length = len(connection.queries_log)
+        with span('test'):
+            list(OmniField.objects.all())
+        self.assertFalse(connection.force_debug_cursor)
+        self.assertEqual(len(connection.queries_log), length)
+
+    def test_keeps_existing_query_logging(self):
+        """
+        Queries should still be logged if they were being logged before the span opened
+        """
+        with self.assertNumQueries(1):
+            with span('test') as current:
+                list(OmniField.objects.all())
+            self.assertTrue(connection.force_debug_cursor)
+        self.assertEqual(current.query_count, 1)
+
+    def test_records_on_error(self):
+        """
+        The span should be recorded if the operation raises an exception
+        """
+        with self.assertRaises(ValueError):
+            with span('test'):
+                raise ValueError
+        self.assertEqual(self.get_span_names(), ['test'])
+        self.assertEqual(query_counter._local.depth, 0)
+
+    def test_handler_details(self):
+        """
+        The handler type and form pk should be taken from the handler
+        """
+        handler = OmniFormSaveSubmissionHandlerFactory.create()
+        with span('test', handler=handler) as current:
+            pass
+        self.assertEqual(current.handler_type, 'OmniFormSaveSubmissionHandler')
+        self.assertEqual(current.form_pk, handler.object_id)
+
+    def test_tracer_errors_ignored(self):
+        """
+        Errors raised by the tracer should be logged rather than raised
+        """
+        with patch.object(self.tracer, 'record', side_effect=ValueError):
+            with patch('omniforms.tracing.logger') as logger:
+                with span('test'):
+                    pass
+        self.assertTrue(logger.exception.called)
+
+    @override_settings(OMNI_FORMS_TRACER=None)
+    def test_disabled(self):
+        """
+        Nothing should be recorded if tracing is disabled
+        """
+        self.assertIsNone(get_tracer())
+        with span('test') as current:
+            pass
+        self.assertIsNone(current)
+
+    def test_tracer_reset_on_setting_change(self):
+        """
+        The tracer should be recreated when the tracer setting changes
+        """
+        with override_settings(OMNI_FORMS_TRACER='omniforms.tracing.LoggingTracer'):
+            self.assertIsInstance(get_tracer(), LoggingTracer)
+        self.assertIsInstance(get_tracer(), MemoryTracer)
+
+
+class FormClassSpansTestCase(TracingTestCase):
+    """
+    Tests the spans recorded when generating form classes
+    """
+    def test_omni_form(self):
+        """
+        Field resolution, field creation and class creation should be recorded for omni forms
+        """
+        form = OmniFormFactory.create()
+        OmniCharFieldFactory.create_batch(3, form=form)
+        refresh_snapshot(form)
+        form.get_form_class()
+        self.assertEqual(
+            self.get_span_names(),
+            ['form.resolve_fields', 'form.as_form_field', 'form.create_class', 'form.get_form_class']
+        )
+        spans = self.tracer.get_spans()
+        self.assertTrue(all(recorded.form_pk == form.pk for recorded in spans))
+        self.assertEqual(spans[1].tags, {'field_count': 3})
+        self.assertEqual(spans[0].query_count, 1)
+        self.assertEqual(spans[-1].query_count, sum(recorded.query_count for recorded in spans[:-1]))
+
+    @override_settings(OMNI_FORMS_CACHE_FORM_CLASSES=True)
+    def test_cached(self):
+        """
+        Only the get_form_class span should be recorded for cached form classes
+        """
+        form = OmniFormFactory.create()
+        form.get_form_class()
+        self.tracer.clear()
+        form.get_form_class()
+        self.assertEqual(self.get_span_names(), ['form.get_form_class'])
+        self.assertEqual(self.tracer.get_spans()[0].query_count, 0)
+
+    def test_model_form(self):
+        """
+        Spans should be recorded for each field of model forms
+        """
+        form = OmniModelFormFactory.create()
+        OmniCharFieldFactory.create(form=form, name='title')
+        form.get_form_class()
+        names = self.get_span_names()
+        self.assertEqual(names.count('form.resolve_fields'), 1)
+        self.assertEqual(names.count('form.as_form_field'), 1)
+        self.assertEqual(names[-2:], ['form.create_class', 'form.get_form_class'])
+        self.assertEqual(self.tracer.get_spans()[-1].form_type, 'omnimodelform')
+
+
+@override_settings(
+    OMNI_FORMS_HANDLER_BACKEND='omniforms.dispatch.SynchronousBackend',
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+)
+class HandlerSpansTestCase(TracingTestCase):
+    """
+    Tests the spans recorded when handling forms
+    """
+    def test_handler_spans(self):
+        """
+        Each handler, email rendering and email sending should be recorded
+        """
+        form = OmniFormFactory.create()
+        OmniEmailFieldFactory.create(form=form, name='email')
+        email_handler = OmniFormEmailHandlerFactory.create(form=form)
+        OmniFormSaveSubmissionHandlerFactory.create(form=form)
+        form_instance = form.get_form_class()(data={'email': 'user@example.com'})
+        self.assertTrue(form_instance.is_valid())
+        self.tracer.clear()
+        form_instance.handle()
+        submission_buffer.flush()
+
+        handler_spans = self.tracer.get_spans('handler.handle')
+        self.assertEqual(
+            sorted(recorded.handler_type for recorded in handler_spans),
+            ['OmniFormEmailHandler', 'OmniFormSaveSubmissionHandler']
+        )
+        self.assertTrue(all(recorded.form_pk == form.pk for recorded in handler_spans))
+        render = self.tracer.get_spans('email.render')
+        self.assertEqual(len(render), 1)
+        self.assertEqual(render[0].handler_type, email_handler.__class__.__name__)
+        send = self.tracer.get_spans('email.send')
+        self.assertEqual(send[0].tags, {'message_count': 1})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_email_handler_handle(self):
+        """
+        Sending email directly from an email handler should be recorded
+        """
+        form = OmniFormFactory.create()
+        handler = OmniFormEmailHandlerFactory.create(form=form)
+        form_instance = form.get_form_class()(data={})
+        self.assertTrue(form_instance.is_valid())
+        self.tracer.clear()
+        handler.handle(form_instance)
+        self.assertEqual(self.get_span_names(), ['email.render', 'email.send'])
+
+
+class LoggingTracerTestCase(TestCase):
+    """
+    Tests the LoggingTracer class
+    """
+    def setUp(self):
+        super(LoggingTracerTestCase, self).setUp()
+        self.span = Span('form.get_form_class', form_pk=1)
+        self.span.elapsed = 0.2
+
+    @patch('omniforms.tracing.logger')
+    def test_logs_slow_spans(self, logger):
+        """
+        Spans slower than the threshold should be logged
+        """
+        with override_settings(OMNI_FORMS_TRACING_SLOW_THRESHOLD=0.1):
+            LoggingTracer().record(self.span)
+        self.assertEqual(logger.warning.call_count, 1)
+        self.assertEqual(logger.warning.call_args[1]['extra']['span']['form_pk'], 1)
+
+    @patch('omniforms.tracing.logger')
+    def test_ignores_fast_spans(self, logger):
+        """
+        Spans faster than the threshold should not be logged
+        """
+        LoggingTracer().record(self.span)
+        logger.warning.assert_not_called()
+
+    @override_settings(OMNI_FORMS_TRACER='omniforms.tracing.LoggingTracer')
+    def test_does_not_count_queries(self):
+        """
+        Query logging should not be enabled for spans recorded by the logging tracer
+        """
+        with span('test') as current:
+            self.assertFalse(connection.force_debug_cursor)
+            list(OmniField.objects.all())
+        self.assertIsNone(current.query_count)
+
+
+class MemoryTracerTestCase(TestCase):
+    """
+    Tests the MemoryTracer class
+    """
+    def test_collects_spans(self):
+        """
+        Spans should be collected and filterable by name
+        """
+        tracer = MemoryTracer()
+        first, second = Span('a'), Span('b')
+        tracer.record(first)
+        tracer.record(second)
+        self.assertEqual(tracer.get_spans(), [first, second])
+        self.assertEqual(tracer.get_spans('b'), [second])
+        tracer.clear()
+        self.assertEqual(tracer.get_spans(), [])
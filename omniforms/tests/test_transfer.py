@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms transfer module and the export and import management commands
+"""
+from __future__ import unicode_literals
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.six import StringIO
+from mock import patch
+from omniforms.benchmarks.forms import build_form
+from omniforms.cloning import bulk_insert
+from omniforms.models import OmniField, OmniForm, OmniFormHandler, OmniModelForm
+from omniforms.tests.factories import (
+    OmniCharFieldFactory,
+    OmniEmailFieldFactory,
+    OmniFormEmailConfirmationHandlerFactory,
+    OmniFormFactory,
+    OmniModelFormFactory
+)
+from omniforms.tests.models import DummyModel
+from omniforms.transfer import (
+    FORMAT_VERSION,
+    InvalidFormDefinition,
+    dump_forms,
+    export_forms,
+    import_forms,
+    load_forms
+)
+import json
+import os
+import shutil
+import tempfile
+
+
+def get_values(instance):
+    """
+    Gets the values of the concrete model fields of the instance that do not depend on the database ids
+
+    :param instance: Model instance
+    :return: Dict of values keyed by attribute name
+    """
+    excluded = ('real_type_id', 'object_id', 'snapshot', 'recipient_field_id')
+    return {
+        field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields
+        if not field.primary_key and field.attname not in excluded
+        and not (field.remote_field and field.remote_field.parent_link)
+    }
+
+
+class TransferTestCase(TestCase):
+    """
+    Tests exporting and importing forms
+    """
+    def setUp(self):
+        super(TransferTestCase, self).setUp()
+        self.form, self.data = build_form(20)
+        self.model_form = OmniModelFormFactory.create()
+        self.email_field = OmniEmailFieldFactory.create(form=self.model_form, name='email')
+        self.handler = OmniFormEmailConfirmationHandlerFactory.create(
+            form=self.model_form,
+            recipient_field=self.email_field
+        )
+
+    def assert_copied(self, source, copy):
+        """
+        Asserts that the copy has the same definition as the source form
+
+        :param source: The source form
+        :param copy: The imported form
+        """
+        self.assertNotEqual(source.pk, copy.pk)
+        self.assertEqual(get_values(source), get_values(copy))
+        for base_model_class in (OmniField, OmniFormHandler):
+            source_instances = list(base_model_class.objects.filter(
+                content_type=ContentType.objects.get_for_model(source), object_id=source.pk
+            ).specific())
+            copies = list(base_model_class.objects.filter(
+                content_type=ContentType.objects.get_for_model(copy), object_id=copy.pk
+            ).specific())
+            self.assertEqual(
+                [instance.__class__ for instance in source_instances],
+                [instance.__class__ for instance in copies]
+            )
+            self.assertEqual(
+                [get_values(instance) for instance in source_instances],
+                [get_values(instance) for instance in copies]
+            )
+
+    def round_trip(self, forms, **kwargs):
+        """
+        Exports and imports the forms
+
+        :param forms: List of forms
+        :param kwargs: Keyword args for import_forms
+        :return: List of imported forms
+        """
+        stream = StringIO()
+        dump_forms(forms, stream)
+        stream.seek(0)
+        return import_forms(load_forms(stream), **kwargs)
+
+    def test_round_trip(self):
+        """
+        Imported forms should have the same fields and handlers as the exported forms
+        """
+        form, model_form = self.round_trip([self.form, self.model_form])
+        self.assertIsInstance(form, OmniForm)
+        self.assertIsInstance(model_form, OmniModelForm)
+        self.assert_copied(self.form, form)
+        self.assert_copied(self.model_form, model_form)
+
+    def test_imported_form_valid(self):
+        """
+        Imported forms should build working form classes
+        """
+        form = self.round_trip([self.form])[0]
+        self.assertTrue(form.get_form_class()(data=self.data).is_valid())
+
+    def test_field_references_remapped(self):
+        """
+        Handler references to fields should point at the imported fields
+        """
+        model_form = self.round_trip([self.model_form])[0]
+        handler = model_form.handlers.get().specific
+        self.assertEqual(handler.recipient_field.name, 'email')
+        self.assertNotEqual(handler.recipient_field_id, self.email_field.pk)
+        self.assertEqual(handler.recipient_field.object_id, model_form.pk)
+
+    def test_natural_keys(self):
+        """
+        Models and content types should be referenced by natural keys rather than ids
+        """
+        form_data, model_form_data = list(export_forms([self.form, self.model_form]))
+        self.assertEqual(model_form_data['model'], 'omniforms.omnimodelform')
+        self.assertEqual(model_form_data['values']['content_type'], ['tests', 'dummymodel'])
+        self.assertEqual(model_form_data['handlers'][0]['values']['recipient_field'], 'email')
+        related = [field for field in form_data['fields'] if field['model'] == 'omniforms.omniforeignkeyfield']
+        self.assertEqual(related[0]['values']['related_type'], ['tests', 'dummymodel2'])
+        for data in [form_data, model_form_data] + form_data['fields'] + form_data['handlers']:
+            for name in ('id', 'real_type', 'object_id', 'snapshot', 'omnifield_ptr'):
+                self.assertNotIn(name, data['values'])
+
+    def test_export_queries(self):
+        """
+        The number of queries required to export forms should not depend on the number of forms
+        """
+        with CaptureQueriesContext(connection) as context:
+            list(export_forms([self.form]))
+        forms = [self.form] + [build_form(20)[0] for index in range(3)]
+        with self.assertNumQueries(len(context.captured_queries)):
+            list(export_forms(forms))
+
+    def test_bulk_inserts(self):
+        """
+        Rows should be inserted in bulk for each concrete model class
+        """
+        forms = [build_form(20)[0] for index in range(3)]
+        with patch('omniforms.transfer.bulk_insert', wraps=bulk_insert) as patched_method:
+            imported = self.round_trip(forms)
+        self.assertEqual(len(imported), 3)
+        model_classes = [call[0][0] for call in patched_method.call_args_list]
+        self.assertEqual(len(model_classes), len(set(model_classes)))
+        self.assertEqual(
+            set(model_classes),
+            set([OmniForm]) | set(field.__class__ for field in self.form.fields.specific()) |
+            set(handler.__class__ for handler in self.form.handlers.specific())
+        )
+
+    def test_batches_in_single_transaction(self):
+        """
+        No forms should be created if any form cannot be imported
+        """
+        records = list(export_forms([self.form, self.model_form]))
+        records[1]['fields'][0]['model'] = 'omniforms.omnifictionalfield'
+        count = OmniForm.objects.count()
+        with self.assertRaises(InvalidFormDefinition):
+            import_forms(records, batch_size=1)
+        self.assertEqual(OmniForm.objects.count(), count)
+
+    def test_invalid_definitions(self):
+        """
+        Invalid models, values and references should raise InvalidFormDefinition
+        """
+        for change in [
+            lambda record: record.update(model='tests.dummymodel'),
+            lambda record: record['values'].update(content_type=['fictional', 'model']),
+            lambda record: record['fields'][0]['values'].update(fictional='value'),
+            lambda record: record['fields'][0].update(model='omniforms.omniformhandler'),
+            lambda record: record['handlers'][0]['values'].update(recipient_field='fictional'),
+        ]:
+            record = list(export_forms([self.model_form]))[0]
+            change(record)
+            with self.assertRaises(InvalidFormDefinition):
+                import_forms([record])
+
+    def test_load_forms_invalid(self):
+        """
+        Streams that are not omniforms exports should raise InvalidFormDefinition
+        """
+        header = json.dumps({'format': 'omniforms', 'version': FORMAT_VERSION})
+        for content in ['', 'not json\n', '{"format": "other"}\n', '{"format": "omniforms", "version": 0}\n',
+                        header + '\n\nnot json\n']:
+            with self.assertRaises(InvalidFormDefinition):
+                list(load_forms(StringIO(content)))
+
+
+class TransferCommandTestCase(TestCase):
+    """
+    Tests the omniforms_export and omniforms_import management commands
+    """
+    def setUp(self):
+        super(TransferCommandTestCase, self).setUp()
+        self.form = OmniFormFactory.create(title='Contact')
+        OmniCharFieldFactory.create(form=self.form, name='subject')
+        self.model_form = OmniModelFormFactory.create(title='Dummy')
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'forms.jsonl')
+
+    def tearDown(self):
+        super(TransferCommandTestCase, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_export_all(self):
+        """
+        All forms should be exported if no ids are given
+        """
+        stdout = StringIO()
+        call_command('omniforms_export', stdout=stdout, stderr=StringIO())
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[0]), {'format': 'omniforms', 'version': FORMAT_VERSION})
+        self.assertEqual([json.loads(line)['values']['title'] for line in lines[1:]], ['Contact', 'Dummy'])
+
+    def test_export_ids(self):
+        """
+        Only the forms with the given ids should be exported
+        """
+        stdout = StringIO()
+        call_command('omniforms_export', self.model_form.pk, model='omnimodelform', stdout=stdout, stderr=StringIO())
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual([json.loads(line)['values']['title'] for line in lines[1:]], ['Dummy'])
+
+    def test_export_missing(self):
+        """
+        A CommandError should be raised if a form does not exist
+        """
+        with self.assertRaises(CommandError):
+            call_command('omniforms_export', 999, stdout=StringIO(), stderr=StringIO())
+
+    def test_export_and_import(self):
+        """
+        Forms written by the export command should be created by the import command
+        """
+        call_command('omniforms_export', output=self.path, stdout=StringIO(), stderr=StringIO())
+        stdout = StringIO()
+        call_command('omniforms_import', self.path, stdout=stdout)
+        self.assertIn('Imported 2 form(s)', stdout.getvalue())
+        imported = OmniForm.objects.exclude(pk=self.form.pk).get()
+        self.assertEqual(imported.title, 'Contact')
+        self.assertEqual(list(imported.fields.values_list('name', flat=True)), ['subject'])
+        imported_model_form = OmniModelForm.objects.exclude(pk=self.model_form.pk).get()
+        self.assertEqual(imported_model_form.content_type.model_class(), DummyModel)
+
+    def test_import_invalid(self):
+        """
+        A CommandError should be raised if the export cannot be imported
+        """
+        with open(self.path, 'w') as export_file:
+            export_file.write('{"format": "other"}\n')
+        with self.assertRaises(CommandError):
+            call_command('omniforms_import', self.path, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('omniforms_import', os.path.join(self.directory, 'missing.jsonl'), stdout=StringIO())
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms validation module
+"""
+from __future__ import unicode_literals
+from decimal import Decimal
+from django import forms
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from mock import patch
+from omniforms.benchmarks.forms import build_form
+from omniforms.cache import form_class_cache
+from omniforms.forms import OmniFormBaseForm
+from omniforms.tests.factories import OmniCharFieldFactory, OmniDateFieldFactory, OmniFormFactory
+from omniforms.validation import FALLBACK, ValidationPlan, compile_field
+import uuid
+
+
+class CustomCharField(forms.CharField):
+    """
+    CharField subclass standing in for a custom mapped field
+    """
+
+
+def odd_validator(value):
+    """
+    Validator that only accepts odd numbers
+
+    :param value: int
+    :raises: ValidationError if the value is even
+    """
+    if value % 2 == 0:
+        raise forms.ValidationError('Enter an odd number.', code='even')
+
+
+class ExampleForm(OmniFormBaseForm):
+    """
+    Form containing every supported field type in various configurations
+    """
+    char = forms.CharField(max_length=5, min_length=2)
+    char_optional = forms.CharField(required=False)
+    char_unstripped = forms.CharField(required=False, strip=False, max_length=3)
+    email = forms.EmailField(max_length=30)
+    email_optional = forms.EmailField(required=False)
+    slug = forms.SlugField()
+    url = forms.URLField(required=False, max_length=40)
+    uuid = forms.UUIDField(required=False)
+    integer = forms.IntegerField(min_value=1, max_value=10)
+    integer_odd = forms.IntegerField(required=False, validators=[odd_validator])
+    float = forms.FloatField(required=False, min_value=0.5)
+    decimal = forms.DecimalField(required=False, max_digits=5, decimal_places=2, max_value=Decimal('100'))
+    boolean = forms.BooleanField()
+    boolean_optional = forms.BooleanField(required=False)
+    choice = forms.ChoiceField(choices=[('a', 'A'), ('Group', [('b', 'B'), ('c', 'C')])])
+    choice_optional = forms.ChoiceField(required=False, choices=[('1', 'One'), ('2', 'Two')])
+    custom = CustomCharField(max_length=3)
+    date = forms.DateField(required=False)
+
+
+ExampleForm._validation_plan = ValidationPlan(ExampleForm.base_fields)
+
+
+class UnplannedExampleForm(ExampleForm):
+    """
+    The example form validated by django alone
+    """
+    _validation_plan = None
+
+
+VALUES = {
+    'char': [None, '', '  ', 'a', ' ab ', 'abcde', 'abcdef', 12],
+    'char_optional': [None, '', ' text '],
+    'char_unstripped': ['', ' ', ' ab', ' abc'],
+    'email': ['user@example.com', ' user@example.com ', 'user', 'user@', '@example.com', 'user@localhost',
+              'user@[127.0.0.1]', 'üser@example.com', 'user@exämple.com', 'a' * 20 + '@example.com', ''],
+    'email_optional': ['', 'user@example.com', 'not an email'],
+    'slug': ['a-slug', 'a slug', 'ä-slug', ''],
+    'url': ['', 'http://www.example.com', 'www.example.com', 'example', 'ftp://example.com', 'http://[::1]/',
+            'http://exämple.com', 'http://example.com?', 'http://' + 'a' * 40 + '.com', 'mailto:user'],
+    'uuid': ['', '0f3a5c1e-2b4d-4e6f-8a9b-1c2d3e4f5a6b', '0F3A5C1E2B4D4E6F8A9B1C2D3E4F5A6B', 'not a uuid'],
+    'integer': ['', None, '1', ' 5 ', '10', '11', '0', '5.0', '5.5', 'five', '1_0'],
+    'integer_odd': ['', '3', '4'],
+    'float': ['', '1.5', '0.1', '1e3', 'inf', 'nan', 'one'],
+    'decimal': ['', '1.23', '1.234', '123.4', '1000', '-99.99', '1e2', 'NaN', 'Infinity', 'x'],
+    'boolean': [None, '', 'on', 'false', '0', 'False', True, False],
+    'boolean_optional': [None, 'on', 'false'],
+    'choice': ['', 'a', 'b', 'c', 'd', 'A'],
+    'choice_optional': ['', '1', '3'],
+    'custom': ['ab', 'abcd'],
+    'date': ['', '2018-01-01', 'tomorrow'],
+}
+
+
+class ValidationPlanTestCase(TestCase):
+    """
+    Tests that forms validated with a validation plan behave exactly as forms validated by django
+    """
+    def assert_identical(self, data):
+        """
+        Asserts that the form data is validated identically with and without the validation plan
+
+        :param data: Dict of submitted data
+        """
+        planned, unplanned = ExampleForm(data=data), UnplannedExampleForm(data=data)
+        self.assertEqual(planned.is_valid(), unplanned.is_valid())
+        self.assertEqual(planned.errors.as_json(), unplanned.errors.as_json())
+        self.assertEqual(planned.cleaned_data, unplanned.cleaned_data)
+        for name, value in planned.cleaned_data.items():
+            self.assertIs(type(value), type(unplanned.cleaned_data[name]), name)
+
+    def test_identical_errors_and_cleaned_data(self):
+        """
+        Every value of every field should be cleaned identically
+        """
+        for name, values in VALUES.items():
+            for value in values:
+                data = {} if value is None else {name: value}
+                self.assert_identical(data)
+
+    def test_valid_data(self):
+        """
+        Valid data should be cleaned identically
+        """
+        data = {
+            'char': 'abc',
+            'email': 'user@example.com',
+            'slug': 'slug',
+            'url': 'example.com/path',
+            'uuid': '0f3a5c1e-2b4d-4e6f-8a9b-1c2d3e4f5a6b',
+            'integer': '3',
+            'float': '2.5',
+            'decimal': '12.34',
+            'boolean': 'on',
+            'choice': 'b',
+            'custom': 'abc',
+            'date': '2018-01-01',
+        }
+        self.assertTrue(ExampleForm(data=data).is_valid())
+        self.assert_identical(data)
+
+    def test_supported_fields_compiled(self):
+        """
+        Only fields of exactly the supported types should have compiled cleaners
+        """
+        plan = ExampleForm._validation_plan
+        self.assertNotIn('custom', plan)
+        self.assertNotIn('date', plan)
+        self.assertEqual(len(plan), len(ExampleForm.base_fields) - 2)
+
+    def test_valid_values_not_cleaned_by_field(self):
+        """
+        Fields should only clean values the compiled cleaner cannot accept
+        """
+        form = ExampleForm(data={'char': 'abc'})
+        with patch.object(forms.CharField, 'clean', autospec=True, side_effect=forms.CharField.clean) \
+                as patched_method:
+            form.is_valid()
+        self.assertNotIn(form.fields['char'], [call[0][0] for call in patched_method.call_args_list])
+        form = ExampleForm(data={'char': 'abcdef'})
+        with patch.object(forms.CharField, 'clean', autospec=True, side_effect=forms.CharField.clean) \
+                as patched_method:
+            form.is_valid()
+        self.assertIn((form.fields['char'], 'abcdef'), [call[0] for call in patched_method.call_args_list])
+
+    def test_clean_methods_called(self):
+        """
+        Form clean_<name> methods should be called for fields with compiled cleaners
+        """
+        class HookForm(ExampleForm):
+            def clean_char(self):
+                return self.cleaned_data['char'].upper()
+
+        form = HookForm(data={'char': 'abc'})
+        form.is_valid()
+        self.assertEqual(form.cleaned_data['char'], 'ABC')
+
+    def test_changed_fields_use_django(self):
+        """
+        Fields changed on the form instance should not use the compiled cleaner
+        """
+        form = ExampleForm(data={})
+        form.fields['char'].required = False
+        form.fields['slug'] = CustomCharField()
+        plan = ExampleForm._validation_plan
+        self.assertIsNone(plan.get_cleaner('char', form.fields['char']))
+        self.assertIsNone(plan.get_cleaner('slug', form.fields['slug']))
+        self.assertIsNotNone(plan.get_cleaner('email', form.fields['email']))
+        form.is_valid()
+        self.assertNotIn('char', form.errors)
+
+    def test_instance_choices_changed(self):
+        """
+        Choices removed from a field on the form instance should not be accepted
+        """
+        form = ExampleForm(data={'choice_optional': '2'})
+        form.fields['choice_optional'].choices = [('1', 'One')]
+        self.assertIsNone(ExampleForm._validation_plan.get_cleaner('choice_optional', form.fields['choice_optional']))
+        form.is_valid()
+        self.assertIn('choice_optional', form.errors)
+
+    def test_instance_validator_added(self):
+        """
+        Validators added to a field on the form instance should be run
+        """
+        form = ExampleForm(data={'integer_odd': '4', 'float': '2'})
+        form.fields['float'].validators.append(odd_validator)
+        self.assertIsNone(ExampleForm._validation_plan.get_cleaner('float', form.fields['float']))
+        form.is_valid()
+        self.assertEqual(form.errors['float'], ['Enter an odd number.'])
+
+    def test_subclass_redeclared_field(self):
+        """
+        Fields redeclared by a subclass of the form class should be cleaned by the redeclared field
+        """
+        class SubclassForm(ExampleForm):
+            char = forms.CharField(max_length=5, required=False)
+
+        form = SubclassForm(data={'char': 'a' * 20})
+        form.is_valid()
+        self.assertEqual(form.errors['char'], UnplannedExampleForm(data={'char': 'a' * 20}).errors['char'])
+
+    def test_unchanged_instance_fields_compiled(self):
+        """
+        Fields copied to the form instance without changes should use the compiled cleaner
+        """
+        form = ExampleForm(data={})
+        plan = ExampleForm._validation_plan
+        for name in ('char', 'choice', 'integer_odd', 'decimal'):
+            self.assertIsNotNone(plan.get_cleaner(name, form.fields[name]), name)
+
+
+class CompileFieldTestCase(TestCase):
+    """
+    Tests the compile_field function
+    """
+    def test_unsupported_fields(self):
+        """
+        Custom field subclasses, localized numbers, disabled fields and callable choices should not be compiled
+        """
+        self.assertIsNone(compile_field(CustomCharField()))
+        self.assertIsNone(compile_field(forms.DateField()))
+        self.assertIsNone(compile_field(forms.IntegerField(localize=True)))
+        self.assertIsNone(compile_field(forms.CharField(disabled=True)))
+        self.assertIsNone(compile_field(forms.ChoiceField(choices=lambda: [('a', 'A')])))
+
+    def test_cleaners(self):
+        """
+        Cleaners should return cleaned values, or FALLBACK for values they cannot accept
+        """
+        self.assertEqual(compile_field(forms.CharField())(' text '), 'text')
+        self.assertIs(compile_field(forms.CharField())(''), FALLBACK)
+        self.assertEqual(compile_field(forms.IntegerField())('3'), 3)
+        self.assertIs(compile_field(forms.IntegerField(max_value=2))('3'), FALLBACK)
+        self.assertEqual(compile_field(forms.UUIDField())('0f3a5c1e2b4d4e6f8a9b1c2d3e4f5a6b'),
+                         uuid.UUID('0f3a5c1e2b4d4e6f8a9b1c2d3e4f5a6b'))
+        self.assertIs(compile_field(forms.ChoiceField(choices=[('a', 'A')]))('b'), FALLBACK)
+
+
+class GeneratedFormPlanTestCase(TestCase):
+    """
+    Tests validation plans for generated form classes
+    """
+    def setUp(self):
+        super(GeneratedFormPlanTestCase, self).setUp()
+        form_class_cache.clear()
+
+    def test_plan_compiled(self):
+        """
+        A plan should be compiled for generated form classes
+        """
+        omni_form = OmniFormFactory.create()
+        OmniCharFieldFactory.create(form=omni_form, name='title')
+        OmniDateFieldFactory.create(form=omni_form, name='date')
+        plan = omni_form.get_form_class()._validation_plan
+        self.assertIn('title', plan)
+        self.assertNotIn('date', plan)
+
+    @override_settings(OMNI_FORMS_VALIDATION_PLAN=False)
+    def test_plan_disabled(self):
+        """
+        No plan should be compiled if the OMNI_FORMS_VALIDATION_PLAN setting is False
+        """
+        omni_form = OmniFormFactory.create()
+        OmniCharFieldFactory.create(form=omni_form, name='title')
+        self.assertIsNone(omni_form.get_form_class()._validation_plan)
+
+    def test_generated_form_identical(self):
+        """
+        Generated forms should be validated identically with and without the plan
+        """
+        omni_form, data = build_form(20)
+        form_class = omni_form.get_form_class()
+        unplanned_class = type(str('Unplanned'), (form_class,), {'_validation_plan': None})
+        invalid = dict((name, 'x' if isinstance(value, str) else value) for name, value in data.items())
+        for submitted in [data, invalid, {}]:
+            planned, unplanned = form_class(data=submitted), unplanned_class(data=submitted)
+            self.assertEqual(planned.is_valid(), unplanned.is_valid())
+            self.assertEqual(planned.errors.as_json(), unplanned.errors.as_json())
+            self.assertEqual(
+                dict((name, list(value) if isinstance(value, QuerySet) else value)
+                     for name, value in planned.cleaned_data.items()),
+                dict((name, list(value) if isinstance(value, QuerySet) else value)
+                     for name, value in unplanned.cleaned_data.items())
+            )
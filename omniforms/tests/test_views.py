@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms views module
+"""
+from __future__ import unicode_literals
+from django.contrib.contenttypes.models import ContentType
+from django.core import signing
+from django.core.urlresolvers import reverse
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from omniforms.models import OmniForeignKeyField
+from omniforms.tests.factories import OmniCharFieldFactory, OmniFormFactory
+from omniforms.tests.models import DummyModel2
+from omniforms.widgets import AUTOCOMPLETE_TOKEN_SALT
+
+
+@override_settings(OMNI_FORMS_AUTOCOMPLETE_PAGE_SIZE=5)
+class AutocompleteViewTestCase(TestCase):
+    """
+    Tests the autocomplete view
+    """
+    def setUp(self):
+        super(AutocompleteViewTestCase, self).setUp()
+        self.form = OmniFormFactory.create()
+        self.field = OmniForeignKeyField.objects.create(
+            related_type=ContentType.objects.get_for_model(DummyModel2),
+            name='dummy',
+            label='Dummy',
+            widget_class='omniforms.widgets.AutocompleteSelect',
+            queryset_filter='{"title__startswith": "Instance"}',
+            queryset_ordering='-title',
+            search_fields='title',
+            form=self.form
+        )
+        for index in range(12):
+            DummyModel2.objects.create(title='Instance {0:02d}'.format(index))
+        DummyModel2.objects.create(title='Excluded')
+        self.queryset = DummyModel2.objects.filter(title__startswith='Instance').order_by('-title')
+        self.url, query_string = self.field.get_autocomplete_url().split('?')
+        self.token = QueryDict(query_string)['token']
+
+    def _get_token(self, field):
+        """
+        Gets a signed token for the given field
+
+        :param field: OmniField instance
+        :return: Token string
+        """
+        return signing.dumps([field.pk, field.content_type_id, field.object_id], salt=AUTOCOMPLETE_TOKEN_SALT)
+
+    def _get_results(self, **params):
+        """
+        Requests a page of results
+
+        :param params: Query parameters
+        :return: Decoded JSON response
+        """
+        params.setdefault('token', self.token)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_page(self):
+        """
+        The first page of results should be returned
+        """
+        data = self._get_results()
+        self.assertEqual(
+            data['results'],
+            [{'id': str(instance.pk), 'text': str(instance)} for instance in self.queryset[:5]]
+        )
+        self.assertTrue(data['more'])
+
+    def test_pagination(self):
+        """
+        The requested page of results should be returned
+        """
+        data = self._get_results(page=2)
+        self.assertEqual(
+            [result['id'] for result in data['results']],
+            [str(instance.pk) for instance in self.queryset[5:10]]
+        )
+
+    def test_last_page(self):
+        """
+        The last page should report that there are no more results
+        """
+        data = self._get_results(page=3)
+        self.assertFalse(data['more'])
+        self.assertEqual(
+            [result['id'] for result in data['results']],
+            [str(instance.pk) for instance in self.queryset[10:]]
+        )
+
+    def test_invalid_page(self):
+        """
+        Invalid page numbers should return the first page
+        """
+        self.assertEqual(self._get_results(page='abc'), self._get_results())
+
+    def test_search(self):
+        """
+        Results should be filtered by the search term
+        """
+        data = self._get_results(q='instance 1')
+        self.assertEqual(
+            [result['id'] for result in data['results']],
+            [str(instance.pk) for instance in self.queryset.filter(title__icontains='instance 1')]
+        )
+        self.assertFalse(data['more'])
+
+    def test_num_queries(self):
+        """
+        A page of results should be fetched without counting the matching rows
+        """
+        with self.assertNumQueries(4):
+            self._get_results(q='instance')
+
+    def test_non_autocomplete_widget(self):
+        """
+        A 404 should be returned for fields that do not use an autocomplete widget
+        """
+        self.field.widget_class = 'django.forms.Select'
+        self.field.save()
+        self.assertEqual(self.client.get(self.url, {'token': self.token}).status_code, 404)
+
+    def test_non_related_field(self):
+        """
+        A 404 should be returned for fields that are not related fields
+        """
+        field = OmniCharFieldFactory.create(form=self.form)
+        response = self.client.get(
+            reverse('omniforms:autocomplete', args=[field.pk]),
+            {'token': self._get_token(field)}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_field(self):
+        """
+        A 404 should be returned for fields that do not exist
+        """
+        self.field.delete()
+        self.assertEqual(self.client.get(self.url, {'token': self.token}).status_code, 404)
+
+    def test_missing_token(self):
+        """
+        A 404 should be returned if the request does not include a token
+        """
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_invalid_token(self):
+        """
+        A 404 should be returned for tokens that were not signed by the widget
+        """
+        for token in ('abc', self.token[:-1], signing.dumps([self.field.pk, self.field.content_type_id])):
+            self.assertEqual(self.client.get(self.url, {'token': token}).status_code, 404)
+
+    def test_token_for_other_field(self):
+        """
+        A token issued for one field should not return the choices of another field
+        """
+        field = OmniCharFieldFactory.create(form=self.form)
+        response = self.client.get(self.url, {'token': self._get_token(field)})
+        self.assertEqual(response.status_code, 404)
+
+    def test_token_for_other_form(self):
+        """
+        A 404 should be returned if the field no longer belongs to the form the token was issued for
+        """
+        self.field.form = OmniFormFactory.create()
+        self.field.save()
+        self.assertEqual(self.client.get(self.url, {'token': self.token}).status_code, 404)
+
+    def test_post_not_allowed(self):
+        """
+        Only GET requests should be allowed
+        """
+        self.assertEqual(self.client.post(self.url).status_code, 405)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Tests the omniforms widgets module
+"""
+from __future__ import unicode_literals
+from django import forms
+from django.test import TestCase
+from omniforms.fields import ModelChoiceField, ModelMultipleChoiceField
+from omniforms.tests.models import DummyModel2
+from omniforms.widgets import AutocompleteSelect, AutocompleteSelectMultiple, get_fallback_widget_class
+
+
+class AutocompleteSelectTestCase(TestCase):
+    """
+    Tests the AutocompleteSelect widget
+    """
+    def setUp(self):
+        super(AutocompleteSelectTestCase, self).setUp()
+        self.instances = [DummyModel2.objects.create(title='Instance {0}'.format(index)) for index in range(3)]
+        self.field = ModelChoiceField(
+            queryset=DummyModel2.objects.order_by('pk'),
+            widget=AutocompleteSelect(url='/autocomplete/1/', attrs={'class': 'wide'})
+        )
+
+    def test_attrs(self):
+        """
+        The widget should add the autocomplete class and URL attributes
+        """
+        self.assertEqual(self.field.widget.attrs['class'], 'wide omniforms-autocomplete')
+        self.assertEqual(self.field.widget.attrs['data-autocomplete-url'], '/autocomplete/1/')
+
+    def test_no_url(self):
+        """
+        The URL attribute should be omitted if no URL is given
+        """
+        self.assertNotIn('data-autocomplete-url', AutocompleteSelect().attrs)
+
+    def test_media(self):
+        """
+        The widget should include the autocomplete script
+        """
+        self.assertIn('omniforms/js/autocomplete.js', str(self.field.widget.media))
+
+    def test_renders_selected_choice_only(self):
+        """
+        Only the empty label and the selected choice should be rendered, using a single query
+        """
+        with self.assertNumQueries(1):
+            html = self.field.widget.render('instance', self.instances[1].pk)
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn('value="{0}" selected'.format(self.instances[1].pk), html)
+        self.assertNotIn('value="{0}"'.format(self.instances[0].pk), html)
+
+    def test_renders_without_value(self):
+        """
+        Only the empty label should be rendered if there is no value, without any queries
+        """
+        with self.assertNumQueries(0):
+            html = self.field.widget.render('instance', None)
+        self.assertEqual(html.count('<option'), 1)
+
+    def test_renders_invalid_value(self):
+        """
+        Invalid values should not be rendered
+        """
+        html = self.field.widget.render('instance', 'abc')
+        self.assertEqual(html.count('<option'), 1)
+
+    def test_static_choices(self):
+        """
+        Widgets with plain choices should render only the selected choices
+        """
+        widget = AutocompleteSelect(choices=[('1', 'One'), ('2', 'Two')])
+        html = widget.render('number', '2')
+        self.assertIn('Two', html)
+        self.assertNotIn('One', html)
+
+
+class AutocompleteSelectMultipleTestCase(TestCase):
+    """
+    Tests the AutocompleteSelectMultiple widget
+    """
+    def test_renders_selected_choices_only(self):
+        """
+        Only the selected choices should be rendered, using a single query
+        """
+        instances = [DummyModel2.objects.create(title='Instance {0}'.format(index)) for index in range(3)]
+        field = ModelMultipleChoiceField(queryset=DummyModel2.objects.order_by('pk'), widget=AutocompleteSelectMultiple)
+        self.assertIsInstance(field.widget, forms.SelectMultiple)
+        with self.assertNumQueries(1):
+            html = field.widget.render('instances', [instances[0].pk, instances[2].pk])
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn('multiple', html)
+
+
+class GetFallbackWidgetClassTestCase(TestCase):
+    """
+    Tests the get_fallback_widget_class function
+    """
+    def test_fallback_widget_class(self):
+        """
+        The plain select widget class the autocomplete widget is based on should be returned
+        """
+        self.assertIs(get_fallback_widget_class(AutocompleteSelect), forms.Select)
+        self.assertIs(get_fallback_widget_class(AutocompleteSelectMultiple), forms.SelectMultiple)
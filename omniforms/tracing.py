@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Timing spans for form generation, handler execution and email delivery
+
+Spans are recorded by the tracer defined by the OMNI_FORMS_TRACER setting. The default
+LoggingTracer logs operations that take longer than OMNI_FORMS_TRACING_SLOW_THRESHOLD
+seconds. The MemoryTracer collects every span and is intended for use in tests.
+"""
+from __future__ import unicode_literals
+from collections import OrderedDict
+from contextlib import contextmanager
+from django import forms
+from django.conf import settings
+from django.db import connections, models
+from django.utils import six
+from django.utils.module_loading import import_string
+import logging
+import threading
+import timeit
+
+
+logger = logging.getLogger(__name__)
+
+
+class Span(object):
+    """
+    A timed operation
+    """
+    def __init__(self, name, form_pk=None, form_type=None, handler_type=None, tags=None):
+        """
+        Sets up the instance
+
+        :param name: The name of the operation, e.g. 'form.as_form_field'
+        :param form_pk: Primary key of the omni form the operation was run for
+        :param form_type: Model name of the omni form the operation was run for
+        :param handler_type: Class name of the handler the operation was run for
+        :param tags: Dict of additional data describing the operation
+        """
+        super(Span, self).__init__()
+        self.name = name
+        self.form_pk = form_pk
+        self.form_type = form_type
+        self.handler_type = handler_type
+        self.tags = tags or {}
+        self.query_count = None
+        self.elapsed = None
+
+    def as_dict(self):
+        """
+        Gets the span data as a dict
+
+        :return: OrderedDict
+        """
+        return OrderedDict([
+            ('name', self.name),
+            ('form_pk', self.form_pk),
+            ('form_type', self.form_type),
+            ('handler_type', self.handler_type),
+            ('query_count', self.query_count),
+            ('elapsed', self.elapsed),
+            ('tags', self.tags),
+        ])
+
+    def __repr__(self):
+        """
+        Gets a representation of the span for debugging
+
+        :return: str
+        """
+        return str('<Span {0} form={1} handler={2} queries={3} elapsed={4}>'.format(
+            self.name, self.form_pk, self.handler_type, self.query_count, self.elapsed
+        ))
+
+
+class BaseTracer(object):
+    """
+    Base class for tracers. Subclasses must define a record method
+    """
+    count_queries = True
+
+    def record(self, span):
+        """
+        Records the finished span
+
+        :param span: Span instance
+        :raises: NotImplementedError
+        """
+        raise NotImplementedError('"{0}" must define it\'s own record method'.format(self.__class__.__name__))
+
+
+class LoggingTracer(BaseTracer):
+    """
+    Logs spans that took longer than the OMNI_FORMS_TRACING_SLOW_THRESHOLD setting (in seconds)
+    Queries are not counted, as counting them enables query logging on every connection whilst a span is open
+    """
+    count_queries = False
+
+    @property
+    def threshold(self):
+        """
+        Gets the number of seconds above which an operation is considered slow
+
+        :return: float
+        """
+        return getattr(settings, 'OMNI_FORMS_TRACING_SLOW_THRESHOLD', 0.5)
+
+    def record(self, span):
+        """
+        Logs the span if it was slow
+
+        :param span: Span instance
+        """
+        if span.elapsed >= self.threshold:
+            logger.warning(
+                'Slow omniforms operation %s took %.3fs (form %s, handler %s)',
+                span.name,
+                span.elapsed,
+                span.form_pk,
+                span.handler_type,
+                extra={'span': span.as_dict()}
+            )
+
+
+class MemoryTracer(BaseTracer):
+    """
+    Collects spans in memory
+    """
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(MemoryTracer, self).__init__()
+        self._lock = threading.Lock()
+        self.spans = []
+
+    def record(self, span):
+        """
+        Stores the span
+
+        :param span: Span instance
+        """
+        with self._lock:
+            self.spans.append(span)
+
+    def get_spans(self, name=None):
+        """
+        Gets the recorded spans, optionally filtered by name
+
+        :param name: Optional span name
+        :return: List of Span instances
+        """
+        with self._lock:
+            return [span for span in self.spans if name is None or span.name == name]
+
+    def clear(self):
+        """
+        Discards the recorded spans
+        """
+        with self._lock:
+            del self.spans[:]
+
+
+_tracer = None
+_tracer_loaded = False
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """
+    Gets the tracer defined by the OMNI_FORMS_TRACER setting. Setting it to None disables tracing
+
+    :return: Tracer instance or None
+    """
+    global _tracer, _tracer_loaded
+    if _tracer_loaded:
+        return _tracer
+    with _tracer_lock:
+        if not _tracer_loaded:
+            tracer = getattr(settings, 'OMNI_FORMS_TRACER', 'omniforms.tracing.LoggingTracer')
+            if isinstance(tracer, six.string_types):
+                tracer = import_string(tracer)
+            _tracer = tracer() if tracer is not None else None
+            _tracer_loaded = True
+        return _tracer
+
+
+def reset_tracer():
+    """
+    Discards the current tracer so that it is recreated from settings on next use
+    """
+    global _tracer, _tracer_loaded
+    with _tracer_lock:
+        _tracer = None
+        _tracer_loaded = False
+
+
+class QueryCounter(object):
+    """
+    Counts the queries run on each database connection in the current thread.
+    Query logging is enabled on connections whilst any span is open and the
+    entries added to the query log are discarded again unless queries were
+    already being logged (e.g. with DEBUG enabled)
+    """
+    def __init__(self):
+        """
+        Sets up the instance
+        """
+        super(QueryCounter, self).__init__()
+        self._local = threading.local()
+
+    def start(self):
+        """
+        Starts counting queries
+
+        :return: Marker to pass to stop
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            self._local.logged = {}
+            for connection in connections.all():
+                self._local.logged[connection.alias] = (
+                    connection.force_debug_cursor,
+                    connection.queries_logged,
+                    len(connection.queries_log)
+                )
+                connection.force_debug_cursor = True
+        self._local.depth = depth + 1
+        return [self._get_position(connection) for connection in connections.all()]
+
+    @staticmethod
+    def _get_position(connection):
+        """
+        Gets the current position in the connections query log
+
+        :param connection: Database connection
+        :return: Tuple of (connection alias, log length, last log entry)
+        """
+        log = connection.queries_log
+        return connection.alias, len(log), log[-1] if log else None
+
+    @staticmethod
+    def _count_since(connection, length, last):
+        """
+        Counts the entries added to the connections query log since the given position
+
+        :param connection: Database connection
+        :param length: The length of the log at the position
+        :param last: The last entry in the log at the position
+        :return: int
+        """
+        log = connection.queries_log
+        if log.maxlen is None or len(log) < log.maxlen:
+            return len(log) - length
+        count = 0
+        for entry in reversed(log):
+            if entry is last:
+                break
+            count += 1
+        return count
+
+    def stop(self, marker):
+        """
+        Stops counting queries
+
+        :param marker: Marker returned by start
+        :return: The number of queries run since start was called
+        """
+        count = 0
+        for alias, length, last in marker:
+            count += self._count_since(connections[alias], length, last)
+
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            for alias, (force_debug_cursor, was_logged, length) in self._local.logged.items():
+                connection = connections[alias]
+                connection.force_debug_cursor = force_debug_cursor
+                if not was_logged:
+                    for index in range(max(len(connection.queries_log) - length, 0)):
+                        connection.queries_log.pop()
+        return count
+
+
+query_counter = QueryCounter()
+
+
+def _get_form_details(form):
+    """
+    Gets the primary key and model name of the omni form
+
+    :param form: OmniForm model instance, form class or form instance generated by an omni form
+    :return: Tuple of (primary key, model name)
+    """
+    form_class = form if isinstance(form, type) else form.__class__
+    if issubclass(form_class, forms.BaseForm) and getattr(form, '_omni_form_pk', None) is not None:
+        from django.contrib.contenttypes.models import ContentType
+        return form._omni_form_pk, ContentType.objects.get_for_id(form._omni_form_content_type_id).model
+    if not isinstance(form, models.Model):
+        return None, None
+    return form.pk, form._meta.model_name
+
+
+@contextmanager
+def span(name, form=None, handler=None, **tags):
+    """
+    Times the operation run within the context and records it with the current tracer
+
+    :param name: The name of the operation
+    :param form: OmniForm model instance, or form instance generated by an omni form
+    :param handler: OmniFormHandler instance the operation was run for
+    :param tags: Additional data describing the operation
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+
+    form_pk, form_type = _get_form_details(form)
+    if form_pk is None and handler is not None:
+        form_pk = handler.object_id
+    current = Span(
+        name,
+        form_pk=form_pk,
+        form_type=form_type,
+        handler_type=handler.__class__.__name__ if handler is not None else None,
+        tags=tags
+    )
+    marker = query_counter.start() if tracer.count_queries else None
+    start = timeit.default_timer()
+    try:
+        yield current
+    finally:
+        current.elapsed = timeit.default_timer() - start
+        if marker is not None:
+            current.query_count = query_counter.stop(marker)
+        try:
+            tracer.record(current)
+        except Exception:
+            logger.exception('Could not record span %s', name)
+
+
+__all__ = [
+    'Span',
+    'BaseTracer',
+    'LoggingTracer',
+    'MemoryTracer',
+    'get_tracer',
+    'reset_tracer',
+    'span',
+]
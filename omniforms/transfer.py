@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Export and import of omni form definitions
+
+Forms are exported as JSON lines. The first line is a header identifying the format and each
+following line holds one form along with all of its fields and handlers. Models and content
+types are referenced by their natural keys ('app_label.model' labels and [app_label, model]
+pairs) and handler references to fields are stored as field names, so exports do not contain
+any database ids and can be imported into any database with the same models installed.
+"""
+from __future__ import unicode_literals
+from collections import OrderedDict
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from omniforms.cloning import bulk_insert
+from omniforms.snapshots import deserialize_value, serialize_value
+import json
+
+
+FORMAT_NAME = 'omniforms'
+FORMAT_VERSION = 1
+
+DEFAULT_BATCH_SIZE = 500
+
+# Attributes that are derived from the model or the form an instance belongs to, so are not exported
+_EXCLUDED_FIELD_NAMES = ('real_type', 'content_type', 'object_id', 'snapshot')
+
+
+class InvalidFormDefinition(ValueError):
+    """
+    Raised when an exported form definition cannot be imported
+    """
+
+
+def _batches(iterable, batch_size):
+    """
+    Splits the iterable into lists of at most batch_size items
+
+    :param iterable: Any iterable
+    :param batch_size: The maximum number of items in each batch
+    :return: Generator of lists
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _get_exported_fields(model_class, excluded=_EXCLUDED_FIELD_NAMES):
+    """
+    Gets the model fields whose values are exported
+
+    :param model_class: Concrete form, field or handler model class
+    :param excluded: Names of fields that are not exported
+    :return: List of model fields
+    """
+    return [
+        field for field in model_class._meta.concrete_fields
+        if not field.primary_key and not (field.remote_field and field.remote_field.parent_link)
+        and field.name not in excluded
+    ]
+
+
+def _serialize_instance(instance, field_names=None, excluded=_EXCLUDED_FIELD_NAMES):
+    """
+    Serializes the form, field or handler instance
+
+    :param instance: Specific model instance
+    :param field_names: Dict of field names keyed by primary key, for the fields of the form the instance belongs to
+    :param excluded: Names of fields that are not exported
+    :raises: InvalidFormDefinition if the instance references a model that cannot be exported
+    :return: OrderedDict containing the model label and a dict of values keyed by field name
+    """
+    from omniforms.models import OmniField
+
+    values = OrderedDict()
+    for field in _get_exported_fields(instance.__class__, excluded=excluded):
+        value = getattr(instance, field.attname)
+        if not field.is_relation or value is None:
+            values[field.name] = serialize_value(field, instance)
+        elif issubclass(field.related_model, ContentType):
+            values[field.name] = list(ContentType.objects.get_for_id(value).natural_key())
+        elif issubclass(field.related_model, OmniField) and field_names is not None and value in field_names:
+            values[field.name] = field_names[value]
+        else:
+            raise InvalidFormDefinition('Cannot export the reference from {0} {1} to {2} {3}'.format(
+                instance._meta.label_lower, instance.pk, field.related_model._meta.label_lower, value
+            ))
+    return OrderedDict([('model', instance._meta.label_lower), ('values', values)])
+
+
+def _get_related(base_model_class, forms):
+    """
+    Gets the fields or handlers of the forms with one query per concrete model class
+
+    :param base_model_class: OmniField or OmniFormHandler
+    :param forms: List of saved OmniForm or OmniModelForm instances
+    :return: Dict of lists of specific instances keyed by (content type id, form primary key)
+    """
+    query = models.Q()
+    for form in forms:
+        query |= models.Q(content_type_id=ContentType.objects.get_for_model(form).pk, object_id=form.pk)
+    related = {}
+    for instance in base_model_class.objects.filter(query).order_by('order', 'pk').specific():
+        related.setdefault((instance.content_type_id, instance.object_id), []).append(instance)
+    return related
+
+
+def export_forms(forms, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Serializes the forms along with all of their fields and handlers. Fields and handlers are
+    fetched with one query per concrete model class for each batch of forms
+
+    :param forms: Iterable of saved OmniForm or OmniModelForm instances
+    :param batch_size: The number of forms to fetch fields and handlers for at a time
+    :raises: InvalidFormDefinition if a form cannot be exported
+    :return: Generator of OrderedDicts, one for each form
+    """
+    from omniforms.models import OmniField, OmniFormHandler
+
+    for batch in _batches(forms, batch_size):
+        fields = _get_related(OmniField, batch)
+        handlers = _get_related(OmniFormHandler, batch)
+        for form in batch:
+            key = (ContentType.objects.get_for_model(form).pk, form.pk)
+            form_fields = fields.get(key, [])
+            field_names = {field.pk: field.name for field in form_fields}
+            data = _serialize_instance(form, excluded=('snapshot',))
+            data['fields'] = [_serialize_instance(field) for field in form_fields]
+            data['handlers'] = [
+                _serialize_instance(handler, field_names=field_names) for handler in handlers.get(key, [])
+            ]
+            yield data
+
+
+def _build_instance(data, base_model_class):
+    """
+    Creates an unsaved form, field or handler instance from its serialized data.
+    References to fields are returned rather than set on the instance
+
+    :param data: Dict containing the model label and a dict of values keyed by field name
+    :param base_model_class: The class the model must be a subclass of
+    :raises: InvalidFormDefinition if the data cannot be loaded
+    :return: Tuple of (unsaved model instance, dict of referenced field names keyed by model field attname)
+    """
+    from omniforms.models import OmniField
+
+    try:
+        model_class = apps.get_model(data['model'])
+    except (KeyError, TypeError, ValueError, LookupError) as e:
+        raise InvalidFormDefinition('Unknown model: {0}'.format(e))
+    if not issubclass(model_class, base_model_class) or model_class._meta.abstract:
+        raise InvalidFormDefinition('{0} is not a {1}'.format(data['model'], base_model_class.__name__))
+
+    instance = model_class()
+    references = {}
+    for name, value in data.get('values', {}).items():
+        try:
+            field = model_class._meta.get_field(name)
+            if field not in _get_exported_fields(model_class, excluded=('real_type', 'object_id', 'snapshot')):
+                raise FieldDoesNotExist('{0} cannot be imported'.format(name))
+            if not field.is_relation or value is None:
+                setattr(instance, field.attname, deserialize_value(field, value))
+            elif issubclass(field.related_model, ContentType):
+                setattr(instance, field.attname, ContentType.objects.get_by_natural_key(*value).pk)
+            elif issubclass(field.related_model, OmniField):
+                references[field.attname] = value
+            else:
+                raise FieldDoesNotExist('{0} references an unsupported model'.format(name))
+        except (FieldDoesNotExist, ContentType.DoesNotExist, ValidationError, TypeError, ValueError) as e:
+            raise InvalidFormDefinition('Invalid value for {0}.{1}: {2}'.format(data['model'], name, e))
+
+    if hasattr(instance, 'real_type_id'):
+        instance.real_type_id = ContentType.objects.get_for_model(model_class).pk
+    return instance, references
+
+
+def _group_by_model(instances):
+    """
+    Groups the instances by their model class
+
+    :param instances: Iterable of model instances
+    :return: OrderedDict of lists of model instances keyed by model class
+    """
+    groups = OrderedDict()
+    for instance in instances:
+        groups.setdefault(instance.__class__, []).append(instance)
+    return groups
+
+
+def _import_batch(records, using):
+    """
+    Creates the forms, fields and handlers for a batch of serialized forms, inserting
+    the rows for each concrete model class in bulk
+
+    :param records: List of dicts returned by export_forms
+    :param using: The database alias to use
+    :raises: InvalidFormDefinition if a form cannot be imported
+    :return: List of created forms
+    """
+    from omniforms.models import OmniField, OmniFormBase, OmniFormHandler
+
+    forms, fields, handlers = [], [], []
+    for record in records:
+        form = _build_instance(record, OmniFormBase)[0]
+        forms.append(form)
+        fields.append([_build_instance(data, OmniField)[0] for data in record.get('fields', [])])
+        handlers.append([_build_instance(data, OmniFormHandler) for data in record.get('handlers', [])])
+
+    for model_class, instances in _group_by_model(forms).items():
+        bulk_insert(model_class, instances, using)
+
+    for form, form_fields, form_handlers in zip(forms, fields, handlers):
+        content_type_id = ContentType.objects.db_manager(using).get_for_model(form).pk
+        for instance in form_fields + [handler for handler, references in form_handlers]:
+            instance.content_type_id = content_type_id
+            instance.object_id = form.pk
+
+    for model_class, instances in _group_by_model(field for form_fields in fields for field in form_fields).items():
+        bulk_insert(model_class, instances, using)
+
+    for form, form_fields, form_handlers in zip(forms, fields, handlers):
+        field_pks = {field.name: field.pk for field in form_fields}
+        for handler, references in form_handlers:
+            for attname, name in references.items():
+                if name not in field_pks:
+                    raise InvalidFormDefinition(
+                        'Handler "{0}" on form "{1}" references the missing field "{2}"'.format(
+                            handler.name, form.title, name
+                        )
+                    )
+                setattr(handler, attname, field_pks[name])
+
+    all_handlers = (handler for form_handlers in handlers for handler, references in form_handlers)
+    for model_class, instances in _group_by_model(all_handlers).items():
+        bulk_insert(model_class, instances, using)
+    return forms
+
+
+def import_forms(records, using=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Creates forms along with all of their fields and handlers from serialized form definitions
+
+    Everything is written in a single transaction. Forms, fields and handlers are inserted in
+    bulk for each concrete model class, one batch of forms at a time. No signals are sent; the
+    snapshot of each form is generated the first time its form class is built.
+
+    :param records: Iterable of dicts returned by export_forms
+    :param using: The database alias to use (defaults to the database for writing forms)
+    :param batch_size: The number of forms to insert at a time
+    :raises: InvalidFormDefinition if a form cannot be imported
+    :return: List of created forms
+    """
+    from omniforms.models import OmniForm
+
+    if using is None:
+        using = router.db_for_write(OmniForm)
+    created = []
+    with transaction.atomic(using=using):
+        for batch in _batches(records, batch_size):
+            created.extend(_import_batch(batch, using))
+    return created
+
+
+def dump_forms(forms, stream, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Writes the forms to the stream as JSON lines
+
+    :param forms: Iterable of saved OmniForm or OmniModelForm instances
+    :param stream: Text stream to write to
+    :param batch_size: The number of forms to fetch fields and handlers for at a time
+    :return: The number of forms written
+    """
+    count = 0
+    stream.write(json.dumps({'format': FORMAT_NAME, 'version': FORMAT_VERSION}) + '\n')
+    for data in export_forms(forms, batch_size=batch_size):
+        stream.write(json.dumps(data, cls=DjangoJSONEncoder) + '\n')
+        count += 1
+    return count
+
+
+def load_forms(stream):
+    """
+    Reads serialized forms from JSON lines written by dump_forms
+
+    :param stream: Text stream to read from
+    :raises: InvalidFormDefinition if the stream is not in the expected format
+    :return: Generator of dicts, one for each form
+    """
+    lines = ((number, line) for number, line in enumerate(stream, 1) if line.strip())
+    try:
+        number, line = next(lines)
+        header = json.loads(line)
+    except StopIteration:
+        raise InvalidFormDefinition('The export is empty')
+    except ValueError as e:
+        raise InvalidFormDefinition('Line {0} is not valid JSON: {1}'.format(number, e))
+    if not isinstance(header, dict) or header.get('format') != FORMAT_NAME:
+        raise InvalidFormDefinition('The export is not an {0} export'.format(FORMAT_NAME))
+    if header.get('version') != FORMAT_VERSION:
+        raise InvalidFormDefinition('Unsupported export version: {0}'.format(header.get('version')))
+
+    for number, line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise InvalidFormDefinition('Line {0} is not valid JSON: {1}'.format(number, e))
+
+
+__all__ = [
+    'FORMAT_VERSION',
+    'InvalidFormDefinition',
+    'export_forms',
+    'import_forms',
+    'dump_forms',
+    'load_forms',
+]
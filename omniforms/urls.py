@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Public URLs for the omniforms app
+"""
+from __future__ import unicode_literals
+from django.conf.urls import url
+from omniforms import views
+
+
+app_name = 'omniforms'
+
+urlpatterns = [
+    url(r'^autocomplete/(?P<pk>\d+)/$', views.autocomplete, name='autocomplete'),
+]
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled validation plans for generated omni forms
+
+A validation plan holds a cleaner for each form field of a supported type. Cleaners are compiled
+once, when the form class is built, from the fields arguments and validators (lengths, bounds,
+regexes and choice sets) and validate submitted values without going through the fields clean,
+validate and run_validators methods. Cleaners only ever accept values. Any value a cleaner cannot
+accept is cleaned with the fields own clean method instead, so errors are always identical to
+those produced by django.
+"""
+from __future__ import unicode_literals
+from decimal import Decimal, DecimalException
+from django import forms
+from django.core import validators
+from django.core.exceptions import ValidationError
+from django.utils import six
+from django.utils.encoding import force_text
+import uuid
+
+
+# Returned by cleaners for values that must be cleaned by the field
+FALLBACK = object()
+
+_INFINITY = (Decimal('Inf'), Decimal('-Inf'))
+
+
+def _compile_validator(validator):
+    """
+    Compiles the validator into a check function returning True for values the validator accepts.
+    Common validators are compiled into direct comparisons and regex matches. Any other validator
+    is called and the value accepted if it doesn't raise a ValidationError
+
+    :param validator: Validator instance or function
+    :return: Check function
+    """
+    validator_type = type(validator)
+    if validator_type is validators.MaxLengthValidator:
+        limit = validator.limit_value
+        return lambda value: len(value) <= limit
+    if validator_type is validators.MinLengthValidator:
+        limit = validator.limit_value
+        return lambda value: len(value) >= limit
+    if validator_type is validators.MaxValueValidator:
+        limit = validator.limit_value
+        return lambda value: value <= limit
+    if validator_type is validators.MinValueValidator:
+        limit = validator.limit_value
+        return lambda value: value >= limit
+    if validator_type is validators.RegexValidator:
+        search = validator.regex.search
+        if validator.inverse_match:
+            return lambda value: search(force_text(value)) is None
+        return lambda value: search(force_text(value)) is not None
+    if validator_type is validators.EmailValidator:
+        return _compile_email_validator(validator)
+    if validator_type is validators.URLValidator:
+        return _compile_url_validator(validator)
+    if validator_type is validators.DecimalValidator:
+        return _compile_decimal_validator(validator)
+
+    def check(value):
+        try:
+            validator(value)
+        except ValidationError:
+            return False
+        return True
+    return check
+
+
+def _compile_email_validator(validator):
+    """
+    Compiles the email validator. Only addresses matching the user and domain regexes are
+    accepted; whitelisted, literal and internationalized domains are left to the validator
+
+    :param validator: EmailValidator instance
+    :return: Check function
+    """
+    user_match, domain_match = validator.user_regex.match, validator.domain_regex.match
+
+    def check(value):
+        user_part, separator, domain_part = value.rpartition('@')
+        return bool(separator and user_match(user_part) and domain_match(domain_part))
+    return check
+
+
+def _compile_url_validator(validator):
+    """
+    Compiles the URL validator. Only URLs matching the regex with a supported scheme are accepted;
+    IPv6 hosts, internationalized domains and URLs longer than the maximum host name are left to the validator
+
+    :param validator: URLValidator instance
+    :return: Check function
+    """
+    schemes, search = frozenset(validator.schemes), validator.regex.search
+
+    def check(value):
+        return (
+            len(value) <= 253 and '[' not in value and
+            value.split('://')[0].lower() in schemes and search(value) is not None
+        )
+    return check
+
+
+def _compile_decimal_validator(validator):
+    """
+    Compiles the decimal validator into a check of the number of digits and decimal places
+
+    :param validator: DecimalValidator instance
+    :return: Check function
+    """
+    max_digits, decimal_places = validator.max_digits, validator.decimal_places
+    max_whole_digits = None if max_digits is None or decimal_places is None else max_digits - decimal_places
+
+    def check(value):
+        digit_tuple, exponent = value.as_tuple()[1:]
+        decimals = abs(exponent)
+        digits = max(len(digit_tuple), decimals)
+        return not (
+            (max_digits is not None and digits > max_digits) or
+            (decimal_places is not None and decimals > decimal_places) or
+            (max_whole_digits is not None and digits - decimals > max_whole_digits)
+        )
+    return check
+
+
+def _compile_checks(field):
+    """
+    Compiles the validators of the field into a single check function
+
+    :param field: Form field instance
+    :return: Check function returning True if the value passes every validator
+    """
+    checks = tuple(_compile_validator(validator) for validator in field.validators)
+    if not checks:
+        return lambda value: True
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value):
+        for check in checks:
+            if not check(value):
+                return False
+        return True
+    return check_all
+
+
+def _compile_char_field(field, convert=None):
+    """
+    Compiles a cleaner for CharField and its subclasses
+
+    :param field: CharField instance
+    :param convert: Optional function converting the stripped text, raising ValueError for invalid values
+    :return: Cleaner function
+    """
+    required, strip, checks = field.required, field.strip, _compile_checks(field)
+    empty_value = field.empty_value if convert is None else None
+
+    def clean(value):
+        if value is None:
+            return FALLBACK if required else empty_value
+        if type(value) is not six.text_type:
+            return FALLBACK
+        if strip:
+            value = value.strip()
+        if not value:
+            return FALLBACK if required else empty_value
+        if convert is not None:
+            try:
+                value = convert(value)
+            except ValueError:
+                return FALLBACK
+        return value if checks(value) else FALLBACK
+    return clean
+
+
+def _compile_url_field(field):
+    """
+    Compiles a cleaner for URLField. URLs are normalized by the fields to_python method
+
+    :param field: URLField instance
+    :return: Cleaner function
+    """
+    clean_text = _compile_char_field(forms.CharField(required=field.required, empty_value=field.empty_value))
+    to_python, checks = field.to_python, _compile_checks(field)
+
+    def clean(value):
+        value = clean_text(value)
+        if value is FALLBACK or not value:
+            return value
+        try:
+            value = to_python(value)
+        except ValidationError:
+            return FALLBACK
+        return value if checks(value) else FALLBACK
+    return clean
+
+
+def _compile_number_field(field, convert, finite=False):
+    """
+    Compiles a cleaner for IntegerField, FloatField and DecimalField
+
+    :param field: Form field instance
+    :param convert: Function converting the submitted text, raising ValueError or DecimalException for invalid values
+    :param finite: Whether or not infinite and NaN values must be rejected
+    :return: Cleaner function
+    """
+    if field.localize:
+        return None
+    required, checks = field.required, _compile_checks(field)
+
+    def clean(value):
+        if value is None or value == '':
+            return FALLBACK if required else None
+        if type(value) is not six.text_type:
+            return FALLBACK
+        try:
+            value = convert(value)
+            if finite and (value != value or value in _INFINITY):
+                return FALLBACK
+        except (ValueError, DecimalException):
+            return FALLBACK
+        return value if checks(value) else FALLBACK
+    return clean
+
+
+def _compile_boolean_field(field):
+    """
+    Compiles a cleaner for BooleanField
+
+    :param field: BooleanField instance
+    :return: Cleaner function
+    """
+    required, checks = field.required, _compile_checks(field)
+
+    def clean(value):
+        if isinstance(value, six.string_types) and value.lower() in ('false', '0'):
+            value = False
+        else:
+            value = bool(value)
+        if not value and required:
+            return FALLBACK
+        return value if checks(value) else FALLBACK
+    return clean
+
+
+def _compile_choice_field(field):
+    """
+    Compiles a cleaner for ChoiceField, checking submitted values against a precomputed set of choices
+
+    :param field: ChoiceField instance
+    :return: Cleaner function
+    """
+    if not isinstance(field.choices, (list, tuple)):
+        return None
+    choices = set()
+    for key, label in field.choices:
+        if isinstance(label, (list, tuple)):
+            choices.update(force_text(group_key) for group_key, group_label in label)
+        else:
+            choices.add(force_text(key))
+    choices = frozenset(choices)
+    required, checks = field.required, _compile_checks(field)
+
+    def clean(value):
+        if value is None or value == '':
+            return FALLBACK if required else ''
+        if type(value) is not six.text_type or value not in choices:
+            return FALLBACK
+        return value if checks(value) else FALLBACK
+    return clean
+
+
+def _to_int(value):
+    """
+    Converts submitted text to an int
+
+    :param value: Text
+    :return: int
+    """
+    return int(value)
+
+
+def _to_uuid(value):
+    """
+    Converts submitted text to a UUID
+
+    :param value: Text
+    :return: uuid.UUID
+    """
+    return uuid.UUID(value)
+
+
+FIELD_COMPILERS = {
+    forms.CharField: _compile_char_field,
+    forms.EmailField: _compile_char_field,
+    forms.SlugField: _compile_char_field,
+    forms.UUIDField: lambda field: _compile_char_field(field, convert=_to_uuid),
+    forms.URLField: _compile_url_field,
+    forms.IntegerField: lambda field: _compile_number_field(field, _to_int),
+    forms.FloatField: lambda field: _compile_number_field(field, float, finite=True),
+    forms.DecimalField: lambda field: _compile_number_field(field, lambda value: Decimal(value.strip()), finite=True),
+    forms.BooleanField: _compile_boolean_field,
+    forms.ChoiceField: _compile_choice_field,
+}
+
+
+def compile_field(field):
+    """
+    Compiles a cleaner for the form field. Cleaners return the cleaned value, or FALLBACK if
+    the value must be cleaned by the field. Only fields of exactly the supported types are
+    compiled, so subclasses (e.g. custom mapped fields) are always cleaned by the field
+
+    :param field: Form field instance
+    :return: Cleaner function, or None if the field is not supported
+    """
+    compiler = FIELD_COMPILERS.get(type(field))
+    if compiler is None or field.disabled:
+        return None
+    return compiler(field)
+
+
+def _get_field_state(field):
+    """
+    Gets the attributes of the form field that its compiled cleaner depends on. The widget
+    only affects how values are read from the submitted data, so it is not included
+
+    :param field: Form field instance
+    :return: Dict of attribute values keyed by name
+    """
+    state = dict(field.__dict__)
+    state.pop('widget', None)
+    for name, value in state.items():
+        if isinstance(value, list):
+            state[name] = list(value)
+    return state
+
+
+class ValidationPlan(object):
+    """
+    The compiled cleaners for the fields of a form class
+
+    Form instances work with deep copies of the form class fields, which may be changed (or
+    replaced) on the instance, and subclasses of the form class may redeclare fields. Cleaners
+    are only used for fields of the same type with the same attributes (including choices and
+    validators) as the field the cleaner was compiled from
+    """
+    def __init__(self, fields):
+        """
+        Compiles cleaners for the fields
+
+        :param fields: Dict of form fields keyed by name
+        """
+        super(ValidationPlan, self).__init__()
+        self._entries = {}
+        for name, field in fields.items():
+            cleaner = compile_field(field)
+            if cleaner is not None:
+                self._entries[name] = (type(field), _get_field_state(field), cleaner)
+
+    def __len__(self):
+        """
+        Gets the number of compiled fields
+
+        :return: int
+        """
+        return len(self._entries)
+
+    def __contains__(self, name):
+        """
+        Whether or not the field has a compiled cleaner
+
+        :param name: Field name
+        :return: bool
+        """
+        return name in self._entries
+
+    def get_cleaner(self, name, field):
+        """
+        Gets the compiled cleaner for the field. Fields that have been replaced or changed
+        in any way since the plan was compiled have no cleaner
+
+        :param name: Field name
+        :param field: Form field instance
+        :return: Cleaner function or None
+        """
+        entry = self._entries.get(name)
+        if entry is None or type(field) is not entry[0]:
+            return None
+        state = entry[1]
+        attributes = field.__dict__
+        if len(attributes) - ('widget' in attributes) != len(state):
+            return None
+        for key, value in state.items():
+            if key not in attributes:
+                return None
+            current = attributes[key]
+            if current is not value and current != value:
+                return None
+        return entry[2]
+
+
+__all__ = [
+    'FALLBACK',
+    'ValidationPlan',
+    'compile_field',
+]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Public views for the omniforms app
+"""
+from __future__ import unicode_literals
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, JsonResponse
+from django.utils.encoding import force_text
+from django.views.decorators.http import require_GET
+from omniforms.models import OmniField, OmniRelatedField
+from omniforms.widgets import AUTOCOMPLETE_TOKEN_SALT
+
+
+def get_autocomplete_page_size():
+    """
+    Gets the number of results returned per page by the autocomplete view
+
+    :return: int
+    """
+    return getattr(settings, 'OMNI_FORMS_AUTOCOMPLETE_PAGE_SIZE', 20)
+
+
+def _get_page_number(request):
+    """
+    Gets the requested page number, defaulting to the first page
+
+    :param request: Http Request instance
+    :return: int
+    """
+    try:
+        return max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return 1
+
+
+def _get_token_scope(request, pk):
+    """
+    Gets the form lookups from the signed token embedded by the autocomplete widget.
+    Raises Http404 if the token is missing, invalid or was issued for another field
+
+    :param request: Http Request instance
+    :param pk: The primary key of the field
+    :return: Dict of lookups scoping the field to its form
+    """
+    try:
+        field_pk, content_type_id, object_id = signing.loads(
+            request.GET.get('token', ''),
+            salt=AUTOCOMPLETE_TOKEN_SALT
+        )
+    except (signing.BadSignature, TypeError, ValueError):
+        raise Http404
+    if force_text(field_pk) != force_text(pk):
+        raise Http404
+    return {'content_type_id': content_type_id, 'object_id': object_id}
+
+
+@require_GET
+def autocomplete(request, pk):
+    """
+    Returns a page of choices for a related field rendered with an autocomplete widget.
+    Results are filtered by the 'q' query parameter using the fields search fields.
+    The total number of results is never counted; one extra row is fetched to
+    determine whether there are more pages. The 'token' query parameter must be the
+    signed token embedded by the widget of the field on its rendered form.
+
+    :param request: Http Request instance
+    :param pk: The primary key of the field
+    :return: JsonResponse instance
+    """
+    field = OmniField.objects.filter(pk=pk, **_get_token_scope(request, pk)).specific().first()
+    if not isinstance(field, OmniRelatedField) or not field.uses_autocomplete_widget():
+        raise Http404
+
+    form_field = field.as_form_field()
+    queryset = form_field.queryset
+    term = request.GET.get('q', '').strip()
+    if term and field.search_fields:
+        queryset = queryset.filter(field.get_search_query(term))
+
+    page_size = get_autocomplete_page_size()
+    offset = (_get_page_number(request) - 1) * page_size
+    instances = list(queryset[offset:offset + page_size + 1])
+    return JsonResponse({
+        'results': [
+            {'id': force_text(form_field.prepare_value(instance)), 'text': form_field.label_from_instance(instance)}
+            for instance in instances[:page_size]
+        ],
+        'more': len(instances) > page_size,
+    })
@@ -1,11 +1,12 @@
 import django
+from collections import OrderedDict
 from django import forms
 from django.contrib.auth.models import Permission, Group
-from django.contrib.contenttypes.models import ContentType
-from django.db.models.query import Q
 from django.template.loader import render_to_string
 
+from omniforms.cloning import clone_form
 from omniforms.models import OmniForm, OmniField, OmniFormHandler
+from omniforms.registry import concrete_model_registry
 
 
 class WagtailOmniFormCloneForm(forms.ModelForm):
@@ -32,31 +33,13 @@ class WagtailOmniFormCloneForm(forms.ModelForm):
     def save(self, commit=True):
         """
         Create a new form instance using the submitted title
-        before cloning all fields associated with the source form
+        before cloning all fields and handlers associated with the source form
         and attaching them to the newly created OmniForm instance
 
         :param commit: Whether or not to commit the changes to the DB
         :return: Cloned form instance
         """
-        instance = OmniForm.objects.create(title=self.cleaned_data['title'])
-
-        # Clone the fields attached to the form
-        for base_field in self.instance.fields.all():
-            field = base_field.specific
-            field.id = None
-            field.omnifield_ptr = None
-            field.form = instance
-            field.save()
-
-        # Clone the handlers attached to the form
-        for base_handler in self.instance.handlers.all():
-            handler = base_handler.specific
-            handler.id = None
-            handler.omniformhandler_ptr = None
-            handler.form = instance
-            handler.save()
-
-        return instance
+        return clone_form(self.instance, title=self.cleaned_data['title'])
 
 
 class OmniPermissionFormBase(forms.ModelForm):
@@ -93,19 +76,20 @@ class OmniPermissionFormBase(forms.ModelForm):
 
         :return: Rendered form panel
         """
-        permissions = self.fields['permissions'].queryset
+        permissions = self.fields['permissions'].queryset.select_related('content_type')
         checkboxes_by_id = self._checkboxes_by_id(self['permissions'])
-        object_perms = []
+        perms_by_content_type = OrderedDict()
 
-        for content_type in ContentType.objects.filter(permission__in=permissions).distinct():
-            content_perms_dict = {'object': content_type.name}
-            for perm in permissions.filter(content_type=content_type):
-                permission_action = perm.codename.split('_')[0]
-                if permission_action in ['add', 'change', 'delete']:
-                    content_perms_dict[permission_action] = checkboxes_by_id[perm.id]
+        for perm in permissions:
+            content_perms_dict = perms_by_content_type.setdefault(
+                perm.content_type_id,
+                {'object': perm.content_type.name}
+            )
+            permission_action = concrete_model_registry.get_permission_action(perm.codename)
+            if permission_action is not None:
+                content_perms_dict[permission_action] = checkboxes_by_id[perm.id]
 
-            if content_perms_dict:
-                object_perms.append(content_perms_dict)
+        object_perms = list(perms_by_content_type.values())
 
         return render_to_string(
             'modeladmin/omniforms/wagtail/includes/permissions.html',
@@ -151,13 +135,9 @@ class OmniFieldPermissionForm(OmniPermissionFormBase):
 
     def __init__(self, *args, **kwargs):
         super(OmniFieldPermissionForm, self).__init__(*args, **kwargs)
-        query = Q()
-        for model_class in OmniField.objects.get_concrete_models():
-            query |= Q(
-                content_type__app_label=model_class._meta.app_label,
-                content_type__model=model_class._meta.model_name
-            )
-        self.fields['permissions'].queryset = Permission.objects.filter(query).select_related('content_type')
+        self.fields['permissions'].queryset = Permission.objects.filter(content_type__in=[
+            content_type for content_type, model_class in concrete_model_registry.get_content_types(OmniField)
+        ]).select_related('content_type')
 
 
 class OmniHandlerPermissionForm(OmniPermissionFormBase):
@@ -169,10 +149,6 @@ class OmniHandlerPermissionForm(OmniPermissionFormBase):
 
     def __init__(self, *args, **kwargs):
         super(OmniHandlerPermissionForm, self).__init__(*args, **kwargs)
-        query = Q()
-        for model_class in OmniFormHandler.objects.get_concrete_models():
-            query |= Q(
-                content_type__app_label=model_class._meta.app_label,
-                content_type__model=model_class._meta.model_name
-            )
-        self.fields['permissions'].queryset = Permission.objects.filter(query).select_related('content_type')
+        self.fields['permissions'].queryset = Permission.objects.filter(content_type__in=[
+            content_type for content_type, model_class in concrete_model_registry.get_content_types(OmniFormHandler)
+        ]).select_related('content_type')
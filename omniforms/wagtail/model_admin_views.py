@@ -7,11 +7,35 @@ from django.http import HttpResponseBadRequest, Http404
 from django.shortcuts import get_object_or_404, redirect
 from omniforms.admin_forms import AddRelatedForm, FieldForm
 from omniforms.models import OmniField, OmniFormHandler
+from omniforms.registry import concrete_model_registry
+from wagtail.contrib.modeladmin import views as modeladmin_views
 from wagtail.contrib.modeladmin.views import ModelFormView, InstanceSpecificView
 from wagtail.wagtailadmin import messages
 
 from omniforms.wagtail.forms import WagtailOmniFormCloneForm
-from omniforms.wagtail.utils import run_permission_hooks
+from omniforms.wagtail.utils import run_permission_hooks, run_permission_hooks_bulk
+
+
+class IndexView(modeladmin_views.IndexView):
+    """
+    Index view for omni forms
+    Runs the permission hooks for every form on the current page in bulk
+    """
+    permission_hook_actions = ('update', 'delete', 'clone')
+
+    def get_context_data(self, **kwargs):
+        """
+        Gets the template context data
+
+        :param kwargs: Default keyword args
+        :return: Dict of context data
+        """
+        context = super(IndexView, self).get_context_data(**kwargs)
+        instances = list(context['object_list'])
+        if instances:
+            for action in self.permission_hook_actions:
+                run_permission_hooks_bulk(action, instances)
+        return context
 
 
 class OmniFormBaseView(ModelFormView, InstanceSpecificView):
@@ -119,6 +143,23 @@ class SelectRelatedView(OmniFormBaseView):
         """
         return AddRelatedForm
 
+    def _get_permitted_content_types(self):
+        """
+        Gets the content types of the related models that the user is permitted to add,
+        excluding any models omitted by the excluded models setting
+
+        :return: List of (ContentType, model class) tuples
+        """
+        excluded_models = getattr(settings, self.excluded_models_setting_name, [])
+        user = self.request.user
+        permissions = None if user.is_active and user.is_superuser else user.get_all_permissions()
+        return [
+            (content_type, model_class)
+            for content_type, model_class in concrete_model_registry.get_content_types(self.related_model_type)
+            if model_class.__name__ not in excluded_models
+            and (permissions is None or self._get_model_permission(model_class, 'add') in permissions)
+        ]
+
     def get_form_kwargs(self):
         """
         Generates a dictionary of form kwargs to pass to the form constructor
@@ -134,26 +175,10 @@ class SelectRelatedView(OmniFormBaseView):
         # We now need to add the form field choices ('choices') to
         # the form kwargs so that we can dynamically populate the
         # forms select box
-        choices = []
-
-        for instance in ContentType.objects.order_by('model'):
-            model_class = instance.model_class()
-            if not model_class:
-                continue
-
-            # Don't add the field to the form choices if the field is explicitly omitted
-            if model_class.__name__ in getattr(settings, self.excluded_models_setting_name, []):
-                continue
-
-            if not issubclass(model_class, self.related_model_type):
-                continue
-
-            if model_class == self.related_model_type:
-                continue
-
-            perm = self._get_model_permission(model_class, 'add')
-            if self.request.user.has_perm(perm):
-                choices.append([instance.pk, instance.name])
+        choices = [
+            [content_type.pk, content_type.name]
+            for content_type, model_class in self._get_permitted_content_types()
+        ]
 
         form_kwargs['choices'] = choices
 
@@ -328,8 +353,7 @@ class FieldFormView(RelatedFormView):
         })
 
         if len(self.related_object_model_class.FORM_WIDGETS) > 1:
-            choices = map(lambda x: (x, x.rsplit('.')[-1]), self.related_object_model_class.FORM_WIDGETS)
-            widgets['widget_class'] = forms.Select(choices=choices)
+            widgets['widget_class'] = forms.Select(choices=self.related_object_model_class.get_widget_choices())
 
         return widgets
 
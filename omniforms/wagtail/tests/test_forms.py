@@ -1,4 +1,4 @@
-from mock import patch
+from mock import Mock, patch
 
 from django import forms
 from django.contrib.auth.models import Group, Permission
@@ -177,6 +177,34 @@ class OmniPermissionFormBaseTestCase(TestCase):
             Permission.objects.get(codename='delete_omnicharfield').pk
         )
 
+    @patch('omniforms.wagtail.forms.render_to_string', Mock(return_value=''))
+    def test_as_admin_panel_num_queries(self):
+        """
+        The panel should be built from a fixed number of queries regardless of the number of content types
+        """
+        form = OmniFieldPermissionForm(instance=self.group)
+        with self.assertNumQueries(2):
+            form.as_admin_panel()
+        form = OmniHandlerPermissionForm(instance=self.group)
+        with self.assertNumQueries(2):
+            form.as_admin_panel()
+
+    @patch('omniforms.wagtail.forms.render_to_string')
+    def test_as_admin_panel_all_content_types(self, render_to_string):
+        """
+        The panel should contain a row for each content type in the permissions queryset
+        """
+        render_to_string.return_value = ''
+        form = OmniFieldPermissionForm(instance=self.group)
+        form.as_admin_panel()
+        context = render_to_string.mock_calls[0][1][1]
+        content_types = set(form.fields['permissions'].queryset.values_list('content_type__model', flat=True))
+        self.assertEqual(len(context['object_perms']), len(content_types))
+        for content_perms_dict in context['object_perms']:
+            self.assertIn('add', content_perms_dict)
+            self.assertIn('change', content_perms_dict)
+            self.assertIn('delete', content_perms_dict)
+
     def test_save_adds_permissions(self):
         """
         The save method should add the selected permissions whilst leaving permissions not managed by the form alone
@@ -7,11 +7,13 @@ from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import override_settings, TestCase
+from django.test.utils import CaptureQueriesContext
 from wagtail.wagtailcore.models import Page
 
 from omniforms.admin_forms import AddRelatedForm
-from omniforms.models import OmniCharField, OmniField, OmniFormHandler, OmniFormEmailHandler
+from omniforms.models import OmniCharField, OmniField, OmniForm, OmniFormHandler, OmniFormEmailHandler
 from omniforms.tests.factories import OmniFormFactory, OmniCharFieldFactory, OmniFormEmailHandlerFactory, UserFactory
 from omniforms.wagtail import model_admin_views
 from omniforms.wagtail.forms import WagtailOmniFormCloneForm
@@ -91,6 +93,44 @@ class OmniFormBaseViewTestCase(TestCase):
         self.assertEqual(perm, 'omniforms.add_omnicharfield')
 
 
+class IndexViewTestCase(ModelAdminTestCaseStub):
+    """
+    Tests the IndexView
+    """
+    def setUp(self):
+        super(IndexViewTestCase, self).setUp()
+        self.url = self.model_admin.url_helper.index_url
+
+    @patch('omniforms.wagtail.model_admin_views.run_permission_hooks_bulk')
+    def test_runs_permission_hooks_in_bulk(self, patched_method):
+        """
+        The view should run the permission hooks for all forms on the page in bulk
+        """
+        OmniFormFactory.create()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [call[0][0] for call in patched_method.call_args_list],
+            ['update', 'delete', 'clone']
+        )
+        self.assertEqual(
+            set(instance.pk for instance in patched_method.call_args_list[0][0][1]),
+            set(OmniForm.objects.values_list('pk', flat=True))
+        )
+
+    @patch('omniforms.wagtail.utils.hooks.get_hooks')
+    def test_permission_hooks_run_once_per_form(self, get_hooks):
+        """
+        Each permission hook should only be run once per form and action during the request
+        """
+        OmniFormFactory.create()
+        hook = Mock()
+        get_hooks.side_effect = lambda name: [hook] if name == 'omniform_permission_check' else []
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(hook.call_count, 3 * OmniForm.objects.count())
+
+
 class SelectFieldViewTestCase(ModelAdminTestCaseStub):
     """
     Tests the SelectFieldView
@@ -118,12 +158,16 @@ class SelectFieldViewTestCase(ModelAdminTestCaseStub):
         self.assertEqual(response.context['instance'], self.form)
         self.assertEqual(response.context['view'].get_page_title(), 'Select field to add to form')
 
-    @patch('django.contrib.auth.models.User.has_perm', Mock(return_value=True))
     @override_settings(WAGTAIL_OMNI_FORM_OMITTED_FIELDS=['OmniDurationField', 'OmniFileField'])
     def test_form_choices(self):
         """
         The view should render the form with the correct choices
         """
+        for model_class in OmniField.objects.get_concrete_models():
+            self.user.user_permissions.add(Permission.objects.get(
+                content_type=ContentType.objects.get_for_model(model_class),
+                codename='add_{0}'.format(model_class._meta.model_name)
+            ))
         response = self.client.get(self.url)
         choices = response.context['form'].fields['choices'].choices
         self.assertTrue(len(choices) > 0)
@@ -139,6 +183,29 @@ class SelectFieldViewTestCase(ModelAdminTestCaseStub):
             elif issubclass(model_class, OmniField) and model_class != OmniField:
                 self.assertIn([instance.pk, instance.name], choices)
 
+    def test_form_choices_filtered_by_permission(self):
+        """
+        The view should only render choices for fields the user is permitted to add
+        """
+        response = self.client.get(self.url)
+        choices = response.context['form'].fields['choices'].choices
+        self.assertEqual(choices, [[
+            ContentType.objects.get_for_model(OmniCharField).pk,
+            ContentType.objects.get_for_model(OmniCharField).name
+        ]])
+
+    def test_form_choices_do_not_query_content_types(self):
+        """
+        Content types should not be queried once the choices have been computed
+        """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        self.assertFalse([
+            query for query in context.captured_queries
+            if 'FROM "django_content_type"' in query['sql']
+        ])
+
     def test_login_required(self):
         """
         The view should only be accessible to logged in users
@@ -229,6 +296,7 @@ class SelectHandlerViewTestCase(ModelAdminTestCaseStub):
         """
         The view should render the form with the correct choices
         """
+        self.user.user_permissions.add(Permission.objects.get(codename='add_omniformsavesubmissionhandler'))
         response = self.client.get(self.url)
         choices = response.context['form'].fields['choices'].choices
         self.assertTrue(len(choices) > 0)
@@ -0,0 +1,257 @@
+from mock import Mock, patch
+
+from django.core.exceptions import PermissionDenied
+from django.core.signals import request_finished
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.test import TestCase
+
+from omniforms.models import OmniForm
+from omniforms.tests.factories import OmniFormFactory
+from omniforms.wagtail.utils import (
+    cache_permission_hooks,
+    permission_hook_cache,
+    run_permission_hooks,
+    run_permission_hooks_bulk
+)
+
+
+class PermissionHooksTestCaseMixin(object):
+    """
+    Mixin patching the wagtail hook registry with mock hooks
+    """
+    def setUp(self):
+        super(PermissionHooksTestCaseMixin, self).setUp()
+        self.form = OmniFormFactory.create()
+        self.hook = Mock()
+        self.bulk_hook = Mock(return_value=[])
+        patcher = patch('omniforms.wagtail.utils.hooks.get_hooks')
+        self.get_hooks = patcher.start()
+        self.get_hooks.side_effect = lambda name: {
+            'omniform_permission_check': [self.hook],
+            'omniform_bulk_permission_check': [self.bulk_hook],
+        }[name]
+        self.addCleanup(patcher.stop)
+
+
+class RunPermissionHooksTestCase(PermissionHooksTestCaseMixin, TestCase):
+    """
+    Tests the run_permission_hooks function
+    """
+    def test_runs_hooks(self):
+        """
+        The function should run the single and bulk permission hooks
+        """
+        run_permission_hooks('update', self.form)
+        self.hook.assert_called_once_with('update', self.form)
+        self.bulk_hook.assert_called_once_with('update', [self.form])
+
+    def test_bulk_hook_denial(self):
+        """
+        The function should raise PermissionDenied if a bulk hook returns the instance pk
+        """
+        self.bulk_hook.return_value = [self.form.pk]
+        self.assertRaises(PermissionDenied, run_permission_hooks, 'update', self.form)
+
+    def test_no_caching_outside_context(self):
+        """
+        Hooks should be run on every call when no cache is active
+        """
+        run_permission_hooks('update', self.form)
+        run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 2)
+
+    def test_caches_outcome(self):
+        """
+        Hooks should only be run once per action and instance whilst a cache is active
+        """
+        with permission_hook_cache():
+            run_permission_hooks('update', self.form)
+            run_permission_hooks('update', OmniForm.objects.get(pk=self.form.pk))
+            run_permission_hooks('delete', self.form)
+        self.assertEqual(self.hook.call_count, 2)
+
+    def test_caches_permission_denied(self):
+        """
+        A cached PermissionDenied exception should be raised again without running the hooks
+        """
+        self.hook.side_effect = PermissionDenied('Locked')
+        with permission_hook_cache():
+            self.assertRaises(PermissionDenied, run_permission_hooks, 'update', self.form)
+            with self.assertRaises(PermissionDenied) as cm:
+                run_permission_hooks('update', self.form)
+        self.assertEqual(cm.exception.args, ('Locked',))
+        self.assertEqual(self.hook.call_count, 1)
+
+    def test_does_not_cache_unsaved_instances(self):
+        """
+        Outcomes for unsaved instances should not be cached
+        """
+        instance = OmniForm(title='Unsaved')
+        with permission_hook_cache():
+            run_permission_hooks('create', instance)
+            run_permission_hooks('create', instance)
+        self.assertEqual(self.hook.call_count, 2)
+        self.bulk_hook.assert_not_called()
+
+    def test_nested_contexts_share_cache(self):
+        """
+        Nested cache contexts should share the outermost cache
+        """
+        with permission_hook_cache() as outer:
+            with permission_hook_cache() as inner:
+                run_permission_hooks('update', self.form)
+            self.assertIs(outer, inner)
+            run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 1)
+
+    def test_cache_cleared_on_exit(self):
+        """
+        The cache should not outlive the context
+        """
+        with permission_hook_cache():
+            run_permission_hooks('update', self.form)
+        with permission_hook_cache():
+            run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 2)
+
+
+class RunPermissionHooksBulkTestCase(PermissionHooksTestCaseMixin, TestCase):
+    """
+    Tests the run_permission_hooks_bulk function
+    """
+    def setUp(self):
+        super(RunPermissionHooksBulkTestCase, self).setUp()
+        self.form_2 = OmniFormFactory.create()
+        self.form_3 = OmniFormFactory.create()
+        self.forms = [self.form, self.form_2, self.form_3]
+
+    def test_returns_outcomes(self):
+        """
+        The function should return a dict of pk to permitted flag
+        """
+        self.bulk_hook.return_value = [self.form_2.pk]
+        self.hook.side_effect = lambda action, instance: instance == self.form_3 and self._deny()
+        result = run_permission_hooks_bulk('delete', self.forms)
+        self.assertEqual(result, {self.form.pk: True, self.form_2.pk: False, self.form_3.pk: False})
+
+    def test_bulk_hook_called_once(self):
+        """
+        Bulk hooks should be called once with all instances
+        """
+        run_permission_hooks_bulk('delete', self.forms)
+        self.bulk_hook.assert_called_once_with('delete', self.forms)
+        self.assertEqual(self.hook.call_count, 3)
+
+    def test_skips_denied_instances(self):
+        """
+        Single instance hooks should not be run for instances denied by bulk hooks
+        """
+        self.bulk_hook.return_value = [self.form.pk]
+        run_permission_hooks_bulk('delete', self.forms)
+        self.assertNotIn(self.form, [call[0][1] for call in self.hook.call_args_list])
+
+    def test_primes_cache(self):
+        """
+        The outcomes should be reused by run_permission_hooks whilst a cache is active
+        """
+        self.bulk_hook.return_value = [self.form_2.pk]
+        with permission_hook_cache():
+            run_permission_hooks_bulk('delete', self.forms)
+            run_permission_hooks('delete', self.form)
+            self.assertRaises(PermissionDenied, run_permission_hooks, 'delete', self.form_2)
+            run_permission_hooks_bulk('delete', self.forms)
+        self.assertEqual(self.bulk_hook.call_count, 1)
+        self.assertEqual(self.hook.call_count, 2)
+
+    @staticmethod
+    def _deny():
+        raise PermissionDenied
+
+
+class CachePermissionHooksTestCase(PermissionHooksTestCaseMixin, TestCase):
+    """
+    Tests the cache_permission_hooks decorator
+    """
+    def test_caches_within_view(self):
+        """
+        Hooks should only be run once during the decorated call
+        """
+        @cache_permission_hooks
+        def view(request):
+            run_permission_hooks('update', self.form)
+            run_permission_hooks('update', self.form)
+            return 'response'
+
+        self.assertEqual(view(None), 'response')
+        self.assertEqual(view(None), 'response')
+        self.assertEqual(self.hook.call_count, 2)
+
+    def _get_template_response_view(self):
+        """
+        Gets a decorated view returning an unrendered template response
+
+        :return: Decorated view function
+        """
+        template = engines['django'].from_string('response')
+
+        @cache_permission_hooks
+        def view(request):
+            run_permission_hooks('update', self.form)
+            return SimpleTemplateResponse(template)
+        return view
+
+    def test_template_response_not_rendered(self):
+        """
+        Template responses should be returned unrendered, with the cache active until they are rendered
+        """
+        response = self._get_template_response_view()(None)
+        self.assertFalse(response.is_rendered)
+        run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 1)
+
+        response.render()
+        self.assertEqual(response.content, b'response')
+
+        run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 2)
+
+    def test_request_finished_discards_cache(self):
+        """
+        The cache should be discarded when the request finishes if the response was never rendered
+        """
+        self._get_template_response_view()(None)
+        request_finished.send(sender=None)
+        run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 2)
+
+    def test_exception_discards_cache(self):
+        """
+        The cache should be discarded if the view raises an exception
+        """
+        @cache_permission_hooks
+        def view(request):
+            run_permission_hooks('update', self.form)
+            raise ValueError
+
+        self.assertRaises(ValueError, view, None)
+        run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 2)
+
+    def test_nested_views_share_cache(self):
+        """
+        Views called whilst a cache is active should use the active cache
+        """
+        view = self._get_template_response_view()
+        with permission_hook_cache():
+            view(None).render()
+            run_permission_hooks('update', self.form)
+        self.assertEqual(self.hook.call_count, 1)
+
+    def test_preserves_attributes(self):
+        """
+        The decorated view should keep the name of the original
+        """
+        def my_view(request):
+            pass
+        self.assertEqual(cache_permission_hooks(my_view).__name__, 'my_view')
@@ -18,7 +18,12 @@ from omniforms.wagtail.wagtail_hooks import (
     WagtailOmniFormURLHelper,
     WagtailOmniFormPermissionHelper
 )
-from omniforms.tests.factories import UserFactory
+from omniforms.tests.factories import (
+    OmniCharFieldFactory,
+    OmniFormEmailHandlerFactory,
+    OmniFormFactory,
+    UserFactory
+)
 
 
 class AddOmniformsPermissionsTestCase(TestCase):
@@ -212,6 +217,127 @@ class WagtailOmniFormModelAdminTestCase(TestCase):
         )
 
 
+class WagtailOmniFormModelAdminIndexTestCase(TestCase):
+    """
+    Tests the WagtailOmniFormModelAdmin index view columns
+    """
+    def setUp(self):
+        super(WagtailOmniFormModelAdminIndexTestCase, self).setUp()
+        self.model_admin = WagtailOmniFormModelAdmin()
+        self.request = RequestFactory().get('/dummy-path/')
+        self.request.user = UserFactory.create(is_staff=True, is_superuser=True)
+        for index in range(3):
+            form = OmniFormFactory.create(title='Form {0}'.format(index))
+            OmniCharFieldFactory.create_batch(2, form=form)
+            OmniFormEmailHandlerFactory.create(form=form)
+
+    def _render_rows(self):
+        """
+        Renders the related object columns for each form in the index queryset
+
+        :return: List of (fields, handlers, locked) tuples
+        """
+        return [
+            (
+                self.model_admin.omni_form_fields(form),
+                self.model_admin.omni_form_handlers(form),
+                self.model_admin.omni_form_locked(form)
+            )
+            for form in self.model_admin.get_queryset(self.request)
+        ]
+
+    def test_admin_urls_cache_permission_hooks(self):
+        """
+        Every admin url callback should be wrapped so permission hook outcomes are cached per request
+        """
+        with patch('omniforms.wagtail.wagtail_hooks.cache_permission_hooks') as patched_method:
+            patched_method.side_effect = lambda view: view
+            urls = self.model_admin.get_admin_urls_for_registration()
+        self.assertEqual(patched_method.call_count, len(urls))
+        names = [pattern.name for pattern in urls]
+        self.assertIn(self.model_admin.url_helper.get_action_url_name('index'), names)
+        self.assertIn(self.model_admin.url_helper.get_action_url_name('add_field'), names)
+
+    def test_get_queryset_prefetches_related(self):
+        """
+        The index queryset should prefetch fields and handlers
+        """
+        queryset = self.model_admin.get_queryset(self.request)
+        self.assertIn('fields', queryset._prefetch_related_lookups)
+        self.assertIn('handlers', queryset._prefetch_related_lookups)
+
+    def test_num_queries(self):
+        """
+        The number of queries should not depend on the number of forms
+        """
+        with self.assertNumQueries(3):
+            rows = self._render_rows()
+        self.assertEqual(len(rows), 3)
+        OmniCharFieldFactory.create(form=OmniFormFactory.create())
+        with self.assertNumQueries(3):
+            self._render_rows()
+
+    @patch('omniforms.wagtail.wagtail_hooks.run_permission_hooks')
+    def test_permission_hooks_run_once_per_form(self, patched_method):
+        """
+        The update and delete hooks should only be run once for each form
+        """
+        self._render_rows()
+        self.assertEqual(patched_method.call_count, 6)
+
+    def test_related_controls_rendered_once(self):
+        """
+        The related object links should be rendered with a single template render per column
+        """
+        with patch.object(self.model_admin.related_controls_template, 'render', return_value='') as patched_method:
+            self._render_rows()
+        self.assertEqual(patched_method.call_count, 6)
+
+    def test_renders_related_links(self):
+        """
+        Edit and delete links should be rendered for each related object
+        """
+        form = self.model_admin.get_queryset(self.request).get(title='Form 0')
+        soup = BeautifulSoup(self.model_admin.omni_form_fields(form), 'lxml')
+        hrefs = [link.attrs['href'] for link in soup.find_all('a', {'class': 'u-link'})]
+        expected = []
+        for field in form.fields.all():
+            expected.append(self.model_admin.url_helper.get_action_url('change_field', str(form.pk), str(field.pk)))
+            expected.append(self.model_admin.url_helper.get_action_url('delete_field', str(form.pk), str(field.pk)))
+        self.assertEqual(hrefs, expected)
+
+    @patch('omniforms.wagtail.wagtail_hooks.run_permission_hooks')
+    def test_locked_form(self, patched_method):
+        """
+        Locked forms should render related objects without links
+        """
+        def hook(action, instance):
+            if action == 'delete':
+                raise PermissionDenied
+        patched_method.side_effect = hook
+        form = self.model_admin.get_queryset(self.request).get(title='Form 0')
+        self.assertEqual(self.model_admin.omni_form_locked(form), 'yes')
+        self.assertIn('<a', self.model_admin.omni_form_fields(form))
+        patched_method.side_effect = PermissionDenied
+        form = self.model_admin.get_queryset(self.request).get(title='Form 1')
+        self.assertEqual(self.model_admin.omni_form_locked(form), 'yes')
+        self.assertNotIn('<a', self.model_admin.omni_form_fields(form))
+
+    def test_unlocked_form(self):
+        """
+        Forms should not be locked if no hooks deny access
+        """
+        form = self.model_admin.get_queryset(self.request).get(title='Form 0')
+        self.assertEqual(self.model_admin.omni_form_locked(form), 'no')
+
+    def test_no_related_objects(self):
+        """
+        An empty string should be returned if the form has no related objects
+        """
+        form = OmniFormFactory.create()
+        self.assertEqual(self.model_admin.omni_form_handlers(form), '')
+
+
 class WagtailOmniFormButtonHelperTestCase(TestCase):
     """
     Tests the WagtailOmniFormButtonHelper
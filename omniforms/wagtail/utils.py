@@ -1,4 +1,134 @@
+from contextlib import contextmanager
+from django.core.exceptions import PermissionDenied
+from django.core.signals import request_finished
+from django.dispatch import receiver
+from django.utils.decorators import available_attrs
+from functools import wraps
 from wagtail.wagtailcore import hooks
+import threading
+
+
+_state = threading.local()
+
+
+@contextmanager
+def permission_hook_cache():
+    """
+    Context manager that stores the outcome of permission hooks until the block exits
+    Whilst active, hooks are only run once for each (action, model, pk) combination.
+    Nested blocks share the outermost cache.
+    """
+    if getattr(_state, 'cache', None) is not None:
+        yield _state.cache
+        return
+
+    _state.cache = {}
+    try:
+        yield _state.cache
+    finally:
+        _state.cache = None
+
+
+def _discard_cache(cache):
+    """
+    Discards the active permission hook cache if it is the given cache
+
+    :param cache: The cache dict to discard
+    """
+    if getattr(_state, 'cache', None) is cache:
+        _state.cache = None
+
+
+@receiver(request_finished)
+def discard_request_permission_hook_cache(**kwargs):
+    """
+    Discards a cache left active by a cache_permission_hooks view whose response was never rendered
+
+    :param kwargs: Signal keyword arguments
+    """
+    cache = getattr(_state, 'request_cache', None)
+    _state.request_cache = None
+    if cache is not None:
+        _discard_cache(cache)
+
+
+def cache_permission_hooks(view_func):
+    """
+    View decorator that caches the outcome of permission hooks for the duration of the request
+    For unrendered template responses the cache remains active until the response has been
+    rendered, so template response middleware and the templates share the cache
+
+    :param view_func: The view function to decorate
+    :return: Decorated view function
+    """
+    @wraps(view_func, assigned=available_attrs(view_func))
+    def wrapped_view(*args, **kwargs):
+        if getattr(_state, 'cache', None) is not None:
+            return view_func(*args, **kwargs)
+
+        cache = _state.cache = {}
+        try:
+            response = view_func(*args, **kwargs)
+        except Exception:
+            _discard_cache(cache)
+            raise
+
+        if callable(getattr(response, 'add_post_render_callback', None)) and not response.is_rendered:
+            _state.request_cache = cache
+            response.add_post_render_callback(lambda rendered: _discard_cache(cache))
+        else:
+            _discard_cache(cache)
+        return response
+    return wrapped_view
+
+
+def _get_cache():
+    """
+    Gets the active permission hook cache
+
+    :return: Dict of hook outcomes or None if no cache is active
+    """
+    return getattr(_state, 'cache', None)
+
+
+def _get_cache_key(action, instance):
+    """
+    Gets the cache key for the action and instance
+
+    :param action: The action being performed
+    :param instance: The model instance being worked on
+    :return: Tuple of (action, model label, pk) or None for unsaved instances
+    """
+    if instance is None or instance.pk is None:
+        return None
+    return action, instance._meta.label_lower, instance.pk
+
+
+def _raise_denied(denied):
+    """
+    Raises a copy of the cached PermissionDenied exception
+
+    :param denied: Cached PermissionDenied exception instance
+    :raises: PermissionDenied
+    """
+    raise denied.__class__(*denied.args)
+
+
+def _run_hooks(action, instance):
+    """
+    Runs the single instance and bulk permission hooks for the instance
+
+    :param action: The action being performed
+    :param instance: The model instance being worked on
+    :raises: PermissionDenied
+    """
+    for hook in hooks.get_hooks('omniform_permission_check'):
+        hook(action, instance)
+
+    if instance is not None and instance.pk is not None:
+        for hook in hooks.get_hooks('omniform_bulk_permission_check'):
+            if instance.pk in set(hook(action, [instance]) or []):
+                raise PermissionDenied
 
 
 def run_permission_hooks(action, instance):
@@ -10,8 +140,78 @@ def run_permission_hooks(action, instance):
      - action: The action being performed (create, update, delete, clone)
      - instance: The instance being operated on
 
+    Any 'omniform_bulk_permission_check' hooks are called with a list containing the instance.
+
+    If a permission hook cache is active (see permission_hook_cache) the outcome,
+    including any PermissionDenied exception, is stored and reused.
+
     :param action: The action being performed
     :param instance: The model instance being worked on
+    :raises: PermissionDenied
     """
-    for hook in hooks.get_hooks('omniform_permission_check'):
-        hook(action, instance)
+    cache = _get_cache()
+    key = _get_cache_key(action, instance) if cache is not None else None
+
+    if key is not None and key in cache:
+        if cache[key] is not None:
+            _raise_denied(cache[key])
+        return
+
+    try:
+        _run_hooks(action, instance)
+    except PermissionDenied as e:
+        if key is not None:
+            cache[key] = e
+        raise
+
+    if key is not None:
+        cache[key] = None
+
+
+def run_permission_hooks_bulk(action, instances):
+    """
+    Runs permission hooks for a list of saved instances
+
+    Each 'omniform_bulk_permission_check' hook is called once with the action and the list
+    of instances and should return the primary keys of the instances for which the action
+    is denied. 'omniform_permission_check' hooks are then run for each remaining instance.
+
+    If a permission hook cache is active the outcomes are stored so that subsequent calls
+    to run_permission_hooks for the same instances do not run the hooks again.
+
+    :param action: The action being performed
+    :param instances: List of saved model instances
+    :return: Dict mapping instance pk to a boolean indicating whether the action is permitted
+    """
+    cache = _get_cache()
+    outcomes = {}
+    pending = []
+
+    for instance in instances:
+        key = _get_cache_key(action, instance)
+        if cache is not None and key in cache:
+            outcomes[instance.pk] = cache[key]
+        else:
+            pending.append(instance)
+
+    denied_pks = set()
+    if pending:
+        for hook in hooks.get_hooks('omniform_bulk_permission_check'):
+            denied_pks.update(hook(action, pending) or [])
+
+    for instance in pending:
+        outcome = None
+        if instance.pk in denied_pks:
+            outcome = PermissionDenied()
+        else:
+            try:
+                for hook in hooks.get_hooks('omniform_permission_check'):
+                    hook(action, instance)
+            except PermissionDenied as e:
+                outcome = e
+        outcomes[instance.pk] = outcome
+        key = _get_cache_key(action, instance)
+        if cache is not None and key is not None:
+            cache[key] = outcome
+
+    return {pk: outcome is None for pk, outcome in outcomes.items()}
@@ -1,7 +1,8 @@
 from django.conf.urls import url
 from django.contrib.auth.models import Permission
 from django.core.exceptions import PermissionDenied
-from django.template.loader import render_to_string
+from django.template.loader import get_template
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
 from wagtail.contrib.modeladmin.helpers.button import ButtonHelper
 from wagtail.contrib.modeladmin.helpers.permission import PermissionHelper
@@ -12,7 +13,7 @@ from wagtail.wagtailcore import hooks
 from omniforms.models import OmniForm
 from omniforms.wagtail import model_admin_views
 from omniforms.wagtail.forms import OmniFieldPermissionForm, OmniHandlerPermissionForm
-from omniforms.wagtail.utils import run_permission_hooks
+from omniforms.wagtail.utils import cache_permission_hooks, run_permission_hooks
 
 
 @hooks.register('register_permissions')
@@ -278,6 +279,7 @@ class WagtailOmniFormModelAdmin(ModelAdmin):
     url_helper_class = WagtailOmniFormURLHelper
     permission_helper_class = WagtailOmniFormPermissionHelper
     # Custom model admin views
+    index_view_class = model_admin_views.IndexView
     clone_form_view_class = model_admin_views.CloneFormView
     select_field_view_class = model_admin_views.SelectFieldView
     add_field_view_class = model_admin_views.AddFieldView
@@ -288,6 +290,49 @@ class WagtailOmniFormModelAdmin(ModelAdmin):
     change_handler_view_class = model_admin_views.ChangeHandlerView
     delete_handler_view_class = model_admin_views.DeleteHandlerView
 
+    related_controls_template_name = 'modeladmin/omniforms/wagtail/includes/related_controls_list.html'
+
+    def get_queryset(self, request):
+        """
+        Gets the queryset for the index view
+        Prefetches the fields and handlers displayed for each form
+
+        :param request: HttpRequest instance
+        :return: OmniForm queryset
+        """
+        return super(WagtailOmniFormModelAdmin, self).get_queryset(request).prefetch_related('fields', 'handlers')
+
+    @cached_property
+    def related_controls_template(self):
+        """
+        The compiled template used to render the related object links for each form
+
+        :return: Template instance
+        """
+        return get_template(self.related_controls_template_name)
+
+    @staticmethod
+    def _get_lock_state(form):
+        """
+        Runs the update and delete permission hooks for the form. The result is stored
+        against the form instance so that the hooks are only run once for each index row
+
+        :param form: OmniForm model instance
+        :return: Dict indicating whether the update and delete actions are locked
+        """
+        lock_state = getattr(form, '_omni_form_lock_state', None)
+        if lock_state is None:
+            lock_state = {}
+            for action in ('update', 'delete'):
+                try:
+                    run_permission_hooks(action, form)
+                except PermissionDenied:
+                    lock_state[action] = True
+                else:
+                    lock_state[action] = False
+            form._omni_form_lock_state = lock_state
+        return lock_state
+
     def _omni_form_related(self, form, related_qs, change_action, delete_action):
         """
         Returns a comma delimited list of links for editing and deleting the related form objects
@@ -298,38 +343,20 @@ class WagtailOmniFormModelAdmin(ModelAdmin):
         :param delete_action: The name of the url delete action
         :return: comma delimited list of field links
         """
-        links = []
-
-        try:
-            run_permission_hooks('update', form)
-        except PermissionDenied:
-            form_locked = True
-        else:
-            form_locked = False
-
-        for related in related_qs:
-            edit_url = self.url_helper.get_action_url(
-                change_action,
-                str(form.pk),
-                str(related.pk)
-            )
-
-            delete_url = self.url_helper.get_action_url(
-                delete_action,
-                str(form.pk),
-                str(related.pk)
-            )
-
-            links.append(render_to_string(
-                'modeladmin/omniforms/wagtail/includes/related_controls.html',
-                {
-                    'button_text': related,
-                    'edit_url': edit_url,
-                    'delete_url': delete_url,
-                    'form_locked': form_locked
-                }
-            ))
-        return mark_safe(''.join(links))
+        related_objects = [
+            {
+                'button_text': related,
+                'edit_url': self.url_helper.get_action_url(change_action, str(form.pk), str(related.pk)),
+                'delete_url': self.url_helper.get_action_url(delete_action, str(form.pk), str(related.pk)),
+            }
+            for related in related_qs
+        ]
+        if not related_objects:
+            return mark_safe('')
+        return mark_safe(self.related_controls_template.render({
+            'related_objects': related_objects,
+            'form_locked': self._get_lock_state(form)['update']
+        }).strip())
 
     def omni_form_fields(self, instance):
         """
@@ -367,13 +394,10 @@ class WagtailOmniFormModelAdmin(ModelAdmin):
         :param instance: The form instance
         :return: string
         """
-        try:
-            run_permission_hooks('update', instance)
-            run_permission_hooks('delete', instance)
-        except PermissionDenied:
+        lock_state = WagtailOmniFormModelAdmin._get_lock_state(instance)
+        if lock_state['update'] or lock_state['delete']:
             return 'yes'
-        else:
-            return 'no'
+        return 'no'
 
     def clone_form_view(self, request, instance_pk):
         """
@@ -501,6 +525,18 @@ class WagtailOmniFormModelAdmin(ModelAdmin):
     def get_admin_urls_for_registration(self):
         """
         Adds extra urls for managing fields associated with the form
+        The outcome of permission hooks is cached for the duration of each request to these views
+
+        :return: tuple of admin urls for the modeladmin class
+        """
+        return tuple(
+            url(pattern.regex.pattern, cache_permission_hooks(pattern.callback), pattern.default_args, pattern.name)
+            for pattern in self._get_admin_urls()
+        )
+
+    def _get_admin_urls(self):
+        """
+        Gets the admin urls for the modeladmin class
 
         :return: tuple of admin urls for the modeladmin class
         """
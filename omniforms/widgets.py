@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Form widgets for the omniforms app
+"""
+from __future__ import unicode_literals
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.encoding import force_text
+
+
+AUTOCOMPLETE_TOKEN_SALT = 'omniforms.autocomplete'
+
+
+def get_fallback_widget_class(widget_class):
+    """
+    Gets the plain select widget class an autocomplete widget class is based on
+
+    :param widget_class: AutocompleteWidgetMixin subclass
+    :return: django.forms.Widget subclass
+    """
+    for base in widget_class.__mro__:
+        if issubclass(base, forms.Widget) and not issubclass(base, AutocompleteWidgetMixin):
+            return base
+    return forms.Select
+
+
+class AutocompleteWidgetMixin(object):
+    """
+    Mixin for select widgets whose choices are loaded from a paginated JSON endpoint
+    Only the selected choices are rendered into the HTML
+    """
+    class Media(object):
+        js = ('omniforms/js/autocomplete.js',)
+
+    def __init__(self, attrs=None, choices=(), url=None):
+        """
+        Sets up the instance
+
+        :param attrs: Dict of widget attributes
+        :param choices: Iterable of choices
+        :param url: The URL of the autocomplete endpoint
+        """
+        attrs = dict(attrs or {})
+        attrs['class'] = ' '.join(filter(None, [attrs.get('class'), 'omniforms-autocomplete']))
+        if url is not None:
+            attrs['data-autocomplete-url'] = url
+        super(AutocompleteWidgetMixin, self).__init__(attrs=attrs, choices=choices)
+
+    def _get_selected_choices(self, value):
+        """
+        Gets the choices for the selected values, fetching the selected instances in a single query
+
+        :param value: List of selected values
+        :return: List of (value, label) tuples
+        """
+        iterator = self.choices
+        if not hasattr(iterator, 'queryset'):
+            return [choice for choice in iterator if force_text(choice[0]) in value]
+
+        choices = []
+        if iterator.field.empty_label is not None:
+            choices.append(('', iterator.field.empty_label))
+        selected = [item for item in value if item not in (None, '')]
+        if selected:
+            key = iterator.field.to_field_name or 'pk'
+            try:
+                instances = list(iterator.queryset.filter(**{'{0}__in'.format(key): selected}))
+            except (ValidationError, TypeError, ValueError):
+                instances = []
+            choices.extend(iterator.choice(instance) for instance in instances)
+        return choices
+
+    def optgroups(self, name, value, attrs=None):
+        """
+        Gets the option groups for the widget, containing only the selected choices
+
+        :param name: The name of the field
+        :param value: List of selected values
+        :param attrs: Dict of widget attributes
+        :return: List of option groups
+        """
+        choices = self.choices
+        self.choices = self._get_selected_choices(value)
+        try:
+            return super(AutocompleteWidgetMixin, self).optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
+class AutocompleteSelect(AutocompleteWidgetMixin, forms.Select):
+    """
+    Select widget with choices loaded from the autocomplete endpoint
+    """
+
+
+class AutocompleteSelectMultiple(AutocompleteWidgetMixin, forms.SelectMultiple):
+    """
+    SelectMultiple widget with choices loaded from the autocomplete endpoint
+    """